@@ -0,0 +1,73 @@
+"""
+Times Sheet construction with fix-antimeridian on, comparing the bounds-test
+fast path against running antimeridian.fix_geojson on every sheet, plus the
+collection-level crossing detection.
+
+    python benchmarks/bench_antimeridian.py --sheets 20000 --crossing 0.01
+"""
+
+import random
+import warnings
+
+import antimeridian
+from geojson import Polygon
+
+from openindexmaps_py.oimpy import OpenIndexMap, Sheet
+
+from harness import run
+from synthetic import sheet_dicts
+
+
+def synthetic_index(count: int, crossing: float, seed: int = 0):
+    rng = random.Random(seed)
+    sheets = list(sheet_dicts(count, seed))
+    for sheetdict in sheets:
+        if rng.random() < crossing:
+            sheetdict["west"], sheetdict["east"] = 179.75, -179.75
+    return sheets
+
+
+def rings(sheets):
+    for sheetdict in sheets:
+        west, south = sheetdict["west"], sheetdict["south"]
+        east, north = sheetdict["east"], sheetdict["north"]
+        ring = [
+            (west, south),
+            (east, south),
+            (east, north),
+            (west, north),
+            (west, south),
+        ]
+        yield Polygon([ring]), (west, south, east, north)
+
+
+def fix_every_sheet(sheets):
+    for polygon, _ in rings(sheets):
+        antimeridian.fix_geojson(polygon)
+
+
+def fast_path(sheets):
+    for polygon, bounds in rings(sheets):
+        Sheet._fix_antimeridian(polygon, *bounds)
+
+
+def options(parser):
+    parser.add_argument("--crossing", type=float, default=0.01)
+
+
+def prepare(directory, count, args):
+    sheets = synthetic_index(count, args.crossing, args.seed)
+    return sheets, OpenIndexMap([Sheet(s) for s in sheets])
+
+
+def variants(workload, args):
+    sheets, oim = workload
+    yield "fix_geojson every sheet", lambda: fix_every_sheet(sheets)
+    yield "bounds test fast path", lambda: fast_path(sheets)
+    yield "Sheet construction", lambda: OpenIndexMap([Sheet(s) for s in sheets])
+    yield "antimeridian_sheets()", lambda: f"{len(oim.antimeridian_sheets())} crossing"
+
+
+if __name__ == "__main__":
+    warnings.simplefilter("ignore")
+    run(__doc__, prepare, variants, sizes=[20000], options=options)
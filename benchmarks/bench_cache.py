@@ -0,0 +1,59 @@
+"""
+Repeated queries of one synthetic OpenIndexMap: streaming the file each time
+against the on-disk parsed-index cache, cold (parse and store) and warm (load
+the stored columns and evaluate the predicates a column at a time).
+
+    python benchmarks/bench_cache.py --sheets 200000
+"""
+
+import io
+import os
+
+from openindexmaps_py.cache import IndexCache
+from openindexmaps_py.columnar import ColumnarOpenIndexMap
+from openindexmaps_py.query import parse_predicate, query_features, query_rows
+from openindexmaps_py.streaming import iter_features
+from openindexmaps_py.writer import write_feature_collection
+
+from harness import run
+from synthetic import write_oim
+
+PREDICATES = ["datePub>=1990", "available=True", "label<20"]
+
+
+def streamed(path):
+    predicates = [parse_predicate(expression) for expression in PREDICATES]
+    with open(path) as file:
+        matches = query_features(iter_features(file), predicates)
+        return write_feature_collection(io.StringIO(), matches)
+
+
+def cached(path, cache):
+    predicates = [parse_predicate(expression) for expression in PREDICATES]
+    oim = ColumnarOpenIndexMap.from_file(path, cache=cache)
+    rows = query_rows(oim.columns, predicates)
+    return write_feature_collection(io.StringIO(), oim.take(rows).output_features())
+
+
+def prepare(directory, count, args):
+    path = write_oim(os.path.join(directory, "oim.geojson"), count, args.seed)
+    return path, os.path.join(directory, "cache")
+
+
+def variants(workload, args):
+    path, directory = workload
+
+    def cold():
+        cache = IndexCache(directory)
+        cache.clear()
+        count = cached(path, cache)
+        return f"{count} matches, cache entry {cache.size() / 1e6:.1f} MB"
+
+    yield "streamed", lambda: streamed(path)
+    yield "cache cold", cold
+    yield "cache warm", lambda: cached(path, IndexCache(directory))
+
+
+if __name__ == "__main__":
+    print(" AND ".join(PREDICATES))
+    run(__doc__, prepare, variants, sizes=[200000])
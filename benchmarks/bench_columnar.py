@@ -0,0 +1,46 @@
+"""
+Compares the retained memory of the list-backed and columnar OpenIndexMaps.
+
+    python benchmarks/bench_columnar.py --sheets 20000
+
+Exits non-zero when the columnar backend is not at least --min-ratio times
+smaller than the list of Sheet objects.
+"""
+
+import os
+import sys
+
+from openindexmaps_py.columnar import ColumnarOpenIndexMap
+from openindexmaps_py.oimpy import OpenIndexMap
+
+from harness import run
+from synthetic import write_oim
+
+
+def options(parser):
+    parser.add_argument("--min-ratio", type=float, default=5.0)
+
+
+def prepare(directory, count, args):
+    return write_oim(os.path.join(directory, "synthetic.geojson"), count, args.seed)
+
+
+def variants(path, args):
+    for cls in (OpenIndexMap, ColumnarOpenIndexMap):
+        yield cls.__name__, lambda cls=cls: cls.from_file(path)
+
+
+def main():
+    args, results = run(__doc__, prepare, variants, options=options)
+    failed = False
+    for listed, columnar in zip(results[::2], results[1::2]):
+        if listed["retained"] is None:
+            continue
+        ratio = listed["retained"] / columnar["retained"]
+        print(f"{listed['sheets']:>9} sheets  memory ratio {ratio:.1f}x")
+        failed |= ratio < args.min_ratio
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,58 @@
+"""
+Throughput of convert_geodex_files on a corpus of synthetic Geodex exports
+with a growing number of worker processes. --records counts the records per
+file.
+
+    python benchmarks/bench_convert_geodex.py --files 16 --records 5000 --jobs 1 2 4
+"""
+
+import os
+
+from openindexmaps_py.geodex import convert_geodex_files
+
+from harness import run
+from synthetic import write_geodex
+
+
+def options(parser):
+    parser.add_argument("--files", type=int, default=8)
+    parser.add_argument("--jobs", type=int, nargs="+", default=[1, 2, 4])
+
+
+def prepare(directory, count, args):
+    sources = [
+        write_geodex(
+            os.path.join(directory, f"f{i:04d}_geodex.geojson"),
+            count,
+            seed=args.seed + i,
+        )
+        for i in range(args.files)
+    ]
+    return sources, os.path.join(directory, "oim")
+
+
+def variants(workload, args):
+    sources, output = workload
+
+    def convert(jobs):
+        results = convert_geodex_files(sources, output, jobs=jobs)
+        return sum(result.records for result in results)
+
+    for jobs in args.jobs:
+        yield f"jobs {jobs}", lambda jobs=jobs: convert(jobs)
+
+
+def main():
+    args, results = run(
+        __doc__, prepare, variants, size="records", sizes=[2000], options=options
+    )
+    print(f"{os.cpu_count()} cores, {args.files} files")
+    for count in args.records:
+        runs = [result for result in results if result["sheets"] == count]
+        for result in runs:
+            speedup = runs[0]["seconds"] / result["seconds"]
+            print(f"{count:>9} {result['case']:10} speedup {speedup:5.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""
+Compares the per-record Geodex conversion (GeodexGeoJSON) with the batch
+conversion (GeodexTable) on a synthetic Geodex export, and checks that both
+write the same OpenIndexMap.
+
+    python benchmarks/bench_geodex.py --records 500000
+"""
+
+import contextlib
+import filecmp
+import io
+import os
+
+from openindexmaps_py.geodex import GeodexGeoJSON, GeodexTable
+
+from harness import run
+from synthetic import write_geodex
+
+
+def per_record(source):
+    # to_openindexmap prints a note about validation
+    with contextlib.redirect_stdout(io.StringIO()):
+        geodex = GeodexGeoJSON.from_geojson_file(source)
+        return geodex.to_openindexmap(VALIDATE=False)
+
+
+def batch(source):
+    return GeodexTable.from_geojson_file(source).to_openindexmap(VALIDATE=False)
+
+
+def options(parser):
+    parser.add_argument(
+        "--skip-per-record",
+        action="store_true",
+        help="Only time the batch conversion (the per-record one takes minutes)",
+    )
+
+
+def prepare(directory, count, args):
+    return directory, write_geodex(
+        os.path.join(directory, "geodex.geojson"), count, args.seed
+    )
+
+
+def variants(workload, args):
+    directory, source = workload
+    outputs = {}
+
+    def converter(name, convert):
+        def convert_and_write():
+            oim = convert(source)
+            outputs[name] = os.path.join(directory, f"{name}.geojson")
+            with open(outputs[name], "w") as file:
+                written = oim.write(file)
+            if len(outputs) < 2:
+                return written
+            same = filecmp.cmp(*outputs.values(), shallow=False)
+            return "outputs identical" if same else "OUTPUTS DIFFER"
+
+        return convert_and_write
+
+    if not args.skip_per_record:
+        yield "GeodexGeoJSON", converter("GeodexGeoJSON", per_record)
+    yield "GeodexTable", converter("GeodexTable", batch)
+
+
+if __name__ == "__main__":
+    run(__doc__, prepare, variants, size="records", sizes=[50000], options=options)
@@ -0,0 +1,42 @@
+"""
+Peak memory of converting a synthetic Geodex export with the streaming
+pipeline (convert_geodex) and with GeodexGeoJSON, at growing series sizes.
+
+    python benchmarks/bench_geodex_pipeline.py --records 1000 10000 50000
+"""
+
+import contextlib
+import io
+import os
+
+from openindexmaps_py.geodex import GeodexGeoJSON, convert_geodex
+
+from harness import run
+from synthetic import write_geodex
+
+
+def prepare(directory, count, args):
+    source = write_geodex(os.path.join(directory, "geodex.geojson"), count, args.seed)
+    return source, os.path.join(directory, "oim.geojson")
+
+
+def variants(workload, args):
+    source, output = workload
+
+    def in_memory():
+        with contextlib.redirect_stdout(io.StringIO()):
+            geodex = GeodexGeoJSON.from_geojson_file(source)
+            oim = geodex.to_openindexmap(VALIDATE=False)
+        with open(output, "w") as file:
+            return oim.write(file)
+
+    def pipeline():
+        skipped = []
+        with open(output, "w") as file:
+            convert_geodex(source, file, on_skip=skipped.append)
+
+    return [("GeodexGeoJSON", in_memory), ("pipeline", pipeline)]
+
+
+if __name__ == "__main__":
+    run(__doc__, prepare, variants, size="records", sizes=[1000, 10000])
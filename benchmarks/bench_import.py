@@ -0,0 +1,72 @@
+"""
+Measures the import time of the package modules with ``python -X importtime``
+and fails when one exceeds a threshold.
+
+    python benchmarks/bench_import.py --max-ms 250
+"""
+
+import argparse
+import statistics
+import subprocess
+import sys
+
+MODULES = ("openindexmaps_py.oimpycli", "openindexmaps_py.oimpy")
+
+# Modules that are only needed by some commands and must not be imported by
+# the CLI entry point.
+DEFERRED = ("folium", "requests", "shapely", "jsonschema", "antimeridian", "yaml")
+
+
+def import_time(module: str) -> tuple[float, set]:
+    """Returns the cumulative import time of ``module`` in ms and all modules loaded."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    cumulative, loaded = None, set()
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative_us, name = line.split("|")
+        name, cumulative_us = name.strip(), cumulative_us.strip()
+        if cumulative_us.isdigit():
+            loaded.add(name)
+            if name == module:
+                cumulative = int(cumulative_us) / 1000
+    return cumulative, loaded
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=7)
+    parser.add_argument(
+        "--max-ms",
+        type=float,
+        default=250.0,
+        help="Fail when the median import time of a module exceeds this",
+    )
+    args = parser.parse_args()
+
+    failed = False
+    for module in MODULES:
+        times, loaded = [], set()
+        for _ in range(args.repeat):
+            elapsed, loaded = import_time(module)
+            times.append(elapsed)
+        median = statistics.median(times)
+        print(f"{module:28} median {median:7.1f} ms  min {min(times):7.1f} ms")
+        if median > args.max_ms:
+            print(f"  slower than {args.max_ms:.0f} ms")
+            failed = True
+        if module == "openindexmaps_py.oimpycli":
+            eager = sorted(name for name in DEFERRED if name in loaded)
+            if eager:
+                print(f"  imports {', '.join(eager)} eagerly")
+                failed = True
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+"""
+Size and build time of the folium page for the notebook's fixture and the
+other index maps in tests/fixture, and for synthetic index maps, with the
+full GeoJSON inlined and with the compact payload.
+
+    python benchmarks/bench_map_payload.py --sheets 1000 10000
+"""
+
+import json
+import os
+import warnings
+
+from openindexmaps_py import mapping
+
+from harness import measure, run
+from synthetic import features
+
+FIXTURES = [
+    "tests/fixture/233bA62500a.geojson",  # the one notebooks/demo.ipynb maps
+    "tests/fixture/f0303_OIM.geojson",
+    "tests/fixture/f0140_OIM.geojson",
+    "tests/fixture/MillionthMap.geojson",
+]
+
+
+def page(data, compact: bool):
+    mapping.create_map(data, compact=compact)
+    return f"{os.path.getsize(mapping.OUTPUT_PATH) / 1e3:.1f} kB"
+
+
+def prepare(directory, count, args):
+    return {"type": "FeatureCollection", "features": list(features(count, args.seed))}
+
+
+def variants(collection, args):
+    return [
+        ("full", lambda: page(collection, False)),
+        ("compact", lambda: page(collection, True)),
+    ]
+
+
+def main():
+    warnings.simplefilter("ignore")  # folium's basemap API key warning
+    run(__doc__, prepare, variants, sizes=[1000, 10000])
+    print()
+    for path in FIXTURES:
+        with open(path) as file:
+            data = json.load(file)
+        for compact in (False, True):
+            measured = measure(page, data, compact, memory=False)
+            print(
+                f"{os.path.basename(path):24} {'compact' if compact else 'full':8}"
+                f" {measured.seconds:7.3f} s  {measured.result}"
+            )
+
+
+if __name__ == "__main__":
+    main()
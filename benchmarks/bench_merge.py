@@ -0,0 +1,55 @@
+"""
+Merging synthetic OpenIndexMaps: the previous in-memory merge (Sheets, one
+OpenIndexMap, one indented dump) against merge_files with one and more jobs.
+Memory is that of the main process; --sheets counts the sheets per file.
+
+    python benchmarks/bench_merge.py --files 8 --sheets 20000 --jobs 1 2 4
+"""
+
+import json
+import os
+
+from openindexmaps_py import oimpy
+from openindexmaps_py.merge import merge_files
+
+from harness import run
+from synthetic import write_oim
+
+
+def in_memory(fp, sources):
+    sheets = []
+    for source in sources:
+        with open(source) as file:
+            for feature in json.load(file)["features"]:
+                feature["properties"]["note"] = f"From source file {source}"
+                sheets.append(oimpy.Sheet(feature["properties"]))
+    return oimpy.OpenIndexMap(sheets).write(fp, indent=4)
+
+
+def options(parser):
+    parser.add_argument("--files", type=int, default=8)
+    parser.add_argument("--jobs", type=int, nargs="+", default=[1, 2])
+
+
+def prepare(directory, count, args):
+    sources = [
+        write_oim(os.path.join(directory, f"{i}.geojson"), count, seed=args.seed + i)
+        for i in range(args.files)
+    ]
+    return sources, os.path.join(directory, "merged.geojson")
+
+
+def variants(workload, args):
+    sources, output = workload
+
+    def merge(function, **kwargs):
+        with open(output, "w") as fp:
+            function(fp, sources, **kwargs)
+
+    yield "in memory", lambda: merge(in_memory)
+    for jobs in args.jobs:
+        yield f"jobs {jobs}", lambda jobs=jobs: merge(merge_files, jobs=jobs)
+
+
+if __name__ == "__main__":
+    run(__doc__, prepare, variants, sizes=[20000], options=options)
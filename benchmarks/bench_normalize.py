@@ -0,0 +1,52 @@
+"""
+Cleaning Geodex bounds: normalize_bounds over whole columns against the
+same checks written record by record in Python.
+
+    python benchmarks/bench_normalize.py --records 100000 1000000
+"""
+
+from openindexmaps_py.geodex import PRIME_MERIDIAN_OFFSETS, normalize_bounds
+
+from harness import run
+from synthetic import geodex_features
+
+
+def per_record(x1, x2, y1, y2, prime_mer):
+    rows = []
+    for west, east, north, south, code in zip(x1, x2, y1, y2, prime_mer):
+        if None in (west, east, north, south):
+            rows.append(None)
+            continue
+        offset = PRIME_MERIDIAN_OFFSETS.get(code, 0.0)
+        west, east = west + offset, east + offset
+        if abs(west) > 180:
+            west = (west + 180) % 360 - 180
+        if abs(east) > 180:
+            east = (east + 180) % 360 - 180
+        if north < south:
+            north, south = south, north
+        if west > east and west - east < 180:
+            west, east = east, west
+        north, south = min(max(north, -90), 90), min(max(south, -90), 90)
+        west, east = min(max(west, -180), 180), min(max(east, -180), 180)
+        rows.append(tuple(round(value, 6) for value in (north, south, west, east)))
+    return rows
+
+
+def prepare(directory, count, args):
+    columns = {field: [] for field in ("X1", "X2", "Y1", "Y2", "PRIME_MER")}
+    for feature in geodex_features(count, args.seed):
+        for field, values in columns.items():
+            values.append(feature["properties"].get(field))
+    return list(columns.values())
+
+
+def variants(columns, args):
+    return [
+        ("normalize_bounds", lambda: normalize_bounds(*columns)),
+        ("per record", lambda: per_record(*columns)),
+    ]
+
+
+if __name__ == "__main__":
+    run(__doc__, prepare, variants, size="records", sizes=[100000])
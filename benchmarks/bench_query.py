@@ -0,0 +1,56 @@
+"""
+The query command's engine on a synthetic OpenIndexMap: time to the first
+match, total time and peak memory of a streamed query against loading the
+whole file with json.load and filtering it.
+
+    python benchmarks/bench_query.py --sheets 200000
+"""
+
+import io
+import json
+import os
+
+from openindexmaps_py.query import parse_predicate, query_features
+from openindexmaps_py.streaming import iter_features
+from openindexmaps_py.writer import write_feature_collection
+
+from harness import run
+from synthetic import write_oim
+
+PREDICATES = ["datePub>=1990", "available=True"]
+
+
+def streamed(path, limit=None):
+    predicates = [parse_predicate(expression) for expression in PREDICATES]
+    with open(path) as file:
+        matches = query_features(iter_features(file), predicates, limit=limit)
+        return write_feature_collection(io.StringIO(), matches)
+
+
+def loaded(path, limit=None):
+    predicates = [parse_predicate(expression) for expression in PREDICATES]
+    with open(path) as file:
+        content = json.load(file)
+    matches = [
+        feature
+        for feature in content["features"]
+        if all(predicate(feature) for predicate in predicates)
+    ][:limit]
+    return write_feature_collection(io.StringIO(), matches)
+
+
+def prepare(directory, count, args):
+    return write_oim(os.path.join(directory, "oim.geojson"), count, args.seed)
+
+
+def variants(path, args):
+    for name, function in (("json.load", loaded), ("streamed", streamed)):
+        for limit in (1, None):
+            yield f"{name} limit {limit}", lambda function=function, limit=limit: (
+                function(path, limit=limit)
+            )
+
+
+if __name__ == "__main__":
+    print(" AND ".join(PREDICATES))
+    run(__doc__, prepare, variants, sizes=[200000])
@@ -0,0 +1,47 @@
+"""
+Compares loading a file through OpenIndexMap.from_file with Sheet and with
+CompactSheet, and the memory each loaded map retains per sheet.
+
+    python benchmarks/bench_sheets.py --sheets 5000
+"""
+
+import os
+
+from openindexmaps_py import oimpy
+from openindexmaps_py.oimpy import CompactSheet, OpenIndexMap, Sheet
+
+from harness import run
+from synthetic import write_oim
+
+
+def options(parser):
+    parser.add_argument(
+        "--no-antimeridian",
+        action="store_true",
+        help="Disable fix-antimeridian to isolate the cost of building sheets",
+    )
+
+
+def prepare(directory, count, args):
+    if args.no_antimeridian:
+        oimpy.config["fix-antimeridian"] = False
+    return write_oim(os.path.join(directory, "synthetic.geojson"), count, args.seed)
+
+
+def variants(path, args):
+    for sheet_class in (Sheet, CompactSheet):
+        yield sheet_class.__name__, lambda sheet_class=sheet_class: (
+            OpenIndexMap.from_file(path, sheet_class=sheet_class)
+        )
+
+
+def main():
+    _, results = run(__doc__, prepare, variants, sizes=[5000], options=options)
+    for result in results:
+        if result["retained"] is not None:
+            per_sheet = result["retained"] / result["sheets"]
+            print(f"{result['case']:14} {per_sheet:8.0f} bytes/sheet retained")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,289 @@
+"""
+Benchmark suite of the library's hot paths on seeded synthetic index maps
+that mix the sheets of openindexmaps_py.testfeatures (plain, antimeridian,
+inset and nonstandard Geodex sheets).
+
+For each size it times Sheet and MapSheet construction,
+OpenIndexMap.from_file, compute_bbox, is_valid, str(), Geodex conversion and
+the `oimpy query` and `oimpy merge` commands, and measures their memory: the
+tracemalloc peak of a second, traced run, and for the commands the peak RSS
+of the process, from `oimpy --timings-json --trace-memory`. Results are
+written as JSON; compare two result files to flag regressions (the exit
+status is then 1).
+
+    python benchmarks/bench_suite.py run --sizes 1000 100000 -o results.json
+    python benchmarks/bench_suite.py run --sizes 1000000 --repeat 1 -o big.json
+    python benchmarks/bench_suite.py compare baseline.json results.json
+
+A million Sheets take about 4 GB of memory for from_file and the cases that
+use the loaded map.
+"""
+
+import argparse
+import gc
+import json
+import logging
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from openindexmaps_py.geodex import convert_geodex
+from openindexmaps_py.oimpy import MapSheet, OpenIndexMap, Sheet
+
+from harness import metadata
+from synthetic import pattern_sheet_dicts, write_geodex, write_oim
+
+SIZES = [1000, 100000]
+SCHEMA = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    "schemas",
+    "1.0.0.schema.json",
+)
+
+
+class Workload:
+    """The synthetic files of one size, and the map loaded from them."""
+
+    def __init__(self, directory: str, sheets: int, seed: int):
+        self.directory = directory
+        self.sheets = sheets
+        self.seed = seed
+        self.oim_path = write_oim(
+            os.path.join(directory, "oim.geojson"), sheets, seed, patterns=True
+        )
+        self.geodex_path = write_geodex(
+            os.path.join(directory, "geodex.geojson"), sheets, seed, patterns=True
+        )
+        self.output_path = os.path.join(directory, "output.geojson")
+        self._oim = None
+
+    @property
+    def oim(self) -> OpenIndexMap:
+        if self._oim is None:
+            self._oim = OpenIndexMap.from_file(self.oim_path)
+        return self._oim
+
+
+def construct(sheet_class):
+    def run(workload):
+        for properties in pattern_sheet_dicts(workload.sheets, workload.seed):
+            sheet_class(properties)
+
+    return run
+
+
+def from_file(workload):
+    OpenIndexMap.from_file(workload.oim_path)
+
+
+def compute_bbox(workload):
+    workload.oim.invalidate_bbox()
+    workload.oim.compute_bbox()
+
+
+def is_valid(workload):
+    workload.oim.is_valid(SCHEMA)
+
+
+def to_str(workload):
+    str(workload.oim)
+
+
+def geodex_conversion(workload):
+    with open(os.devnull, "w") as fp:
+        convert_geodex(workload.geodex_path, fp, on_skip=lambda skipped: None)
+
+
+def cli(*arguments):
+    """A case running `oimpy`, in a new process as from the shell."""
+
+    def command(workload, timings_path=None):
+        options = []
+        if timings_path:
+            options = ["--timings-json", timings_path, "--trace-memory"]
+        filled = [
+            argument.format(oim=workload.oim_path, output=workload.output_path)
+            for argument in arguments
+        ]
+        subprocess.run(
+            [sys.executable, "-m", "openindexmaps_py.oimpycli", *options, *filled],
+            check=True,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        )
+
+    command.cli = True
+    return command
+
+
+CASES = {
+    "Sheet": construct(Sheet),
+    "MapSheet": construct(MapSheet),
+    "from_file": from_file,
+    "compute_bbox": compute_bbox,
+    "is_valid": is_valid,
+    "str": to_str,
+    "geodex_conversion": geodex_conversion,
+    "cli_query": cli(
+        "query", "{oim}", "-w", "datePub>=1950", "-f", "{output}", "--quiet"
+    ),
+    "cli_merge": cli("merge", "{oim}", "{oim}", "-f", "{output}", "--quiet"),
+}
+
+
+def measure(case, workload, repeat: int, memory: bool) -> dict:
+    """The best time of ``repeat`` runs, then the memory of one more."""
+    seconds = []
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        case(workload)
+        seconds.append(time.perf_counter() - start)
+    result = {
+        "seconds": min(seconds),
+        "sheets_per_second": workload.sheets / min(seconds),
+        "tracemalloc_peak": None,
+        "peak_rss": None,
+    }
+    if not memory:
+        return result
+    if getattr(case, "cli", False):
+        timings_path = os.path.join(workload.directory, "timings.json")
+        case(workload, timings_path)
+        with open(timings_path) as file:
+            report = json.load(file)
+        result["tracemalloc_peak"] = report["tracemalloc_peak"]
+        result["peak_rss"] = report["peak_rss"]
+    else:
+        gc.collect()
+        tracemalloc.start()
+        case(workload)
+        result["tracemalloc_peak"] = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return result
+
+
+def run(args):
+    unknown = set(args.cases) - set(CASES)
+    if unknown:
+        sys.exit(f"Unknown cases: {', '.join(sorted(unknown))}")
+    # The nonstandard sheets fail the schema; keep their errors out of the table.
+    logging.disable(logging.ERROR)
+    results = []
+    print(f"{'case':18} {'sheets':>8} {'seconds':>9} {'sheets/s':>10} {'peak MB':>8}")
+    for sheets in args.sizes:
+        with tempfile.TemporaryDirectory() as tmp:
+            workload = Workload(tmp, sheets, args.seed)
+            workload.oim  # loaded outside the timed runs
+            for name in args.cases:
+                result = measure(CASES[name], workload, args.repeat, args.memory)
+                results.append({"case": name, "sheets": sheets, **result})
+                peak = result["tracemalloc_peak"]
+                print(
+                    f"{name:18} {sheets:>8} {result['seconds']:>9.3f} "
+                    f"{result['sheets_per_second']:>10.0f} "
+                    f"{'-' if peak is None else f'{peak / 1e6:.1f}':>8}"
+                )
+    report = {
+        "meta": metadata(seed=args.seed, repeat=args.repeat),
+        "results": results,
+    }
+    with open(args.output, "w") as file:
+        json.dump(report, file, indent=2)
+    print(f"Results written to {args.output}")
+
+
+def compare_results(
+    baseline: dict, current: dict, threshold: float, min_seconds: float
+):
+    """
+    Yields (case, sheets, seconds ratio, memory ratio, flags) for the runs in
+    both reports. A run is flagged when it is more than ``threshold`` slower
+    (and at least ``min_seconds`` slower) or uses more than ``threshold``
+    more memory than in ``baseline``.
+    """
+    before = {(r["case"], r["sheets"]): r for r in baseline["results"]}
+    for after in current["results"]:
+        old = before.get((after["case"], after["sheets"]))
+        if old is None:
+            continue
+        flags = []
+        ratio = after["seconds"] / old["seconds"] if old["seconds"] else None
+        if (
+            ratio is not None
+            and ratio > 1 + threshold
+            and after["seconds"] - old["seconds"] >= min_seconds
+        ):
+            flags.append("slower")
+        memory_ratio = None
+        for key in ("tracemalloc_peak", "peak_rss"):
+            if old.get(key) and after.get(key):
+                memory_ratio = after[key] / old[key]
+                if memory_ratio > 1 + threshold:
+                    flags.append(f"more memory ({key})")
+        yield after["case"], after["sheets"], ratio, memory_ratio, flags
+
+
+def compare(args):
+    with open(args.baseline) as file:
+        baseline = json.load(file)
+    with open(args.current) as file:
+        current = json.load(file)
+    print(f"{'case':18} {'sheets':>8} {'time':>7} {'memory':>7}")
+    regressions = 0
+    for case, sheets, ratio, memory_ratio, flags in compare_results(
+        baseline, current, args.threshold, args.min_seconds
+    ):
+        regressions += bool(flags)
+        print(
+            f"{case:18} {sheets:>8} "
+            f"{'-' if ratio is None else f'{ratio:.2f}x':>7} "
+            f"{'-' if memory_ratio is None else f'{memory_ratio:.2f}x':>7}"
+            f"{'  REGRESSION: ' + ', '.join(flags) if flags else ''}"
+        )
+    print(f"{regressions} regressions (threshold {args.threshold:.0%})")
+    if regressions:
+        sys.exit(1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run", help="Run the suite")
+    run_parser.add_argument("--sizes", type=int, nargs="+", default=SIZES)
+    run_parser.add_argument("--cases", nargs="+", default=list(CASES))
+    run_parser.add_argument("--repeat", type=int, default=3)
+    run_parser.add_argument("--seed", type=int, default=0)
+    run_parser.add_argument(
+        "--no-memory",
+        dest="memory",
+        action="store_false",
+        help="Skip the traced runs that measure memory",
+    )
+    run_parser.add_argument("--output", "-o", default="bench_results.json")
+    run_parser.set_defaults(handler=run)
+
+    compare_parser = commands.add_parser(
+        "compare", help="Flag regressions between two result files"
+    )
+    compare_parser.add_argument("baseline")
+    compare_parser.add_argument("current")
+    compare_parser.add_argument("--threshold", type=float, default=0.1)
+    compare_parser.add_argument(
+        "--min-seconds",
+        type=float,
+        default=0.005,
+        help="Ignore slowdowns smaller than this, which are mostly noise",
+    )
+    compare_parser.set_defaults(handler=compare)
+
+    args = parser.parse_args()
+    args.handler(args)
+
+
+if __name__ == "__main__":
+    main()
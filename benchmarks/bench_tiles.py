@@ -0,0 +1,62 @@
+"""
+Vector tile pyramid of a synthetic OpenIndexMap: the time to prepare the
+sheets, to encode each zoom level and to write the whole pyramid to a
+directory and to MBTiles with one and several processes, and the size of the
+tiles against the GeoJSON a map would otherwise inline.
+
+    python benchmarks/bench_tiles.py --sheets 200000 --max-zoom 10 --jobs 1 4
+"""
+
+import os
+
+from openindexmaps_py.columnar import ColumnarOpenIndexMap
+from openindexmaps_py.tiles import tile_source, write_tiles, zoom_tiles
+
+from harness import run
+from synthetic import write_oim
+
+
+def options(parser):
+    parser.add_argument("--max-zoom", type=int, default=10)
+    parser.add_argument("--jobs", type=int, nargs="+", default=[1, 4])
+
+
+def prepare(directory, count, args):
+    path = write_oim(os.path.join(directory, "oim.geojson"), count, args.seed)
+    return directory, path, ColumnarOpenIndexMap.from_file(path)
+
+
+def variants(workload, args):
+    directory, path, oim = workload
+    source = tile_source(oim)
+
+    def encode(zoom):
+        tiles = zoom_tiles(source, zoom)
+        size = sum(len(data) for _, _, data in tiles)
+        largest = max(len(data) for _, _, data in tiles)
+        return f"{len(tiles)} tiles {size / 1e6:.1f} MB, largest {largest / 1e3:.1f} kB"
+
+    def write(destination, jobs):
+        counts = write_tiles(oim, destination, maxzoom=args.max_zoom, jobs=jobs)
+        return f"{sum(counts.values())} tiles"
+
+    def prepare_sheets():
+        tile_source(oim)
+        return f"GeoJSON inlined in a page: {os.path.getsize(path) / 1e6:.1f} MB"
+
+    yield "prepare", prepare_sheets
+    for zoom in range(args.max_zoom + 1):
+        yield f"z{zoom}", lambda zoom=zoom: encode(zoom)
+    for jobs in args.jobs:
+        for name in ("directory", "mbtiles"):
+            destination = os.path.join(
+                directory, "index.mbtiles" if name == "mbtiles" else "tiles"
+            )
+            yield f"{name} ({jobs} jobs)", lambda destination=destination, jobs=jobs: (
+                write(destination, jobs)
+            )
+
+
+if __name__ == "__main__":
+    print(f"{os.cpu_count()} cores")
+    run(__doc__, prepare, variants, sizes=[200000], options=options)
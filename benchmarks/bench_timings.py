@@ -0,0 +1,42 @@
+"""
+Cost of the stage timings: converts a synthetic Geodex export with the
+streaming pipeline with timings off and on, and prints the stage report.
+
+    python benchmarks/bench_timings.py --records 50000 --repeat 3
+"""
+
+import io
+import os
+
+from openindexmaps_py.geodex import convert_geodex
+from openindexmaps_py.timings import Timings
+
+from harness import run
+from synthetic import write_geodex
+
+reports = []
+
+
+def convert(source):
+    convert_geodex(source, io.StringIO(), on_skip=lambda skipped: None)
+
+
+def prepare(directory, count, args):
+    source = write_geodex(os.path.join(directory, "geodex.geojson"), count, args.seed)
+    convert(source)  # warm up imports and the config
+    return source
+
+
+def variants(source, args):
+    def timed():
+        with Timings() as timings:
+            convert(source)
+        reports.append(timings)
+
+    return [("timings off", lambda: convert(source)), ("timings on", timed)]
+
+
+if __name__ == "__main__":
+    run(__doc__, prepare, variants, size="records", sizes=[20000])
+    print()
+    print(reports[0].format())  # of an untraced run
@@ -0,0 +1,68 @@
+"""
+Batch validation of many synthetic OpenIndexMaps, the way the ``validate``
+command checks a repository: the previous way (json.load, then
+jsonschema.validate with the schema re-read for each file) against
+validate_files with one and several processes. --sheets counts the sheets
+per file.
+
+    python benchmarks/bench_validate_files.py --files 50 --sheets 2000 --jobs 1 4
+"""
+
+import json
+import os
+
+from jsonschema import ValidationError, validate
+
+from openindexmaps_py.validation import SCHEMA_PATH, validate_files
+
+from harness import run
+from synthetic import features
+
+
+def write_collection(path, count: int, seed: int) -> str:
+    with open(path, "w") as file:
+        collection = {"type": "FeatureCollection"}
+        json.dump({**collection, "features": list(features(count, seed))}, file)
+    return path
+
+
+def previous(paths):
+    invalid = 0
+    for path in paths:
+        with open(SCHEMA_PATH, "r") as schema_file:
+            schema = json.load(schema_file)
+        with open(path, "r") as file:
+            collection = json.load(file)
+        try:
+            validate(instance=collection, schema=schema)
+        except ValidationError:
+            invalid += 1
+    return f"{invalid} invalid"
+
+
+def batched(paths, jobs):
+    invalid = sum(not report.valid for report in validate_files(paths, jobs=jobs))
+    return f"{invalid} invalid"
+
+
+def options(parser):
+    parser.add_argument("--files", type=int, default=50)
+    parser.add_argument("--jobs", type=int, nargs="+", default=[1, 4])
+
+
+def prepare(directory, count, args):
+    return [
+        write_collection(os.path.join(directory, f"{i}.geojson"), count, args.seed + i)
+        for i in range(args.files)
+    ]
+
+
+def variants(paths, args):
+    yield "jsonschema", lambda: previous(paths)
+    for jobs in args.jobs:
+        yield f"{jobs} jobs", lambda jobs=jobs: batched(paths, jobs)
+
+
+if __name__ == "__main__":
+    print(f"{os.cpu_count()} cores")
+    run(__doc__, prepare, variants, sizes=[2000], options=options)
@@ -0,0 +1,42 @@
+"""
+Compares JSON Schema validation of a FeatureCollection through
+jsonschema.validate (re-reading the schema every call) and through the cached,
+compiled validator in openindexmaps_py.validation.
+
+    python benchmarks/bench_validation.py --sheets 10000 100000
+"""
+
+import json
+
+from jsonschema import validate
+
+from openindexmaps_py.validation import SCHEMA_PATH, get_validator
+
+from harness import run
+from synthetic import features
+
+
+def jsonschema_path(collection):
+    with open(SCHEMA_PATH, "r") as schema_file:
+        schema = json.load(schema_file)
+    validate(instance=collection, schema=schema)
+
+
+def compiled_path(collection):
+    assert get_validator(SCHEMA_PATH).is_valid(collection)
+
+
+def prepare(directory, count, args):
+    return {"type": "FeatureCollection", "features": list(features(count, args.seed))}
+
+
+def variants(collection, args):
+    return [
+        ("jsonschema.validate", lambda: jsonschema_path(collection)),
+        ("compiled", lambda: compiled_path(collection)),
+    ]
+
+
+if __name__ == "__main__":
+    get_validator(SCHEMA_PATH)  # compiled once per process
+    run(__doc__, prepare, variants, sizes=[1000, 10000])
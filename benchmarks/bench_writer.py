@@ -0,0 +1,43 @@
+"""
+Compares str(OpenIndexMap) through geojson.dumps + geojson_rewind with the
+streaming OpenIndexMap.write, in time and in temporary memory.
+
+    python benchmarks/bench_writer.py --sheets 100000
+"""
+
+import os
+
+import geojson
+from geojson_rewind import rewind
+
+from openindexmaps_py.columnar import ColumnarOpenIndexMap, SheetColumns
+
+from harness import run
+from synthetic import sheet_dicts
+
+
+def prepare(directory, count, args):
+    # The columnar backend keeps the collection itself small, so the peaks
+    # are dominated by what each writer allocates.
+    oim = ColumnarOpenIndexMap(
+        columns=SheetColumns.from_properties(sheet_dicts(count, args.seed))
+    )
+    return oim, os.path.join(directory, "out.geojson")
+
+
+def variants(workload, args):
+    oim, path = workload
+
+    def dumps_then_rewind():
+        with open(path, "w") as file:
+            file.write(rewind(geojson.dumps(oim)))
+
+    def streaming():
+        with open(path, "w") as file:
+            return oim.write(file)
+
+    return [("dumps + rewind", dumps_then_rewind), ("OpenIndexMap.write", streaming)]
+
+
+if __name__ == "__main__":
+    run(__doc__, prepare, variants, sizes=[20000])
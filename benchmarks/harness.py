@@ -0,0 +1,149 @@
+"""
+Shared driver of the comparison benchmarks.
+
+Each bench_*.py script compares ways of doing one thing: the previous code
+against the current one, or one setting against another. It hands ``run`` a
+function that prepares its synthetic input for one size and a function that
+names the variants to time on that input. ``run`` parses the common options,
+times every variant (the best of --repeat runs, then the tracemalloc peak of
+one more run unless --no-memory is given) and prints one table. With
+--output it writes the results in the JSON format of bench_suite.py, so that
+``bench_suite.py compare`` can flag regressions between two runs.
+"""
+
+import argparse
+import datetime
+import gc
+import json
+import os
+import platform
+import subprocess
+import tempfile
+import time
+import tracemalloc
+from typing import NamedTuple
+
+
+class Measurement(NamedTuple):
+    """The best time of a variant and the memory of a traced run of it."""
+
+    seconds: float
+    result: object
+    peak: int = None  # tracemalloc peak, in bytes
+    retained: int = None  # traced memory still held once the run returned
+
+
+def measure(function, *args, repeat: int = 1, memory: bool = True, **kwargs):
+    """The best time of ``repeat`` runs, then, with ``memory``, a traced run."""
+    seconds = []
+    for _ in range(repeat):
+        result = None
+        gc.collect()
+        start = time.perf_counter()
+        result = function(*args, **kwargs)
+        seconds.append(time.perf_counter() - start)
+    if not memory:
+        return Measurement(min(seconds), result)
+    result = None
+    gc.collect()
+    tracemalloc.start()
+    try:
+        result = function(*args, **kwargs)
+        retained, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return Measurement(min(seconds), result, peak, retained)
+
+
+def commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def metadata(**settings) -> dict:
+    """The "meta" member of a results file: when, where and how it was run."""
+    return {
+        "created": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        "commit": commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        **settings,
+    }
+
+
+def parser(doc: str, *, size: str = "sheets", sizes=(10000,)):
+    """The options every comparison takes; scripts add their own to it."""
+    parser = argparse.ArgumentParser(
+        description=doc.strip().splitlines()[0],
+        epilog=doc.strip(),
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument(f"--{size}", type=int, nargs="+", default=list(sizes))
+    parser.add_argument("--repeat", type=int, default=1)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--no-memory",
+        dest="memory",
+        action="store_false",
+        help="Skip the traced runs that measure memory",
+    )
+    parser.add_argument("--output", "-o", help="Write the results to this JSON file")
+    return parser
+
+
+def run(doc: str, prepare, variants, *, size="sheets", sizes=(10000,), options=None):
+    """
+    Runs a comparison. Returns the parsed options and the results, one dict
+    per variant and size.
+
+    For each size, ``prepare(directory, count, args)`` writes the input into a
+    temporary directory and returns it, and ``variants(workload, args)`` returns
+    (name, function) pairs. Each function is called without arguments; an int
+    or str it returns (a count of matches, say) is printed after its times.
+    ``options(parser)`` adds the script's own options.
+    """
+    arguments = parser(doc, size=size, sizes=sizes)
+    if options:
+        options(arguments)
+    args = arguments.parse_args()
+    results = []
+    print(f"{size:>9} {'variant':24} {'seconds':>9} {f'{size}/s':>12} {'peak MB':>9}")
+    for count in getattr(args, size):
+        with tempfile.TemporaryDirectory() as directory:
+            workload = prepare(directory, count, args)
+            for name, function in variants(workload, args):
+                measured = measure(function, repeat=args.repeat, memory=args.memory)
+                # Keep counts and notes, not the maps a variant may return.
+                note = measured.result
+                note = note if isinstance(note, (int, str)) else None
+                results.append(
+                    {
+                        "case": name,
+                        "sheets": count,
+                        "seconds": measured.seconds,
+                        "sheets_per_second": count / measured.seconds,
+                        "tracemalloc_peak": measured.peak,
+                        "retained": measured.retained,
+                        "peak_rss": None,
+                        "result": note,
+                    }
+                )
+                peak = "-" if measured.peak is None else f"{measured.peak / 1e6:.2f}"
+                print(
+                    f"{count:>9} {name:24} {measured.seconds:>9.3f} "
+                    f"{count / measured.seconds:>12.0f} {peak:>9}"
+                    f"{'' if note is None else f'  {note}'}"
+                )
+    if args.output:
+        settings = {"seed": args.seed, "repeat": args.repeat}
+        with open(args.output, "w") as file:
+            json.dump(
+                {"meta": metadata(**settings), "results": results}, file, indent=2
+            )
+        print(f"Results written to {args.output}")
+    return args, results
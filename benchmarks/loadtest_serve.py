@@ -0,0 +1,133 @@
+"""
+Load test of ``oimpy serve`` on localhost: concurrent keep-alive clients ask
+for random map viewports (and some point, label and date queries) and the
+p50/p99 latency and requests per second are reported.
+
+Starts a server on a synthetic OpenIndexMap unless --port names one that is
+already running.
+
+    python benchmarks/loadtest_serve.py --sheets 100000 --requests 5000 --concurrency 16
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from urllib.parse import quote
+
+from synthetic import write_oim
+
+
+def targets(count: int, seed: int = 0):
+    """Yields request targets: mostly viewports, with a few other lookups."""
+    rng = random.Random(seed)
+    for _ in range(count):
+        kind = rng.random()
+        if kind < 0.7:
+            width = rng.choice([0.5, 2.0, 8.0])
+            west, south = rng.uniform(-179, 170), rng.uniform(-70, 60)
+            bbox = f"{west:.3f},{south:.3f},{west + width:.3f},{south + width / 2:.3f}"
+            yield f"/sheets?bbox={bbox}&fields=label,datePub"
+        elif kind < 0.85:
+            yield f"/sheets?point={rng.uniform(-179, 170):.4f},{rng.uniform(-70, 69):.4f}"
+        elif kind < 0.95:
+            yield f"/sheets?label={quote(f'{rng.randrange(1000)}-{rng.randrange(100)}')}"
+        else:
+            year = rng.randrange(1900, 2000)
+            yield f"/sheets?date={year}&limit=100&fields=label"
+
+
+async def client(host, port, queue, latencies, gzip):
+    reader, writer = await asyncio.open_connection(host, port)
+    encoding = "Accept-Encoding: gzip\r\n" if gzip else ""
+    while True:
+        try:
+            target = queue.get_nowait()
+        except asyncio.QueueEmpty:
+            break
+        start = time.perf_counter()
+        writer.write(
+            f"GET {target} HTTP/1.1\r\nHost: {host}\r\n{encoding}\r\n".encode()
+        )
+        await writer.drain()
+        head = await reader.readuntil(b"\r\n\r\n")
+        length = 0
+        for line in head.split(b"\r\n"):
+            name, _, value = line.partition(b":")
+            if name.lower() == b"content-length":
+                length = int(value)
+        await reader.readexactly(length)
+        latencies.append(time.perf_counter() - start)
+    writer.close()
+
+
+async def run(host, port, count, concurrency, gzip):
+    queue = asyncio.Queue()
+    for target in targets(count):
+        queue.put_nowait(target)
+    latencies = []
+    start = time.perf_counter()
+    await asyncio.gather(
+        *(client(host, port, queue, latencies, gzip) for _ in range(concurrency))
+    )
+    return latencies, time.perf_counter() - start
+
+
+def percentile(values, share):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(share * len(values)))]
+
+
+def wait_for_server(process):
+    line = process.stdout.readline()
+    if not line.startswith("Serving"):
+        raise RuntimeError(f"Server did not start: {line}")
+    return line.strip()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sheets", type=int, default=100000)
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--gzip", action="store_true")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, help="Port of a server already running")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        process = None
+        port = args.port
+        if port is None:
+            path = write_oim(os.path.join(tmp, "oim.geojson"), args.sheets)
+            port = 8765
+            process = subprocess.Popen(
+                [sys.executable, "-m", "openindexmaps_py.oimpycli", "serve", path]
+                + ["--host", args.host, "--port", str(port)],
+                stdout=subprocess.PIPE,
+                text=True,
+            )
+            print(wait_for_server(process))
+        try:
+            latencies, elapsed = asyncio.run(
+                run(args.host, port, args.requests, args.concurrency, args.gzip)
+            )
+        finally:
+            if process is not None:
+                process.terminate()
+                process.wait()
+
+    print(
+        f"{len(latencies)} requests, {args.concurrency} connections"
+        f"{', gzip' if args.gzip else ''}: {len(latencies) / elapsed:.0f} requests/s, "
+        f"p50 {percentile(latencies, 0.5) * 1000:.2f} ms, "
+        f"p99 {percentile(latencies, 0.99) * 1000:.2f} ms"
+    )
+
+
+if __name__ == "__main__":
+    main()
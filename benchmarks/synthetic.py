@@ -0,0 +1,191 @@
+"""
+Seeded generator of synthetic OpenIndexMap sheets for the benchmarks.
+"""
+
+import json
+import random
+
+
+def sheet_dicts(count: int, seed: int = 0):
+    """Yields ``count`` sheet property dicts laid out on a regular grid."""
+    rng = random.Random(seed)
+    for i in range(count):
+        west = round(-179.0 + (i % 1400) * 0.25, 6)
+        south = round(-70.0 + (i // 1400 % 560) * 0.25, 6)
+        yield {
+            "label": f"{i // 100}-{i % 100}",
+            "datePub": str(1900 + rng.randrange(100)),
+            "available": rng.random() < 0.3,
+            "west": west,
+            "east": round(west + 0.25, 6),
+            "south": south,
+            "north": round(south + 0.25, 6),
+            "inst": "AGSL",
+            "scale": "1:24000",
+            "location": ["Wisconsin"],
+        }
+
+
+# The kinds of sheet in openindexmaps_py.testfeatures and how often each
+# turns up in pattern_sheet_dicts and pattern_geodex_features.
+PATTERNS = {"plain": 85, "antimeridian": 5, "inset": 5, "nonstandard": 5}
+
+
+def _patterns(count: int, seed: int):
+    rng = random.Random(seed + 1)
+    return rng.choices(list(PATTERNS), weights=list(PATTERNS.values()), k=count)
+
+
+def pattern_sheet_dicts(count: int, seed: int = 0):
+    """
+    Yields ``count`` sheet property dicts mixing the testfeatures sheets: the
+    grid sheets of ``sheet_dicts`` with some crossing the antimeridian, some
+    with one or two insets and some with the swapped bounds and integer date
+    of a nonstandard Geodex record.
+    """
+    for pattern, properties in zip(_patterns(count, seed), sheet_dicts(count, seed)):
+        west, south = properties["west"], properties["south"]
+        if pattern == "antimeridian":
+            properties["west"] = round(175 + west % 4.75, 6)
+            properties["east"] = round(properties["west"] - 350, 6)
+        elif pattern == "inset":
+            properties["inset"] = [
+                {
+                    "inset_label": f"Inset {n}",
+                    "north": round(south - 0.125 * n, 6),
+                    "south": round(south - 0.125 * n - 0.1, 6),
+                    "west": west,
+                    "east": round(west + 0.1, 6),
+                }
+                for n in range(1, 2 + len(properties["label"]) % 2)
+            ]
+        elif pattern == "nonstandard":
+            properties["west"], properties["east"] = properties["east"], west
+            properties["south"], properties["north"] = properties["north"], south
+            properties["datePub"] = int(properties["datePub"])
+        yield properties
+
+
+def features(count: int, seed: int = 0):
+    """Yields ``count`` GeoJSON features with Polygon geometries."""
+    for properties in sheet_dicts(count, seed):
+        west, south = properties["west"], properties["south"]
+        east, north = properties["east"], properties["north"]
+        yield {
+            "type": "Feature",
+            "properties": properties,
+            "geometry": {
+                "type": "Polygon",
+                "coordinates": [
+                    [
+                        [west, south],
+                        [east, south],
+                        [east, north],
+                        [west, north],
+                        [west, south],
+                    ]
+                ],
+            },
+        }
+
+
+def write_oim(path, count: int, seed: int = 0, *, patterns: bool = False):
+    """
+    Writes a synthetic OpenIndexMap file with ``count`` sheets, from
+    ``pattern_sheet_dicts`` with ``patterns``.
+    """
+    sheets = pattern_sheet_dicts if patterns else sheet_dicts
+    features = (
+        {"type": "Feature", "properties": properties, "geometry": None}
+        for properties in sheets(count, seed)
+    )
+    with open(path, "w") as file:
+        file.write('{"type": "FeatureCollection", "features": [')
+        for i, feature in enumerate(features):
+            if i:
+                file.write(",")
+            file.write(json.dumps(feature))
+        file.write("]}")
+    return path
+
+
+_YEAR_TYPES = (0, 97, 98, 99, 100, 102, 103, 109, 114, 115, 120, 121, 0, 0)
+
+
+def geodex_features(count: int, seed: int = 0):
+    """
+    Yields ``count`` features shaped like an AGSL Geodex export from QGIS.
+
+    About one record in a hundred has no X1 and is skipped by the converters.
+    """
+    rng = random.Random(seed)
+    for i in range(count):
+        west = round(-179.0 + (i % 1400) * 0.25, 5)
+        north = round(-69.75 + (i // 1400 % 560) * 0.25, 5)
+        east, south = round(west + 0.25, 5), round(north - 0.25, 5)
+        properties = {
+            "GDX_FILE": 303,
+            "GDX_NUM": "f0303",
+            "RECORD": f"{i // 100}-{i % 100}",
+            "LOCATION": rng.choice(["Dunajska Streda", "Komarno", "Nitra", None]),
+            "DATE": 1900 + rng.randrange(100),
+            "PUBLISHER": "Geological Survey (U.S.)",
+            "SCALE": rng.choice([24000, 62500, 100000]),
+            "PRODUCTION": rng.choice([31, 32, 33, 38, 40]),
+            "PROJECT": rng.choice([0, 161, 175, 187, 500]),
+            "PRIME_MER": rng.choice([131, 131, 131, 142, 135]),
+            "CATLOC": rng.choice(["646-b  A-1:100,000", None]),
+            "HOLD": rng.choice([0, 1]),
+            "EDITION_NO": rng.choice([0, 1, 2]),
+            "ISO_TYPE": rng.randrange(8),
+            "ISO_VAL": rng.choice([0, 10, 20, 100]),
+            "X1": None if i % 100 == 99 else west,
+            "X2": east,
+            "Y1": north,
+            "Y2": south,
+        }
+        for slot in range(1, 5):
+            properties[f"YEAR{slot}"] = 1900 + rng.randrange(100)
+            properties[f"YEAR{slot}_TYPE"] = rng.choice(_YEAR_TYPES)
+        ring = [[west, south], [west, north], [east, north], [east, south]]
+        yield {
+            "type": "Feature",
+            "properties": properties,
+            "geometry": {"type": "MultiPolygon", "coordinates": [[ring + ring[:1]]]},
+        }
+
+
+def pattern_geodex_features(count: int, seed: int = 0):
+    """
+    Yields ``count`` Geodex features mixing the testfeatures Geodex sheets:
+    those of ``geodex_features`` with some crossing the antimeridian and some
+    with swapped X and Y bounds. Geodex records have no insets; those drawn
+    as inset sheets are left plain.
+    """
+    for pattern, feature in zip(_patterns(count, seed), geodex_features(count, seed)):
+        properties = feature["properties"]
+        if properties["X1"] is None:
+            pass
+        elif pattern == "antimeridian":
+            properties["X1"] = round(178 + properties["X1"] % 1.75, 5)
+            properties["X2"] = round(properties["X1"] - 356, 5)
+        elif pattern == "nonstandard":
+            properties["X1"], properties["X2"] = properties["X2"], properties["X1"]
+            properties["Y1"], properties["Y2"] = properties["Y2"], properties["Y1"]
+        yield feature
+
+
+def write_geodex(path, count: int, seed: int = 0, *, patterns: bool = False):
+    """
+    Writes a synthetic Geodex export with ``count`` records, from
+    ``pattern_geodex_features`` with ``patterns``.
+    """
+    records = pattern_geodex_features if patterns else geodex_features
+    with open(path, "w") as file:
+        file.write('{"type": "FeatureCollection", "name": "synthetic", "features": [')
+        for i, feature in enumerate(records(count, seed)):
+            if i:
+                file.write(",\n")
+            file.write(json.dumps(feature))
+        file.write("]}")
+    return path
@@ -0,0 +1,176 @@
+"""
+On-disk cache of parsed OpenIndexMaps.
+
+Parsing a large GeoJSON file takes seconds; loading its ``SheetColumns`` (the
+bounds arrays, the dictionary-encoded property columns and their value tables)
+back from a binary .npz file takes milliseconds. Entries are keyed by the
+file's absolute path, size and modification time, and optionally a hash of its
+content, so a file that changes is parsed again.
+
+The cache lives in ``$OIMPY_CACHE_DIR``, else in the user cache directory, and
+is kept under ``cache-max-mb`` (see config.yml) by evicting the least recently
+used entries.
+"""
+
+import hashlib
+import logging
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+from openindexmaps_py.columnar import SheetColumns, read_columns
+from openindexmaps_py.timings import stage
+
+logger = logging.getLogger(__name__)
+
+# Bump when the entries written by ``store`` change shape.
+CACHE_VERSION = 1
+
+_SUFFIX = ".npz"
+
+
+def default_cache_dir() -> Path:
+    """``$OIMPY_CACHE_DIR``, else ``openindexmaps-py`` in the user cache directory."""
+    directory = os.environ.get("OIMPY_CACHE_DIR")
+    if directory:
+        return Path(directory)
+    if sys.platform == "win32":
+        base = os.environ.get("LOCALAPPDATA") or Path.home() / "AppData" / "Local"
+    elif sys.platform == "darwin":
+        base = Path.home() / "Library" / "Caches"
+    else:
+        base = os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache"
+    return Path(base) / "openindexmaps-py"
+
+
+def content_hash(file_path, chunk_size: int = 1 << 20) -> str:
+    """The BLAKE2b digest of a file's content."""
+    digest = hashlib.blake2b(digest_size=20)
+    with open(file_path, "rb") as file:
+        for chunk in iter(lambda: file.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class IndexCache:
+    """
+    A directory of parsed OpenIndexMaps, one .npz file per source file.
+
+    ``hash_content`` adds a hash of the whole file to the key, which catches
+    edits that keep the size and modification time but costs a read of the
+    file on every lookup. ``max_bytes`` defaults to ``cache-max-mb``.
+    """
+
+    def __init__(self, directory=None, *, max_bytes: int = None, hash_content=False):
+        self.directory = Path(directory) if directory else default_cache_dir()
+        self._max_bytes = max_bytes
+        self.hash_content = hash_content
+
+    @property
+    def max_bytes(self) -> int:
+        if self._max_bytes is None:
+            from openindexmaps_py.oimpy import config
+
+            return int(config["cache-max-mb"] * 1024 * 1024)
+        return self._max_bytes
+
+    def key(self, file_path, *, sources: bool = False) -> str:
+        """The key of a file in its current state, read with or without sources."""
+        path = os.path.abspath(file_path)
+        status = os.stat(path)
+        parts = [str(CACHE_VERSION), path, str(status.st_size), str(status.st_mtime_ns)]
+        if self.hash_content:
+            parts.append(content_hash(path))
+        if sources:
+            parts.append("sources")
+        return hashlib.sha256("\0".join(parts).encode("utf-8")).hexdigest()
+
+    def _entry(self, key: str) -> Path:
+        return self.directory / (key + _SUFFIX)
+
+    def load(self, key: str) -> SheetColumns:
+        """The columns stored under ``key``, or None."""
+        entry = self._entry(key)
+        try:
+            with stage("cache.load"):
+                columns = SheetColumns.load(entry)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning(f"Discarding unreadable cache entry {entry}: {e}")
+            entry.unlink(missing_ok=True)
+            return None
+        try:
+            os.utime(entry)  # mark as recently used
+        except OSError:
+            pass
+        return columns
+
+    def store(self, key: str, columns: SheetColumns):
+        """Stores columns under ``key``, then evicts entries over the size limit."""
+        self.directory.mkdir(parents=True, exist_ok=True)
+        with stage("cache.store"):
+            handle, temporary = tempfile.mkstemp(
+                dir=self.directory, prefix=".", suffix=".tmp"
+            )
+            try:
+                with os.fdopen(handle, "wb") as file:
+                    columns.save(file)
+                os.replace(temporary, self._entry(key))
+            except BaseException:
+                os.unlink(temporary)
+                raise
+        self.evict()
+
+    def columns(self, file_path, *, sources: bool = False) -> SheetColumns:
+        """
+        The parsed columns of a GeoJSON file, from the cache when possible.
+        With ``sources`` they keep the rest of each feature too (see
+        ``read_columns``), in an entry of their own.
+        """
+        key = self.key(file_path, sources=sources)
+        columns = self.load(key)
+        if columns is None:
+            columns = read_columns(file_path, sources=sources)
+            try:
+                self.store(key, columns)
+            except (OSError, TypeError, ValueError) as e:
+                logger.warning(f"Could not cache {file_path}: {e}")
+        return columns
+
+    def entries(self) -> list[Path]:
+        """The entries, least recently used first."""
+        try:
+            entries = [
+                entry
+                for entry in self.directory.iterdir()
+                if entry.suffix == _SUFFIX and entry.is_file()
+            ]
+        except FileNotFoundError:
+            return []
+        return sorted(entries, key=lambda entry: entry.stat().st_mtime_ns)
+
+    def size(self) -> int:
+        """Total bytes held by the entries."""
+        return sum(entry.stat().st_size for entry in self.entries())
+
+    def evict(self) -> int:
+        """Removes least recently used entries until under ``max_bytes``."""
+        entries = self.entries()
+        sizes = [entry.stat().st_size for entry in entries]
+        total, removed, limit = sum(sizes), 0, self.max_bytes
+        for entry, size in zip(entries, sizes):
+            if total <= limit:
+                break
+            entry.unlink(missing_ok=True)
+            total -= size
+            removed += 1
+        return removed
+
+    def clear(self) -> int:
+        """Removes every entry."""
+        entries = self.entries()
+        for entry in entries:
+            entry.unlink(missing_ok=True)
+        return len(entries)
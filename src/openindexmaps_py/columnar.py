@@ -0,0 +1,680 @@
+"""
+Columnar, array-backed storage for large OpenIndexMaps.
+
+Sheet bounds live in NumPy float arrays and every other property is held in a
+dictionary-encoded column (one int32 code per sheet plus a table of unique
+values). ``Sheet`` objects and ``__geo_interface__`` dicts are only built when
+they are requested.
+"""
+
+import copy
+import json
+from collections.abc import Sequence
+
+import geojson
+import numpy as np
+
+from openindexmaps_py.oimpy import BOUNDS, OpenIndexMap, Sheet
+from openindexmaps_py.spatial import crosses_antimeridian
+from openindexmaps_py.streaming import iter_features
+from openindexmaps_py.writer import (
+    OutputFeature,
+    round_floats,
+    write_feature_collection,
+)
+
+# Kinds of value stored for a bound: kept as a float, kept as an int, or
+# something else entirely (None, a string, ...) kept in a generic column.
+_FLOAT, _INT, _OTHER = 0, 1, 2
+
+_INITIAL_CAPACITY = 64
+
+_WRITE_CHUNK = 4096
+
+# Version of the file layout written by ``SheetColumns.save``.
+_FORMAT = 1
+
+# Types of the values that are copied when read, as rows share them.
+_JSON = (list, dict)
+
+# Keys that Sheet drops from its properties.
+_RESERVED = frozenset(("type", "geometry", "properties"))
+
+
+def _value_key(value):
+    """Returns a hashable key that keeps 1, 1.0 and True apart."""
+    try:
+        hash(value)
+    except TypeError:
+        return ("json", json.dumps(value, sort_keys=True, default=str))
+    return (type(value), value)
+
+
+class _DictColumn:
+    """A dictionary-encoded column: one int32 code per row, -1 when missing."""
+
+    def __init__(self, capacity: int):
+        self.values = []
+        self._lookup = {}
+        self._mutable = []
+        self.codes = np.full(capacity, -1, dtype=np.int32)
+
+    @classmethod
+    def from_values(
+        cls, values: list, codes: np.ndarray, mutable: list = None
+    ) -> "_DictColumn":
+        """
+        A column over an existing table of values, whose lookup is built on
+        demand. ``mutable`` lists the codes of the list and dict values.
+        """
+        column = cls(0)
+        column.values = list(values)
+        column._lookup = None
+        column._mutable = [False] * len(values)
+        if mutable is None:
+            mutable = [i for i, value in enumerate(values) if type(value) in _JSON]
+        for code in mutable:
+            column._mutable[code] = True
+        column.codes = codes
+        return column
+
+    def with_codes(self, codes: np.ndarray) -> "_DictColumn":
+        """
+        A column with other codes over the same table of values. The table is
+        shared, not copied; values added through either column are appended
+        to it, so the codes of both stay valid.
+        """
+        column = _DictColumn(0)
+        column.values, column._lookup = self.values, self._lookup
+        column._mutable, column.codes = self._mutable, codes
+        return column
+
+    def mutable_codes(self) -> list:
+        return [code for code, mutable in enumerate(self._mutable) if mutable]
+
+    def _build_lookup(self) -> dict:
+        lookup = {}
+        for code, value in enumerate(self.values):
+            try:
+                lookup[(type(value), value)] = code
+            except TypeError:
+                lookup[_value_key(value)] = code
+        self._lookup = lookup
+        return lookup
+
+    def resize(self, capacity: int):
+        codes = np.full(capacity, -1, dtype=np.int32)
+        codes[: len(self.codes)] = self.codes
+        self.codes = codes
+
+    def encode(self, value) -> int:
+        lookup = self._lookup
+        if lookup is None:
+            lookup = self._build_lookup()
+        key = (type(value), value)
+        try:
+            code = lookup.get(key)
+        except TypeError:
+            key = _value_key(value)
+            code = lookup.get(key)
+        if code is None:
+            code = len(self.values)
+            lookup[key] = code
+            self.values.append(value)
+            self._mutable.append(key[0] == "json")
+        return code
+
+    def set(self, row: int, value):
+        self.codes[row] = self.encode(value)
+
+    def get(self, row: int):
+        code = self.codes[row]
+        value = self.values[code]
+        # Lists and dicts are shared between rows, so hand out copies.
+        return copy.deepcopy(value) if self._mutable[code] else value
+
+    def nbytes(self) -> int:
+        return self.codes.nbytes
+
+
+class SourceFeatures:
+    """
+    The features of a source file without their properties (their geometry,
+    id, ...), and the file's top-level ``members``. Each feature is kept as
+    JSON text in one buffer and decoded only when its row is read.
+    """
+
+    def __init__(self, members: dict = None):
+        self.members = members if members is not None else {}
+        self._buffer = bytearray()
+        self._offsets = [0]
+
+    @classmethod
+    def from_arrays(cls, text: np.ndarray, offsets: np.ndarray, members: dict):
+        sources = cls(members)
+        sources._buffer = bytearray(text.tobytes())
+        sources._offsets = offsets.tolist()
+        return sources
+
+    def __len__(self) -> int:
+        return len(self._offsets) - 1
+
+    def append(self, feature: dict):
+        # The properties live in the columns; a dict is marked by True.
+        rest = {
+            key: True if key == "properties" and isinstance(value, dict) else value
+            for key, value in feature.items()
+        }
+        text = json.dumps(rest, ensure_ascii=False, separators=(",", ":"))
+        self._buffer += text.encode("utf-8")
+        self._offsets.append(len(self._buffer))
+
+    def feature(self, row: int, properties: dict) -> dict:
+        """The feature of ``row`` as it was read, given its properties."""
+        start, stop = self._offsets[row], self._offsets[row + 1]
+        feature = json.loads(self._buffer[start:stop].decode("utf-8"))
+        if feature.get("properties") is True:
+            feature["properties"] = properties
+        return feature
+
+    def arrays(self) -> dict:
+        return {
+            "source_text": np.frombuffer(bytes(self._buffer), dtype=np.uint8),
+            "source_offsets": np.array(self._offsets, dtype=np.int64),
+        }
+
+
+class SheetColumns:
+    """
+    Column store for the properties of many sheets.
+
+    west/south/east/north are float64 arrays (NaN where a sheet has no numeric
+    value); all other properties are dictionary-encoded. The key order of each
+    sheet's properties is itself dictionary-encoded so rows round-trip exactly.
+
+    ``sources`` holds the rest of each source feature (``SourceFeatures``)
+    when the store was read with ``read_columns(..., sources=True)``, else None;
+    it is saved and loaded with the store but not kept by ``take``.
+    """
+
+    def __init__(self, capacity: int = _INITIAL_CAPACITY):
+        self.sources = None
+        self._size = 0
+        self._capacity = max(int(capacity), 1)
+        self._bounds = {
+            name: np.full(self._capacity, np.nan, dtype=np.float64) for name in BOUNDS
+        }
+        self._kinds = {name: np.zeros(self._capacity, dtype=np.int8) for name in BOUNDS}
+        self._keys = _DictColumn(self._capacity)
+        self._columns = {}
+
+    @classmethod
+    def from_properties(cls, properties_iter) -> "SheetColumns":
+        """Builds a column store from an iterable of property dicts."""
+        columns = cls()
+        for properties in properties_iter:
+            columns.append(properties)
+        return columns
+
+    def __len__(self) -> int:
+        return self._size
+
+    def keys(self) -> list[str]:
+        """Returns every property key in the store, in first-seen order."""
+        return list(dict.fromkeys(key for keys in self._keys.values for key in keys))
+
+    def _grow(self):
+        capacity = self._capacity * 2
+        for name in BOUNDS:
+            bounds = np.full(capacity, np.nan, dtype=np.float64)
+            bounds[: self._capacity] = self._bounds[name]
+            self._bounds[name] = bounds
+            kinds = np.zeros(capacity, dtype=np.int8)
+            kinds[: self._capacity] = self._kinds[name]
+            self._kinds[name] = kinds
+        self._keys.resize(capacity)
+        for column in self._columns.values():
+            column.resize(capacity)
+        self._capacity = capacity
+
+    def _column(self, key: str) -> _DictColumn:
+        column = self._columns.get(key)
+        if column is None:
+            column = self._columns[key] = _DictColumn(self._capacity)
+        return column
+
+    def append(self, properties: dict) -> int:
+        """Appends one sheet's properties and returns its row number."""
+        if self._size == self._capacity:
+            self._grow()
+        row = self._size
+        properties = properties or {}
+        self._keys.set(row, tuple(properties))
+        bounds, columns = self._bounds, self._columns
+        for key, value in properties.items():
+            if key in bounds:
+                if isinstance(value, float):
+                    bounds[key][row] = value
+                    self._kinds[key][row] = _FLOAT
+                    continue
+                if isinstance(value, int) and not isinstance(value, bool):
+                    bounds[key][row] = value
+                    self._kinds[key][row] = _INT
+                    continue
+                self._kinds[key][row] = _OTHER
+            column = columns.get(key) or self._column(key)
+            column.codes[row] = column.encode(value)
+        self._size += 1
+        return row
+
+    def row(self, index: int) -> dict:
+        """Rebuilds the property dict of one sheet."""
+        if index < 0:
+            index += self._size
+        if not 0 <= index < self._size:
+            raise IndexError("sheet index out of range")
+        properties = {}
+        for key in self._keys.get(index):
+            if key in self._bounds:
+                kind = self._kinds[key][index]
+                if kind == _FLOAT:
+                    properties[key] = float(self._bounds[key][index])
+                    continue
+                if kind == _INT:
+                    properties[key] = int(self._bounds[key][index])
+                    continue
+            properties[key] = self._columns[key].get(index)
+        return properties
+
+    def rows(self, start: int = 0, stop: int = None) -> list[dict]:
+        """Rebuilds the property dicts of rows start..stop, a column at a time."""
+        stop = self._size if stop is None else min(stop, self._size)
+        start = min(start, stop)
+        bounds = {
+            name: (
+                self._bounds[name][start:stop].tolist(),
+                self._kinds[name][start:stop].tolist(),
+            )
+            for name in BOUNDS
+        }
+        codes = {
+            key: column.codes[start:stop].tolist()
+            for key, column in self._columns.items()
+        }
+        key_tuples = self._keys.values
+        rows = []
+        for offset, key_code in enumerate(self._keys.codes[start:stop].tolist()):
+            properties = {}
+            for key in key_tuples[key_code]:
+                if key in bounds:
+                    values, kinds = bounds[key]
+                    kind = kinds[offset]
+                    if kind == _FLOAT:
+                        properties[key] = values[offset]
+                        continue
+                    if kind == _INT:
+                        properties[key] = int(values[offset])
+                        continue
+                column = self._columns[key]
+                code = codes[key][offset]
+                value = column.values[code]
+                properties[key] = (
+                    copy.deepcopy(value) if column._mutable[code] else value
+                )
+            rows.append(properties)
+        return rows
+
+    def bounds(self) -> np.ndarray:
+        """Returns an (n, 4) array of west, south, east, north."""
+        return np.column_stack([self._bounds[name][: self._size] for name in BOUNDS])
+
+    def float_bounds(self) -> np.ndarray:
+        """Returns a mask of the rows whose four bounds are all floats."""
+        mask = np.ones(self._size, dtype=bool)
+        for name in BOUNDS:
+            mask &= self._kinds[name][: self._size] == _FLOAT
+        return mask
+
+    def encoded(self, key: str):
+        """
+        Returns (values, codes) for one property: its distinct values and an
+        array giving each row's index into them, -1 where the row lacks it.
+        """
+        size = self._size
+        if key not in self._bounds:
+            column = self._columns.get(key)
+            if column is None:
+                return [], np.full(size, -1, dtype=np.int32)
+            return column.values, column.codes[:size]
+        has_key = np.array([key in keys for keys in self._keys.values], dtype=bool)
+        present = has_key[self._keys.codes[:size]] if has_key.size else has_key
+        kinds, numbers = self._kinds[key][:size], self._bounds[key][:size]
+        values, codes = [], np.full(size, -1, dtype=np.int32)
+        for kind, cast in ((_FLOAT, float), (_INT, int)):
+            rows = present & (kinds == kind)
+            unique, inverse = np.unique(numbers[rows], return_inverse=True)
+            codes[rows] = inverse.reshape(-1) + len(values)
+            values.extend(cast(value) for value in unique.tolist())
+        column = self._columns.get(key)
+        if column is not None:
+            rows = present & (kinds == _OTHER)
+            codes[rows] = column.codes[:size][rows] + len(values)
+            values.extend(column.values)
+        return values, codes
+
+    def column(self, key: str) -> list:
+        """Returns the decoded values of one property, None where missing."""
+        values, codes = self.encoded(key)
+        return [values[code] if code >= 0 else None for code in codes.tolist()]
+
+    def source_features(self, rows):
+        """
+        Yields the features of the given rows as they were read from the
+        source file: its geometry and other members, with the properties from
+        the columns. Needs a store read with ``sources=True``.
+        """
+        if self.sources is None:
+            raise ValueError("The store was read without its source features")
+        rows = np.asarray(rows, dtype=np.intp)
+        for start in range(0, len(rows), _WRITE_CHUNK):
+            chunk = rows[start : start + _WRITE_CHUNK]
+            for row, properties in zip(chunk.tolist(), self.take(chunk).rows()):
+                yield self.sources.feature(row, properties)
+
+    def take(self, rows) -> "SheetColumns":
+        """Returns a new store holding the given rows, in that order."""
+        rows = np.asarray(rows, dtype=np.intp)
+        taken = SheetColumns(capacity=len(rows))
+        taken._size = len(rows)
+        for name in BOUNDS:
+            taken._bounds[name][: len(rows)] = self._bounds[name][: self._size][rows]
+            taken._kinds[name][: len(rows)] = self._kinds[name][: self._size][rows]
+
+        def taken_column(column: _DictColumn) -> _DictColumn:
+            codes = np.full(taken._capacity, -1, dtype=np.int32)
+            codes[: len(rows)] = column.codes[: self._size][rows]
+            return column.with_codes(codes)
+
+        taken._keys = taken_column(self._keys)
+        taken._columns = {
+            key: taken_column(column) for key, column in self._columns.items()
+        }
+        return taken
+
+    def save(self, file):
+        """
+        Writes the store to a NumPy .npz file (a path or binary file).
+
+        The arrays are stored as they are; the unique-value tables, which hold
+        the JSON values of the properties, are stored as one JSON document.
+        """
+        size = self._size
+        arrays = {"keys": self._keys.codes[:size]}
+        for name in BOUNDS:
+            arrays[f"bounds_{name}"] = self._bounds[name][:size]
+            arrays[f"kinds_{name}"] = self._kinds[name][:size]
+        for i, column in enumerate(self._columns.values()):
+            arrays[f"column_{i}"] = column.codes[:size]
+        tables = {
+            "format": _FORMAT,
+            "keys": self._keys.values,
+            "columns": [
+                [key, column.values, column.mutable_codes()]
+                for key, column in self._columns.items()
+            ],
+        }
+        if self.sources is not None:
+            tables["members"] = self.sources.members
+            arrays.update(self.sources.arrays())
+        text = json.dumps(tables, ensure_ascii=False, separators=(",", ":"))
+        arrays["tables"] = np.frombuffer(text.encode("utf-8"), dtype=np.uint8)
+        np.savez(file, **arrays)
+
+    @classmethod
+    def load(cls, file) -> "SheetColumns":
+        """Reads a store written by ``save``."""
+        with np.load(file, allow_pickle=False) as data:
+            tables = json.loads(data["tables"].tobytes().decode("utf-8"))
+            if tables.get("format") != _FORMAT:
+                raise ValueError(
+                    f"Unsupported column store format {tables.get('format')}"
+                )
+            columns = cls(capacity=len(data["keys"]))
+            size = columns._size = len(data["keys"])
+            for name in BOUNDS:
+                columns._bounds[name][:size] = data[f"bounds_{name}"]
+                columns._kinds[name][:size] = data[f"kinds_{name}"]
+
+            def loaded_column(values, codes, mutable=()) -> _DictColumn:
+                padded = np.full(columns._capacity, -1, dtype=np.int32)
+                padded[:size] = codes
+                return _DictColumn.from_values(values, padded, mutable)
+
+            keys = [tuple(keys) for keys in tables["keys"]]
+            columns._keys = loaded_column(keys, data["keys"])
+            columns._columns = {
+                key: loaded_column(values, data[f"column_{i}"], mutable)
+                for i, (key, values, mutable) in enumerate(tables["columns"])
+            }
+            if "source_offsets" in data.files:
+                columns.sources = SourceFeatures.from_arrays(
+                    data["source_text"], data["source_offsets"], tables["members"]
+                )
+        return columns
+
+    def nbytes(self) -> int:
+        """Approximate size of the arrays (excluding the unique-value tables)."""
+        total = sum(array.nbytes for array in self._bounds.values())
+        total += sum(array.nbytes for array in self._kinds.values())
+        total += self._keys.nbytes()
+        total += sum(column.nbytes() for column in self._columns.values())
+        return total
+
+
+def read_columns(file_path: str, *, sources: bool = False) -> SheetColumns:
+    """
+    Parses the sheet properties of a GeoJSON file into a column store; with
+    ``sources`` the rest of each feature is kept too, in ``columns.sources``.
+    """
+    with open(file_path, "r") as file:
+        if not sources:
+            return SheetColumns.from_properties(
+                feature.get("properties") for feature in iter_features(file)
+            )
+        members = {}
+        columns = SheetColumns()
+        columns.sources = SourceFeatures(members)
+        for feature in iter_features(file, members=members):
+            columns.append(feature.get("properties"))
+            columns.sources.append(feature)
+        return columns
+
+
+def _rectangle_rings(bounds: np.ndarray, usable: np.ndarray) -> list:
+    """
+    Returns the output ring of each row of bounds, or None for rows whose
+    sheet has to be built to know its geometry.
+
+    A ring is listed here only where ``Sheet`` gives a plain rectangle:
+    usable (float) bounds, finite, within -180..180, not crossing the
+    antimeridian and not collapsing to a line once rounded. Its corners are
+    rounded like the Polygon's and wound counterclockwise, as the writer would.
+    """
+    west, south, east, north = bounds.T
+    rounded = round_floats(bounds)
+    w, s, e, n = rounded.T
+    with np.errstate(invalid="ignore"):
+        simple = usable & np.isfinite(bounds).all(axis=1)
+        simple &= (np.abs(west) <= 180) & (np.abs(east) <= 180)
+        simple &= ~crosses_antimeridian(west, east) & (w != e) & (s != n)
+        counterclockwise = (east - west) * (north - south) > 0
+    corners = np.stack(
+        [
+            np.column_stack([w, s]),
+            np.column_stack(np.where(counterclockwise, [e, s], [w, n])),
+            np.column_stack([e, n]),
+            np.column_stack(np.where(counterclockwise, [w, n], [e, s])),
+            np.column_stack([w, s]),
+        ],
+        axis=1,
+    )
+    return [ring if ok else None for ring, ok in zip(corners.tolist(), simple.tolist())]
+
+
+def _builds_rectangles(sheet_class) -> bool:
+    """Tells whether ``sheet_class`` has the geometry and output of Sheet."""
+    return (
+        issubclass(sheet_class, Sheet)
+        and sheet_class._geometry_and_properties is Sheet._geometry_and_properties
+        and sheet_class.__geo_interface__ is Sheet.__geo_interface__
+    )
+
+
+class SheetSequence(Sequence):
+    """A read-only sequence view that builds ``Sheet`` objects on access."""
+
+    def __init__(self, columns: SheetColumns, sheet_class=Sheet):
+        self._columns = columns
+        self._sheet_class = sheet_class
+
+    def __len__(self) -> int:
+        return len(self._columns)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if not isinstance(index, int):
+            # geojson.FeatureCollection.__getitem__ relies on a TypeError here
+            # to fall back to plain dict lookups such as oim["type"].
+            raise TypeError("sheet indices must be integers or slices")
+        return self._sheet_class(self._columns.row(index))
+
+    def append(self, sheet: geojson.Feature):
+        self._columns.append(sheet.get("properties"))
+
+
+class ColumnarOpenIndexMap(OpenIndexMap):
+    """
+    An OpenIndexMap whose sheets are held in a ``SheetColumns`` store.
+
+    ``features`` is a lazy sequence of ``Sheet`` objects, so code that iterates
+    or indexes an OpenIndexMap keeps working.
+    """
+
+    def __init__(
+        self,
+        sheets: list = None,
+        *,
+        columns: SheetColumns = None,
+        sheet_class=Sheet,
+        **kwargs,
+    ):
+        # Skip FeatureCollection.__init__, which would materialize a list.
+        geojson.GeoJSON.__init__(self, **kwargs)
+        columns = columns if columns is not None else SheetColumns()
+        object.__setattr__(self, "columns", columns)
+        self["features"] = SheetSequence(columns, sheet_class)
+        for sheet in sheets or []:
+            if isinstance(sheet, geojson.Feature):
+                self.add_sheet(sheet)
+
+    def add_sheet(self, sheet: geojson.Feature):
+        if isinstance(sheet, geojson.Feature):
+            self.columns.append(sheet.get("properties"))
+            self._sheet_added(sheet)
+        else:
+            raise ValueError("Only Feature objects can be added.")
+
+    @classmethod
+    def from_file(cls, file_path: str, *, sheet_class=Sheet, cache=False):
+        """
+        Creates a columnar OpenIndexMap from a GeoJSON file.
+
+        With ``cache=True`` (or an ``IndexCache``) the parsed columns are kept
+        on disk, and loading the same unchanged file again skips parsing.
+        """
+        if cache:
+            from openindexmaps_py.cache import IndexCache
+
+            if not isinstance(cache, IndexCache):
+                cache = IndexCache()
+            columns = cache.columns(file_path)
+        else:
+            columns = read_columns(file_path)
+        return cls(columns=columns, sheet_class=sheet_class)
+
+    @classmethod
+    def from_openindexmap(cls, oim: OpenIndexMap):
+        """Converts a list-backed OpenIndexMap to the columnar backend."""
+        columns = SheetColumns.from_properties(
+            feature.get("properties") for feature in oim.features
+        )
+        return cls(columns=columns)
+
+    def take(self, rows) -> "ColumnarOpenIndexMap":
+        """Returns a new OpenIndexMap with the sheets at the given rows."""
+        return type(self)(
+            columns=self.columns.take(rows), sheet_class=self.features._sheet_class
+        )
+
+    def _bounds_array(self) -> np.ndarray:
+        return self.columns.bounds()
+
+    def _property_values(self, key: str) -> list:
+        return self.columns.column(key)
+
+    def write(self, fp, indent: int = None, precision: int = 6) -> int:
+        """
+        Streams the collection as GeoJSON to an open text file.
+
+        The output is the same as writing the Sheet objects. Rectangular sheets
+        are written straight from the columns, with their rings built in bulk,
+        so most rows never become Sheet objects.
+        """
+        return write_feature_collection(
+            fp, self.output_features(precision), indent=indent, precision=precision
+        )
+
+    def output_features(self, precision: int = 6):
+        """Yields the features as ``write`` serializes them."""
+        columns, sheet_class = self.columns, self.features._sheet_class
+        if precision != 6 or not _builds_rectangles(sheet_class):
+            yield from self.features
+            return
+        usable, bounds = columns.float_bounds(), columns.bounds()
+        for start in range(0, len(columns), _WRITE_CHUNK):
+            stop = start + _WRITE_CHUNK
+            rings = _rectangle_rings(bounds[start:stop], usable[start:stop])
+            for ring, properties in zip(rings, columns.rows(start, stop)):
+                if ring is None or not _RESERVED.isdisjoint(properties):
+                    yield sheet_class(properties)
+                else:
+                    yield OutputFeature(
+                        type="Feature",
+                        geometry={"type": "Polygon", "coordinates": [ring]},
+                        properties=properties,
+                    )
+
+    def geometries(self):
+        """
+        Yields the geometry of every sheet, in order. Plain rectangles come
+        straight from the bounds; only the other sheets are built.
+        """
+        columns, sheet_class = self.columns, self.features._sheet_class
+        if not _builds_rectangles(sheet_class):
+            for sheet in self.features:
+                yield sheet.__geo_interface__.get("geometry")
+            return
+        usable, bounds = columns.float_bounds(), columns.bounds()
+        for start in range(0, len(columns), _WRITE_CHUNK):
+            stop = start + _WRITE_CHUNK
+            rings = _rectangle_rings(bounds[start:stop], usable[start:stop])
+            for row, ring in enumerate(rings, start):
+                if ring is None:
+                    yield self.features[row].__geo_interface__.get("geometry")
+                else:
+                    yield {"type": "Polygon", "coordinates": [ring]}
+
+    def to_openindexmap(self) -> OpenIndexMap:
+        """Materializes every sheet into a list-backed OpenIndexMap."""
+        return OpenIndexMap(list(self.features))
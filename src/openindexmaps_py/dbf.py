@@ -0,0 +1,163 @@
+"""
+Memory-mapped reading of dBASE (.dbf) attribute tables.
+
+Geodex series are ArcGIS shapefiles, whose attributes live in a .dbf file of
+fixed-width records. ``DbfReader`` maps the file into memory, views the
+records as a NumPy structured array (one fixed-width byte field per column)
+and decodes them a batch at a time, so a table is never copied or parsed as a
+whole. Values follow what QGIS/OGR export: trailing blanks are trimmed, blank
+fields are None, N fields without decimals are ints and F or N fields with
+decimals are floats.
+"""
+
+import mmap
+import struct
+from pathlib import Path
+from typing import NamedTuple
+
+import numpy as np
+
+BATCH_SIZE = 10000
+
+_HEADER = struct.Struct("<B3BIHH")
+_DESCRIPTOR_SIZE = 32
+_TERMINATOR = 0x0D
+
+
+class DbfField(NamedTuple):
+    name: str
+    type: str
+    offset: int
+    length: int
+    decimals: int
+
+
+def _encoding(path: Path, encoding: str) -> str:
+    """The encoding given, else the one named in a .cpg next to the file."""
+    if encoding:
+        return encoding
+    cpg = path.with_suffix(".cpg")
+    if cpg.exists():
+        name = cpg.read_text().strip()
+        return "utf-8" if name.upper() in ("UTF-8", "UTF8", "65001") else name
+    return "latin-1"
+
+
+class DbfReader:
+    """
+    Reads the records of a .dbf file in batches of property dicts or columns.
+
+    Use it as a context manager, or call ``close``, to release the memory map.
+    """
+
+    def __init__(self, path, *, encoding: str = None):
+        self.path = Path(path)
+        self.encoding = _encoding(self.path, encoding)
+        self._file = open(self.path, "rb")
+        try:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:  # an empty file cannot be mapped
+            self._file.close()
+            raise ValueError(f"{self.path} is not a dBASE file")
+        self._read_header()
+
+    def _read_header(self):
+        data = self._map
+        if len(data) < _HEADER.size:
+            raise ValueError(f"{self.path} is not a dBASE file")
+        _, _, _, _, count, header_length, record_length = _HEADER.unpack_from(data)
+        fields, position, offset = [], _HEADER.size + 20, 1  # byte 0: deleted flag
+        while position < header_length and data[position] != _TERMINATOR:
+            descriptor = data[position : position + _DESCRIPTOR_SIZE]
+            name = descriptor[:11].split(b"\0")[0].decode("ascii", "replace")
+            length, decimals = descriptor[16], descriptor[17]
+            fields.append(DbfField(name, chr(descriptor[11]), offset, length, decimals))
+            offset += length
+            position += _DESCRIPTOR_SIZE
+        if offset > record_length:
+            raise ValueError(f"{self.path}: fields are longer than the records")
+        # Trust the file size over the header's count if the file is truncated.
+        count = min(count, (len(data) - header_length) // max(record_length, 1))
+        self.fields = fields
+        self._records = np.ndarray(
+            shape=(count,),
+            dtype=np.dtype(
+                {
+                    "names": ["_deleted"] + [field.name for field in fields],
+                    "formats": ["S1"] + [f"S{field.length}" for field in fields],
+                    "offsets": [0] + [field.offset for field in fields],
+                    "itemsize": record_length,
+                }
+            ),
+            buffer=data,
+            offset=header_length,
+        )
+
+    def __len__(self) -> int:
+        """Number of records, deleted ones included."""
+        return len(self._records)
+
+    def __enter__(self) -> "DbfReader":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        self._records = None
+        try:
+            self._map.close()
+        except BufferError:
+            # A batch still refers to the map; it is released with the batch.
+            pass
+        self._file.close()
+
+    def _decode(self, field: DbfField, raw: np.ndarray) -> list:
+        """Decodes one column of raw fixed-width values."""
+        if field.type in "NF":
+            stripped = np.char.strip(raw)
+            missing = (stripped == b"") | (np.char.find(stripped, b"*") >= 0)
+            if field.type == "N" and field.decimals == 0:
+                try:
+                    numbers = np.where(missing, b"0", stripped).astype(np.int64)
+                except ValueError:  # "1.5" in a field declared without decimals
+                    numbers = np.where(missing, b"nan", stripped).astype(np.float64)
+            else:
+                numbers = np.where(missing, b"nan", stripped).astype(np.float64)
+            values = numbers.tolist()
+            for row in np.flatnonzero(missing).tolist():
+                values[row] = None
+            return values
+        if field.type == "L":
+            table = {b"T": True, b"t": True, b"Y": True, b"y": True}
+            table.update({b"F": False, b"f": False, b"N": False, b"n": False})
+            return [table.get(value[:1]) for value in raw.tolist()]
+        encoding = self.encoding
+        return [
+            value.decode(encoding, "replace") if value else None
+            for value in np.char.rstrip(raw).tolist()
+        ]
+
+    def iter_columns(self, fields=None, *, batch_size: int = BATCH_SIZE):
+        """
+        Yields {field name: list of values} for each batch of records, leaving
+        out deleted records. ``fields`` restricts the columns that are decoded.
+        """
+        wanted = [
+            field for field in self.fields if fields is None or field.name in fields
+        ]
+        for start in range(0, len(self._records), batch_size):
+            batch = self._records[start : start + batch_size]
+            kept = batch["_deleted"] != b"*"
+            if not kept.all():
+                batch = batch[kept]
+            yield {
+                field.name: self._decode(field, batch[field.name]) for field in wanted
+            }
+
+    def iter_records(self, fields=None, *, batch_size: int = BATCH_SIZE):
+        """Yields the records as property dicts, decoded a batch at a time."""
+        for columns in self.iter_columns(fields, batch_size=batch_size):
+            names = list(columns)
+            for values in zip(*columns.values()):
+                yield dict(zip(names, values))
@@ -1,119 +1,154 @@
 from openindexmaps_py import oimpy
+import contextlib
+import fnmatch
 import geojson
+import glob
+import itertools
+import logging
+import numpy as np
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
-from typing import List
+from typing import List, NamedTuple
+
+from openindexmaps_py.columnar import ColumnarOpenIndexMap, SheetColumns
+from openindexmaps_py.dbf import BATCH_SIZE, DbfReader
+from openindexmaps_py.oimpy import SCHEMA_PATH
+from openindexmaps_py.streaming import iter_features
+from openindexmaps_py.timings import Timings, stage, timed, timed_iter
+from openindexmaps_py.writer import round_floats, write_feature_collection
+
+logger = logging.getLogger(__name__)
+
+# The YEARn_TYPE codes that fill each OIM date field.
+DATE_TYPES = {
+    "datePub": [97, 98, 99, 113, 121],
+    "date": [100, 110, 114, 116, 118, 119],
+    "dateSurvey": [102, 109, 115],
+    "datePhoto": [103, 104, 105, 106, 120],
+}
+
+# ISO_TYPE code -> (lines property, interval property, unit of ISO_VAL)
+ISO_TYPES = {
+    4: ("contLines", "contInterv", "feet"),
+    5: ("contLines", "contInterv", "meters"),
+    1: ("bathLines", "bathInterv", "feet"),
+    2: ("bathLines", "bathInterv", "fathoms"),
+    3: ("bathLines", "bathInterv", "meters"),
+}
 
 
 class GeodexDictionary:
     """A class for looking up various geodex attributes."""
 
-    def __init__(self):
-        self.lookup_dict = {
-            "map_type": {
-                30: "Administrative map",
-                1: "Aerial photograph",
-                6: "Aeronautical chart",
-                7: "Bathymetric map",
-                21: "Coal map",
-                0: "Not assigned",
-                5: "Geologic map",
-                4: "Hydrogeologic map",
-                11: "Land use map",
-                12: "Nautical chart",
-                13: "Orthophoto map",
-                14: "Planimetric map",
-                998: "Printed map - 2 color",
-                997: "Printed map - colored",
-                996: "Printed map - monochrome",
-                995: "Projection not indicated",
-                15: "Reference map",
-                16: "Road map",
-                22: "Satellite image map",
-                24: "Shaded relief map",
-                18: "Topo map (contours)",
-                23: "Topo map (form lines)",
-                19: "Topo map (hachures)",
-                25: "Topo map (irr interval)",
-                20: "Topo map (layer tints)",
-            },
-            "production": {
-                38: "Blue line print",
-                39: "Blueprint",
-                37: "Negative microform",
-                35: "Negative photocopy",
-                34: "Positive photocopy",
-                31: "Printed map - colored",
-                33: "Printed map - monochrome",
-                32: "Printed map - 2 color",
-            },
-            "projection": {
-                0: "Not assigned",
-                163: "Azimuthal equidistant",
-                185: "Bonne",
-                199: "Cassini",
-                182: "Conic equidistant",
-                183: "Conic",
-                171: "Cylindrical",
-                180: "Gauss-Krüger",
-                999: "Gauss-Krüger",
-                164: "Gnomonic",
-                186: "Lambert conformal conic",
-                175: "Mercator",
-                176: "Miller",
-                998: "Munich PM",
-                187: "Polyconic",
-                198: "Polyhedric",
-                161: "Not indicated",
-                178: "Sinusoidal",
-                168: "Stereographic",
-                179: "Transverse Mercator",
-            },
-            "prime_meridian": {
-                0: "Not assigned",
-                157: "Athens PM",
-                999: "Cordoba PM",
-                148: "Copenhagen PM",
-                135: "Ferro PM",
-                131: "Greenwich PM",
-                132: "Madrid PM",
-                146: "Munich PM",
-                142: "Paris PM",
-                138: "Quito PM",
-                147: "Rome PM",
-            },
-            "iso_type": {
-                1: "Isobars Feet",
-                2: "Isobars Fathoms",
-                3: "Isobars Meters",
-                4: "Contours Feet",
-                5: "Contours Meters",
-                6: "Multiple Isobar Types",
-                7: "No Isobar Indicated",
-            },
-            "year_type": {
-                97: "Approximate Date",  # datePub
-                98: "Publication Date",  # datePub
-                99: "Compilation Date",  # datePub
-                100: "Base Map Date",  # date
-                102: "Field Checked",  # dateSurvey
-                103: "Image Year",  # datePhoto
-                104: "Photography to",  # datePhoto
-                105: "Photo Inspected",  # datePhoto
-                106: "Image Date",  # datePhoto
-                108: "Preliminary Edition",  # date
-                109: "Compiled From Map Dated",  # datePSurvey
-                110: "Interim Edition",  # date
-                112: "Printed",  # datePub
-                113: "Printed Circa",  # datePub
-                114: "Revised",  # date
-                115: "Situation/Survey",  # dateSurvey
-                116: "Transportation Network",  # date
-                118: "Provisional Edition",  # date
-                120: "Photo Revised",  # datePhoto
-                121: "Edition of",  # datePub
-                119: "Magnetic Declination Year",  # date
-            },
-        }
+    # Shared by every instance, so creating a GeodexDictionary is free.
+    lookup_dict = {
+        "map_type": {
+            30: "Administrative map",
+            1: "Aerial photograph",
+            6: "Aeronautical chart",
+            7: "Bathymetric map",
+            21: "Coal map",
+            0: "Not assigned",
+            5: "Geologic map",
+            4: "Hydrogeologic map",
+            11: "Land use map",
+            12: "Nautical chart",
+            13: "Orthophoto map",
+            14: "Planimetric map",
+            998: "Printed map - 2 color",
+            997: "Printed map - colored",
+            996: "Printed map - monochrome",
+            995: "Projection not indicated",
+            15: "Reference map",
+            16: "Road map",
+            22: "Satellite image map",
+            24: "Shaded relief map",
+            18: "Topo map (contours)",
+            23: "Topo map (form lines)",
+            19: "Topo map (hachures)",
+            25: "Topo map (irr interval)",
+            20: "Topo map (layer tints)",
+        },
+        "production": {
+            38: "Blue line print",
+            39: "Blueprint",
+            37: "Negative microform",
+            35: "Negative photocopy",
+            34: "Positive photocopy",
+            31: "Printed map - colored",
+            33: "Printed map - monochrome",
+            32: "Printed map - 2 color",
+        },
+        "projection": {
+            0: "Not assigned",
+            163: "Azimuthal equidistant",
+            185: "Bonne",
+            199: "Cassini",
+            182: "Conic equidistant",
+            183: "Conic",
+            171: "Cylindrical",
+            180: "Gauss-Krüger",
+            999: "Gauss-Krüger",
+            164: "Gnomonic",
+            186: "Lambert conformal conic",
+            175: "Mercator",
+            176: "Miller",
+            998: "Munich PM",
+            187: "Polyconic",
+            198: "Polyhedric",
+            161: "Not indicated",
+            178: "Sinusoidal",
+            168: "Stereographic",
+            179: "Transverse Mercator",
+        },
+        "prime_meridian": {
+            0: "Not assigned",
+            157: "Athens PM",
+            999: "Cordoba PM",
+            148: "Copenhagen PM",
+            135: "Ferro PM",
+            131: "Greenwich PM",
+            132: "Madrid PM",
+            146: "Munich PM",
+            142: "Paris PM",
+            138: "Quito PM",
+            147: "Rome PM",
+        },
+        "iso_type": {
+            1: "Isobars Feet",
+            2: "Isobars Fathoms",
+            3: "Isobars Meters",
+            4: "Contours Feet",
+            5: "Contours Meters",
+            6: "Multiple Isobar Types",
+            7: "No Isobar Indicated",
+        },
+        "year_type": {
+            97: "Approximate Date",  # datePub
+            98: "Publication Date",  # datePub
+            99: "Compilation Date",  # datePub
+            100: "Base Map Date",  # date
+            102: "Field Checked",  # dateSurvey
+            103: "Image Year",  # datePhoto
+            104: "Photography to",  # datePhoto
+            105: "Photo Inspected",  # datePhoto
+            106: "Image Date",  # datePhoto
+            108: "Preliminary Edition",  # date
+            109: "Compiled From Map Dated",  # datePSurvey
+            110: "Interim Edition",  # date
+            112: "Printed",  # datePub
+            113: "Printed Circa",  # datePub
+            114: "Revised",  # date
+            115: "Situation/Survey",  # dateSurvey
+            116: "Transportation Network",  # date
+            118: "Provisional Edition",  # date
+            120: "Photo Revised",  # datePhoto
+            121: "Edition of",  # datePub
+            119: "Magnetic Declination Year",  # date
+        },
+    }
 
     def lookup(self, category: str, key: int) -> str:
         """Lookup a value based on category and key.
@@ -131,6 +166,7 @@ class GeodexDictionary:
 class GeodexSheet:
     """Represents a single geodex sheet with its properties and coordinates."""
 
+    @timed("GeodexSheet.__init__")
     def __init__(self, sheetdict: dict, FLIP):
         geodex_dict = GeodexDictionary()
         properties = sheetdict.get("properties", {})
@@ -166,7 +202,8 @@ class GeodexSheet:
         # self.map_type = geodex_dict.lookup("map_type", properties.get("MAP_TYPE", None))
         # self.map_for = properties.get("MAP_FOR", None)
         self.project = geodex_dict.lookup("projection", properties.get("PROJECT", None))
-        # TODO: If the Prime Meridian is anything other than 131 (Greenwich), we need to mess with longitude coords
+        # Longitudes stay on their own prime meridian here; normalize_bounds
+        # (the NORMALIZE option of the conversions) shifts them to Greenwich.
         self.prime_mer = geodex_dict.lookup(
             "prime_meridian", properties.get("PRIME_MER", None)
         )
@@ -182,13 +219,9 @@ class GeodexSheet:
         self.iso_type = properties.get("ISO_TYPE", None)
         self.iso_val = properties.get("ISO_VAL", 0)
 
+    @timed("GeodexSheet.get_dates")
     def get_dates(self) -> dict:
-        oim_date_dict = {
-            "datePub": [97, 98, 99, 113, 121],
-            "date": [100, 110, 114, 116, 118, 119],
-            "dateSurvey": [102, 109, 115],
-            "datePhoto": [103, 104, 105, 106, 120],
-        }
+        oim_date_dict = DATE_TYPES
 
         years = [
             {"year1": (str(self.year1), self.year1_type)},
@@ -218,6 +251,7 @@ class GeodexSheet:
         # Remove keys with None values
         return {k: v for k, v in dates.items() if v is not None}
 
+    @timed("GeodexSheet.get_iso")
     def get_iso(self) -> dict:
         # "iso_type": {
         #         1: "Isobars Feet",
@@ -233,7 +267,6 @@ class GeodexSheet:
             "bathLines": None,
             "bathInterv": None,
         }
-        geodex_dict = GeodexDictionary()
         if self.iso_type == 4:
             iso["contLines"] = True
             if self.iso_val != 0:
@@ -263,6 +296,7 @@ class GeodexSheet:
         if None in [self.y1, self.y2, self.x1, self.x2]:
             raise ValueError(f"Invalid coordinates for record {self.record}")
 
+        scale = None
         if self.scale is not None:
             assert isinstance(self.scale, int), "SCALE IS NOT AN INT!"
             scale = f"1:{self.scale}"
@@ -314,11 +348,25 @@ class GeodexGeoJSON:
         geodex_sheets = cls._parse_geojson_file(geojson_file, FLIP)
         return cls(geodex_sheets)
 
+    @classmethod
+    def from_dbf(
+        cls, dbf_file: Path, *, FLIP=False, encoding=None, batch_size=BATCH_SIZE
+    ) -> "GeodexGeoJSON":
+        """
+        Loads the attribute table of a Geodex shapefile straight from its .dbf,
+        decoding the records a batch at a time. The .shp geometry is not read:
+        sheets are built from X1/X2/Y1/Y2, as with a GeoJSON export.
+        """
+        records = read_dbf_features(dbf_file, encoding=encoding, batch_size=batch_size)
+        return cls([sheet for _, sheet in geodex_sheets(records, FLIP=FLIP)])
+
     @staticmethod
     def _parse_geojson_file(geojson_file: Path, FLIP) -> List[GeodexSheet]:
         geodex_sheets = []
         with geojson_file.open("r") as file:
-            content_geojson = geojson.load(file)
+            with stage("geojson.load") as loading:
+                content_geojson = geojson.load(file)
+                loading.records = len(content_geojson.get("features") or ())
             if isinstance(content_geojson, geojson.FeatureCollection):
                 features = content_geojson.get("features", [])
                 for feature in features:
@@ -329,7 +377,9 @@ class GeodexGeoJSON:
                         print(f"Skipping feature due to error: {e}")
         return geodex_sheets
 
-    def to_openindexmap(self, *, VALIDATE: bool = True) -> "oimpy.OpenIndexMap":
+    def to_openindexmap(
+        self, *, VALIDATE: bool = True, schema_path: str = SCHEMA_PATH
+    ) -> "oimpy.OpenIndexMap":
         valid_sheets = [
             sheet.to_sheet()
             for sheet in self.features
@@ -348,8 +398,735 @@ class GeodexGeoJSON:
             return oim
 
 
+GEODEX_FIELDS = (
+    "RECORD",
+    "LOCATION",
+    "DATE",
+    "X1",
+    "X2",
+    "Y1",
+    "Y2",
+    "SCALE",
+    "PRODUCTION",
+    "HOLD",
+    "CATLOC",
+    "PUBLISHER",
+    "PROJECT",
+    "PRIME_MER",
+    "YEAR1",
+    "YEAR1_TYPE",
+    "YEAR2",
+    "YEAR2_TYPE",
+    "YEAR3",
+    "YEAR3_TYPE",
+    "YEAR4",
+    "YEAR4_TYPE",
+    "EDITION_NO",
+    "ISO_TYPE",
+    "ISO_VAL",
+)
+
+_DATE_FIELDS = tuple(DATE_TYPES)
+_ISO_CODES = tuple(ISO_TYPES)
+
+
+def _code_table(mapping: dict) -> np.ndarray:
+    """Returns an object array with mapping[code] at index code, None elsewhere."""
+    table = np.full(max(mapping) + 1, None, dtype=object)
+    for code, value in mapping.items():
+        table[code] = value
+    return table
+
+
+_PRODUCTION = _code_table(GeodexDictionary.lookup_dict["production"])
+_PROJECTION = _code_table(GeodexDictionary.lookup_dict["projection"])
+_PRIME_MERIDIAN = _code_table(GeodexDictionary.lookup_dict["prime_meridian"])
+_DATE_FIELD_OF_TYPE = _code_table(
+    {code: i for i, types in enumerate(DATE_TYPES.values()) for code in types}
+)
+_ISO_OF_TYPE = _code_table({code: i for i, code in enumerate(_ISO_CODES)})
+
+
+def _numbers(values, *, strict: bool = False) -> np.ndarray:
+    """
+    Returns a column as float64, NaN where a value is not a number. With
+    ``strict``, values other than numbers and None raise TypeError.
+    """
+
+    def number(value):
+        if isinstance(value, (int, float)):
+            return value
+        if strict and value is not None:
+            raise TypeError(f"Expected a number, got {value!r}")
+        return np.nan
+
+    return np.fromiter(map(number, values), dtype=np.float64, count=len(values))
+
+
+def _lookup(table: np.ndarray, values) -> np.ndarray:
+    """
+    Maps a column of codes through a code table, like dict.get on every value
+    (so 31 and 31.0 find the same entry and unknown codes give None).
+    """
+    codes = _numbers(values)
+    found = (codes >= 0) & (codes < len(table)) & (codes == np.floor(codes))
+    output = np.full(len(codes), None, dtype=object)
+    output[found] = table[codes[found].astype(np.intp)]
+    return output
+
+
+def round_column(values, precision: int = 6) -> list:
+    """
+    Rounds a column of numbers in bulk, with the result of ``round(value,
+    precision)`` for every value: None stays None and ints stay ints.
+    """
+    output = round_floats(_numbers(values, strict=True), precision).tolist()
+    for row, value in enumerate(values):
+        if value is None or not isinstance(value, float):
+            output[row] = value if value is None else int(value)
+    return output
+
+
+# Longitude of each Geodex prime meridian in degrees east of Greenwich, as
+# defined by EPSG. Copenhagen, Cordoba, Munich and Quito have no EPSG
+# definition; their records are flagged by normalize_bounds and not shifted.
+PRIME_MERIDIAN_OFFSETS = {
+    0: 0.0,  # Not assigned
+    131: 0.0,  # Greenwich, EPSG:8901
+    142: 2.5969213 * 0.9,  # Paris, 2.5969213 grads, EPSG:8903
+    132: -(3 + 41 / 60 + 14.55 / 3600),  # Madrid, EPSG:8905
+    147: 12 + 27 / 60 + 8.4 / 3600,  # Rome, EPSG:8906
+    135: -(17 + 40 / 60),  # Ferro, EPSG:8909
+    157: 23 + 42 / 60 + 58.815 / 3600,  # Athens, EPSG:8912
+}
+
+_PRIME_MERIDIAN_OFFSET = np.full(max(PRIME_MERIDIAN_OFFSETS) + 1, np.nan)
+_PRIME_MERIDIAN_OFFSET[list(PRIME_MERIDIAN_OFFSETS)] = list(
+    PRIME_MERIDIAN_OFFSETS.values()
+)
+
+# Flags set by normalize_bounds, per record.
+SHIFTED = 1
+SWAPPED_LATITUDES = 2
+SWAPPED_LONGITUDES = 4
+OUT_OF_RANGE = 8
+UNKNOWN_MERIDIAN = 16
+
+
+class NormalizedBounds(NamedTuple):
+    """Float arrays of normalized bounds (NaN where missing) and their flags."""
+
+    north: np.ndarray
+    south: np.ndarray
+    west: np.ndarray
+    east: np.ndarray
+    flags: np.ndarray
+
+
+def _floats(values) -> np.ndarray:
+    """
+    A column as float64 with NaN for None. NumPy converts lists of numbers and
+    None in C; other values fall back to ``_numbers``.
+    """
+    try:
+        return np.array(values, dtype=np.float64)
+    except (TypeError, ValueError):
+        return _numbers(values)
+
+
+def normalize_bounds(
+    x1, x2, y1, y2, prime_mer=None, *, clamp: bool = True, precision: int = 6
+) -> NormalizedBounds:
+    """
+    Cleans whole columns of Geodex bounds at once.
+
+    Longitudes measured from another prime meridian (PRIME_MER codes, see
+    PRIME_MERIDIAN_OFFSETS) are shifted to Greenwich and wrapped back into
+    [-180, 180]. Latitudes given south first are swapped, as are longitudes
+    given east first; X1 > X2 is only read as a swap when the sheet would
+    otherwise span more than 180 degrees, so sheets crossing the antimeridian
+    are kept. Values outside [-90, 90] or [-180, 180] are clamped (or, without
+    ``clamp``, left as they are) and flagged. Everything is rounded to
+    ``precision`` decimals like ``round``.
+    """
+    west, east = _floats(x1), _floats(x2)
+    north, south = _floats(y1), _floats(y2)
+    flags = np.zeros(len(west), dtype=np.uint8)
+
+    if prime_mer is not None:
+        codes = _floats(prime_mer)
+        table = _PRIME_MERIDIAN_OFFSET
+        coded = ~np.isnan(codes)
+        offsets = np.full(len(codes), np.nan)
+        found = coded & (codes >= 0) & (codes < len(table)) & (codes % 1 == 0)
+        offsets[found] = table[codes[found].astype(np.intp)]
+        known = ~np.isnan(offsets)
+        flags[coded & ~known] |= UNKNOWN_MERIDIAN
+        offsets[~known] = 0.0
+        shifted = offsets != 0
+        flags[shifted] |= SHIFTED
+        for longitudes in (west, east):
+            longitudes += offsets
+            wrap = shifted & (np.abs(longitudes) > 180)
+            longitudes[wrap] = (longitudes[wrap] + 180) % 360 - 180
+
+    swapped = north < south
+    north, south = np.where(swapped, south, north), np.where(swapped, north, south)
+    flags[swapped] |= SWAPPED_LATITUDES
+    swapped = (west > east) & (west - east < 180)
+    west, east = np.where(swapped, east, west), np.where(swapped, west, east)
+    flags[swapped] |= SWAPPED_LONGITUDES
+
+    for values, limit in ((north, 90), (south, 90), (west, 180), (east, 180)):
+        outside = np.abs(values) > limit
+        flags[outside] |= OUT_OF_RANGE
+        if clamp:
+            np.clip(values, -limit, limit, out=values)
+
+    if precision is not None:
+        north, south, west, east = (
+            round_floats(values, precision) for values in (north, south, west, east)
+        )
+    return NormalizedBounds(north, south, west, east, flags)
+
+
+def _none_for_nan(values: np.ndarray) -> list:
+    return [None if value != value else value for value in values.tolist()]
+
+
+class GeodexTable:
+    """
+    A Geodex attribute table held as columns, for converting a whole series
+    at once.
+
+    Produces the same OpenIndexMap as ``GeodexGeoJSON.to_openindexmap``, but
+    maps the PRODUCTION, PROJECT, PRIME_MER, YEARn_TYPE and ISO_TYPE codes
+    through lookup arrays, rounds coordinates in bulk and stores the result in
+    a ``ColumnarOpenIndexMap`` in one pass, without GeodexSheet objects.
+    """
+
+    def __init__(self, columns: dict, *, FLIP=False):
+        self.columns = columns
+        self.FLIP = FLIP
+
+    def __len__(self) -> int:
+        return len(self.columns["RECORD"])
+
+    @classmethod
+    def from_features(cls, features, *, FLIP=False) -> "GeodexTable":
+        """Loads the Geodex fields of an iterable of GeoJSON features."""
+        rows = []
+        for feature in features:
+            properties = feature.get("properties") or {}
+            row = [properties.get(field) for field in GEODEX_FIELDS]
+            row[-1] = properties.get("ISO_VAL", 0)
+            rows.append(row)
+        columns = list(zip(*rows)) if rows else [()] * len(GEODEX_FIELDS)
+        return cls(dict(zip(GEODEX_FIELDS, map(list, columns))), FLIP=FLIP)
+
+    @classmethod
+    def from_geojson_file(cls, geojson_file: Path, *, FLIP=False) -> "GeodexTable":
+        """Loads a Geodex export, reading its features one at a time."""
+        with Path(geojson_file).open("r") as file:
+            return cls.from_features(iter_features(file), FLIP=FLIP)
+
+    @classmethod
+    def from_dbf(
+        cls, dbf_file: Path, *, FLIP=False, encoding=None, batch_size=BATCH_SIZE
+    ) -> "GeodexTable":
+        """Loads the Geodex fields of a .dbf attribute table, a batch at a time."""
+        columns = {field: [] for field in GEODEX_FIELDS}
+        with DbfReader(dbf_file, encoding=encoding) as reader:
+            for batch in reader.iter_columns(GEODEX_FIELDS, batch_size=batch_size):
+                count = len(next(iter(batch.values()), ()))
+                for field, values in columns.items():
+                    default = 0 if field == "ISO_VAL" else None
+                    values.extend(batch.get(field, [default] * count))
+        return cls(columns, FLIP=FLIP)
+
+    def normalize(self, *, clamp: bool = True) -> np.ndarray:
+        """
+        Runs the X1/X2/Y1/Y2 columns through ``normalize_bounds`` in place and
+        returns its flags for every record.
+        """
+        columns = self.columns
+        bounds = normalize_bounds(
+            columns["X1"],
+            columns["X2"],
+            columns["Y1"],
+            columns["Y2"],
+            columns["PRIME_MER"],
+            clamp=clamp,
+        )
+        columns["Y1"], columns["Y2"] = map(_none_for_nan, (bounds.north, bounds.south))
+        columns["X1"], columns["X2"] = map(_none_for_nan, (bounds.west, bounds.east))
+        return bounds.flags
+
+    def skipped_records(self) -> list[int]:
+        """Returns the rows that are not converted because a coordinate is missing."""
+        return np.flatnonzero(~self._has_coordinates()).tolist()
+
+    def _has_coordinates(self) -> np.ndarray:
+        has = np.ones(len(self), dtype=bool)
+        for field in ("X1", "X2", "Y1", "Y2"):
+            has &= np.fromiter(
+                (value is not None for value in self.columns[field]),
+                dtype=bool,
+                count=len(self),
+            )
+        return has
+
+    def _dates(self, rows: np.ndarray) -> list:
+        """Returns, per date field, the YEARn column that fills it on each row."""
+        # Later YEARn slots win, as in GeodexSheet.get_dates.
+        winner = np.full((len(_DATE_FIELDS), len(rows)), -1, dtype=np.intp)
+        positions = np.arange(len(rows))
+        for slot in range(4):
+            types = [self.columns[f"YEAR{slot + 1}_TYPE"][row] for row in rows]
+            field = _lookup(_DATE_FIELD_OF_TYPE, types)
+            matched = field != None  # noqa: E711 (element-wise)
+            winner[field[matched].astype(np.intp), positions[matched]] = slot
+        years = [self.columns[f"YEAR{slot + 1}"] for slot in range(4)]
+        return [
+            [None if slot < 0 else str(years[slot][row]) for slot, row in zip(w, rows)]
+            for w in winner.tolist()
+        ]
+
+    def sheet_properties(self) -> list[dict]:
+        """Returns the OIM properties of every record that has coordinates."""
+        rows = np.flatnonzero(self._has_coordinates())
+        columns = self.columns
+
+        def column(field: str) -> list:
+            values = columns[field]
+            return [values[row] for row in rows]
+
+        scales = column("SCALE")
+        for scale in scales:
+            if scale is not None:
+                assert isinstance(scale, int), "SCALE IS NOT AN INT!"
+        label, title = column("RECORD"), column("LOCATION")
+        if self.FLIP:
+            label, title = title, label
+        date_pub, date, date_survey, date_photo = self._dates(rows)
+        output = {
+            "label": label,
+            "title": title,
+            "datePub": [
+                str(value) if year is None else year
+                for value, year in zip(column("DATE"), date_pub)
+            ],
+            "north": round_column(column("Y1")),
+            "south": round_column(column("Y2")),
+            "west": round_column(column("X1")),
+            "east": round_column(column("X2")),
+            "scale": [None if value is None else f"1:{value}" for value in scales],
+            "color": _lookup(_PRODUCTION, column("PRODUCTION")).tolist(),
+            "inst": ["AGSL"] * len(rows),
+            "available": [value == 1 for value in column("HOLD")],
+            "instCallNo": column("CATLOC"),
+            "edition": [
+                None if value is None or value == 0 else str(value)
+                for value in column("EDITION_NO")
+            ],
+            "publisher": column("PUBLISHER"),
+            "projection": _lookup(_PROJECTION, column("PROJECT")).tolist(),
+            "primeMer": _lookup(_PRIME_MERIDIAN, column("PRIME_MER")).tolist(),
+            "date": date,
+            "dateSurvey": date_survey,
+            "datePhoto": date_photo,
+        }
+
+        # Filled a column at a time, in the key order of GeodexSheet.to_sheet.
+        sheets = [{} for _ in rows]
+        for key, values in output.items():
+            for sheet, value in zip(sheets, values):
+                if value is not None:
+                    sheet[key] = value
+        iso_types = _lookup(_ISO_OF_TYPE, column("ISO_TYPE")).tolist()
+        for sheet, iso, value in zip(sheets, iso_types, column("ISO_VAL")):
+            if iso is not None:
+                lines, interval, unit = ISO_TYPES[_ISO_CODES[iso]]
+                sheet[lines] = True
+                if value != 0:
+                    sheet[interval] = f"{value} {unit}"
+        return sheets
+
+    @timed("GeodexTable.to_openindexmap", records=lambda self, **options: len(self))
+    def to_openindexmap(
+        self,
+        *,
+        VALIDATE: bool = True,
+        schema_path: str = SCHEMA_PATH,
+        sheet_class=oimpy.MapSheet,
+    ) -> ColumnarOpenIndexMap:
+        """
+        Converts the table to an OpenIndexMap whose sheets are built on access.
+
+        Returns None when ``VALIDATE`` is set and the result does not validate.
+        """
+        columns = SheetColumns.from_properties(self.sheet_properties())
+        oim = ColumnarOpenIndexMap(columns=columns, sheet_class=sheet_class)
+        if VALIDATE:
+            return oim if oim.is_valid(schema_path) else None
+        return oim
+
+
+class SkippedRecord(NamedTuple):
+    """A Geodex record that a conversion left out, and why."""
+
+    index: int
+    record: object
+    reason: str
+
+
+def _log_skipped(skipped: SkippedRecord):
+    logger.warning(
+        "Skipping record %s (feature %d): %s",
+        skipped.record,
+        skipped.index,
+        skipped.reason,
+    )
+
+
+def read_geodex_features(geojson_file: Path):
+    """
+    Pipeline stage: yields (index, feature) from a Geodex export, one at a
+    time. A .dbf attribute table is read with ``read_dbf_features``.
+    """
+    if Path(geojson_file).suffix.lower() == ".dbf":
+        yield from read_dbf_features(geojson_file)
+        return
+    with Path(geojson_file).open("r") as file:
+        yield from enumerate(timed_iter("iter_features", iter_features(file)))
+
+
+def read_dbf_features(dbf_file: Path, *, encoding=None, batch_size=BATCH_SIZE):
+    """
+    Pipeline stage: yields (index, feature) for the records of a .dbf, as
+    geometry-less features. Records are decoded ``batch_size`` at a time.
+    """
+    with DbfReader(dbf_file, encoding=encoding) as reader:
+        records = timed_iter(
+            "DbfReader.iter_records", reader.iter_records(batch_size=batch_size)
+        )
+        for index, properties in enumerate(records):
+            yield index, {"type": "Feature", "properties": properties, "geometry": None}
+
+
+def normalized_features(records, *, clamp: bool = True, batch_size=BATCH_SIZE):
+    """
+    Pipeline stage: (index, feature) -> (index, feature) with the X1/X2/Y1/Y2
+    properties run through ``normalize_bounds``, ``batch_size`` records at a
+    time. Records with a coordinate missing are passed on unchanged.
+    """
+    records = iter(records)
+    while True:
+        batch = list(itertools.islice(records, batch_size))
+        if not batch:
+            return
+        properties = [feature.get("properties") or {} for _, feature in batch]
+
+        def column(field):
+            return [record.get(field) for record in properties]
+
+        with stage("normalize_bounds", records=len(batch)):
+            bounds = normalize_bounds(
+                column("X1"),
+                column("X2"),
+                column("Y1"),
+                column("Y2"),
+                column("PRIME_MER"),
+                clamp=clamp,
+            )
+        complete = ~np.isnan(np.stack(bounds[:4])).any(axis=0)
+        north, south, west, east = (values.tolist() for values in bounds[:4])
+        for row in np.flatnonzero(complete).tolist():
+            record = properties[row]
+            record["Y1"], record["Y2"] = north[row], south[row]
+            record["X1"], record["X2"] = west[row], east[row]
+        for row in np.flatnonzero(bounds.flags & (OUT_OF_RANGE | UNKNOWN_MERIDIAN)):
+            index, record = batch[row][0], properties[row]
+            if bounds.flags[row] & UNKNOWN_MERIDIAN:
+                logger.warning(
+                    "Record %s (%s): prime meridian %s has no known offset",
+                    index,
+                    record.get("RECORD"),
+                    record.get("PRIME_MER"),
+                )
+            if bounds.flags[row] & OUT_OF_RANGE:
+                logger.warning(
+                    "Record %s (%s): bounds out of range%s",
+                    index,
+                    record.get("RECORD"),
+                    ", clamped" if clamp else "",
+                )
+        yield from batch
+
+
+def geodex_sheets(records, *, FLIP=False, on_skip=_log_skipped):
+    """Pipeline stage: (index, feature) -> (index, GeodexSheet)."""
+    for index, feature in records:
+        try:
+            yield index, GeodexSheet(feature, FLIP)
+        except ValueError as e:
+            properties = feature.get("properties") or {}
+            on_skip(SkippedRecord(index, properties.get("RECORD"), str(e)))
+
+
+def map_sheets(records, *, on_skip=_log_skipped):
+    """Pipeline stage: (index, GeodexSheet) -> (index, MapSheet)."""
+    for index, sheet in records:
+        if None in [sheet.y1, sheet.y2, sheet.x1, sheet.x2]:
+            on_skip(SkippedRecord(index, sheet.record, "missing coordinates"))
+            continue
+        try:
+            yield index, sheet.to_sheet()
+        except (ValueError, AssertionError) as e:
+            on_skip(SkippedRecord(index, sheet.record, str(e) or type(e).__name__))
+
+
+def validated_sheets(records, *, schema_path=SCHEMA_PATH, on_skip=_log_skipped):
+    """
+    Pipeline stage: passes on the sheets that are valid OpenIndexMap features
+    under the JSON Schema and reports the others as skipped.
+    """
+    from openindexmaps_py.validation import get_validator
+
+    validator = get_validator(schema_path)
+    for index, sheet in records:
+        errors = validator.feature_errors(sheet.__geo_interface__)
+        if errors:
+            reason = "; ".join(error.message for error in errors)
+            on_skip(
+                SkippedRecord(index, sheet.get("properties", {}).get("label"), reason)
+            )
+        else:
+            yield index, sheet
+
+
+def convert_geodex(
+    geojson_file: Path,
+    fp,
+    *,
+    FLIP=False,
+    VALIDATE: bool = False,
+    NORMALIZE: bool = False,
+    schema_path: str = SCHEMA_PATH,
+    on_skip=_log_skipped,
+    indent: int = None,
+) -> int:
+    """
+    Converts a Geodex export to an OpenIndexMap written to an open text file.
+
+    Each record flows through the pipeline (read feature -> GeodexSheet ->
+    MapSheet -> optional validation -> writer) on its own, so memory use does
+    not grow with the size of the series. Records that are left out are
+    passed to ``on_skip`` as SkippedRecord tuples (logged by default). With
+    ``NORMALIZE``, bounds go through ``normalized_features`` first.
+    Returns the number of sheets written.
+    """
+    records = read_geodex_features(geojson_file)
+    if NORMALIZE:
+        records = normalized_features(records)
+    records = geodex_sheets(records, FLIP=FLIP, on_skip=on_skip)
+    records = map_sheets(records, on_skip=on_skip)
+    if VALIDATE:
+        records = validated_sheets(records, schema_path=schema_path, on_skip=on_skip)
+    return write_feature_collection(fp, (sheet for _, sheet in records), indent=indent)
+
+
+class GeodexFileResult(NamedTuple):
+    """The outcome of converting one Geodex export."""
+
+    source: str
+    output: str
+    written: int
+    skipped: list
+    seconds: float
+    error: str = None
+    timings: Timings = None
+
+    @property
+    def records(self) -> int:
+        return self.written + len(self.skipped)
+
+
+# Fields that every Geodex record has and that no OpenIndexMap property shares.
+_EXPORT_FIELDS = ("RECORD", "X1", "X2", "Y1", "Y2")
+
+
+def is_geodex_export(path) -> bool:
+    """
+    Tells whether a file looks like a Geodex export: a .dbf attribute table or
+    a .geojson file whose first feature has the Geodex RECORD and X1..Y2
+    fields. OpenIndexMaps, such as those written by ``oim_path``, do not. A
+    .geojson file that cannot be read is kept, so that its error is reported.
+    """
+    path = Path(path)
+    suffix = path.suffix.lower()
+    if suffix == ".dbf":
+        return True
+    if suffix != ".geojson":
+        return False
+    try:
+        with open(path) as file:
+            feature = next(iter_features(file), None)
+    except (OSError, ValueError):
+        return True
+    properties = feature.get("properties") if isinstance(feature, dict) else None
+    return isinstance(properties, dict) and all(
+        name in properties for name in _EXPORT_FIELDS
+    )
+
+
+def find_geodex_files(*sources) -> list[Path]:
+    """
+    Expands directories and glob patterns (to the Geodex exports they hold, see
+    ``is_geodex_export``) and plain paths into a sorted list of files without
+    duplicates.
+    """
+    files = set()
+    for source in sources:
+        source = str(source)
+        if os.path.isdir(source):
+            files.update(
+                path for path in Path(source).iterdir() if is_geodex_export(path)
+            )
+        elif glob.has_magic(source):
+            files.update(
+                Path(path)
+                for path in glob.glob(source, recursive=True)
+                if is_geodex_export(path)
+            )
+        else:
+            files.add(Path(source))
+    return sorted(files)
+
+
+def oim_path(source: Path, output_dir: Path) -> Path:
+    """Names the OpenIndexMap for a Geodex export: f0303_geodex -> f0303_OIM."""
+    stem = Path(source).stem
+    stem = stem[: -len("_geodex")] if stem.endswith("_geodex") else stem
+    return Path(output_dir) / f"{stem}_OIM.geojson"
+
+
+def convert_geodex_file(
+    source: Path,
+    output: Path,
+    *,
+    FLIP=False,
+    VALIDATE: bool = False,
+    NORMALIZE: bool = False,
+    schema_path: str = SCHEMA_PATH,
+    timings: bool = False,
+) -> GeodexFileResult:
+    """
+    Converts one export with convert_geodex; errors are returned, not raised.
+    With ``timings``, the per-stage Timings of the conversion are returned too.
+
+    The OpenIndexMap is written to a temporary file next to ``output`` and
+    moved there once complete, so a failed conversion leaves no partial file.
+    """
+    skipped = []
+    collector = Timings() if timings else None
+    start = time.perf_counter()
+    partial = Path(output).with_name(f".{Path(output).name}.{os.getpid()}.tmp")
+    try:
+        with open(partial, "w") as fp, collector or contextlib.nullcontext():
+            written = convert_geodex(
+                source,
+                fp,
+                FLIP=FLIP,
+                VALIDATE=VALIDATE,
+                NORMALIZE=NORMALIZE,
+                schema_path=schema_path,
+                on_skip=skipped.append,
+            )
+        os.replace(partial, output)
+        error = None
+    except Exception as e:
+        written, error = 0, f"{type(e).__name__}: {e}"
+        with contextlib.suppress(OSError):
+            os.unlink(partial)
+    seconds = time.perf_counter() - start
+    return GeodexFileResult(
+        str(source), str(output), written, skipped, seconds, error, collector
+    )
+
+
+def convert_geodex_files(
+    sources,
+    output_dir: Path,
+    *,
+    flip=(),
+    jobs: int = 1,
+    VALIDATE: bool = False,
+    NORMALIZE: bool = False,
+    schema_path: str = SCHEMA_PATH,
+    timings: bool = False,
+):
+    """
+    Converts many Geodex exports, one OpenIndexMap per input, spreading the
+    files over ``jobs`` processes (all cores when ``jobs`` is 0).
+
+    ``flip`` holds file name patterns (``fnmatch``) of the series whose RECORD
+    and LOCATION columns are swapped. Returns an iterator of GeodexFileResult,
+    one per file in the order of ``sources``; with ``timings`` each result
+    carries the per-stage Timings of its file.
+
+    Raises ValueError, before anything is converted, when two sources would be
+    written to the same OpenIndexMap (e.g. f0168.geojson and f0168.dbf).
+    """
+    output_dir = Path(output_dir)
+    tasks = [
+        (
+            Path(source),
+            oim_path(source, output_dir),
+            any(fnmatch.fnmatch(Path(source).name, pattern) for pattern in flip),
+        )
+        for source in sources
+    ]
+    sources_by_output = {}
+    for source, output, _ in tasks:
+        sources_by_output.setdefault(output, []).append(str(source))
+    collisions = [
+        f"{', '.join(names)} -> {output}"
+        for output, names in sources_by_output.items()
+        if len(names) > 1
+    ]
+    if collisions:
+        raise ValueError(
+            "Several sources would be written to the same file: "
+            + "; ".join(collisions)
+        )
+    output_dir.mkdir(parents=True, exist_ok=True)
+    options = {
+        "VALIDATE": VALIDATE,
+        "NORMALIZE": NORMALIZE,
+        "schema_path": schema_path,
+        "timings": timings,
+    }
+    return _convert_tasks(tasks, jobs, options)
+
+
+def _convert_tasks(tasks, jobs: int, options: dict):
+    """Yields the result of each (source, output, FLIP) task, in order."""
+    jobs = jobs or os.cpu_count()
+    if jobs == 1 or len(tasks) < 2:
+        for source, output, FLIP in tasks:
+            yield convert_geodex_file(source, output, FLIP=FLIP, **options)
+        return
+    with ProcessPoolExecutor(max_workers=min(jobs, len(tasks))) as pool:
+        futures = [
+            pool.submit(convert_geodex_file, source, output, FLIP=FLIP, **options)
+            for source, output, FLIP in tasks
+        ]
+        for future in futures:
+            yield future.result()
+
+
 if __name__ == "__main__":
-    schema_path = "schemas/1.0.0.schema.json"
     geodex_geojson_file = Path("QGIS/f0303_geodex.geojson")
     geodex_object = GeodexGeoJSON.from_geojson_file(geodex_geojson_file, FLIP=False)
     oim = geodex_object.to_openindexmap(VALIDATE=True)
@@ -0,0 +1,89 @@
+"""
+Attribute indexes over sheet properties.
+
+Values are compared as strings, like the ``query`` command does. ``HashIndex``
+answers exact lookups; ``SortedIndex`` keeps the values in natural order
+("46-2" before "46-10") for range queries and in plain string order for prefix
+queries. Both return row numbers into the collection.
+"""
+
+import re
+from bisect import bisect_left, bisect_right, insort
+from collections import defaultdict
+
+_CHUNKS = re.compile(r"(\d+)")
+
+
+def natural_key(value) -> tuple:
+    """
+    Sort key that orders the digit runs of a string by their numeric value and
+    the text between them case-insensitively, with the string as a tie-break.
+    """
+    text = str(value)
+    key = []
+    for i, chunk in enumerate(_CHUNKS.split(text)):
+        if i % 2:
+            key.append((0, int(chunk)))
+        elif chunk:
+            key.append((1, chunk.casefold()))
+    return tuple(key), text
+
+
+class HashIndex:
+    """Maps the string form of a property to the rows that have it."""
+
+    def __init__(self, values=()):
+        self._rows = defaultdict(list)
+        for row, value in enumerate(values):
+            self.add(row, value)
+
+    def add(self, row: int, value):
+        if value is not None:
+            self._rows[str(value)].append(row)
+
+    def lookup(self, value) -> list[int]:
+        return list(self._rows.get(str(value), ()))
+
+
+class SortedIndex:
+    """Keeps the rows of a property sorted in natural and in string order."""
+
+    def __init__(self, values=()):
+        entries = [
+            (str(value), row) for row, value in enumerate(values) if value is not None
+        ]
+        natural = sorted((natural_key(text), row) for text, row in entries)
+        self._natural_keys = [key for key, _ in natural]
+        self._natural_rows = [row for _, row in natural]
+        self._text = sorted(entries)
+
+    def add(self, row: int, value):
+        if value is None:
+            return
+        key = natural_key(value)
+        position = bisect_right(self._natural_keys, key)
+        self._natural_keys.insert(position, key)
+        self._natural_rows.insert(position, row)
+        insort(self._text, (str(value), row))
+
+    def range(self, start=None, end=None) -> list[int]:
+        """Returns rows with start <= value <= end in natural order; bounds may be None."""
+        low = (
+            0 if start is None else bisect_left(self._natural_keys, natural_key(start))
+        )
+        if end is None:
+            high = len(self._natural_keys)
+        else:
+            high = bisect_right(self._natural_keys, natural_key(end))
+        return self._natural_rows[low:high]
+
+    def prefix(self, prefix: str) -> list[int]:
+        """Returns the rows whose value starts with ``prefix``, in natural order."""
+        prefix = str(prefix)
+        low = bisect_left(self._text, (prefix,))
+        matches = []
+        for text, row in self._text[low:]:
+            if not text.startswith(prefix):
+                break
+            matches.append((natural_key(text), row))
+        return [row for _, row in sorted(matches)]
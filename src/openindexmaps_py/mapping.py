@@ -1,12 +1,272 @@
 import folium
+import json
+import os
 import webbrowser
-from folium.plugins import MousePosition, MiniMap
+from branca.element import MacroElement
+from folium.map import Layer
+from folium.plugins import MousePosition, MiniMap, VectorGridProtobuf
+from folium.template import Template
 import requests
 
+OUTPUT_PATH = "html/index.html"
 
-def create_map(geojson_data):
-    m = folium.Map(location=(22, -80), tiles="cartodb positron")
+# Vector tile styling, following the GeoJSON layer's style_function.
+_TILE_STYLE = """function (properties, zoom) {
+    return {
+        fill: true,
+        fillColor: properties.available ? "green" : "grey",
+        fillOpacity: 0.2,
+        color: "black",
+        weight: 2
+    };
+}"""
+
+
+# Style classes of the compact layer: a sheet is drawn with _STYLES[1] when it
+# is available, with _STYLES[0] otherwise.
+_STYLES = [
+    {"fillColor": "grey", "color": "black", "weight": 2},
+    {"fillColor": "green", "color": "black", "weight": 2},
+]
+_HIGHLIGHT = {"fillColor": "pink", "weight": 4}
+_TOOLTIP_FIELDS = ["label", "datePub"]
+_TOOLTIP_ALIASES = ["Sheet", "Published Date"]
+_GEOMETRY_TYPES = [
+    "Point",
+    "MultiPoint",
+    "LineString",
+    "MultiLineString",
+    "Polygon",
+    "MultiPolygon",
+    "GeometryCollection",
+]
+
+
+class _SheetPopup(MacroElement):
+    """Shows the label and date of a clicked vector tile sheet."""
+
+    _template = Template("""
+        {% macro script(this, kwargs) %}
+        {{ this.layer.get_name() }}.on("click", function (e) {
+            var properties = e.layer.properties || {};
+            var content = document.createElement("div");
+            [["Sheet", "label"], ["Published Date", "datePub"]].forEach(function (field) {
+                var line = document.createElement("div");
+                var name = document.createElement("b");
+                name.textContent = field[0] + ": ";
+                line.appendChild(name);
+                line.appendChild(document.createTextNode(properties[field[1]] ?? ""));
+                content.appendChild(line);
+            });
+            L.popup().setLatLng(e.latlng).setContent(content).openOn({{ this.map_name }});
+        });
+        {% endmacro %}
+        """)
+
+    def __init__(self, layer, map_name: str):
+        super().__init__()
+        self.layer = layer
+        self.map_name = map_name
+
+
+class _Packer:
+    """
+    Quantizes coordinates to integers of 10**-precision degrees and stores
+    each as the difference from the one before it, TopoJSON style. The
+    cursor runs on across rings and features, so neighbouring sheets cost a
+    few digits per coordinate.
+    """
+
+    def __init__(self, precision: int):
+        self.scale = 10**precision
+        self.x = self.y = 0
+        self.xs, self.ys = [], []
+
+    def positions(self, positions, closed: bool = False) -> list:
+        if closed and len(positions) > 1 and positions[0] == positions[-1]:
+            positions = positions[:-1]  # the page closes the ring again
+        flat = []
+        for position in positions:
+            x, y = round(position[0] * self.scale), round(position[1] * self.scale)
+            flat += (x - self.x, y - self.y)
+            self.x, self.y = x, y
+            self.xs.append(x)
+            self.ys.append(y)
+        return flat
+
+    def geometry(self, geometry):
+        if not geometry:
+            return None
+        geometry_type = geometry["type"]
+        if geometry_type == "GeometryCollection":
+            coordinates = [self.geometry(g) for g in geometry["geometries"]]
+        else:
+            coordinates = geometry["coordinates"]
+            if geometry_type == "Point":
+                coordinates = self.positions([coordinates])
+            elif geometry_type in ("MultiPoint", "LineString"):
+                coordinates = self.positions(coordinates)
+            elif geometry_type == "MultiLineString":
+                coordinates = [self.positions(line) for line in coordinates]
+            elif geometry_type == "Polygon":
+                coordinates = [self.positions(ring, True) for ring in coordinates]
+            else:
+                coordinates = [
+                    [self.positions(ring, True) for ring in polygon]
+                    for polygon in coordinates
+                ]
+        return [_GEOMETRY_TYPES.index(geometry_type), coordinates]
+
+    def bounds(self) -> list:
+        if not self.xs:
+            return None
+        return [
+            [min(self.ys) / self.scale, min(self.xs) / self.scale],
+            [max(self.ys) / self.scale, max(self.xs) / self.scale],
+        ]
+
+
+def pack_sheets(geojson_data, precision: int = 5) -> dict:
+    """
+    Packs the sheets of a FeatureCollection (a dict, JSON text or an object
+    with ``__geo_interface__``) for the compact map in one pass: a column
+    per tooltip field, each sheet's style class as one character of
+    ``classes`` and the delta-encoded geometries. ``bounds`` is
+    [[south, west], [north, east]], or None when there are no coordinates.
+    """
+    if isinstance(geojson_data, str):
+        geojson_data = json.loads(geojson_data)
+    collection = getattr(geojson_data, "__geo_interface__", geojson_data)
+    packer = _Packer(precision)
+    columns = {field: [] for field in _TOOLTIP_FIELDS}
+    classes, geometries = [], []
+    for feature in collection["features"]:
+        feature = getattr(feature, "__geo_interface__", feature)
+        properties = feature.get("properties") or {}
+        for field, column in columns.items():
+            column.append(properties.get(field))
+        classes.append("1" if properties.get("available") else "0")
+        geometries.append(packer.geometry(feature.get("geometry")))
+    return {
+        "scale": packer.scale,
+        "properties": columns,
+        "classes": "".join(classes),
+        "geometries": geometries,
+        "bounds": packer.bounds(),
+    }
 
+
+class _CompactSheets(Layer):
+    """
+    The sheets as packed by ``pack_sheets``, unpacked into a GeoJSON layer
+    by the page. Styling, highlighting and the tooltip are done in
+    JavaScript from the style classes, where folium's GeoJson calls Python
+    style functions on every feature and writes a case per feature id.
+    """
+
+    _template = Template("""
+        {% macro header(this, kwargs) %}
+        <style>
+            .sheet-tooltip { background-color: #F0EFEF; border: 2px solid black;
+                border-radius: 3px; max-width: 800px; }
+            .sheet-tooltip th { padding: 2px; padding-right: 8px; text-align: left; }
+        </style>
+        {% endmacro %}
+        {% macro script(this, kwargs) %}
+        var {{ this.get_name() }} = (function (packed) {
+            var types = {{ this.types|tojson }};
+            var styles = {{ this.styles|tojson }};
+            var highlight = {{ this.highlight|tojson }};
+            var fields = {{ this.fields|tojson }};
+            var aliases = {{ this.aliases|tojson }};
+            var x = 0, y = 0;
+            function positions(flat, closed) {
+                var points = [];
+                for (var i = 0; i < flat.length; i += 2) {
+                    x += flat[i];
+                    y += flat[i + 1];
+                    points.push([x / packed.scale, y / packed.scale]);
+                }
+                if (closed && points.length) points.push(points[0]);
+                return points;
+            }
+            function rings(list) {
+                return list.map(function (ring) { return positions(ring, true); });
+            }
+            function geometry(g) {
+                if (g === null) return null;
+                var type = types[g[0]], c = g[1];
+                if (type === "GeometryCollection") {
+                    return {type: type, geometries: c.map(geometry)};
+                }
+                var coordinates;
+                if (type === "Point") coordinates = positions(c)[0];
+                else if (type === "MultiPoint" || type === "LineString") coordinates = positions(c);
+                else if (type === "MultiLineString") coordinates = c.map(function (line) { return positions(line); });
+                else if (type === "Polygon") coordinates = rings(c);
+                else coordinates = c.map(rings);
+                return {type: type, coordinates: coordinates};
+            }
+            var features = packed.geometries.map(function (g, i) {
+                var properties = {class: +packed.classes[i]};
+                fields.forEach(function (field) {
+                    properties[field] = packed.properties[field][i];
+                });
+                return {type: "Feature", properties: properties, geometry: geometry(g)};
+            });
+            var layer = L.geoJson({type: "FeatureCollection", features: features}, {
+                style: function (feature) { return styles[feature.properties.class]; },
+                onEachFeature: function (feature, sheet) {
+                    sheet.on({
+                        mouseover: function (e) {
+                            if (typeof e.target.setStyle === "function") e.target.setStyle(highlight);
+                        },
+                        mouseout: function (e) {
+                            if (typeof e.target.setStyle === "function") layer.resetStyle(e.target);
+                        },
+                        click: function (e) {
+                            if (typeof e.target.getBounds === "function") {
+                                {{ this._parent.get_name() }}.fitBounds(e.target.getBounds());
+                            }
+                        }
+                    });
+                }
+            });
+            layer.bindTooltip(function (sheet) {
+                var table = document.createElement("table");
+                fields.forEach(function (field, i) {
+                    var row = table.insertRow();
+                    var name = document.createElement("th");
+                    name.textContent = aliases[i];
+                    row.appendChild(name);
+                    var value = sheet.feature.properties[field];
+                    row.insertCell().textContent = value === null ? "" : value.toLocaleString();
+                });
+                return table;
+            }, {sticky: false, className: "sheet-tooltip"});
+            return layer;
+        })({{ this.packed|tojson }});
+        {% endmacro %}
+        """)
+
+    def __init__(self, packed: dict, name: str = "Sheets"):
+        super().__init__(name=name, overlay=True)
+        self._name = "CompactSheets"
+        self.packed = {key: value for key, value in packed.items() if key != "bounds"}
+        self.types = _GEOMETRY_TYPES
+        self.styles = _STYLES
+        self.highlight = _HIGHLIGHT
+        self.fields = _TOOLTIP_FIELDS
+        self.aliases = _TOOLTIP_ALIASES
+
+
+def _add_compact_sheets(m, geojson_data, precision: int) -> list:
+    packed = pack_sheets(geojson_data, precision)
+    _CompactSheets(packed).add_to(m)
+    return packed["bounds"]
+
+
+def _add_geojson(m, geojson_data) -> list:
     geojson_object = folium.GeoJson(
         geojson_data,
         zoom_on_click=True,
@@ -22,8 +282,8 @@ def create_map(geojson_data):
     )
 
     tooltip = folium.GeoJsonTooltip(
-        fields=["label", "datePub"],
-        aliases=["Sheet", "Published Date"],
+        fields=_TOOLTIP_FIELDS,
+        aliases=_TOOLTIP_ALIASES,
         localize=True,
         sticky=False,
         labels=True,
@@ -37,20 +297,87 @@ def create_map(geojson_data):
     ).add_to(geojson_object)
 
     geojson_object.add_to(m)
+    return geojson_object.get_bounds()
+
+
+def _add_vector_tiles(m, tiles: str, bounds, layer: str) -> list:
+    """
+    Adds a vector tile layer. ``tiles`` is a URL template or a directory
+    written by ``tiles.write_tiles``, whose metadata supplies the layer name,
+    zoom range and bounds.
+    """
+    max_zoom = None
+    if "{z}" not in tiles:
+        with open(os.path.join(tiles, "metadata.json")) as file:
+            metadata = json.load(file)
+        layer = metadata["vector_layers"][0]["id"]
+        max_zoom = metadata["maxzoom"]
+        bounds = bounds or metadata["bounds"]
+        # Relative to the page, so html/ and the tiles can be served together.
+        directory = os.path.relpath(tiles, os.path.dirname(OUTPUT_PATH))
+        tiles = directory.replace(os.sep, "/") + "/{z}/{x}/{y}.pbf"
+    options = {"interactive": True}
+    if max_zoom is not None:
+        options["maxNativeZoom"] = max_zoom
+    # The style is a function, so the options go in as JavaScript.
+    styles = f"{json.dumps(layer)}: {_TILE_STYLE}"
+    script = f'{json.dumps(options)[:-1]}, "vectorTileLayerStyles": {{{styles}}}}}'
+    source = VectorGridProtobuf(tiles, "Sheets", script)
+    source.add_to(m)
+    _SheetPopup(source, m.get_name()).add_to(m)
+    if bounds:
+        west, south, east, north = bounds
+        return [[south, west], [north, east]]
+    return None
+
+
+def create_map(
+    geojson_data=None,
+    *,
+    tiles: str = None,
+    bounds=None,
+    layer="sheets",
+    compact: bool = False,
+    precision: int = 5,
+):
+    """
+    Writes a Folium map of the sheets to html/index.html.
+
+    With ``compact`` the inlined sheets are cut down by ``pack_sheets`` to
+    what the tooltip and styling use, with coordinates quantized to
+    ``precision`` decimals (5 is about a metre) and delta-encoded, which
+    makes the page several times smaller and quicker to build.
+
+    The sheets are inlined from ``geojson_data`` or, for large index maps,
+    drawn from vector tiles: ``tiles`` is then a URL template such as
+    ``http://localhost:8000/tiles/{z}/{x}/{y}.pbf`` (with ``bounds`` as
+    [west, south, east, north] to frame and ``layer`` the tile layer) or a
+    directory written by ``oimpy tiles``. Browsers do not load tiles from
+    file:// pages, so serve the page and tiles over HTTP.
+    """
+    m = folium.Map(location=(22, -80), tiles="cartodb positron")
+
+    if tiles is not None:
+        fit = _add_vector_tiles(m, tiles, bounds, layer)
+    elif compact:
+        fit = _add_compact_sheets(m, geojson_data, precision)
+    else:
+        fit = _add_geojson(m, geojson_data)
 
-    folium.FitBounds(geojson_object.get_bounds()).add_to(m)
+    if fit:
+        folium.FitBounds(fit).add_to(m)
     folium.LayerControl().add_to(m)
     MousePosition().add_to(m)
     MiniMap(toggle_display=True).add_to(m)
 
-    m.save("html/index.html")
+    m.save(OUTPUT_PATH)
 
 
 def main():
     geojson_url = "https://raw.githubusercontent.com/UWM-Libraries/OpenIndexMaps/main/233bA62500a.geojson"
     geojson_data = requests.get(geojson_url).json()
     create_map(geojson_data)
-    webbrowser.open("html/index.html")
+    webbrowser.open(OUTPUT_PATH)
 
 
 if __name__ == "__main__":
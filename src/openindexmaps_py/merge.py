@@ -0,0 +1,87 @@
+"""
+Streaming merge of OpenIndexMaps.
+
+Every input's features are read with ``iter_features``, tagged with the file
+they came from and written straight to the output, so memory use does not
+depend on the size or number of inputs. With several jobs, worker processes
+parse and serialize whole inputs into temporary files, which are copied to
+the output in input order as they become ready.
+"""
+
+import os
+import shutil
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+
+from openindexmaps_py.streaming import iter_features
+from openindexmaps_py.timings import timed_iter
+from openindexmaps_py.writer import (
+    feature_separator,
+    write_collection_head,
+    write_collection_tail,
+    write_features,
+)
+
+INDENT = 4
+
+
+def source_note(source) -> str:
+    return f"From source file {source}"
+
+
+def tagged_features(source):
+    """Yields the features of a file with their ``note`` set to where they came from."""
+    note = source_note(source)
+    with open(source, "r") as file:
+        for feature in timed_iter("iter_features", iter_features(file)):
+            properties = feature.get("properties")
+            if not isinstance(properties, dict):
+                properties = feature["properties"] = {}
+            properties["note"] = note
+            yield feature
+
+
+def _write_part(source, part_path: str, indent) -> int:
+    """Worker: writes the serialized features of one input to ``part_path``."""
+    with open(part_path, "w") as part:
+        return write_features(part, tagged_features(source), indent=indent)
+
+
+def merge_files(fp, sources, *, jobs: int = 1, indent: int = INDENT) -> int:
+    """
+    Writes one FeatureCollection with the features of every source, in order.
+
+    ``jobs`` processes parse the inputs in parallel (all cores when 0).
+    Returns the number of features written.
+    """
+    sources = list(sources)
+    jobs = jobs or os.cpu_count()
+    write_collection_head(fp, indent=indent)
+    count = 0
+    if jobs == 1 or len(sources) < 2:
+        for source in sources:
+            count += write_features(
+                fp, tagged_features(source), indent=indent, continued=bool(count)
+            )
+        write_collection_tail(fp, count, indent=indent)
+        return count
+
+    with tempfile.TemporaryDirectory() as tmp, ProcessPoolExecutor(
+        max_workers=min(jobs, len(sources))
+    ) as pool:
+        futures = [
+            pool.submit(_write_part, source, os.path.join(tmp, f"{i}.part"), indent)
+            for i, source in enumerate(sources)
+        ]
+        for i, future in enumerate(futures):
+            written = future.result()
+            part_path = os.path.join(tmp, f"{i}.part")
+            if written:
+                if count:
+                    fp.write(feature_separator(indent))
+                with open(part_path, "r") as part:
+                    shutil.copyfileobj(part, fp)
+                count += written
+            os.remove(part_path)
+    write_collection_tail(fp, count, indent=indent)
+    return count
@@ -1,54 +1,85 @@
+from collections.abc import MutableMapping
 from pathlib import Path
+import io
 import json
 import geojson
 from geojson import FeatureCollection, Feature, Polygon
-from geojson_rewind import rewind
 import logging
-from jsonschema import validate, ValidationError
-import antimeridian
-from shapely.geometry import shape
-import yaml
+import numpy as np
+
+from openindexmaps_py.indexes import HashIndex, SortedIndex
+from openindexmaps_py.spatial import SheetIndex, crosses_antimeridian
+from openindexmaps_py.streaming import iter_features
+from openindexmaps_py.timings import stage, timed, timed_iter
+from openindexmaps_py.writer import feature_json, write_feature_collection
 
 import importlib.resources as pkg_resources
 
-# Load the configuration from the YAML file
-with pkg_resources.files('openindexmaps_py').joinpath('config.yml').open('r') as f:
-    config = yaml.safe_load(f)
+# antimeridian, shapely, jsonschema and yaml are imported where they are used,
+# so importing this module (and the CLI) stays fast.
+
+
+class LazyConfig(MutableMapping):
+    """
+    The package configuration, read from config.yml on first access.
+
+    Loading also sets the level of the ``openindexmaps_py`` logger, unless the
+    application has already set one; handlers are left to the application
+    (the CLI calls ``logging.basicConfig``).
+    """
+
+    def __init__(self, resource: str = "config.yml"):
+        self.resource = resource
+        self._data = None
+
+    def _load(self) -> dict:
+        if self._data is None:
+            import yaml
+
+            package = pkg_resources.files("openindexmaps_py")
+            with package.joinpath(self.resource).open("r") as f:
+                self._data = yaml.safe_load(f)
+            package_logger = logging.getLogger("openindexmaps_py")
+            if package_logger.level == logging.NOTSET:
+                package_logger.setLevel(self._data["logging-level"])
+        return self._data
+
+    def __getitem__(self, key):
+        return self._load()[key]
+
+    def __setitem__(self, key, value):
+        self._load()[key] = value
+
+    def __delitem__(self, key):
+        del self._load()[key]
+
+    def __iter__(self):
+        return iter(self._load())
+
+    def __len__(self) -> int:
+        return len(self._load())
 
-# Configure logging
-logging.basicConfig(level=config["logging-level"])
+    def __repr__(self) -> str:
+        return f"LazyConfig({self._load()!r})"
+
+
+config = LazyConfig()
 logger = logging.getLogger(__name__)
 
+# The OpenIndexMap JSON Schema, relative to the repository root.
+SCHEMA_PATH = "schemas/1.0.0.schema.json"
+
 
 class Sheet(Feature):
     """
     A class to represent a map sheet, inheriting from geojson.Feature.
     """
 
+    @timed("Sheet.__init__")
     def __init__(self, sheetdict: dict = None, **kwargs):
         # Extract geometry and properties for the GeoJSON Feature
         sheetdict = sheetdict if sheetdict else self.default_sheet_dict()
-        geometry = Polygon(
-            [
-                [
-                    (sheetdict.get("west", 0.0), sheetdict.get("south", 0.0)),
-                    (sheetdict.get("east", 0.0), sheetdict.get("south", 0.0)),
-                    (sheetdict.get("east", 0.0), sheetdict.get("north", 0.0)),
-                    (sheetdict.get("west", 0.0), sheetdict.get("north", 0.0)),
-                    (sheetdict.get("west", 0.0), sheetdict.get("south", 0.0)),
-                ]
-            ]
-        )
-        if config["fix-antimeridian"]:
-            logging.debug(f"Fixing antimeridian for geometry:\n{geometry}")
-            geometry = antimeridian.fix_geojson(geometry)
-
-        properties = {
-            k: v
-            for k, v in sheetdict.items()
-            if k not in ["type", "geometry", "properties"]
-        }
-        properties.update(kwargs)
+        geometry, properties = self._geometry_and_properties(sheetdict, kwargs)
 
         # Initialize the geojson.Feature
         super().__init__(geometry=geometry, properties=properties)
@@ -84,12 +115,66 @@ class Sheet(Feature):
         for key, value in kwargs.items():
             setattr(self, key, value)
 
+        self._warn_if_invalid()
+
+    @timed("Sheet._warn_if_invalid")
+    def _warn_if_invalid(self):
         if config["sheet-validation-warn"]:
             if not super().is_valid:
                 logger.warning(
                     f"The sheet \"{self.label if self.label else 'Null'}\" is invalid according to geojson spec."
                 )
 
+    @staticmethod
+    def _geometry_and_properties(sheetdict: dict, kwargs: dict):
+        """Builds the Polygon geometry and the properties dict of a sheet."""
+        west, south = sheetdict.get("west", 0.0), sheetdict.get("south", 0.0)
+        east, north = sheetdict.get("east", 0.0), sheetdict.get("north", 0.0)
+        geometry = Polygon(
+            [
+                [
+                    (west, south),
+                    (east, south),
+                    (east, north),
+                    (west, north),
+                    (west, south),
+                ]
+            ]
+        )
+        if config["fix-antimeridian"]:
+            geometry = Sheet._fix_antimeridian(geometry, west, south, east, north)
+
+        properties = {
+            k: v
+            for k, v in sheetdict.items()
+            if k not in ["type", "geometry", "properties"]
+        }
+        properties.update(kwargs)
+        return geometry, properties
+
+    @staticmethod
+    def _fix_antimeridian(geometry: Polygon, west, south, east, north):
+        """
+        Runs antimeridian.fix_geojson only on sheets that it would split.
+
+        For every other sheet the fixer would just wind the ring
+        counterclockwise, which is done here directly.
+        """
+        try:
+            in_range = -180 <= west <= 180 and -180 <= east <= 180
+            needs_fix = not in_range or crosses_antimeridian(west, east)
+        except TypeError:
+            needs_fix = True
+        if needs_fix:
+            import antimeridian
+
+            logger.debug("Fixing antimeridian for geometry:\n%s", geometry)
+            with stage("antimeridian.fix_geojson"):
+                return antimeridian.fix_geojson(geometry)
+        if (east - west) * (north - south) < 0:
+            geometry["coordinates"][0].reverse()
+        return geometry
+
     def default_sheet_dict(self) -> dict:
         """Provides a default metadata structure based on common fields."""
         return {
@@ -120,7 +205,7 @@ class Sheet(Feature):
         }
 
     def __str__(self) -> str:
-        return rewind(geojson.dumps(self, indent=4))
+        return feature_json(self)
 
 
 class MapSheet(Sheet):
@@ -128,6 +213,7 @@ class MapSheet(Sheet):
     A class to represent a map sheet with additional attributes.
     """
 
+    @timed("MapSheet.__init__")
     def __init__(self, sheetdict: dict, **kwargs):
         super().__init__(sheetdict, **kwargs)
         self.title = sheetdict.get("title", None)
@@ -161,12 +247,216 @@ class PhotoFrame(Sheet):
         self.rollNo = sheetdict.get("rollNo", None)
 
 
+SHEET_ATTRIBUTES = (
+    "label",
+    "labelAlt",
+    "labelAlt2",
+    "datePub",
+    "date",
+    "west",
+    "east",
+    "north",
+    "south",
+    "location",
+    "scale",
+    "color",
+    "inst",
+    "sheetId",
+    "available",
+    "physHold",
+    "digHold",
+    "instCallNo",
+    "recId",
+    "download",
+    "websiteUrl",
+    "thumbUrl",
+    "iiifUrl",
+    "fileName",
+    "note",
+)
+
+MAPSHEET_ATTRIBUTES = (
+    "title",
+    "titleAlt",
+    "dateSurvey",
+    "datePhoto",
+    "dateReprnt",
+    "overprint",
+    "edition",
+    "publisher",
+    "overlays",
+    "projection",
+    "lcCallNo",
+    "contLines",
+    "contInterv",
+    "bathLines",
+    "bathInterv",
+    "primeMer",
+)
+
+PHOTOFRAME_ATTRIBUTES = ("photomos", "bands", "rectificn", "rollNo")
+
+
+def _property_accessors(*names):
+    """Class decorator adding attributes that read and write self["properties"]."""
+
+    def accessor(name):
+        rounded = name in ("west", "east", "north", "south")
+
+        def fget(self):
+            value = self["properties"].get(name, None)
+            return Sheet._round_if_float(value) if rounded else value
+
+        def fset(self, value):
+            self["properties"][name] = value
+
+        return property(fget, fset, doc=f'The sheet\'s "{name}" property.')
+
+    def decorate(cls):
+        for name in names:
+            setattr(cls, name, accessor(name))
+        return cls
+
+    return decorate
+
+
+@_property_accessors(*SHEET_ATTRIBUTES)
+class CompactSheet(Sheet):
+    """
+    A Sheet that keeps every value once, in its properties.
+
+    The attribute API of Sheet (``sheet.label``, ``sheet.west``, ...) is served
+    by properties over ``self["properties"]`` instead of copies of each value.
+    """
+
+    @timed("CompactSheet.__init__")
+    def __init__(self, sheetdict: dict = None, **kwargs):
+        sheetdict = sheetdict if sheetdict else self.default_sheet_dict()
+        geometry, properties = self._geometry_and_properties(sheetdict, kwargs)
+        Feature.__init__(self, geometry=geometry, properties=properties)
+        self._warn_if_invalid()
+
+    def __getattr__(self, name):
+        try:
+            return super().__getattr__(name)
+        except AttributeError:
+            properties = self.get("properties") or {}
+            if name in properties:
+                return properties[name]
+            raise
+
+    def __setattr__(self, name, value):
+        if isinstance(getattr(type(self), name, None), property):
+            object.__setattr__(self, name, value)
+        else:
+            super().__setattr__(name, value)
+
+
+@_property_accessors(*MAPSHEET_ATTRIBUTES)
+class CompactMapSheet(CompactSheet):
+    """A CompactSheet with the additional attributes of a MapSheet."""
+
+
+@_property_accessors(*PHOTOFRAME_ATTRIBUTES)
+class CompactPhotoFrame(CompactSheet):
+    """A CompactSheet with the additional attributes of a PhotoFrame."""
+
+
+BOUNDS = ("west", "south", "east", "north")
+
+
+def sheet_bounds(feature: geojson.Feature) -> tuple:
+    """
+    Returns (west, south, east, north) for a feature.
+
+    Sheets are read from their properties, the same values their Polygon is
+    built from; other features fall back to the bounds of their geometry.
+    """
+    if isinstance(feature, Sheet):
+        properties = feature.get("properties") or {}
+        bounds = tuple(properties.get(name, 0.0) for name in BOUNDS)
+        if all(
+            isinstance(value, (int, float)) and not isinstance(value, bool)
+            for value in bounds
+        ):
+            return bounds
+    geometry = feature.get("geometry")
+    if not geometry:
+        return (np.nan,) * 4
+    from shapely.geometry import shape
+
+    return shape(geometry).bounds
+
+
+def bbox_of_bounds(bounds) -> list[float]:
+    """
+    Computes [minx, miny, maxx, maxy] over an (n, 4) array of sheet bounds.
+
+    Rows containing NaN are ignored. When fix-antimeridian is on, a sheet that
+    crosses the antimeridian is split at 180 degrees and so spans the full
+    longitude range, and a sheet with longitudes outside -180..180 counts with
+    the bounds of its fixed geometry, whose longitudes are normalized.
+    """
+    bounds = np.asarray(bounds, dtype=np.float64).reshape(-1, 4)
+    bounds = bounds[~np.isnan(bounds).any(axis=1)]
+    if not len(bounds):
+        return [float("inf"), float("inf"), float("-inf"), float("-inf")]
+    if config["fix-antimeridian"]:
+        outside = (np.abs(bounds[:, 0]) > 180) | (np.abs(bounds[:, 2]) > 180)
+        if outside.any():
+            bounds = bounds.copy()
+            bounds[outside] = [_fixed_bounds(*row) for row in bounds[outside]]
+    west, south, east, north = bounds.T
+    low, high = np.minimum(west, east), np.maximum(west, east)
+    if config["fix-antimeridian"]:
+        crossing = crosses_antimeridian(west, east)
+        low[crossing], high[crossing] = -180.0, 180.0
+    return [
+        float(low.min()),
+        float(np.minimum(south, north).min()),
+        float(high.max()),
+        float(np.maximum(south, north).max()),
+    ]
+
+
+def _fixed_bounds(west, south, east, north) -> tuple:
+    """The bounds of the geometry a sheet with these bounds is given."""
+    from shapely.geometry import shape
+
+    sheetdict = {"west": west, "south": south, "east": east, "north": north}
+    try:
+        geometry, _ = Sheet._geometry_and_properties(sheetdict, {})
+    except ValueError:  # the fixer rejects the ring; its bounds are all we have
+        return west, south, east, north
+    return shape(geometry).bounds
+
+
+def _merge_bbox(first: list[float], second: list[float]) -> list[float]:
+    return [
+        min(first[0], second[0]),
+        min(first[1], second[1]),
+        max(first[2], second[2]),
+        max(first[3], second[3]),
+    ]
+
+
 class OpenIndexMap(FeatureCollection):
     """
     A class to represent an OpenIndexMap, inheriting from geojson.FeatureCollection.
     Contains multiple Sheet objects.
+
+    The bounding box is cached as (bbox, number of features) and kept up to
+    date by add_sheet; the spatial index is built on first use and dropped by
+    add_sheet. Attribute indexes are built on the first lookup of a property
+    and updated by add_sheet. Call invalidate_bbox, invalidate_spatial_index
+    and invalidate_attribute_indexes after changing ``features`` in any other
+    way.
     """
 
+    _bbox = None
+    _spatial_index = None
+    _attribute_indexes = None
+
     def __init__(self, sheets: list = None, **kwargs):
         sheets = sheets if sheets else self.default_oim()
         features = [sheet for sheet in sheets if isinstance(sheet, geojson.Feature)]
@@ -178,9 +468,49 @@ class OpenIndexMap(FeatureCollection):
     def add_sheet(self, sheet: geojson.Feature):
         if isinstance(sheet, geojson.Feature):
             self.features.append(sheet)
+            self._sheet_added(sheet)
         else:
             raise ValueError("Only Feature objects can be added.")
 
+    def invalidate_bbox(self):
+        """Drops the cached bounding box so the next compute_bbox rebuilds it."""
+        # GeoJSON.__setattr__ would store the cache as a dict item.
+        object.__setattr__(self, "_bbox", None)
+
+    def invalidate_spatial_index(self):
+        """Drops the spatial index so the next query rebuilds it."""
+        object.__setattr__(self, "_spatial_index", None)
+
+    def invalidate_attribute_indexes(self):
+        """Drops all attribute indexes so the next lookup rebuilds them."""
+        object.__setattr__(self, "_attribute_indexes", None)
+
+    def _sheet_added(self, sheet: geojson.Feature):
+        self.invalidate_spatial_index()
+        if self._attribute_indexes is not None:
+            indexes, count = self._attribute_indexes
+            if count + 1 != len(self.features):
+                self.invalidate_attribute_indexes()
+            else:
+                properties = sheet.get("properties") or {}
+                for (key, _), index in indexes.items():
+                    index.add(count, properties.get(key))
+                object.__setattr__(self, "_attribute_indexes", (indexes, count + 1))
+        if self._bbox is None:
+            return
+        bbox, count = self._bbox
+        if count + 1 != len(self.features):
+            self.invalidate_bbox()
+            return
+        bbox = _merge_bbox(bbox, bbox_of_bounds(sheet_bounds(sheet)))
+        object.__setattr__(self, "_bbox", (bbox, count + 1))
+
+    def _bounds_array(self) -> np.ndarray:
+        """Returns an (n, 4) array of the bounds of every feature."""
+        return np.array(
+            [sheet_bounds(feature) for feature in self.features], dtype=np.float64
+        ).reshape(-1, 4)
+
     @property
     def __geo_interface__(self):
         """
@@ -192,68 +522,161 @@ class OpenIndexMap(FeatureCollection):
         }
 
     @classmethod
-    def from_file(cls, file_path: str):
-        """Creates an instance of an OpenIndexMap from a GeoJSON file."""
-        with open(file_path, "r") as file:
-            json_data = json.load(file)
-            sheetlist = []
-            for feature in json_data.get("features"):
-                feature_sheet = Sheet(feature.get("properties"))
-                sheetlist.append(feature_sheet)
+    def from_file(cls, file_path: str, *, sheet_class=Sheet, cache=False):
+        """Creates an instance of an OpenIndexMap from a GeoJSON file.
+
+        Pass ``sheet_class=CompactSheet`` to load large files with less memory.
+        With ``cache=True`` (or an ``IndexCache``) the file is parsed once into
+        an on-disk cache and a ``ColumnarOpenIndexMap`` is returned.
+        """
+        if cache:
+            from openindexmaps_py.columnar import ColumnarOpenIndexMap
+
+            return ColumnarOpenIndexMap.from_file(
+                file_path, sheet_class=sheet_class, cache=cache
+            )
+        return cls(list(cls.iter_sheets(file_path, sheet_class=sheet_class)))
 
-            return cls(sheetlist)
+    @staticmethod
+    def iter_sheets(file_path: str, *, sheet_class=Sheet):
+        """Yields the sheets of a GeoJSON file one at a time.
+
+        The ``features`` array is parsed incrementally, so memory use does not
+        grow with the size of the file.
+        """
+        with open(file_path, "r") as file:
+            for feature in timed_iter("iter_features", iter_features(file)):
+                yield sheet_class(feature.get("properties"))
 
     def __str__(self) -> str:
-        return rewind(geojson.dumps(self))
+        output = io.StringIO()
+        self.write(output)
+        return output.getvalue()
+
+    def write(self, fp, indent: int = None, precision: int = 6) -> int:
+        """
+        Streams the collection as GeoJSON to an open text file.
+
+        Features are serialized one at a time, with coordinates rounded to
+        ``precision`` decimals and rings in RFC 7946 winding order. Returns
+        the number of features written.
+        """
+        return write_feature_collection(
+            fp, self.features, indent=indent, precision=precision
+        )
 
-    def is_valid(self, schema_path: str = "schemas/1.0.0.schema.json") -> bool:
+    @timed("OpenIndexMap.is_valid", records=lambda self, *_, **__: len(self.features))
+    def is_valid(self, schema_path: str = SCHEMA_PATH) -> bool:
         """
         Override the is_valid method to add custom validation logic.
         First, use the parent class's validation. Then, validate against a JSON Schema.
         """
         if super().is_valid:
             logger.info("The FeatureCollection is valid according to geojson.")
+            from openindexmaps_py.validation import get_validator
+
             try:
-                # Load the schema from the given path
-                with open(schema_path, "r") as schema_file:
-                    schema = json.load(schema_file)
-
-                # Validate the FeatureCollection against the schema
-                validate(instance=self.__geo_interface__, schema=schema)
-                logger.info(
-                    "The FeatureCollection is valid according to the JSON Schema."
-                )
-                return True
-            except ValidationError as e:
-                logger.error(f"JSON Schema validation error: {e.message}")
-                return False
-            except DeprecationWarning as e:
-                logger.error("JSON Schema Reference Error (TODO!)")
+                # Compiled once per process and cached by schema path and mtime
+                validator = get_validator(schema_path)
             except Exception as e:
                 logger.error(f"Error reading schema file: {e}")
                 return False
+
+            # Validate the FeatureCollection against the schema, reporting
+            # every error of every feature rather than only the first one.
+            errors = 0
+            for error in validator.iter_errors(self.__geo_interface__):
+                errors += 1
+                logger.error(
+                    f"JSON Schema validation error at {error.json_path}: {error.message}"
+                )
+            if errors:
+                return False
+            logger.info("The FeatureCollection is valid according to the JSON Schema.")
+            return True
         else:
             logger.error("The FeatureCollection is not valid according to geojson.")
             return False
 
-    def compute_bbox(self) -> list[float]:
-        # Initialize variables to store min and max coordinates
-        minx, miny, maxx, maxy = (
-            float("inf"),
-            float("inf"),
-            float("-inf"),
-            float("-inf"),
-        )
+    def spatial_index(self) -> SheetIndex:
+        """Returns the spatial index over the sheet bounds, building it if needed."""
+        count = len(self.features)
+        if self._spatial_index is None or self._spatial_index[1] != count:
+            index = SheetIndex(
+                self._bounds_array(), split_antimeridian=config["fix-antimeridian"]
+            )
+            object.__setattr__(self, "_spatial_index", (index, count))
+        return self._spatial_index[0]
+
+    def query_bbox(self, west, south, east, north) -> list:
+        """Returns the sheets whose bounds intersect the box."""
+        rows = self.spatial_index().query_bbox(west, south, east, north)
+        return [self.features[int(row)] for row in rows]
+
+    def sheets_at(self, lon, lat) -> list:
+        """Returns the sheets that cover a point."""
+        rows = self.spatial_index().query_point(lon, lat)
+        return [self.features[int(row)] for row in rows]
+
+    def nearest_sheets(self, lon, lat, count: int = 1) -> list:
+        """Returns the ``count`` sheets closest to a point, nearest first."""
+        rows = self.spatial_index().nearest(lon, lat, count)
+        return [self.features[int(row)] for row in rows]
+
+    def _property_values(self, key: str) -> list:
+        """Returns the value of one property for every feature, None where missing."""
+        return [(feature.get("properties") or {}).get(key) for feature in self.features]
+
+    def _attribute_index(self, key: str, index_class):
+        count = len(self.features)
+        if self._attribute_indexes is None or self._attribute_indexes[1] != count:
+            object.__setattr__(self, "_attribute_indexes", ({}, count))
+        indexes = self._attribute_indexes[0]
+        index = indexes.get((key, index_class))
+        if index is None:
+            index = indexes[(key, index_class)] = index_class(
+                self._property_values(key)
+            )
+        return index
+
+    def find(self, key: str, value) -> list:
+        """
+        Returns the sheets whose property ``key`` equals ``value`` (compared as
+        strings), e.g. ``oim.find("label", "46-2")``. The hash index on ``key``
+        is built on first use.
+        """
+        return [self.features[row] for row in self.find_rows(key, value)]
 
-        # Iterate through each feature in the GeoJSON
-        for feature in self.__geo_interface__["features"]:
-            geom = shape(feature["geometry"])
-            bbox = geom.bounds
-            minx, miny = min(minx, bbox[0]), min(miny, bbox[1])
-            maxx, maxy = max(maxx, bbox[2]), max(maxy, bbox[3])
+    def find_rows(self, key: str, value) -> list:
+        """Returns the sorted positions in ``features`` of the sheets ``find`` returns."""
+        return self._attribute_index(key, HashIndex).lookup(value)
 
-        # Return the bounding box in the format [minx, miny, maxx, maxy]
-        return [float(minx), float(miny), float(maxx), float(maxy)]
+    def find_range(self, key: str, start=None, end=None) -> list:
+        """
+        Returns the sheets with start <= ``key`` <= end in natural order, e.g.
+        ``oim.find_range("label", "46-1", "46-20")``.
+        """
+        rows = self._attribute_index(key, SortedIndex).range(start, end)
+        return [self.features[row] for row in rows]
+
+    def find_prefix(self, key: str, prefix: str) -> list:
+        """Returns the sheets whose ``key`` starts with ``prefix``, in natural order."""
+        rows = self._attribute_index(key, SortedIndex).prefix(prefix)
+        return [self.features[row] for row in rows]
+
+    def antimeridian_sheets(self) -> list:
+        """Returns the sheets that cross the antimeridian, found in one pass over the bounds."""
+        bounds = self._bounds_array()
+        rows = np.flatnonzero(crosses_antimeridian(bounds[:, 0], bounds[:, 2]))
+        return [self.features[int(row)] for row in rows]
+
+    def compute_bbox(self) -> list[float]:
+        """Returns the bounding box of all features as [minx, miny, maxx, maxy]."""
+        count = len(self.features)
+        if self._bbox is None or self._bbox[1] != count:
+            bbox = bbox_of_bounds(self._bounds_array())
+            object.__setattr__(self, "_bbox", (bbox, count))
+        return list(self._bbox[0])
 
 
 if __name__ == "__main__":
@@ -2,26 +2,97 @@
 
 import click
 import json
-from openindexmaps_py import mapping, oimpy
-from jsonschema import validate, ValidationError
+import logging
+import os
+import shutil
+import sys
 
+from openindexmaps_py.timings import stage, timed_iter
 
-def handle_output(content_JSON, print_to_file, quiet):
-    """Handle output to console or file"""
-    if print_to_file:
-        with open(print_to_file, "w") as output_file:
-            output_file.write(content_JSON)
+# Subcommands import what they need (oimpy, jsonschema, mapping and with it
+# folium) when they run, so that ``oimpy query`` does not pay for ``map``.
+
+
+def handle_output(write, print_to_file, quiet):
+    """Handle output to console or file
+
+    ``write`` is called with an open text file and streams the content to it.
+    """
+    stdout = sys.stdout
+    with stage("output"):
+        if print_to_file:
+            with open(print_to_file, "w") as output_file:
+                write(output_file)
             if not quiet:
-                click.echo(content_JSON)
-            click.echo(f"Written to {output_file.name}")
-    else:
-        if not quiet:
-            click.echo(content_JSON)
+                with open(print_to_file, "r") as output_file:
+                    shutil.copyfileobj(output_file, stdout)
+                stdout.write("\n")
+            click.echo(f"Written to {print_to_file}")
+        else:
+            if not quiet:
+                write(stdout)
+                stdout.write("\n")
+
+
+def resolve_schema(schema):
+    """
+    The JSON Schema to validate against: ``schema``, or the package's default
+    schema. Checked only here, when validation actually runs.
+    """
+    from openindexmaps_py.oimpy import SCHEMA_PATH
+
+    path = schema or SCHEMA_PATH
+    if not os.path.isfile(path):
+        raise click.BadParameter(
+            f"File '{path}' does not exist.", param_hint="'--schema'"
+        )
+    return path
 
 
 @click.group()
-def cli():
-    pass
+@click.option(
+    "--profile",
+    "profile_path",
+    type=click.Path(dir_okay=False),
+    help="Run the command under cProfile and write the stats to this .prof file",
+)
+@click.option(
+    "--timings-json",
+    "timings_path",
+    type=click.Path(dir_okay=False),
+    help="Write the command's stage and phase times and memory peaks to this "
+    "JSON file",
+)
+@click.option(
+    "--trace-memory",
+    is_flag=True,
+    help="Flag. Also report the tracemalloc peak of Python allocations; this "
+    "slows allocation-heavy commands down several times.",
+)
+@click.pass_context
+def cli(ctx, profile_path, timings_path, trace_memory):
+    """
+    Work with OpenIndexMaps.
+
+    With --profile, --timings-json or --trace-memory, a summary of the time
+    spent parsing, constructing sheets, validating, serializing and writing
+    output, and of the peak memory, is printed to stderr when the command ends.
+    """
+    from openindexmaps_py.oimpy import config
+
+    logging.basicConfig(level=config["logging-level"])
+    if profile_path or timings_path or trace_memory:
+        from openindexmaps_py.profiling import CommandProfile
+
+        profile = CommandProfile(
+            ctx.invoked_subcommand,
+            profile_path=profile_path,
+            report_path=timings_path,
+            trace_memory=trace_memory,
+        )
+        # Closed last to first: the summary is printed once the profile is done.
+        ctx.call_on_close(lambda: click.echo(profile.summary, err=True))
+        ctx.with_resource(profile)
 
 
 @cli.command()
@@ -37,6 +108,37 @@ def cli():
     default=("", None),
     help=r"Query the file by key-value pair. e.g. `-q label 46-2` to find sheets with the label name 46-2",
 )
+@click.option(
+    "--where",
+    "-w",
+    multiple=True,
+    help="Predicate key<op>value with op one of = != >= <= > <. "
+    "e.g. `-w 'datePub>=1950'`. May be repeated; all must hold.",
+)
+@click.option(
+    "--bbox",
+    nargs=4,
+    type=float,
+    default=None,
+    help="Keep sheets intersecting WEST SOUTH EAST NORTH",
+)
+@click.option(
+    "--point",
+    nargs=2,
+    type=float,
+    default=None,
+    help="Keep sheets containing LON LAT",
+)
+@click.option(
+    "--limit",
+    "-n",
+    type=click.IntRange(min=0),
+    help="Stop after this many matches",
+)
+@click.option(
+    "--fields",
+    help="Comma-separated properties to keep on each match. e.g. `label,datePub`",
+)
 @click.option(
     "--schema",
     "-s",
@@ -56,39 +158,105 @@ def cli():
     default=False,
     help="Flag. Do not write results to console.",
 )
-def query(file, indent, aquery, schema, print_to_file, quiet):
-    """Query and print OpenIndexMap files to console or to an output file"""
-    content = json.load(file)
-    assert isinstance(content, dict)
+@click.option(
+    "--cache",
+    is_flag=True,
+    default=False,
+    help="Flag. Keep the parsed file in the user cache directory and query "
+    "that, so repeated queries of an unchanged file skip parsing.",
+)
+def query(
+    file,
+    indent,
+    aquery,
+    where,
+    bbox,
+    point,
+    limit,
+    fields,
+    schema,
+    print_to_file,
+    quiet,
+    cache,
+):
+    """Query and print OpenIndexMap files to console or to an output file
+
+    Features are read and written one at a time, so memory use does not grow
+    with the size of the file and matches are written as they are found.
+
+    With --cache the file is parsed once into a binary column store in the
+    cache directory ($OIMPY_CACHE_DIR, else the user cache directory) and
+    queries run against that store. The store keeps each feature's geometry,
+    so the output is the same as without --cache.
+    """
+    from openindexmaps_py import query as oimquery
+    from openindexmaps_py.streaming import iter_features, read_ahead
+    from openindexmaps_py.writer import write_feature_collection
 
+    try:
+        predicates = [oimquery.parse_predicate(expression) for expression in where]
+    except ValueError as e:
+        raise click.BadParameter(str(e), param_hint="--where")
     if aquery[0]:
-        k, v = aquery
-        click.echo(f"Query: {k}=={v}...\n")
-
-        output_features = [
-            oimpy.Sheet(feature["properties"])
-            for feature in content.get("features", [])
-            if str(feature.get("properties", {}).get(k, "")) == v
-        ]
-        if not output_features:
-            click.echo("No features returned in query. Aborting.")
+        predicates.insert(0, oimquery.Predicate(aquery[0], "=", aquery[1]))
+    if predicates:
+        click.echo(f"Query: {' AND '.join(str(p) for p in predicates)}...\n", err=True)
+    if bbox:
+        predicates.append(oimquery.bbox_predicate(*bbox))
+    if point:
+        predicates.append(oimquery.point_predicate(*point))
+    fields = [field.strip() for field in fields.split(",")] if fields else None
+
+    if schema and file.name == "<stdin>":
+        raise click.BadParameter(
+            "standard input cannot be validated before it is queried",
+            param_hint="--schema",
+        )
+    if schema:
+        from openindexmaps_py.validation import get_validator
+
+        members = {}
+        errors = get_validator(schema).iter_stream_errors(
+            timed_iter("iter_features", iter_features(file, members=members)),
+            members,
+        )
+        error = next(errors, None)
+        if error is not None:
+            click.echo(f"Validation error: {error.message}\n")
             return
+        file.seek(0)
 
-        output_OIM = oimpy.OpenIndexMap(output_features)
-        content_JSON = json.dumps(output_OIM.__geo_interface__, indent=indent)
-    else:
-        content_JSON = json.dumps(content, indent=indent)
+    if cache and file.name == "<stdin>":
+        raise click.BadParameter(
+            "standard input cannot be cached", param_hint="--cache"
+        )
 
-    if schema:
-        with open(schema, "r") as schema_file:
-            schema_data = json.load(schema_file)
-            try:
-                validate(instance=content, schema=schema_data)
-            except ValidationError as e:
-                click.echo(f"Validation error: {e.message}\n")
-                return
+    def write(fp):
+        if cache:
+            from openindexmaps_py.cache import IndexCache
 
-    handle_output(content_JSON, print_to_file, quiet)
+            columns = IndexCache().columns(file.name, sources=True)
+            rows = oimquery.query_rows(columns, predicates, limit=limit)
+            members = columns.sources.members
+            matches = oimquery.query_features(
+                columns.source_features(rows), fields=fields
+            )
+        else:
+            # The top-level members (name, crs, ...) are kept, as they give the
+            # features their meaning.
+            members = {}
+            features = iter_features(file, members=members)
+            matches = oimquery.query_features(
+                read_ahead(timed_iter("iter_features", features)),
+                predicates,
+                limit=limit,
+                fields=fields,
+            )
+        count = write_feature_collection(fp, matches, indent=indent, members=members)
+        if not count and (predicates or limit == 0):
+            click.echo("\nNo features returned in query.", err=True)
+
+    handle_output(write, print_to_file, quiet)
 
 
 @cli.command()
@@ -99,28 +267,40 @@ def query(file, indent, aquery, schema, print_to_file, quiet):
     type=click.Path(exists=True),
     help="Path to JSON schema for validation",
 )
-def map(file, schema):
+@click.option(
+    "--compact",
+    is_flag=True,
+    help="Inline only what the tooltip and styling use, with packed coordinates.",
+)
+def map(file, schema, compact):
     """Create a quick Folium map and open it in the browser"""
-    json_data = json.load(file)
+    with stage("json.load"):
+        json_data = json.load(file)
 
     if schema:
+        from jsonschema import validate, ValidationError
+
         with open(schema, "r") as schema_file:
             schema_data = json.load(schema_file)
             try:
-                validate(instance=json_data, schema=schema_data)
+                with stage("jsonschema.validate"):
+                    validate(instance=json_data, schema=schema_data)
             except ValidationError as e:
                 click.echo(f"Validation error: {e.message}\n")
                 return
 
+    from openindexmaps_py import mapping
+
     try:
-        mapping.create_map(json.dumps(json_data))
+        with stage("mapping.create_map"):
+            mapping.create_map(json.dumps(json_data), compact=compact)
         click.echo("Map created at html/index.html")
     except Exception as e:
         click.echo(f"Error creating the map: {e}\n")
 
 
 @cli.command()
-@click.argument("files", nargs=-1, type=click.File(mode="r"))
+@click.argument("files", nargs=-1, type=click.Path(exists=True, dir_okay=False))
 @click.option(
     "--print-to-file",
     "-f",
@@ -134,21 +314,351 @@ def map(file, schema):
     default=False,
     help="Flag. Do not write results to console.",
 )
-def merge(files, print_to_file, quiet):
-    """Merge multiple OpenIndexMaps into a single OpenIndexMap."""
-    output_feature_sheets = []
+@click.option(
+    "--jobs",
+    "-j",
+    type=click.IntRange(min=0),
+    default=1,
+    show_default=True,
+    help="Number of processes parsing the inputs; 0 uses every core",
+)
+def merge(files, print_to_file, quiet, jobs):
+    """Merge multiple OpenIndexMaps into a single OpenIndexMap.
 
-    for file in files:
-        json_data = json.load(file)
-        for feature in json_data.get("features", []):
-            feature["properties"]["note"] = f"From source file {file.name}"
-            feature_sheet = oimpy.Sheet(feature["properties"])
-            output_feature_sheets.append(feature_sheet)
+    Features are streamed from each input to the output in the order the
+    files are given, each noting the file it came from.
+    """
+    from openindexmaps_py.merge import merge_files
 
-    output_oim = oimpy.OpenIndexMap(output_feature_sheets)
-    content_JSON = json.dumps(output_oim.__geo_interface__, indent=4)
+    handle_output(lambda fp: merge_files(fp, files, jobs=jobs), print_to_file, quiet)
 
-    handle_output(content_JSON, print_to_file, quiet)
+
+@cli.command()
+@click.argument("paths", nargs=-1, required=True)
+@click.option(
+    "--schema",
+    "-s",
+    type=click.Path(dir_okay=False),
+    help="JSON Schema every file is checked against  "
+    "[default: schemas/1.0.0.schema.json]",
+)
+@click.option(
+    "--no-schema",
+    is_flag=True,
+    help="Flag. Run only the GeoJSON and sheet checks.",
+)
+@click.option(
+    "--pattern",
+    default="*.geojson",
+    show_default=True,
+    help="File name pattern of the files checked in directories",
+)
+@click.option(
+    "--jobs",
+    "-j",
+    type=click.IntRange(min=0),
+    default=1,
+    show_default=True,
+    help="Number of worker processes; 0 uses every core",
+)
+@click.option(
+    "--format",
+    "report_format",
+    type=click.Choice(["json", "ndjson"]),
+    default="json",
+    show_default=True,
+    help="Report as one JSON document, or one JSON line per file",
+)
+@click.option(
+    "--report",
+    "-o",
+    type=click.Path(dir_okay=False),
+    help="Write the report to this file instead of the console",
+)
+def validate(paths, schema, no_schema, pattern, jobs, report_format, report):
+    """
+    Validate OpenIndexMaps (files, directories or globs) in parallel.
+
+    Each file is streamed through the GeoJSON, JSON Schema and sheet checks
+    and every error is reported with its JSON path. A summary is printed to
+    stderr; the exit status is 1 when any file is invalid.
+    """
+    import time
+
+    from openindexmaps_py.validation import find_files, validate_files
+
+    files = find_files(paths, pattern)
+    if not files:
+        click.echo("No files found.", err=True)
+        sys.exit(1)
+    schema = None if no_schema else resolve_schema(schema)
+
+    start = time.perf_counter()
+    features = errors = invalid = 0
+    output = open(report, "w") if report else sys.stdout
+    try:
+        if report_format == "json":
+            output.write(f'{{"schema": {json.dumps(schema)}, "files": [')
+        for i, result in enumerate(
+            validate_files(files, schema_path=schema, jobs=jobs)
+        ):
+            features += result.features
+            errors += len(result.errors)
+            invalid += not result.valid
+            line = json.dumps(result.to_dict())
+            if report_format == "json":
+                output.write(("," if i else "") + "\n" + line)
+            else:
+                output.write(line + "\n")
+            output.flush()
+        elapsed = time.perf_counter() - start
+        if report_format == "json":
+            summary = {
+                "files": len(files),
+                "invalid": invalid,
+                "features": features,
+                "errors": errors,
+                "seconds": round(elapsed, 6),
+            }
+            output.write(f'\n], "summary": {json.dumps(summary)}}}\n')
+    finally:
+        if report:
+            output.close()
+    click.echo(
+        f"{len(files)} files, {features} features: {invalid} invalid, "
+        f"{errors} errors in {elapsed:.2f} s",
+        err=True,
+    )
+    if invalid:
+        sys.exit(1)
+
+
+@cli.command()
+@click.argument(
+    "files", nargs=-1, required=True, type=click.Path(exists=True, dir_okay=False)
+)
+@click.option("--host", default="127.0.0.1", show_default=True, help="Address to bind")
+@click.option("--port", "-p", type=int, default=8000, show_default=True)
+@click.option(
+    "--reload-interval",
+    type=click.FloatRange(min=0),
+    default=1.0,
+    show_default=True,
+    help="Seconds between checks for changed files; 0 disables reloading",
+)
+@click.option(
+    "--cache",
+    is_flag=True,
+    default=False,
+    help="Flag. Load the files through the on-disk parsed-index cache.",
+)
+def serve(files, host, port, reload_interval, cache):
+    """
+    Serve sheet queries over HTTP from OpenIndexMaps held in memory.
+
+    GET /sheets takes bbox=W,S,E,N, point=LON,LAT, label=..., date=1950 or
+    date=1950/1960, map=NAME, fields=... and limit=N and answers with a
+    GeoJSON FeatureCollection. GET / lists the loaded maps. Files are
+    reloaded when they change on disk.
+    """
+    from openindexmaps_py.server import serve as serve_files
+
+    def ready(service, address):
+        click.echo(
+            f"Serving {len(service)} sheets from {len(service.maps)} files "
+            f"at http://{address[0]}:{address[1]}/ (Ctrl+C to stop)"
+        )
+
+    serve_files(
+        files,
+        host=host,
+        port=port,
+        cache=cache,
+        reload_interval=reload_interval,
+        ready=ready,
+    )
+
+
+@cli.command()
+@click.argument("file", type=click.Path(exists=True, dir_okay=False))
+@click.option(
+    "--output",
+    "-o",
+    type=click.Path(),
+    required=True,
+    help="Directory for {z}/{x}/{y}.pbf tiles, or a file ending in .mbtiles",
+)
+@click.option("--min-zoom", type=click.IntRange(0, 24), default=0, show_default=True)
+@click.option("--max-zoom", type=click.IntRange(0, 24), default=10, show_default=True)
+@click.option("--layer", default="sheets", show_default=True, help="Tile layer name")
+@click.option(
+    "--fields",
+    help="Comma-separated properties kept in the tiles, e.g. `label,datePub`. "
+    "Default: all",
+)
+@click.option(
+    "--jobs",
+    "-j",
+    type=click.IntRange(min=0),
+    default=1,
+    show_default=True,
+    help="Number of worker processes; 0 uses every core",
+)
+@click.option(
+    "--cache",
+    is_flag=True,
+    default=False,
+    help="Flag. Load the file through the on-disk parsed-index cache.",
+)
+def tiles(file, output, min_zoom, max_zoom, layer, fields, jobs, cache):
+    """
+    Cut an OpenIndexMap into a Mapbox Vector Tile pyramid.
+
+    Sheets are simplified for each zoom level and the levels are generated in
+    parallel. Point `create_map(tiles=...)` at the output directory to draw
+    them instead of inlining the GeoJSON.
+    """
+    import time
+
+    from openindexmaps_py.columnar import ColumnarOpenIndexMap
+    from openindexmaps_py.tiles import write_tiles
+
+    if min_zoom > max_zoom:
+        raise click.BadParameter("--min-zoom is above --max-zoom")
+    fields = [field.strip() for field in fields.split(",")] if fields else None
+    start = time.perf_counter()
+    oim = ColumnarOpenIndexMap.from_file(file, cache=cache)
+    counts = write_tiles(
+        oim,
+        output,
+        minzoom=min_zoom,
+        maxzoom=max_zoom,
+        layer=layer,
+        fields=fields,
+        jobs=jobs,
+    )
+    for zoom, count in counts.items():
+        click.echo(f"z{zoom}: {count} tiles")
+    click.echo(
+        f"{sum(counts.values())} tiles of {len(oim.columns)} sheets written to "
+        f"{output} in {time.perf_counter() - start:.2f} s"
+    )
+
+
+@cli.command("convert-geodex")
+@click.argument("sources", nargs=-1, required=True)
+@click.option(
+    "--output-dir",
+    "-o",
+    type=click.Path(file_okay=False),
+    default=".",
+    show_default=True,
+    help="Directory for the OpenIndexMaps, named like f0303_OIM.geojson",
+)
+@click.option(
+    "--jobs",
+    "-j",
+    type=click.IntRange(min=0),
+    default=1,
+    show_default=True,
+    help="Number of worker processes; 0 uses every core",
+)
+@click.option(
+    "--flip",
+    multiple=True,
+    help="File name pattern of a series whose RECORD and LOCATION are swapped. "
+    "e.g. `--flip 'f0140*'`. May be repeated.",
+)
+@click.option(
+    "--validate", is_flag=True, help="Flag. Leave out sheets that fail the schema."
+)
+@click.option(
+    "--schema",
+    "-s",
+    type=click.Path(dir_okay=False),
+    help="JSON Schema used with --validate  [default: schemas/1.0.0.schema.json]",
+)
+@click.option(
+    "--normalize",
+    is_flag=True,
+    help="Flag. Shift longitudes to Greenwich, fix swapped bounds and clamp "
+    "out-of-range values.",
+)
+@click.option(
+    "--timings",
+    is_flag=True,
+    help="Flag. Print the time spent in each stage of the conversion.",
+)
+def convert_geodex(
+    sources, output_dir, jobs, flip, validate, schema, normalize, timings
+):
+    """
+    Convert Geodex exports (files, directories or globs) to OpenIndexMaps.
+
+    Sources are GeoJSON exports or the .dbf attribute tables of the shapefiles.
+    """
+    import time
+
+    from openindexmaps_py import geodex
+    from openindexmaps_py.timings import Timings, current
+
+    # Each file is timed on its own, in this process or a worker; under
+    # `oimpy --timings-json` their stages go to the command's collector too.
+    command_timings = current()
+
+    files = geodex.find_geodex_files(*sources)
+    if not files:
+        click.echo("No Geodex files found.")
+        sys.exit(1)
+    if validate:
+        schema = resolve_schema(schema)
+
+    start = time.perf_counter()
+    records = written = skipped = failed = 0
+    try:
+        results = geodex.convert_geodex_files(
+            files,
+            output_dir,
+            flip=flip,
+            jobs=jobs,
+            VALIDATE=validate,
+            NORMALIZE=normalize,
+            schema_path=schema,
+            timings=timings or command_timings is not None,
+        )
+    except ValueError as e:
+        click.echo(f"Error: {e}", err=True)
+        sys.exit(1)
+    stage_timings = Timings()
+    for result in results:
+        name = result.source
+        if result.error:
+            failed += 1
+            click.echo(f"{name}: failed ({result.error})")
+            continue
+        records += result.records
+        written += result.written
+        skipped += len(result.skipped)
+        if result.timings:
+            stage_timings.merge(result.timings)
+        click.echo(
+            f"{name}: {result.written}/{result.records} sheets written, "
+            f"{len(result.skipped)} skipped in {result.seconds:.2f} s "
+            f"-> {result.output}"
+        )
+    elapsed = time.perf_counter() - start
+    rate = records / elapsed if elapsed else 0.0
+    click.echo(
+        f"{len(files)} files, {records} records: {written} written, "
+        f"{skipped} skipped, {failed} failed in {elapsed:.2f} s "
+        f"({rate:.0f} records/s)"
+    )
+    if timings:
+        click.echo(stage_timings.format())
+    if command_timings is not None:
+        command_timings.merge(stage_timings, seconds=False)
+    if failed:
+        sys.exit(1)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,118 @@
+"""
+Profiling of a whole command, for ``oimpy --profile``, ``--timings-json`` and
+``--trace-memory``.
+
+A ``CommandProfile`` times the command's stages (see timings.py); with
+``profile_path`` it also runs cProfile and writes the stats there, for
+``python -m pstats`` or snakeviz, and with ``trace_memory`` it traces the
+Python allocations. On exit it writes the JSON report, if asked to, and
+returns a text summary: the time of each phase (parse, sheet construction,
+validation, serialization, output), the peak resident set size of the process
+and, when traced, the tracemalloc peak.
+
+Tracing allocations slows allocation-heavy code down, often several times, so
+it is off unless asked for: phase times from a traced run are only comparable
+with each other.
+"""
+
+import cProfile
+import json
+import sys
+import tracemalloc
+
+from openindexmaps_py.timings import Timings
+
+_PHASE_NAMES = {
+    "parse": "parse",
+    "sheets": "sheet construction",
+    "validation": "validation",
+    "serialization": "serialization",
+    "output": "output",
+    "other": "other",
+}
+
+
+def peak_rss() -> int:
+    """The peak resident set size of this process in bytes, or None if unknown."""
+    try:
+        import resource
+    except ImportError:  # Windows
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes.
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+class CommandProfile:
+    """Times, and optionally profiles and traces, the code run inside it."""
+
+    def __init__(
+        self,
+        command: str = None,
+        *,
+        profile_path=None,
+        report_path=None,
+        trace_memory: bool = False,
+    ):
+        self.command = command
+        self.profile_path = profile_path
+        self.report_path = report_path
+        self.trace_memory = trace_memory
+        self.timings = Timings()
+        self.profiler = cProfile.Profile() if profile_path else None
+        self.tracemalloc_peak = None
+        self.summary = None
+        self._tracing = False
+
+    def __enter__(self) -> "CommandProfile":
+        if self.trace_memory:
+            self._tracing = not tracemalloc.is_tracing()
+            if self._tracing:
+                tracemalloc.start()
+            tracemalloc.reset_peak()
+        self.timings.__enter__()
+        if self.profiler:
+            self.profiler.enable()
+        return self
+
+    def __exit__(self, *exc_info):
+        if self.profiler:
+            self.profiler.disable()
+        self.timings.__exit__(*exc_info)
+        if self.trace_memory:
+            self.tracemalloc_peak = tracemalloc.get_traced_memory()[1]
+        if self._tracing:
+            tracemalloc.stop()
+        if self.profiler:
+            self.profiler.dump_stats(self.profile_path)
+        if self.report_path:
+            with open(self.report_path, "w") as file:
+                json.dump(self.report(), file, indent=2)
+        self.summary = self.format()
+
+    def report(self) -> dict:
+        """
+        The stage timings, phases and memory peaks as a JSON-serializable dict;
+        the tracemalloc peak is None when memory was not traced.
+        """
+        return {
+            "command": self.command,
+            **self.timings.report(),
+            "peak_rss": peak_rss(),
+            "tracemalloc_peak": self.tracemalloc_peak,
+        }
+
+    def format(self) -> str:
+        """The phases and memory peaks as text."""
+        total = self.timings.seconds
+        lines = [f"{'phase':<20} {'seconds':>9} {'share':>6}"]
+        for phase, seconds in self.timings.phases().items():
+            share = seconds / total if total else 0.0
+            lines.append(f"{_PHASE_NAMES[phase]:<20} {seconds:>9.3f} {share:>6.1%}")
+        lines.append(f"{'total':<20} {total:>9.3f}")
+        rss = peak_rss()
+        if rss is not None:
+            lines.append(f"peak RSS {rss / 2**20:.1f} MiB")
+        if self.tracemalloc_peak is not None:
+            lines.append(f"tracemalloc peak {self.tracemalloc_peak / 2**20:.1f} MiB")
+        return "\n".join(lines)
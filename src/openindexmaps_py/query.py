@@ -0,0 +1,314 @@
+"""
+Streaming queries over the features of an OpenIndexMap.
+
+A query is a list of predicates (callables taking a feature) that must all
+hold. ``parse_predicate`` reads the ``key<op>value`` expressions of the
+``query`` command; ``bbox_predicate`` and ``point_predicate`` filter on sheet
+bounds. ``query_features`` applies them to an iterable of features lazily, so
+a query over ``iter_features`` uses constant memory and stops reading as soon
+as ``limit`` matches are found. ``query_rows`` applies them to a parsed
+``SheetColumns`` store instead, a whole column at a time.
+"""
+
+import functools
+import itertools
+import re
+
+import numpy as np
+
+from openindexmaps_py.indexes import natural_key
+from openindexmaps_py.oimpy import BOUNDS
+from openindexmaps_py.spatial import crosses_antimeridian
+
+# Longest operators first, so that ">=" is not read as ">".
+OPERATORS = ("!=", ">=", "<=", "=", ">", "<")
+
+_EXPRESSION = re.compile(
+    r"^\s*([^!<>=\s][^!<>=]*?)\s*(" + "|".join(map(re.escape, OPERATORS)) + r")(.*)$"
+)
+_NUMBER = re.compile(r"^[+-]?(\d+\.?\d*|\.\d+)([eE][+-]?\d+)?$")
+_DATE = re.compile(r"^(\d{4})(?:-(\d{1,2})(?:-(\d{1,2}))?)?$")
+
+
+def _ordering_key(value):
+    """
+    Returns (kind, key) for comparing a property value with a range bound:
+    numbers by value, ISO dates ("1950", "1950-03", "1950-03-01") as
+    (year, month, day) tuples and anything else in natural string order.
+    """
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return "number", value
+    text = str(value).strip()
+    date = _DATE.match(text)
+    if date and (date.group(2) or not _NUMBER.match(text)):
+        return "date", tuple(int(part) for part in date.groups() if part)
+    if _NUMBER.match(text):
+        return "number", float(text)
+    return "text", natural_key(text)
+
+
+@functools.lru_cache(maxsize=256)
+def _bound_key(bound: str):
+    """``_ordering_key`` of a query's bound, which is compared many times."""
+    return _ordering_key(bound)
+
+
+def compare(value, bound) -> int:
+    """
+    Compares a property value with a bound: -1, 0 or 1.
+
+    Years compare with dates, and two dates are compared at the precision of
+    the coarser one, so "1950-06-01" equals both "1950" and "1950-06".
+    """
+    kind, key = _ordering_key(value)
+    bound_kind, bound_key = (
+        _bound_key(bound) if isinstance(bound, str) else _ordering_key(bound)
+    )
+    if {kind, bound_kind} == {"number", "date"}:
+        # A whole number next to a date is a year.
+        if kind == "number" and float(key).is_integer():
+            kind, key = "date", (int(key),)
+        elif bound_kind == "number" and float(bound_key).is_integer():
+            bound_kind, bound_key = "date", (int(bound_key),)
+    if kind != bound_kind:
+        key, bound_key = natural_key(str(value)), natural_key(str(bound))
+    elif kind == "date":
+        length = min(len(key), len(bound_key))
+        key, bound_key = key[:length], bound_key[:length]
+    return (key > bound_key) - (key < bound_key)
+
+
+class Predicate:
+    """
+    ``key op value`` on the properties of a feature.
+
+    ``=`` and ``!=`` compare the string form of the property, with a missing
+    property read as "" (as ``-q`` always has). The range operators compare
+    numbers, dates and text as ``compare`` does; a missing property never
+    satisfies them.
+    """
+
+    def __init__(self, key: str, op: str, value: str):
+        if op not in OPERATORS:
+            raise ValueError(f"Unknown operator {op!r}")
+        self.key, self.op, self.value = key, op, value
+
+    def __repr__(self) -> str:
+        return f"Predicate({self.key!r}, {self.op!r}, {self.value!r})"
+
+    def __str__(self) -> str:
+        return f"{self.key}{self.op}{self.value}"
+
+    def __call__(self, feature: dict) -> bool:
+        return self.matches((feature.get("properties") or {}).get(self.key))
+
+    def mask(self, columns, selected: np.ndarray = None) -> np.ndarray:
+        """
+        Evaluates the predicate on every row of a ``SheetColumns`` at once,
+        comparing each distinct value of the property only once. With a
+        ``selected`` mask only the values of those rows are compared, and the
+        other rows come out False.
+        """
+        values, codes = columns.encoded(self.key)
+        wanted = np.unique(codes if selected is None else codes[selected])
+        # A code of -1 (property missing) picks the last entry.
+        table = np.zeros(len(values) + 1, dtype=bool)
+        for code in wanted.tolist():
+            table[code] = self.matches(values[code] if code >= 0 else None)
+        return table[codes]
+
+    def matches(self, value) -> bool:
+        """Tells whether a property value satisfies the predicate."""
+        if self.op == "=":
+            return str("" if value is None else value) == self.value
+        if self.op == "!=":
+            return str("" if value is None else value) != self.value
+        if value is None:
+            return False
+        order = compare(value, self.value)
+        if self.op == ">=":
+            return order >= 0
+        if self.op == "<=":
+            return order <= 0
+        if self.op == ">":
+            return order > 0
+        return order < 0
+
+
+def parse_predicate(expression: str) -> Predicate:
+    """Parses ``key<op>value``, e.g. ``label=46-2`` or ``datePub>=1950``."""
+    match = _EXPRESSION.match(expression)
+    if not match:
+        raise ValueError(
+            f"Cannot parse {expression!r}; expected key<op>value with op one of "
+            + ", ".join(OPERATORS)
+        )
+    key, op, value = match.groups()
+    return Predicate(key, op, value.strip())
+
+
+def _walk_coordinates(coordinates):
+    if coordinates and isinstance(coordinates[0], (int, float)):
+        yield coordinates
+    else:
+        for member in coordinates or ():
+            yield from _walk_coordinates(member)
+
+
+def feature_bounds(feature: dict):
+    """
+    Returns (west, south, east, north) from a sheet's properties, else from
+    its geometry's coordinates, or None when it has neither.
+    """
+    properties = feature.get("properties") or {}
+    bounds = tuple(properties.get(name) for name in BOUNDS)
+    if all(
+        isinstance(value, (int, float)) and not isinstance(value, bool)
+        for value in bounds
+    ):
+        return bounds
+    geometry = feature.get("geometry") or {}
+    geometries = geometry.get("geometries", [geometry])
+    points = [
+        point[:2]
+        for member in geometries
+        for point in _walk_coordinates((member or {}).get("coordinates"))
+    ]
+    if not points:
+        return None
+    longitudes, latitudes = zip(*points)
+    return min(longitudes), min(latitudes), max(longitudes), max(latitudes)
+
+
+def _longitude_ranges(west, east, crossing: bool) -> list:
+    if crossing:
+        return [(max(west, east), 180.0), (-180.0, min(west, east))]
+    return [(min(west, east), max(west, east))]
+
+
+class BBoxPredicate:
+    """
+    Matches features whose bounds intersect the box, edges included.
+
+    As with ``SheetIndex``, a box with west > east runs east over 180 degrees
+    and sheets that cross the antimeridian are split there.
+    """
+
+    def __init__(self, west, south, east, north):
+        self.box = (west, south, east, north)
+        self._query_ranges = _longitude_ranges(west, east, west > east)
+        self._low, self._high = min(south, north), max(south, north)
+
+    def __repr__(self) -> str:
+        return f"BBoxPredicate{self.box!r}"
+
+    def __call__(self, feature: dict) -> bool:
+        bounds = feature_bounds(feature)
+        if bounds is None:
+            return False
+        sheet_west, sheet_south, sheet_east, sheet_north = bounds
+        low, high = self._low, self._high
+        if max(sheet_south, sheet_north) < low or min(sheet_south, sheet_north) > high:
+            return False
+        crossing = bool(crosses_antimeridian(sheet_west, sheet_east))
+        return any(
+            start <= query_end and end >= query_start
+            for start, end in _longitude_ranges(sheet_west, sheet_east, crossing)
+            for query_start, query_end in self._query_ranges
+        )
+
+    def mask(self, columns, selected: np.ndarray = None) -> np.ndarray:
+        """
+        Evaluates the predicate on the bounds arrays of a ``SheetColumns``.
+        Rows without four numeric bounds are matched on their source feature
+        when the store keeps one (see ``SheetColumns.sources``), else never.
+        """
+        west, south, east, north = columns.bounds().T
+        with np.errstate(invalid="ignore"):
+            hit = ~(np.isnan(west) | np.isnan(south) | np.isnan(east) | np.isnan(north))
+            hit &= np.fmax(south, north) >= self._low
+            hit &= np.fmin(south, north) <= self._high
+            crossing = crosses_antimeridian(west, east)
+            start, end = np.fmin(west, east), np.fmax(west, east)
+            overlaps = np.zeros(len(hit), dtype=bool)
+            for query_start, query_end in self._query_ranges:
+                overlaps |= ~crossing & (start <= query_end) & (end >= query_start)
+                overlaps |= crossing & (end <= query_end) & (180.0 >= query_start)
+                overlaps |= crossing & (-180.0 <= query_end) & (start >= query_start)
+        hit &= overlaps
+        if columns.sources is not None:
+            missing = np.isnan(columns.bounds()).any(axis=1)
+            if selected is not None:
+                missing &= selected
+            rows = np.flatnonzero(missing)
+            hit[rows] = [self(feature) for feature in columns.source_features(rows)]
+        return hit
+
+
+def bbox_predicate(west, south, east, north) -> BBoxPredicate:
+    """Matches features whose bounds intersect the box (see ``BBoxPredicate``)."""
+    return BBoxPredicate(west, south, east, north)
+
+
+def point_predicate(lon, lat) -> BBoxPredicate:
+    """Matches features whose bounds contain the point, edges included."""
+    return BBoxPredicate(lon, lat, lon, lat)
+
+
+def _project(feature: dict, fields) -> dict:
+    # Sheets hold their attributes as dict items; write what they serialize to.
+    feature = getattr(feature, "__geo_interface__", feature)
+    properties = feature.get("properties") or {}
+    projected = dict(feature)
+    projected["properties"] = {
+        field: properties[field] for field in fields if field in properties
+    }
+    return projected
+
+
+def query_features(features, predicates=(), *, limit: int = None, fields=None):
+    """
+    Yields the features that satisfy every predicate, lazily.
+
+    Stops after ``limit`` matches without reading further. ``fields`` keeps
+    only those properties (in that order) on each match.
+    """
+    predicates = list(predicates)
+    matches = (
+        feature
+        for feature in features
+        if all(predicate(feature) for predicate in predicates)
+    )
+    if limit is not None:
+        matches = itertools.islice(matches, limit)
+    if fields:
+        matches = (_project(feature, fields) for feature in matches)
+    return matches
+
+
+def query_rows(columns, predicates=(), *, limit: int = None) -> np.ndarray:
+    """
+    Returns the row numbers of a ``SheetColumns`` that satisfy every predicate.
+
+    Predicates with a ``mask`` method are evaluated a column at a time, each
+    on the rows the ones before it kept; any other callable is called on each
+    row's source feature, or on a feature without geometry when the store
+    keeps no sources.
+    """
+    selected = np.ones(len(columns), dtype=bool)
+    for predicate in predicates:
+        if hasattr(predicate, "mask"):
+            selected &= predicate.mask(columns, selected)
+        elif columns.sources is not None:
+            features = columns.source_features(np.arange(len(columns)))
+            selected &= np.array([predicate(f) for f in features], dtype=bool)
+        else:
+            selected &= np.array(
+                [
+                    predicate({"type": "Feature", "properties": properties})
+                    for properties in columns.rows()
+                ],
+                dtype=bool,
+            )
+    rows = np.flatnonzero(selected)
+    return rows if limit is None else rows[:limit]
@@ -0,0 +1,424 @@
+"""
+A small asyncio HTTP service answering sheet queries from memory.
+
+``SheetService`` loads OpenIndexMap files once into columnar storage, with a
+spatial index over the bounds and the map's hash index over the labels
+(``OpenIndexMap.find_rows``), and answers
+
+    GET /                    the loaded maps: name, file, sheet count, bbox
+    GET /sheets?...          the matching sheets as a GeoJSON FeatureCollection
+
+where ``/sheets`` takes any of ``bbox=west,south,east,north``,
+``point=lon,lat``, ``label=46-2``, ``date=1950`` or ``date=1950/1960`` (either
+end may be left out; ``date_key`` names the property, datePub by default),
+``map=name`` (repeatable), ``fields=label,datePub`` and ``limit=100``.
+
+Responses carry an ETag derived from the query and the state of the files,
+so a matching ``If-None-Match`` is answered with 304 before any work is done,
+and are gzipped for clients that accept it. A watcher polls the files and
+reloads those that change. The HTTP handling is deliberately minimal (GET and
+HEAD, keep-alive, no request bodies); it is meant for a local front end, not
+for the open internet.
+"""
+
+import asyncio
+import gzip
+import hashlib
+import io
+import json
+import logging
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from urllib.parse import parse_qs, urlsplit
+
+import numpy as np
+
+from openindexmaps_py.columnar import ColumnarOpenIndexMap
+from openindexmaps_py.query import Predicate, query_features
+from openindexmaps_py.writer import write_feature_collection
+
+logger = logging.getLogger(__name__)
+
+DATE_KEY = "datePub"
+
+# Bodies smaller than this are sent uncompressed.
+GZIP_MIN_BYTES = 1024
+
+# Number of encoded responses kept for repeated queries.
+RESPONSE_CACHE_SIZE = 256
+
+_REASONS = {
+    200: "OK",
+    304: "Not Modified",
+    400: "Bad Request",
+    404: "Not Found",
+    405: "Method Not Allowed",
+    431: "Request Header Fields Too Large",
+    500: "Internal Server Error",
+}
+
+
+class QueryError(ValueError):
+    """A request that cannot be answered as given."""
+
+
+def _file_state(path) -> tuple:
+    status = os.stat(path)
+    return status.st_mtime_ns, status.st_size
+
+
+def _numbers(text: str, count: int, name: str) -> list[float]:
+    try:
+        values = [float(part) for part in text.split(",")]
+    except ValueError:
+        values = []
+    if len(values) != count:
+        raise QueryError(f"{name} takes {count} comma-separated numbers")
+    return values
+
+
+class LoadedMap:
+    """One OpenIndexMap file, loaded and indexed for queries."""
+
+    def __init__(self, path, *, name: str = None, cache=False):
+        self.path = Path(path)
+        self.name = name or self.path.stem
+        self.state = _file_state(self.path)
+        self.oim = ColumnarOpenIndexMap.from_file(str(self.path), cache=cache)
+        self.spatial = self.oim.spatial_index()
+        digest = hashlib.sha1(f"{self.path.resolve()}\0{self.state}".encode("utf-8"))
+        self.version = digest.hexdigest()[:16]
+
+    def __len__(self) -> int:
+        return len(self.oim.columns)
+
+    def changed(self) -> bool:
+        """Tells whether the file on disk differs from the one loaded."""
+        try:
+            return _file_state(self.path) != self.state
+        except OSError:
+            return False  # keep serving what was loaded while the file is away
+
+    def describe(self) -> dict:
+        return {
+            "name": self.name,
+            "file": str(self.path),
+            "sheets": len(self),
+            "bbox": self.oim.compute_bbox() if len(self) else None,
+            "version": self.version,
+        }
+
+    def select(
+        self, *, bbox=None, point=None, label=None, dates=None, date_key=DATE_KEY
+    ) -> np.ndarray:
+        """The sorted rows of the sheets that satisfy every criterion given."""
+        rows = None
+        if bbox is not None:
+            rows = self.spatial.query_bbox(*bbox)
+        if point is not None:
+            found = self.spatial.query_point(*point)
+            rows = found if rows is None else np.intersect1d(rows, found)
+        if label is not None:
+            found = np.array(self.oim.find_rows("label", label), dtype=np.intp)
+            rows = found if rows is None else np.intersect1d(rows, found)
+        if rows is None:
+            rows = np.arange(len(self))
+        if dates is not None and len(rows):
+            selected = np.zeros(len(self), dtype=bool)
+            selected[rows] = True
+            start, end = dates
+            if start:
+                selected &= Predicate(date_key, ">=", start).mask(
+                    self.oim.columns, selected
+                )
+            if end:
+                selected &= Predicate(date_key, "<=", end).mask(
+                    self.oim.columns, selected
+                )
+            rows = rows[selected[rows]]
+        return rows
+
+    def features(self, rows):
+        """Yields the sheets at ``rows`` as they are written to files."""
+        return self.oim.take(rows).output_features()
+
+
+class SheetService:
+    """
+    The maps of a set of files and the HTTP requests answered from them.
+
+    ``respond`` turns a request into (status, headers, body) and does not
+    touch the network, so it can be used and tested on its own. ``handle``
+    runs it in the event loop's executor, so a large query does not hold up
+    the other connections.
+    """
+
+    def __init__(self, paths, *, cache=False, reload_interval: float = 1.0):
+        self.cache = cache
+        self.reload_interval = reload_interval
+        self.maps = OrderedDict()
+        for path in paths:
+            name = Path(path).stem
+            if name in self.maps:
+                name = f"{name}-{len(self.maps)}"
+            self.maps[name] = LoadedMap(path, name=name, cache=cache)
+        self._responses = OrderedDict()
+        self._responses_lock = threading.Lock()
+        self._watcher = None
+
+    def __len__(self) -> int:
+        return sum(len(loaded) for loaded in self.maps.values())
+
+    # Reloading
+
+    async def reload_changed(self) -> list[str]:
+        """Reloads the maps whose files changed; returns their names."""
+        loop = asyncio.get_running_loop()
+        reloaded = []
+        for name, loaded in list(self.maps.items()):
+            if not loaded.changed():
+                continue
+            try:
+                fresh = await loop.run_in_executor(
+                    None,
+                    lambda: LoadedMap(loaded.path, name=name, cache=self.cache),
+                )
+            except Exception as e:  # a half-written file: try again next time
+                logger.warning(f"Could not reload {loaded.path}: {e}")
+                continue
+            self.maps[name] = fresh
+            reloaded.append(name)
+            logger.info(f"Reloaded {loaded.path} ({len(fresh)} sheets)")
+        return reloaded
+
+    async def watch(self):
+        """Polls the files every ``reload_interval`` seconds, reloading changes."""
+        while True:
+            await asyncio.sleep(self.reload_interval)
+            await self.reload_changed()
+
+    # Requests
+
+    def _parse_sheets_query(self, query: dict) -> dict:
+        def single(name):
+            values = query.get(name)
+            if values and len(values) > 1:
+                raise QueryError(f"{name} may only be given once")
+            return values[0] if values else None
+
+        criteria = {}
+        if single("bbox") is not None:
+            criteria["bbox"] = _numbers(single("bbox"), 4, "bbox")
+        if single("point") is not None:
+            criteria["point"] = _numbers(single("point"), 2, "point")
+        if single("label") is not None:
+            criteria["label"] = single("label")
+        date = single("date")
+        if date is not None:
+            start, _, end = date.partition("/") if "/" in date else (date, "", date)
+            criteria["dates"] = (start.strip(), end.strip())
+        if single("date_key") is not None:
+            criteria["date_key"] = single("date_key")
+        names = query.get("map") or list(self.maps)
+        unknown = [name for name in names if name not in self.maps]
+        if unknown:
+            raise QueryError(f"Unknown map {unknown[0]!r}")
+        limit = single("limit")
+        if limit is not None:
+            if not limit.isdigit():
+                raise QueryError("limit takes a non-negative integer")
+            limit = int(limit)
+        fields = single("fields")
+        fields = [field.strip() for field in fields.split(",")] if fields else None
+        return {"criteria": criteria, "maps": names, "limit": limit, "fields": fields}
+
+    def _sheets_body(self, parsed: dict) -> bytes:
+        limit = parsed["limit"]
+
+        def features():
+            remaining = limit
+            for name in parsed["maps"]:
+                if remaining == 0:
+                    return
+                loaded = self.maps[name]
+                rows = loaded.select(**parsed["criteria"])
+                if remaining is not None:
+                    rows = rows[:remaining]
+                    remaining -= len(rows)
+                yield from loaded.features(rows)
+
+        output = io.StringIO()
+        matches = query_features(features(), fields=parsed["fields"])
+        write_feature_collection(output, matches)
+        return output.getvalue().encode("utf-8")
+
+    def _index_body(self) -> bytes:
+        maps = [loaded.describe() for loaded in self.maps.values()]
+        return json.dumps({"maps": maps, "sheets": len(self)}).encode("utf-8")
+
+    def respond(self, method: str, target: str, headers: dict):
+        """Answers a request; ``headers`` have lower-case names."""
+        if method not in ("GET", "HEAD"):
+            return self._error(405, f"{method} is not supported", Allow="GET, HEAD")
+        url = urlsplit(target)
+        if url.path == "/":
+            content_type, parsed = "application/json", None
+            versions = [loaded.version for loaded in self.maps.values()]
+        elif url.path == "/sheets":
+            content_type = "application/geo+json"
+            try:
+                parsed = self._parse_sheets_query(parse_qs(url.query))
+            except QueryError as e:
+                return self._error(400, str(e))
+            versions = [self.maps[name].version for name in parsed["maps"]]
+        else:
+            return self._error(404, f"No such resource {url.path}")
+
+        gzipped = "gzip" in headers.get("accept-encoding", "")
+        key = json.dumps([url.path, parsed, versions], sort_keys=True)
+        tag = hashlib.sha1(key.encode("utf-8")).hexdigest()[:24]
+        response_headers = {
+            "Content-Type": content_type,
+            "Cache-Control": "no-cache",
+            "Vary": "Accept-Encoding",
+        }
+        matches = [
+            match.strip() for match in headers.get("if-none-match", "").split(",")
+        ]
+        # The tag names the bytes sent: "-gz" only when they are compressed.
+        # A body is fixed by its query and files, so the tag the client would
+        # get for its encoding can be answered before any work, except for an
+        # identity tag under gzip, which depends on the size of the body.
+        etag = f'"{tag}-gz"' if gzipped else f'"{tag}"'
+        if etag in matches:
+            response_headers["ETag"] = etag
+            return 304, response_headers, b""
+
+        with self._responses_lock:
+            cached = self._responses.get((tag, gzipped))
+            if cached is not None:
+                self._responses.move_to_end((tag, gzipped))
+        if cached is None:
+            body = self._index_body() if parsed is None else self._sheets_body(parsed)
+            encoding = None
+            if gzipped and len(body) >= GZIP_MIN_BYTES:
+                body, encoding = gzip.compress(body, compresslevel=5), "gzip"
+            cached = (body, encoding)
+            with self._responses_lock:
+                self._responses[(tag, gzipped)] = cached
+                if len(self._responses) > RESPONSE_CACHE_SIZE:
+                    self._responses.popitem(last=False)
+        body, encoding = cached
+        response_headers["ETag"] = f'"{tag}-gz"' if encoding == "gzip" else f'"{tag}"'
+        if response_headers["ETag"] in matches:
+            return 304, response_headers, b""
+        if encoding:
+            response_headers["Content-Encoding"] = encoding
+        return 200, response_headers, body
+
+    @staticmethod
+    def _error(status: int, message: str, **headers):
+        body = json.dumps({"error": message}).encode("utf-8")
+        return status, {"Content-Type": "application/json", **headers}, body
+
+    # HTTP
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """Serves the requests of one connection, keeping it open when asked to."""
+        loop = asyncio.get_running_loop()
+        try:
+            while True:
+                try:
+                    head = await reader.readuntil(b"\r\n\r\n")
+                except (asyncio.IncompleteReadError, ConnectionError):
+                    return
+                except asyncio.LimitOverrunError:
+                    await self._send(
+                        writer, "GET", *self._error(431, "Headers too large")
+                    )
+                    return
+                request_line, *lines = head.decode("latin-1").split("\r\n")
+                parts = request_line.split(" ")
+                if len(parts) != 3:
+                    await self._send(
+                        writer, "GET", *self._error(400, "Bad request line")
+                    )
+                    return
+                method, target, version = parts
+                headers = {}
+                for line in lines:
+                    name, colon, value = line.partition(":")
+                    if colon:
+                        headers[name.strip().lower()] = value.strip()
+                length = headers.get("content-length", "0")
+                if length.isdigit() and int(length):
+                    await reader.readexactly(int(length))
+                try:
+                    response = await loop.run_in_executor(
+                        None, self.respond, method, target, headers
+                    )
+                except Exception:
+                    logger.exception(f"Error answering {method} {target}")
+                    response = self._error(500, "Internal server error")
+                connection = headers.get("connection", "").lower()
+                keep_alive = (
+                    connection != "close"
+                    if version == "HTTP/1.1"
+                    else connection == "keep-alive"
+                )
+                await self._send(writer, method, *response, keep_alive=keep_alive)
+                if not keep_alive:
+                    return
+        finally:
+            writer.close()
+
+    @staticmethod
+    async def _send(writer, method, status, headers, body, *, keep_alive=False):
+        lines = [f"HTTP/1.1 {status} {_REASONS[status]}"]
+        headers = {
+            **headers,
+            "Content-Length": str(len(body)),
+            "Connection": "keep-alive" if keep_alive else "close",
+        }
+        lines += [f"{name}: {value}" for name, value in headers.items()]
+        writer.write(("\r\n".join(lines) + "\r\n\r\n").encode("latin-1"))
+        if method != "HEAD" and status != 304:
+            writer.write(body)
+        await writer.drain()
+
+    async def start(self, host: str = "127.0.0.1", port: int = 8000):
+        """Starts listening and watching the files; returns the asyncio server."""
+        server = await asyncio.start_server(self.handle, host, port)
+        if self.reload_interval:
+            self._watcher = asyncio.get_running_loop().create_task(self.watch())
+        return server
+
+
+def serve(
+    paths,
+    *,
+    host: str = "127.0.0.1",
+    port: int = 8000,
+    cache=False,
+    reload_interval: float = 1.0,
+    ready=None,
+):
+    """
+    Loads the files and serves them until interrupted. ``ready`` is called
+    with the service and the bound (host, port) once requests are accepted.
+    """
+
+    async def main():
+        service = SheetService(paths, cache=cache, reload_interval=reload_interval)
+        server = await service.start(host, port)
+        if ready is not None:
+            ready(service, server.sockets[0].getsockname()[:2])
+        async with server:
+            await server.serve_forever()
+
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,148 @@
+"""
+Spatial index over the bounds of the sheets of an OpenIndexMap.
+
+Sheet bounds are packed into a shapely ``STRtree``. A sheet that crosses the
+antimeridian (split in two by ``antimeridian.fix_geojson``) is indexed as its
+two halves, and query boxes with west > east are split the same way, so
+lookups near 180 degrees find the right sheets. Nearest-sheet lookups search
+a window around the point that grows until it holds enough sheets, so they
+only rank the sheets close by.
+
+shapely is imported when an index is first built, so that modules which only
+need ``crosses_antimeridian`` stay cheap to import.
+"""
+
+import numpy as np
+
+
+def crosses_antimeridian(west, east):
+    """
+    Tells whether a box is split at 180 degrees by ``antimeridian.fix_geojson``.
+
+    The fixer splits a ring wherever two consecutive longitudes are more than
+    180 degrees apart (but not exactly 360), so for a sheet this depends only
+    on its west and east edges. Works on scalars and on NumPy arrays.
+    """
+    span = np.abs(np.subtract(east, west))
+    return (span > 180) & (span != 360)
+
+
+def _split_crossing(bounds: np.ndarray, crossing: np.ndarray):
+    """Returns boxes for all bounds (with crossing ones split) and their rows."""
+    rows = np.arange(len(bounds))
+    west_half = bounds[crossing].copy()
+    west_half[:, 2] = 180.0
+    east_half = bounds[crossing].copy()
+    east_half[:, 0] = -180.0
+    boxes = np.concatenate([bounds[~crossing], west_half, east_half])
+    owners = np.concatenate([rows[~crossing], rows[crossing], rows[crossing]])
+    return boxes, owners
+
+
+class SheetIndex:
+    """
+    An STR-packed R-tree over an (n, 4) array of west, south, east, north.
+
+    Queries return sorted arrays of row numbers into the original array. Rows
+    with NaN bounds are never returned.
+    """
+
+    def __init__(self, bounds: np.ndarray, *, split_antimeridian: bool = True):
+        import shapely
+
+        bounds = np.asarray(bounds, dtype=np.float64).reshape(-1, 4)
+        self.split_antimeridian = split_antimeridian
+        valid = ~np.isnan(bounds).any(axis=1)
+        west, south, east, north = bounds.T
+        if split_antimeridian:
+            crossing = crosses_antimeridian(west, east) & valid
+        else:
+            crossing = np.zeros_like(valid)
+
+        # Outside the antimeridian case, a box is the same whichever way
+        # round its edges were given, as with the sheet's Polygon. A crossing
+        # box runs from its larger longitude east over 180 degrees.
+        normalized = bounds.copy()
+        low, high = np.minimum(west, east), np.maximum(west, east)
+        normalized[:, 0] = np.where(crossing, high, low)
+        normalized[:, 2] = np.where(crossing, low, high)
+        normalized[:, 1] = np.minimum(south, north)
+        normalized[:, 3] = np.maximum(south, north)
+
+        boxes, owners = _split_crossing(normalized[valid], crossing[valid])
+        self._owners = np.flatnonzero(valid)[owners]
+        self._boxes = boxes
+        self._tree = shapely.STRtree(shapely.box(*boxes.T))
+        # The usual size of a box: the first window of a nearest lookup.
+        sizes = np.maximum(boxes[:, 2] - boxes[:, 0], boxes[:, 3] - boxes[:, 1])
+        self._spacing = float(np.median(sizes)) if len(sizes) else 0.0
+
+    def __len__(self) -> int:
+        return len(np.unique(self._owners))
+
+    def _query_boxes(self, west, south, east, north):
+        south, north = min(south, north), max(south, north)
+        if self.split_antimeridian and west > east:
+            return [(west, south, 180.0, north), (-180.0, south, east, north)]
+        return [(min(west, east), south, max(west, east), north)]
+
+    def query_bbox(self, west, south, east, north) -> np.ndarray:
+        """Returns the rows whose bounds intersect the box (edges included)."""
+        import shapely
+
+        hits = [
+            self._tree.query(shapely.box(*box), predicate="intersects")
+            for box in self._query_boxes(west, south, east, north)
+        ]
+        return np.unique(self._owners[np.concatenate(hits)])
+
+    def query_point(self, lon, lat) -> np.ndarray:
+        """Returns the rows whose bounds contain the point (edges included)."""
+        import shapely
+
+        hits = self._tree.query(shapely.Point(lon, lat), predicate="intersects")
+        return np.unique(self._owners[hits])
+
+    def _distances(self, boxes: np.ndarray, lon, lat) -> np.ndarray:
+        west, south, east, north = self._boxes[boxes].T
+        dx = np.maximum.reduce([west - lon, np.zeros_like(west), lon - east])
+        dy = np.maximum.reduce([south - lat, np.zeros_like(south), lat - north])
+        return np.hypot(dx, dy)
+
+    def nearest(self, lon, lat, count: int = 1) -> np.ndarray:
+        """
+        Returns up to ``count`` rows ordered by planar distance, in degrees,
+        from the point to their bounds (0 for sheets containing the point),
+        and by row between sheets at the same distance.
+        """
+        import shapely
+
+        if not len(self._boxes) or count < 1:
+            return np.array([], dtype=np.intp)
+        point = shapely.Point(lon, lat)
+        if count == 1:
+            ties = self._tree.query_nearest(point, all_matches=True)
+            return self._owners[ties].min(keepdims=True)
+        _, (closest,) = self._tree.query_nearest(
+            point, return_distance=True, all_matches=False
+        )
+        # Every box within ``radius`` of the point meets the square window,
+        # so once that many rows are within it, none outside can be nearer.
+        radius = closest + (self._spacing or 1.0) * np.sqrt(count)
+        while True:
+            if not np.isfinite(radius):
+                boxes = np.arange(len(self._boxes))
+                distance = self._distances(boxes, lon, lat)
+                break
+            window = shapely.box(lon - radius, lat - radius, lon + radius, lat + radius)
+            boxes = self._tree.query(window, predicate="intersects")
+            distance = self._distances(boxes, lon, lat)
+            within = self._owners[boxes[distance <= radius]]
+            if len(boxes) == len(self._boxes) or len(np.unique(within)) >= count:
+                break
+            radius *= 2
+        # Halves of a split sheet share an owner; keep its closer half.
+        order = np.lexsort((self._owners[boxes], distance))
+        owners = self._owners[boxes][order]
+        _, first = np.unique(owners, return_index=True)
+        return owners[np.sort(first)][:count]
@@ -0,0 +1,126 @@
+"""
+Incremental reading of (Geo)JSON FeatureCollections.
+
+``iter_features`` walks the top-level object of a FeatureCollection and
+decodes the members of its ``features`` array one at a time, so only one
+feature (plus a read buffer) is held in memory.
+"""
+
+import itertools
+import json
+
+CHUNK_SIZE = 1 << 16
+
+_WHITESPACE = " \t\n\r"
+
+
+class _Reader:
+    """A growable text buffer over a file handle with a read position."""
+
+    def __init__(self, file, chunk_size: int):
+        self.file = file
+        self.chunk_size = chunk_size
+        self.buffer = ""
+        self.pos = 0
+        self.eof = False
+
+    def fill(self) -> bool:
+        """Reads another chunk, dropping what has already been consumed."""
+        if self.eof:
+            return False
+        # Read at least as much as is pending so that a feature larger than
+        # the chunk size is re-scanned a logarithmic number of times.
+        chunk = self.file.read(max(self.chunk_size, len(self.buffer) - self.pos))
+        if not chunk:
+            self.eof = True
+            return False
+        self.buffer = self.buffer[self.pos :] + chunk
+        self.pos = 0
+        return True
+
+    def peek(self) -> str:
+        """Returns the next non-whitespace character without consuming it."""
+        while True:
+            while self.pos < len(self.buffer) and self.buffer[self.pos] in _WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            if not self.fill():
+                raise ValueError("Unexpected end of JSON input")
+
+    def expect(self, char: str):
+        found = self.peek()
+        if found != char:
+            raise ValueError(f"Expected {char!r} at offset {self.pos}, found {found!r}")
+        self.pos += 1
+
+    def decode(self, decoder: json.JSONDecoder):
+        """Decodes the next JSON value, reading more input until it is complete."""
+        self.peek()
+        while True:
+            try:
+                value, end = decoder.raw_decode(self.buffer, self.pos)
+            except json.JSONDecodeError:
+                if not self.fill():
+                    raise
+                continue
+            # A number at the end of the buffer may continue in the next chunk.
+            if end == len(self.buffer) and not self.eof and self.fill():
+                continue
+            self.pos = end
+            return value
+
+
+def iter_features(file, *, chunk_size: int = CHUNK_SIZE, members: dict = None):
+    """Yields the features of a FeatureCollection read from an open text file.
+
+    The ``features`` array may appear anywhere in the top-level object; the
+    other top-level members are decoded and stored in ``members`` if a dict is
+    given, else discarded.
+    """
+    reader = _Reader(file, chunk_size)
+    decoder = json.JSONDecoder()
+    reader.expect("{")
+    if reader.peek() == "}":
+        return
+    while True:
+        key = reader.decode(decoder)
+        reader.expect(":")
+        if key == "features":
+            reader.expect("[")
+            if reader.peek() == "]":
+                reader.pos += 1
+            else:
+                while True:
+                    yield reader.decode(decoder)
+                    separator = reader.peek()
+                    reader.pos += 1
+                    if separator == "]":
+                        break
+                    if separator != ",":
+                        raise ValueError(
+                            f"Expected ',' or ']' in features, found {separator!r}"
+                        )
+        elif members is not None:
+            members[key] = reader.decode(decoder)
+        else:
+            reader.decode(decoder)
+        separator = reader.peek()
+        reader.pos += 1
+        if separator == "}":
+            return
+        if separator != ",":
+            raise ValueError(f"Expected ',' or '}}', found {separator!r}")
+
+
+def read_ahead(features):
+    """
+    Reads the first feature of ``iter_features`` now and returns an iterator
+    over all of them, so that the members before the ``features`` array are
+    in the ``members`` dict before the output is started. Members that come
+    after the array are only stored once the features are exhausted.
+    """
+    features = iter(features)
+    for first in features:
+        return itertools.chain([first], features)
+    return features
@@ -0,0 +1,980 @@
+"""
+Mapbox Vector Tile pyramids of OpenIndexMaps.
+
+``write_tiles`` cuts the sheets of an OpenIndexMap into z/x/y tiles in Web
+Mercator, one layer of polygons per tile, and writes them to a directory of
+``{z}/{x}/{y}.pbf`` files (with a TileJSON ``metadata.json``) or to a single
+MBTiles file. Each zoom level is cut into bands of tile columns, which worker
+processes encode in parallel and which are written as they come back, so the
+memory used follows the size of a band rather than of a whole level.
+
+Sheets are simplified for each zoom level: coordinates are snapped to the
+pixel grid of that level (``extent / 256`` tile units), rings that are not
+rectangles are thinned with Douglas-Peucker at the same tolerance, and a sheet
+that collapses to nothing at some zoom is left out of its tiles. Rectangular
+sheets, nearly all of them, are clipped, snapped and encoded a whole zoom
+level at a time with NumPy.
+
+The tiles are protobuf messages encoded here, so that no vector tile library
+is needed; the tests read them back with mapbox-vector-tile.
+"""
+
+import gzip
+import json
+import math
+import os
+import sqlite3
+import struct
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from pathlib import Path
+from typing import NamedTuple
+
+import numpy as np
+
+from openindexmaps_py.columnar import ColumnarOpenIndexMap, SheetColumns
+from openindexmaps_py.timings import timed
+
+EXTENT = 4096
+BUFFER = 64
+MIN_ZOOM, MAX_ZOOM = 0, 10
+LAYER = "sheets"
+
+# Deepest zoom accepted; tile coordinates stay well within int64 below it.
+MAX_SUPPORTED_ZOOM = 24
+
+# Screen pixels per tile side; the simplification grid is one such pixel.
+TILE_PIXELS = 256
+
+MAX_LATITUDE = 85.0511287798066
+
+_MOVE_TO, _LINE_TO, _CLOSE_PATH = 1, 2, 7
+_POLYGON = 3
+
+
+def _encode_varint(value: int) -> bytes:
+    out = bytearray()
+    while value > 0x7F:
+        out.append(value & 0x7F | 0x80)
+        value >>= 7
+    out.append(value)
+    return bytes(out)
+
+
+_SMALL_VARINTS = [_encode_varint(value) for value in range(1 << 14)]
+
+
+def _varint(value: int) -> bytes:
+    if value < 16384:
+        return _SMALL_VARINTS[value]
+    return _encode_varint(value)
+
+
+def _zigzag(value: int) -> int:
+    return (value << 1) ^ (value >> 63)
+
+
+def _command(command: int, count: int) -> int:
+    return command | count << 3
+
+
+def _message(field: int, body: bytes) -> bytes:
+    """A length-delimited field."""
+    return _varint(field << 3 | 2) + _varint(len(body)) + body
+
+
+def _varint_sizes(values: np.ndarray) -> np.ndarray:
+    """The number of bytes of each non-negative int encoded as a varint."""
+    sizes = np.ones(np.shape(values), dtype=np.int64)
+    rest = np.asarray(values, dtype=np.int64) >> 7
+    while rest.any():
+        sizes += rest > 0
+        rest >>= 7
+    return sizes
+
+
+def _varints(values: np.ndarray, keep: np.ndarray = None):
+    """
+    Encodes an array of non-negative ints as varints, in row-major order.
+    Returns the bytes and the byte count of each value (0 where ``keep`` is
+    False, for values left out).
+    """
+    values = np.asarray(values, dtype=np.int64)
+    counts = _varint_sizes(values)
+    if keep is not None:
+        counts = np.where(keep, counts, 0)
+    digits = np.arange(max(int(counts.max(initial=1)), 1))
+    groups = (values[..., None] >> (7 * digits)) & 0x7F
+    groups |= np.where(digits < counts[..., None] - 1, 0x80, 0)
+    data = groups[digits < counts[..., None]].astype(np.uint8)
+    return data.tobytes(), counts
+
+
+def _gather(pool: bytes, starts, lengths):
+    """
+    Concatenates the byte ranges ``pool[start:start + length]``. Returns the
+    bytes and the end offset of each range in them.
+    """
+    lengths = np.asarray(lengths, dtype=np.int64).reshape(-1)
+    ends = np.cumsum(lengths)
+    shift = np.asarray(starts, dtype=np.int64).reshape(-1) - (ends - lengths)
+    index = np.repeat(shift, lengths) + np.arange(ends[-1] if len(ends) else 0)
+    return np.frombuffer(pool, dtype=np.uint8)[index].tobytes(), ends
+
+
+def _pool(messages: list[bytes]):
+    """Concatenates messages; returns the bytes and the start offset of each."""
+    sizes = np.array([len(message) for message in messages], dtype=np.int64)
+    return b"".join(messages), np.concatenate([[0], np.cumsum(sizes)])
+
+
+def _value_message(value) -> bytes:
+    """Encodes a property value as a tile layer's Value message."""
+    if isinstance(value, bool):
+        body = b"\x38" + _varint(int(value))
+    elif isinstance(value, int) and 0 <= value < 1 << 64:
+        body = b"\x28" + _varint(value)
+    elif isinstance(value, int) and -(1 << 63) <= value < 0:
+        body = b"\x30" + _varint(_zigzag(value))
+    elif isinstance(value, float):
+        body = b"\x19" + struct.pack("<d", value)
+    else:
+        if not isinstance(value, str):
+            value = json.dumps(value, default=str)
+        body = _message(1, value.encode("utf-8"))
+    return _message(4, body)
+
+
+def _field_type(values: list) -> str:
+    """The TileJSON type of a property: Boolean, Number or String."""
+    kinds = {type(value) for value in values if value is not None}
+    if kinds and kinds <= {bool}:
+        return "Boolean"
+    if kinds and kinds <= {int, float}:
+        return "Number"
+    return "String"
+
+
+# Projection
+
+
+def mercator(lon, lat):
+    """
+    Projects degrees to Web Mercator world coordinates: x and y run from 0 to
+    1, eastward from the antimeridian and southward from the top of the map.
+    """
+    lon = np.asarray(lon, dtype=np.float64)
+    lat = np.clip(np.asarray(lat, dtype=np.float64), -MAX_LATITUDE, MAX_LATITUDE)
+    x = (lon + 180.0) / 360.0
+    y = 0.5 - np.arcsinh(np.tan(np.radians(lat))) / (2 * np.pi)
+    return x, y
+
+
+def tile_bounds(zoom: int, x: int, y: int) -> tuple:
+    """The (west, south, east, north) degrees of tile z/x/y."""
+    size = 1 << zoom
+
+    def latitude(row):
+        return math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * row / size))))
+
+    return (
+        x / size * 360.0 - 180.0,
+        latitude(y + 1),
+        (x + 1) / size * 360.0 - 180.0,
+        latitude(y),
+    )
+
+
+# Source
+
+
+class TileSource(NamedTuple):
+    """The sheets of an OpenIndexMap, projected and encoded for tiling."""
+
+    boxes: np.ndarray  # world x0, y0, x1, y1 of each rectangular polygon
+    box_rows: np.ndarray  # the row of the sheet of each box
+    shapes: list  # (row, polygons) of sheets with other geometry
+    codes: np.ndarray  # (fields, rows) value codes, -1 where missing
+    keys: bytes  # the encoded key of each field, one after another
+    key_offsets: np.ndarray  # where each field's key starts in ``keys``
+    values: bytes  # the encoded values of each field, by code
+    value_offsets: np.ndarray  # where each value starts in ``values``
+    value_base: np.ndarray  # the index of each field's first value
+    field_types: dict
+    bounds: list
+
+
+def _polygons(geometry) -> list:
+    if not geometry:
+        return []
+    if geometry["type"] == "Polygon":
+        return [geometry["coordinates"]]
+    if geometry["type"] == "MultiPolygon":
+        return list(geometry["coordinates"])
+    return []
+
+
+def _rectangle(polygon):
+    """Returns (west, south, east, north) of an axis-aligned rectangle, else None."""
+    if len(polygon) != 1 or len(polygon[0]) != 5:
+        return None
+    ring = polygon[0]
+    if list(ring[0]) != list(ring[4]):
+        return None
+    for (x0, y0, *_), (x1, y1, *_) in zip(ring, ring[1:]):
+        if x0 != x1 and y0 != y1:
+            return None
+    xs = {point[0] for point in ring}
+    ys = {point[1] for point in ring}
+    if len(xs) != 2 or len(ys) != 2:
+        return None
+    return min(xs), min(ys), max(xs), max(ys)
+
+
+def _rectangles(rings: list):
+    """
+    Checks many 5-point rings at once. Returns (west, south, east, north) of
+    each and a mask of the rings that are axis-aligned rectangles.
+    """
+    try:
+        points = np.asarray(rings, dtype=np.float64)[:, :, :2]
+    except ValueError:  # points of different dimensions
+        points = np.asarray([[point[:2] for point in ring] for ring in rings])
+    x, y = points[..., 0], points[..., 1]
+    west, south = x.min(axis=1), y.min(axis=1)
+    east, north = x.max(axis=1), y.max(axis=1)
+    simple = (points[:, 0] == points[:, 4]).all(axis=1)
+    simple &= ((np.diff(x, axis=1) == 0) | (np.diff(y, axis=1) == 0)).all(axis=1)
+    simple &= ((x == west[:, None]) | (x == east[:, None])).all(axis=1)
+    simple &= ((y == south[:, None]) | (y == north[:, None])).all(axis=1)
+    simple &= (west < east) & (south < north)
+    return np.column_stack([west, south, east, north]), simple
+
+
+def _world_ring(ring) -> np.ndarray:
+    """Projects a ring, leaving out its closing point."""
+    points = np.asarray([point[:2] for point in ring], dtype=np.float64)
+    if len(points) > 1 and (points[0] == points[-1]).all():
+        points = points[:-1]
+    return np.column_stack(mercator(points[:, 0], points[:, 1]))
+
+
+def _world_polygons(polygons: list) -> list:
+    projected = [
+        [_world_ring(ring) for ring in polygon if len(ring) >= 3]
+        for polygon in polygons
+    ]
+    return [polygon for polygon in projected if polygon]
+
+
+def tile_source(oim, fields: list[str] = None) -> TileSource:
+    """
+    Prepares an OpenIndexMap for ``zoom_tiles``, keeping the ``fields``
+    properties (all of them by default) as the tile features' attributes.
+    """
+    if isinstance(oim, ColumnarOpenIndexMap):
+        columns, geometries = oim.columns, oim.geometries()
+    else:
+        features = [
+            getattr(sheet, "__geo_interface__", sheet) for sheet in oim.features
+        ]
+        columns = SheetColumns.from_properties(
+            feature.get("properties") for feature in features
+        )
+        geometries = (feature.get("geometry") for feature in features)
+    boxes, box_rows, shapes, singles, single_rows = [], [], [], [], []
+    for row, geometry in enumerate(geometries):
+        polygons = _polygons(geometry)
+        if len(polygons) == 1 and len(polygons[0]) == 1 and len(polygons[0][0]) == 5:
+            # The usual sheet: checked with all the others below.
+            singles.append(polygons[0][0])
+            single_rows.append(row)
+            continue
+        rectangles = [_rectangle(polygon) for polygon in polygons]
+        if None in rectangles:
+            shapes.append((row, _world_polygons(polygons)))
+            continue
+        boxes.extend(rectangles)
+        box_rows.extend([row] * len(rectangles))
+    if singles:
+        found, simple = _rectangles(singles)
+        boxes.extend(found[simple].tolist())
+        box_rows.extend(np.asarray(single_rows)[simple].tolist())
+        for i in np.flatnonzero(~simple).tolist():
+            shapes.append((single_rows[i], _world_polygons([[singles[i]]])))
+    boxes = np.asarray(boxes, dtype=np.float64).reshape(-1, 4)
+    west, south, east, north = boxes.T
+    x0, y0 = mercator(west, north)
+    x1, y1 = mercator(east, south)
+
+    fields = columns.keys() if fields is None else list(fields)
+    codes = np.full((len(fields), len(columns)), -1, dtype=np.int32)
+    keys, values, value_base, field_types = [], [], [], {}
+    for i, field in enumerate(fields):
+        field_values, field_codes = columns.encoded(field)
+        codes[i] = field_codes
+        # MVT has no null: a None value is left out like a missing one.
+        nulls = [code for code, value in enumerate(field_values) if value is None]
+        if nulls:
+            codes[i][np.isin(codes[i], nulls)] = -1
+        keys.append(_message(3, field.encode("utf-8")))
+        values.extend(
+            b"" if value is None else _value_message(value) for value in field_values
+        )
+        value_base.append(len(values) - len(field_values))
+        field_types[field] = _field_type(field_values)
+    keys, key_offsets = _pool(keys)
+    values, value_offsets = _pool(values)
+    bounds = oim.compute_bbox()
+    return TileSource(
+        boxes=np.column_stack([x0, y0, x1, y1]),
+        box_rows=np.asarray(box_rows, dtype=np.int64),
+        shapes=shapes,
+        codes=codes,
+        keys=keys,
+        key_offsets=key_offsets,
+        values=values,
+        value_offsets=value_offsets,
+        value_base=np.asarray(value_base, dtype=np.int64),
+        field_types=field_types,
+        bounds=bounds if np.isfinite(bounds).all() else None,
+    )
+
+
+# Geometry
+
+
+def _tile_range(low, high, extent: int, buffer: int, last: int):
+    """
+    The first and last tile (clamped to the map) whose buffered area overlaps
+    the open interval low..high of global tile units.
+    """
+    first = np.maximum((low - buffer) // extent, 0)
+    final = np.minimum(-((-(high + buffer)) // extent) - 1, last)
+    return first, final
+
+
+def _box_tiles(boxes: np.ndarray, zoom: int, extent: int, buffer: int, grid: int):
+    """
+    Snaps the boxes to the pixel grid of one zoom level. Returns their global
+    x0, y0, x1, y1 and their first and last tile columns and rows; the last
+    are before the first for boxes that collapse at this zoom.
+    """
+    scale = float(extent << zoom) / grid
+    x0, y0, x1, y1 = (np.round(boxes * scale).astype(np.int64) * grid).T
+    last = (1 << zoom) - 1
+    tx0, tx1 = _tile_range(x0, x1, extent, buffer, last)
+    ty0, ty1 = _tile_range(y0, y1, extent, buffer, last)
+    collapsed = (x0 >= x1) | (y0 >= y1)
+    tx1[collapsed] = tx0[collapsed] - 1
+    return x0, y0, x1, y1, tx0, tx1, ty0, ty1
+
+
+def _box_pieces(
+    boxes: np.ndarray,
+    zoom: int,
+    extent: int,
+    buffer: int,
+    grid: int,
+    columns: tuple = None,
+):
+    """
+    Snaps and clips the boxes to the tiles of one zoom level, or of its tile
+    columns ``first <= x < stop`` when ``columns`` is given. Returns the box
+    index, tile x and y and local x0, y0, x1, y1 of every piece.
+    """
+    x0, y0, x1, y1, tx0, tx1, ty0, ty1 = _box_tiles(boxes, zoom, extent, buffer, grid)
+    if columns is not None:
+        tx0, tx1 = np.maximum(tx0, columns[0]), np.minimum(tx1, columns[1] - 1)
+    across = np.maximum(tx1 - tx0 + 1, 0)
+    counts = across * np.maximum(ty1 - ty0 + 1, 0)
+    index = np.repeat(np.arange(len(boxes)), counts)
+    offset = np.arange(len(index)) - np.repeat(np.cumsum(counts) - counts, counts)
+    tx = tx0[index] + offset % across[index]
+    ty = ty0[index] + offset // across[index]
+    left, top = tx * extent, ty * extent
+    low, high = -buffer, extent + buffer
+    return (
+        index,
+        tx,
+        ty,
+        np.clip(x0[index] - left, low, high),
+        np.clip(y0[index] - top, low, high),
+        np.clip(x1[index] - left, low, high),
+        np.clip(y1[index] - top, low, high),
+    )
+
+
+def _box_geometries(first, u0, v0, u1, v1):
+    """
+    Encodes the boxes as clockwise rings, continuing each feature's cursor
+    from its previous piece. Returns the bytes and the end offset of each piece.
+    """
+    zero = np.zeros(len(u0), dtype=np.int64)
+    cx = np.where(first, 0, np.roll(u0, 1))
+    cy = np.where(first, 0, np.roll(v1, 1))
+
+    def zigzag(values):
+        return (values << 1) ^ (values >> 63)
+
+    commands = np.column_stack(
+        [
+            zero + _command(_MOVE_TO, 1),
+            zigzag(u0 - cx),
+            zigzag(v0 - cy),
+            zero + _command(_LINE_TO, 3),
+            zigzag(u1 - u0),
+            zero,
+            zero,
+            zigzag(v1 - v0),
+            zigzag(u0 - u1),
+            zero,
+            zero + _command(_CLOSE_PATH, 1),
+        ]
+    )
+    data, counts = _varints(commands)
+    return data, np.cumsum(counts.sum(axis=1))
+
+
+def _clip_ring(points: list, x0, y0, x1, y1) -> list:
+    """Clips a ring to a rectangle (Sutherland-Hodgman)."""
+    for axis, limit, below in (
+        (0, x0, False),
+        (0, x1, True),
+        (1, y0, False),
+        (1, y1, True),
+    ):
+        if not points:
+            break
+        clipped = []
+        previous = points[-1]
+        was_inside = previous[axis] <= limit if below else previous[axis] >= limit
+        for point in points:
+            inside = point[axis] <= limit if below else point[axis] >= limit
+            if inside != was_inside:
+                share = (limit - previous[axis]) / (point[axis] - previous[axis])
+                other = previous[1 - axis] + share * (
+                    point[1 - axis] - previous[1 - axis]
+                )
+                clipped.append((limit, other) if axis == 0 else (other, limit))
+            if inside:
+                clipped.append(point)
+            previous, was_inside = point, inside
+        points = clipped
+    return points
+
+
+def _distance(point, start, end) -> float:
+    """Distance from a point to a segment."""
+    (x, y), (x0, y0), (x1, y1) = point, start, end
+    dx, dy = x1 - x0, y1 - y0
+    length = dx * dx + dy * dy
+    if length:
+        share = min(max(((x - x0) * dx + (y - y0) * dy) / length, 0.0), 1.0)
+        x0, y0 = x0 + share * dx, y0 + share * dy
+    return math.hypot(x - x0, y - y0)
+
+
+def _simplify(points: list, tolerance: float) -> list:
+    """Douglas-Peucker on a ring given without its closing point."""
+    count = len(points)
+    if count <= 4:
+        return points
+    keep = [False] * count
+    keep[0] = True
+    far = max(range(1, count), key=lambda i: _distance(points[i], points[0], points[0]))
+    keep[far] = True
+    spans = [(0, far), (far, count)]
+    while spans:
+        start, end = spans.pop()
+        if end - start < 2:
+            continue
+        a, b = points[start], points[end % count]
+        distance, i = max(
+            (_distance(points[i], a, b), i) for i in range(start + 1, end)
+        )
+        if distance > tolerance:
+            keep[i] = True
+            spans += [(start, i), (i, end)]
+    return [point for point, kept in zip(points, keep) if kept]
+
+
+def _area(ring: list) -> int:
+    """Twice the signed area; positive for clockwise rings in tile coordinates."""
+    return sum(
+        x0 * y1 - x1 * y0 for (x0, y0), (x1, y1) in zip(ring, ring[1:] + ring[:1])
+    )
+
+
+def _shape_rings(
+    shapes: list,
+    zoom: int,
+    extent: int,
+    buffer: int,
+    grid: int,
+    columns: tuple = None,
+):
+    """
+    Clips, simplifies and snaps the other sheets to the tiles of one zoom
+    level, or of its tile columns ``first <= x < stop`` when ``columns`` is
+    given. Returns {(tile x, tile y, row): rings} in local tile units.
+    """
+    scale = float(extent << zoom)
+    last = (1 << zoom) - 1
+    first, stop = columns or (0, last + 1)
+    pieces = {}
+    for row, polygons in shapes:
+        for polygon in polygons:
+            low, high = (
+                np.min(polygon[0], axis=0) * scale,
+                np.max(polygon[0], axis=0) * scale,
+            )
+            tx0, tx1 = _tile_range(
+                math.floor(low[0]), math.ceil(high[0]), extent, buffer, last
+            )
+            ty0, ty1 = _tile_range(
+                math.floor(low[1]), math.ceil(high[1]), extent, buffer, last
+            )
+            tx0, tx1 = max(tx0, first), min(tx1, stop - 1)
+            if tx0 > tx1:
+                continue
+            rings = [(ring * scale).tolist() for ring in polygon]
+            for tx in range(tx0, tx1 + 1):
+                for ty in range(ty0, ty1 + 1):
+                    left, top = tx * extent, ty * extent
+                    local = []
+                    for i, ring in enumerate(rings):
+                        ring = _clip_ring(
+                            ring,
+                            left - buffer,
+                            top - buffer,
+                            left + extent + buffer,
+                            top + extent + buffer,
+                        )
+                        ring = _simplify(ring, grid)
+                        snapped = []
+                        for x, y in ring:
+                            point = (
+                                round(x / grid) * grid - left,
+                                round(y / grid) * grid - top,
+                            )
+                            if not snapped or point != snapped[-1]:
+                                snapped.append(point)
+                        while len(snapped) > 1 and snapped[0] == snapped[-1]:
+                            snapped.pop()
+                        area = _area(snapped) if len(snapped) >= 3 else 0
+                        if not area:
+                            if i == 0:
+                                break  # the polygon collapsed at this zoom
+                            continue
+                        # Exterior rings clockwise, holes counterclockwise.
+                        if (area > 0) != (i == 0):
+                            snapped.reverse()
+                        local.append(snapped)
+                    if local:
+                        pieces.setdefault((tx, ty, row), []).append(local)
+    return pieces
+
+
+def _ring_geometry(polygons: list) -> bytes:
+    """Encodes polygons (lists of rings in local tile units) as one geometry."""
+    commands = []
+    cx = cy = 0
+    for polygon in polygons:
+        for ring in polygon:
+            (x, y), rest = ring[0], ring[1:]
+            commands += [_command(_MOVE_TO, 1), _zigzag(x - cx), _zigzag(y - cy)]
+            commands.append(_command(_LINE_TO, len(rest)))
+            cx, cy = x, y
+            for x, y in rest:
+                commands += [_zigzag(x - cx), _zigzag(y - cy)]
+                cx, cy = x, y
+            commands.append(_command(_CLOSE_PATH, 1))
+    return b"".join(_varint(command) for command in commands)
+
+
+# Tiles
+
+
+@timed("tiles.zoom_tiles")
+def zoom_tiles(
+    source: TileSource,
+    zoom: int,
+    *,
+    layer: str = LAYER,
+    extent: int = EXTENT,
+    buffer: int = BUFFER,
+    columns: tuple = None,
+) -> list[tuple]:
+    """
+    Encodes the tiles of one zoom level, or only those of its tile columns
+    ``first <= x < stop`` when ``columns`` is (first, stop). Returns (x, y,
+    tile bytes) for every tile that holds part of a sheet, ordered by x and
+    then y.
+    """
+    grid = max(extent // TILE_PIXELS, 1)
+    index, tx, ty, u0, v0, u1, v1 = _box_pieces(
+        source.boxes, zoom, extent, buffer, grid, columns
+    )
+    rows = source.box_rows[index]
+    order = np.lexsort((index, rows, ty, tx))
+    tx, ty, rows, u0, v0, u1, v1 = (
+        array[order] for array in (tx, ty, rows, u0, v0, u1, v1)
+    )
+    # A sheet's pieces in one tile (a MultiPolygon's parts) make one feature.
+    first = np.ones(len(rows), dtype=bool)
+    first[1:] = (tx[1:] != tx[:-1]) | (ty[1:] != ty[:-1]) | (rows[1:] != rows[:-1])
+    geometries, ends = _box_geometries(first, u0, v0, u1, v1)
+    starts = np.flatnonzero(first)
+    piece_starts = np.concatenate([[0], ends])
+    geometry_starts = piece_starts[starts]
+    geometry_sizes = piece_starts[np.append(starts, len(rows))[1:]] - geometry_starts
+    tx, ty, rows = tx[starts], ty[starts], rows[starts]
+
+    shapes = _shape_rings(source.shapes, zoom, extent, buffer, grid, columns)
+    if shapes:
+        found = list(shapes)
+        encoded = [_ring_geometry(shapes[key]) for key in found]
+        shape_geometries, shape_starts = _pool(encoded)
+        tx = np.append(tx, [key[0] for key in found]).astype(np.int64)
+        ty = np.append(ty, [key[1] for key in found]).astype(np.int64)
+        rows = np.append(rows, [key[2] for key in found]).astype(np.int64)
+        geometry_starts = np.append(
+            geometry_starts, shape_starts[:-1] + len(geometries)
+        )
+        geometry_sizes = np.append(geometry_sizes, np.diff(shape_starts))
+        geometries += shape_geometries
+        order = np.lexsort((rows, ty, tx))
+        tx, ty, rows = tx[order], ty[order], rows[order]
+        geometry_starts, geometry_sizes = geometry_starts[order], geometry_sizes[order]
+    count = len(rows)
+    if not count:
+        return []
+
+    # Tags: each tile lists the keys and values its features use, so number
+    # the distinct (tile, field) and (tile, field, code) triples of the zoom.
+    new_tile = np.ones(count, dtype=bool)
+    new_tile[1:] = (tx[1:] != tx[:-1]) | (ty[1:] != ty[:-1])
+    tile = np.cumsum(new_tile) - 1
+    tile_count = int(tile[-1]) + 1
+    codes = source.codes[:, rows].T
+    fields = codes.shape[1]
+    present = codes >= 0
+    entry_tile = np.broadcast_to(tile[:, None], codes.shape)[present]
+    entry_field = np.nonzero(present)[1]
+    tile_field = entry_tile * fields + entry_field
+    key_table, key_index = np.unique(tile_field, return_inverse=True)
+    key_first = np.searchsorted(key_table // max(fields, 1), np.arange(tile_count + 1))
+    width = int(source.codes.max(initial=-1)) + 1
+    value_table, value_index = np.unique(
+        tile_field * width + codes[present], return_inverse=True
+    )
+    value_first = np.searchsorted(
+        value_table // max(fields * width, 1), np.arange(tile_count + 1)
+    )
+    tags = np.zeros((count, fields, 2), dtype=np.int64)
+    tags[present, 0] = key_index.reshape(-1) - key_first[entry_tile]
+    tags[present, 1] = value_index.reshape(-1) - value_first[entry_tile]
+    tag_data, tag_sizes = _varints(
+        tags.reshape(count, 2 * fields), np.repeat(present, 2, axis=1)
+    )
+    tag_sizes = tag_sizes.sum(axis=1)
+
+    # Features: (id, tags, type, geometry) messages, laid out a tile at a time.
+    feature_sizes = (
+        1 + _varint_sizes(rows) + 1 + _varint_sizes(tag_sizes) + tag_sizes
+    ) + (3 + _varint_sizes(geometry_sizes) + geometry_sizes)
+    byte = np.zeros(count, dtype=np.int64)
+    heads, head_sizes = _varints(
+        np.column_stack(
+            [byte + 0x12, feature_sizes, byte + 0x08, rows, byte + 0x12, tag_sizes]
+        )
+    )
+    middles, middle_sizes = _varints(
+        np.column_stack([byte + 0x18, byte + _POLYGON, byte + 0x22, geometry_sizes])
+    )
+    sections = [heads, tag_data, middles, geometries]
+    bases = np.cumsum([0] + [len(section) for section in sections])
+    head_sizes, middle_sizes = head_sizes.sum(axis=1), middle_sizes.sum(axis=1)
+    features, feature_ends = _gather(
+        b"".join(sections),
+        np.column_stack(
+            [
+                np.cumsum(head_sizes) - head_sizes + bases[0],
+                np.cumsum(tag_sizes) - tag_sizes + bases[1],
+                np.cumsum(middle_sizes) - middle_sizes + bases[2],
+                geometry_starts + bases[3],
+            ]
+        ),
+        np.column_stack([head_sizes, tag_sizes, middle_sizes, geometry_sizes]),
+    )
+    feature_ends = feature_ends[3::4]
+
+    field_of_key = key_table % max(fields, 1)
+    keys, key_ends = _gather(
+        source.keys,
+        source.key_offsets[field_of_key],
+        np.diff(source.key_offsets)[field_of_key],
+    )
+    value_of_entry = source.value_base[value_table // width % max(fields, 1)]
+    value_of_entry += value_table % max(width, 1)
+    values, value_ends = _gather(
+        source.values,
+        source.value_offsets[value_of_entry],
+        np.diff(source.value_offsets)[value_of_entry],
+    )
+
+    header = b"\x78\x02" + _message(1, layer.encode("utf-8"))
+    footer = b"\x28" + _varint(extent)
+    tile_first = np.flatnonzero(new_tile)
+    feature_ends = np.concatenate([[0], feature_ends])[
+        np.append(tile_first, count)
+    ].tolist()
+    key_ends = np.concatenate([[0], key_ends])[key_first].tolist()
+    value_ends = np.concatenate([[0], value_ends])[value_first].tolist()
+    tiles = []
+    for t, (x, y) in enumerate(zip(tx[tile_first].tolist(), ty[tile_first].tolist())):
+        body = b"".join(
+            (
+                header,
+                features[feature_ends[t] : feature_ends[t + 1]],
+                keys[key_ends[t] : key_ends[t + 1]],
+                values[value_ends[t] : value_ends[t + 1]],
+                footer,
+            )
+        )
+        tiles.append((x, y, b"\x1a" + _varint(len(body)) + body))
+    return tiles
+
+
+# Box pieces encoded at a time, which bounds the tiles held in memory.
+_BAND_PIECES = 1 << 18
+
+
+def _column_bands(
+    source: TileSource,
+    zoom: int,
+    *,
+    extent: int = EXTENT,
+    buffer: int = BUFFER,
+    pieces: int = _BAND_PIECES,
+    **options,
+) -> list[tuple]:
+    """
+    Cuts the tile columns of one zoom level into bands of about ``pieces``
+    box pieces each (a single column may hold more). Returns (first, stop)
+    for each band, at least one.
+    """
+    columns = 1 << zoom
+    grid = max(extent // TILE_PIXELS, 1)
+    *_, tx0, tx1, ty0, ty1 = _box_tiles(source.boxes, zoom, extent, buffer, grid)
+    down = np.maximum(ty1 - ty0 + 1, 0)
+    live = (tx0 <= tx1) & (down > 0)
+    if not live.any():
+        return [(0, columns)]
+    # The pieces of each column step up where boxes start and down past
+    # their ends: sum the steps at the distinct edges.
+    edges, inverse = np.unique(
+        np.concatenate([tx0[live], tx1[live] + 1]), return_inverse=True
+    )
+    steps = np.zeros(len(edges), dtype=np.int64)
+    np.add.at(steps, inverse.reshape(-1), np.concatenate([down[live], -down[live]]))
+    density = np.cumsum(steps)[:-1]
+    before = np.concatenate([[0], np.cumsum(density * np.diff(edges))])
+    targets = np.arange(1, before[-1] // pieces + 1) * pieces
+    segment = np.searchsorted(before, targets) - 1
+    cuts = edges[segment] - (before[segment] - targets) // density[segment]
+    bounds = np.unique(np.concatenate([[0], cuts, [columns]])).tolist()
+    return list(zip(bounds[:-1], bounds[1:]))
+
+
+_worker = None
+
+
+def _start_worker(source: TileSource, options: dict):
+    global _worker
+    _worker = source, options
+
+
+def _worker_tiles(zoom: int, columns: tuple) -> list[tuple]:
+    source, options = _worker
+    return zoom_tiles(source, zoom, columns=columns, **options)
+
+
+def _generate(source: TileSource, zooms, options: dict, jobs: int):
+    """
+    Yields (zoom, tiles) for each band of tile columns of each zoom level,
+    spread over ``jobs`` processes. At most two bands per process are held
+    at a time, so the tiles are written as they come back.
+    """
+    # The deepest levels hold the most tiles: start them first.
+    bands = [
+        (zoom, columns)
+        for zoom in sorted(zooms, reverse=True)
+        for columns in _column_bands(source, zoom, **options)
+    ]
+    jobs = jobs or os.cpu_count()
+    if jobs == 1 or len(bands) < 2:
+        for zoom, columns in bands:
+            yield zoom, zoom_tiles(source, zoom, columns=columns, **options)
+        return
+    jobs = min(jobs, len(bands))
+    bands = iter(bands)
+    with ProcessPoolExecutor(
+        max_workers=jobs,
+        initializer=_start_worker,
+        initargs=(source, options),
+    ) as pool:
+        pending = {}
+        for zoom, columns in bands:
+            pending[pool.submit(_worker_tiles, zoom, columns)] = zoom
+            if len(pending) < 2 * jobs:
+                continue
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                yield pending.pop(future), future.result()
+        for future in list(pending):
+            yield pending.pop(future), future.result()
+
+
+# Output
+
+
+class _TileDirectory:
+    """A directory of {z}/{x}/{y}.pbf files with a TileJSON metadata.json."""
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.path.mkdir(parents=True, exist_ok=True)
+
+    def write(self, zoom: int, tiles: list):
+        folders = set()
+        for x, y, data in tiles:
+            folder = self.path / str(zoom) / str(x)
+            if folder not in folders:
+                folder.mkdir(parents=True, exist_ok=True)
+                folders.add(folder)
+            (folder / f"{y}.pbf").write_bytes(data)
+
+    def close(self, metadata: dict):
+        if metadata is None:
+            return
+        tilejson = {"tilejson": "3.0.0", "scheme": "xyz", "tiles": ["{z}/{x}/{y}.pbf"]}
+        with open(self.path / "metadata.json", "w") as file:
+            json.dump({**tilejson, **metadata}, file, indent=2)
+
+
+class _MBTiles:
+    """An MBTiles file: gzipped tiles, with rows numbered from the south."""
+
+    def __init__(self, path: Path):
+        if path.exists():
+            path.unlink()
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.connection = sqlite3.connect(path)
+        self.connection.executescript("""
+            CREATE TABLE metadata (name TEXT, value TEXT);
+            CREATE TABLE tiles (
+                zoom_level INTEGER,
+                tile_column INTEGER,
+                tile_row INTEGER,
+                tile_data BLOB
+            );
+            CREATE UNIQUE INDEX tile_index ON tiles (zoom_level, tile_column, tile_row);
+            """)
+
+    def write(self, zoom: int, tiles: list):
+        last = (1 << zoom) - 1
+        self.connection.executemany(
+            "INSERT INTO tiles VALUES (?, ?, ?, ?)",
+            (
+                (zoom, x, last - y, gzip.compress(data, compresslevel=6, mtime=0))
+                for x, y, data in tiles
+            ),
+        )
+
+    def close(self, metadata: dict):
+        try:
+            if metadata is not None:
+                layers = {"vector_layers": metadata["vector_layers"]}
+                rows = {
+                    "name": metadata["name"],
+                    "format": "pbf",
+                    "type": "overlay",
+                    "minzoom": metadata["minzoom"],
+                    "maxzoom": metadata["maxzoom"],
+                    "bounds": ",".join(str(value) for value in metadata["bounds"]),
+                    "center": ",".join(str(value) for value in metadata["center"]),
+                    "json": json.dumps(layers),
+                }
+                self.connection.executemany(
+                    "INSERT INTO metadata VALUES (?, ?)",
+                    [(name, str(value)) for name, value in rows.items()],
+                )
+                self.connection.commit()
+        finally:
+            self.connection.close()
+
+
+def _metadata(source: TileSource, name: str, layer: str, minzoom, maxzoom) -> dict:
+    west, south, east, north = source.bounds or (-180, -MAX_LATITUDE, 180, MAX_LATITUDE)
+    center = (west + east) / 2
+    if west > east:  # across the antimeridian
+        center = (center + 360) % 360 - 180
+    return {
+        "name": name,
+        "bounds": [west, south, east, north],
+        "center": [center, (south + north) / 2, minzoom],
+        "minzoom": minzoom,
+        "maxzoom": maxzoom,
+        "vector_layers": [
+            {
+                "id": layer,
+                "fields": source.field_types,
+                "minzoom": minzoom,
+                "maxzoom": maxzoom,
+            }
+        ],
+    }
+
+
+def write_tiles(
+    oim,
+    destination,
+    *,
+    minzoom: int = MIN_ZOOM,
+    maxzoom: int = MAX_ZOOM,
+    layer: str = LAYER,
+    fields: list[str] = None,
+    extent: int = EXTENT,
+    buffer: int = BUFFER,
+    jobs: int = 1,
+) -> dict[int, int]:
+    """
+    Writes the vector tile pyramid of an OpenIndexMap, zoom levels ``minzoom``
+    to ``maxzoom``, to ``destination``: an MBTiles file when its name ends in
+    .mbtiles, a directory otherwise. The bands of tile columns of each level
+    are spread over ``jobs`` processes (all cores when 0) and written as they
+    are encoded. Returns the number of tiles of each level.
+    """
+    if not 0 <= minzoom <= maxzoom <= MAX_SUPPORTED_ZOOM:
+        raise ValueError(
+            f"Zoom levels must run from 0 to {MAX_SUPPORTED_ZOOM}, "
+            f"got {minzoom} to {maxzoom}"
+        )
+    source = tile_source(oim, fields)
+    options = {"layer": layer, "extent": extent, "buffer": buffer}
+    destination = Path(destination)
+    if destination.suffix == ".mbtiles":
+        output = _MBTiles(destination)
+    else:
+        output = _TileDirectory(destination)
+    zooms = range(minzoom, maxzoom + 1)
+    counts, metadata = dict.fromkeys(zooms, 0), None
+    try:
+        for zoom, tiles in _generate(source, zooms, options, jobs):
+            output.write(zoom, tiles)
+            counts[zoom] += len(tiles)
+        metadata = _metadata(source, destination.stem, layer, minzoom, maxzoom)
+    finally:
+        output.close(metadata)
+    return dict(sorted(counts.items()))
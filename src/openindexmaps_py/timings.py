@@ -0,0 +1,256 @@
+"""
+Optional wall-clock timing of named stages.
+
+Code marks its stages with the ``timed`` decorator, the ``stage`` context
+manager or ``timed_iter``. Nothing is recorded unless a ``Timings`` collector
+is active (``with Timings() as timings: ...``); until then a marked stage
+costs a global lookup and a function call.
+
+Stage times are inclusive: a stage that runs inside another (the antimeridian
+fix inside MapSheet construction, say) is counted in both. Each stage's own
+time, without the stages run inside it, is kept too; ``Timings.phases`` adds
+those up by PHASES, so that the phases of a run sum to its wall time.
+"""
+
+import functools
+import time
+from typing import NamedTuple
+
+_active = None
+
+# The phase each stage belongs to. Stages not listed, and time outside any
+# stage, count as "other".
+PHASES = {
+    "iter_features": "parse",
+    "geojson.load": "parse",
+    "json.load": "parse",
+    "cache.load": "parse",
+    "DbfReader.iter_records": "parse",
+    "Sheet.__init__": "sheets",
+    "CompactSheet.__init__": "sheets",
+    "MapSheet.__init__": "sheets",
+    "antimeridian.fix_geojson": "sheets",
+    "GeodexSheet.__init__": "sheets",
+    "GeodexSheet.get_dates": "sheets",
+    "GeodexSheet.get_iso": "sheets",
+    "GeodexTable.to_openindexmap": "sheets",
+    "normalize_bounds": "sheets",
+    "Sheet._warn_if_invalid": "validation",
+    "OpenIndexMap.is_valid": "validation",
+    "SchemaValidator.feature_errors": "validation",
+    "jsonschema.validate": "validation",
+    "writer.feature_json": "serialization",
+    "tiles.zoom_tiles": "serialization",
+    "mapping.create_map": "serialization",
+    "cache.store": "output",
+    "output": "output",
+}
+PHASE_ORDER = ["parse", "sheets", "validation", "serialization", "output", "other"]
+
+
+class StageTiming(NamedTuple):
+    """The totals of one stage."""
+
+    name: str
+    calls: int
+    records: int
+    seconds: float
+    self_seconds: float = None  # without the stages run inside this one
+
+    @property
+    def records_per_second(self) -> float:
+        return self.records / self.seconds if self.seconds else None
+
+
+class Timings:
+    """Collects the wall time, calls and records of every stage run while active."""
+
+    def __init__(self):
+        self._stages = {}  # name -> [calls, records, seconds, self_seconds]
+        self._inner = [0.0]  # time in stages run inside each running stage
+        self.seconds = 0.0
+        self._previous = None
+        self._start = None
+
+    def __enter__(self) -> "Timings":
+        global _active
+        self._previous, _active = _active, self
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        global _active
+        self.seconds += time.perf_counter() - self._start
+        _active = self._previous
+
+    def add(
+        self,
+        name: str,
+        seconds: float,
+        calls: int = 1,
+        records: int = None,
+        self_seconds: float = None,
+    ):
+        """
+        Adds a run of a stage; ``records`` defaults to ``calls`` and
+        ``self_seconds`` to ``seconds``.
+        """
+        totals = self._stages.get(name)
+        if totals is None:
+            totals = self._stages[name] = [0, 0, 0.0, 0.0]
+        totals[0] += calls
+        totals[1] += calls if records is None else records
+        totals[2] += seconds
+        totals[3] += seconds if self_seconds is None else self_seconds
+
+    def _enter_stage(self):
+        self._inner.append(0.0)
+
+    def _exit_stage(
+        self, name: str, seconds: float, calls: int = 1, records: int = None
+    ):
+        inner = self._inner.pop()
+        if self._inner:
+            self._inner[-1] += seconds
+        self.add(name, seconds, calls, records, seconds - inner)
+
+    def merge(self, other: "Timings", *, seconds: bool = True):
+        """
+        Adds the stages of another collector, e.g. one from a worker process.
+        With ``seconds=False`` its wall time is left out, for a collector
+        that ran while this one was timing.
+        """
+        for stage in other.stages:
+            self.add(
+                stage.name,
+                stage.seconds,
+                stage.calls,
+                stage.records,
+                stage.self_seconds,
+            )
+        if seconds:
+            self.seconds += other.seconds
+
+    @property
+    def stages(self) -> list[StageTiming]:
+        """The stages in the order they first ran."""
+        return [StageTiming(name, *totals) for name, totals in self._stages.items()]
+
+    def phases(self) -> dict:
+        """The seconds spent in each phase of PHASE_ORDER; they add up to ``seconds``."""
+        phases = dict.fromkeys(PHASE_ORDER, 0.0)
+        for stage in self.stages:
+            phases[PHASES.get(stage.name, "other")] += stage.self_seconds
+        # Parallel workers' stages can add up to more than the wall time.
+        phases["other"] += max(self.seconds - sum(phases.values()), 0.0)
+        return phases
+
+    def report(self) -> dict:
+        """The timings as a JSON-serializable dict."""
+        return {
+            "seconds": self.seconds,
+            "stages": [
+                {
+                    name: value
+                    for name, value in stage._asdict().items()
+                    if name != "self_seconds"
+                }
+                | {"records_per_second": stage.records_per_second}
+                for stage in self.stages
+            ],
+            "phases": self.phases(),
+        }
+
+    def format(self) -> str:
+        """The timings as a text table."""
+        width = max([len(stage.name) for stage in self.stages] + [5])
+        lines = [
+            f"{'stage':<{width}} {'calls':>9} {'records':>9} {'seconds':>9} "
+            f"{'records/s':>11} {'share':>6}"
+        ]
+        for stage in self.stages:
+            rate = stage.records_per_second
+            share = stage.seconds / self.seconds if self.seconds else 0.0
+            lines.append(
+                f"{stage.name:<{width}} {stage.calls:>9} {stage.records:>9} "
+                f"{stage.seconds:>9.3f} {'-' if rate is None else f'{rate:.0f}':>11} "
+                f"{share:>6.1%}"
+            )
+        lines.append(f"{'total':<{width}} {'':>9} {'':>9} {self.seconds:>9.3f}")
+        return "\n".join(lines)
+
+
+def current() -> Timings:
+    """The active collector, or None."""
+    return _active
+
+
+def timed(name: str, records=None):
+    """
+    Decorator that records each call of a function as a run of ``name``.
+    ``records``, if given, is called with the function's arguments and returns
+    the number of records the call handles.
+    """
+
+    def decorate(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            timings = _active
+            if timings is None:
+                return func(*args, **kwargs)
+            count = None if records is None else records(*args, **kwargs)
+            timings._enter_stage()
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                timings._exit_stage(name, time.perf_counter() - start, records=count)
+
+        return wrapper
+
+    return decorate
+
+
+class stage:
+    """
+    Context manager that records its block as one run of ``name``. Set
+    ``records`` on it (before or inside the block) when the block handles
+    more than one record.
+    """
+
+    __slots__ = ("name", "records", "_timings", "_start")
+
+    def __init__(self, name: str, records: int = None):
+        self.name = name
+        self.records = records
+
+    def __enter__(self) -> "stage":
+        self._timings = _active
+        if self._timings is not None:
+            self._timings._enter_stage()
+            self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        if self._timings is not None:
+            seconds = time.perf_counter() - self._start
+            self._timings._exit_stage(self.name, seconds, records=self.records)
+
+
+def timed_iter(name: str, iterable):
+    """Yields from ``iterable``, recording the time to produce each item."""
+    if _active is None:
+        yield from iterable
+        return
+    timings = _active
+    iterator = iter(iterable)
+    while True:
+        timings._enter_stage()
+        start = time.perf_counter()
+        try:
+            item = next(iterator)
+        except StopIteration:
+            timings._exit_stage(name, time.perf_counter() - start, calls=0, records=0)
+            return
+        timings._exit_stage(name, time.perf_counter() - start)
+        yield item
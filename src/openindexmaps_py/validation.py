@@ -0,0 +1,504 @@
+"""
+Compiled, cached JSON Schema validation for OpenIndexMaps.
+
+A schema file is loaded, checked and compiled once per process and cached by
+path and modification time. Features are validated one at a time against the
+schema's ``features.items`` rules: a predicate compiled from the schema (nested
+Python closures, see ``compile_schema``) accepts valid features quickly, and
+jsonschema is only consulted to report every error of a feature that fails.
+
+``validate_files`` checks many files at once (the ``validate`` command): each
+file is streamed through the GeoJSON, JSON Schema and sheet checks, spread
+over a pool of processes that each compile the schema once.
+"""
+
+import copy
+import functools
+import glob
+import json
+import math
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import NamedTuple
+
+import geojson
+from jsonschema.validators import validator_for
+
+from openindexmaps_py.oimpy import BOUNDS, SCHEMA_PATH
+from openindexmaps_py.streaming import iter_features
+from openindexmaps_py.timings import timed
+
+# Keywords that never affect validity (jsonschema does not check "format"
+# unless it is given a format checker; "errorMessage" is an ajv extension).
+_ANNOTATIONS = {
+    "$schema",
+    "$id",
+    "$comment",
+    "title",
+    "description",
+    "default",
+    "examples",
+    "format",
+    "errorMessage",
+    "readOnly",
+    "writeOnly",
+    "deprecated",
+}
+
+_TYPES = {
+    "object": lambda instance: isinstance(instance, dict),
+    "array": lambda instance: isinstance(instance, list),
+    "string": lambda instance: isinstance(instance, str),
+    "null": lambda instance: instance is None,
+    "boolean": lambda instance: isinstance(instance, bool),
+    "number": lambda instance: isinstance(instance, (int, float))
+    and not isinstance(instance, bool),
+    "integer": lambda instance: (
+        isinstance(instance, int) and not isinstance(instance, bool)
+    )
+    or (isinstance(instance, float) and instance.is_integer()),
+}
+
+
+class _Unsupported(Exception):
+    """Raised while compiling a schema that uses a keyword we do not compile."""
+
+
+def _json_equal(one, two) -> bool:
+    """Equality as JSON Schema defines it, where true is not 1."""
+    if isinstance(one, bool) or isinstance(two, bool):
+        return isinstance(one, bool) and isinstance(two, bool) and one == two
+    if isinstance(one, dict) and isinstance(two, dict):
+        return one.keys() == two.keys() and all(
+            _json_equal(one[key], two[key]) for key in one
+        )
+    if isinstance(one, list) and isinstance(two, list):
+        return len(one) == len(two) and all(map(_json_equal, one, two))
+    return one == two
+
+
+def _always(instance) -> bool:
+    return True
+
+
+def _never(instance) -> bool:
+    return False
+
+
+def _compile_type(value):
+    names = [value] if isinstance(value, str) else list(value)
+    try:
+        checks = [_TYPES[name] for name in names]
+    except KeyError as e:
+        raise _Unsupported(f"type {e}")
+    if len(checks) == 1:
+        return checks[0]
+    return lambda instance: any(check(instance) for check in checks)
+
+
+def _compile_object_members(schema: dict):
+    properties = {
+        name: _compile(subschema)
+        for name, subschema in schema.get("properties", {}).items()
+    }
+    patterns = [
+        (re.compile(pattern), _compile(subschema))
+        for pattern, subschema in schema.get("patternProperties", {}).items()
+    ]
+    additional = _compile(schema.get("additionalProperties", True))
+
+    def check(instance):
+        if not isinstance(instance, dict):
+            return True
+        for name, value in instance.items():
+            matched = False
+            property_check = properties.get(name)
+            if property_check is not None:
+                matched = True
+                if not property_check(value):
+                    return False
+            for pattern, pattern_check in patterns:
+                if pattern.search(name):
+                    matched = True
+                    if not pattern_check(value):
+                        return False
+            if not matched and not additional(value):
+                return False
+        return True
+
+    return check
+
+
+def _compile_keyword(keyword: str, value):
+    if keyword == "type":
+        return _compile_type(value)
+    if keyword == "enum":
+        return lambda instance: any(_json_equal(instance, item) for item in value)
+    if keyword == "const":
+        return lambda instance: _json_equal(instance, value)
+    if keyword == "required":
+        return lambda instance: not isinstance(instance, dict) or all(
+            name in instance for name in value
+        )
+    if keyword == "items":
+        if not isinstance(value, (dict, bool)):
+            raise _Unsupported("items as a list")
+        item_check = _compile(value)
+        return lambda instance: not isinstance(instance, list) or all(
+            item_check(item) for item in instance
+        )
+    if keyword == "minItems":
+        return lambda instance: not isinstance(instance, list) or len(instance) >= value
+    if keyword == "maxItems":
+        return lambda instance: not isinstance(instance, list) or len(instance) <= value
+    if keyword == "minLength":
+        return lambda instance: not isinstance(instance, str) or len(instance) >= value
+    if keyword == "maxLength":
+        return lambda instance: not isinstance(instance, str) or len(instance) <= value
+    if keyword == "pattern":
+        pattern = re.compile(value)
+        return lambda instance: not isinstance(instance, str) or bool(
+            pattern.search(instance)
+        )
+    if keyword in ("minimum", "maximum", "exclusiveMinimum", "exclusiveMaximum"):
+        if not _TYPES["number"](value):
+            raise _Unsupported(f"{keyword} {value!r}")
+        compare = {
+            "minimum": lambda instance: instance >= value,
+            "maximum": lambda instance: instance <= value,
+            "exclusiveMinimum": lambda instance: instance > value,
+            "exclusiveMaximum": lambda instance: instance < value,
+        }[keyword]
+        is_number = _TYPES["number"]
+        return lambda instance: not is_number(instance) or compare(instance)
+    if keyword == "not":
+        negated = _compile(value)
+        return lambda instance: not negated(instance)
+    if keyword in ("oneOf", "anyOf", "allOf"):
+        checks = [_compile(subschema) for subschema in value]
+        if keyword == "allOf":
+            return lambda instance: all(check(instance) for check in checks)
+        if keyword == "anyOf":
+            return lambda instance: any(check(instance) for check in checks)
+        return lambda instance: sum(1 for check in checks if check(instance)) == 1
+    raise _Unsupported(keyword)
+
+
+def _compile(schema):
+    if schema is True or schema == {}:
+        return _always
+    if schema is False:
+        return _never
+    if not isinstance(schema, dict):
+        raise _Unsupported(repr(schema))
+    checks = []
+    object_keywords = ("properties", "patternProperties", "additionalProperties")
+    if any(keyword in schema for keyword in object_keywords):
+        checks.append(_compile_object_members(schema))
+    for keyword, value in schema.items():
+        if keyword in _ANNOTATIONS or keyword in object_keywords:
+            continue
+        checks.append(_compile_keyword(keyword, value))
+    if not checks:
+        return _always
+    if len(checks) == 1:
+        return checks[0]
+    return lambda instance: all(check(instance) for check in checks)
+
+
+def compile_schema(schema):
+    """
+    Compiles a JSON Schema into a predicate ``instance -> bool``.
+
+    Returns None when the schema uses a keyword (such as ``$ref``) that is not
+    compiled, in which case callers should use jsonschema directly.
+    """
+    try:
+        return _compile(schema)
+    except (_Unsupported, re.error):
+        return None
+
+
+def _uses_refs(schema) -> bool:
+    if isinstance(schema, dict):
+        return "$ref" in schema or any(_uses_refs(value) for value in schema.values())
+    if isinstance(schema, list):
+        return any(_uses_refs(value) for value in schema)
+    return False
+
+
+class SchemaValidator:
+    """
+    An OpenIndexMap JSON Schema, checked and compiled once.
+
+    Collections are validated as an envelope (everything but the members of
+    ``features``) plus one validation per feature, so the cost grows linearly
+    with the number of features and every feature's errors are reported.
+    """
+
+    def __init__(self, schema: dict):
+        validator_class = validator_for(schema)
+        validator_class.check_schema(schema)
+        self.schema = schema
+        self._validator = validator_class(schema)
+
+        features_schema = schema.get("properties", {}).get("features", {})
+        items_schema = features_schema.get("items")
+        if isinstance(items_schema, dict) and not _uses_refs(schema):
+            envelope_schema = copy.deepcopy(schema)
+            del envelope_schema["properties"]["features"]["items"]
+            self._envelope_validator = validator_class(envelope_schema)
+            self._feature_validator = validator_class(items_schema)
+            self._feature_check = compile_schema(items_schema)
+        else:
+            self._envelope_validator = self._validator
+            self._feature_validator = None
+            self._feature_check = None
+
+    @classmethod
+    def from_file(cls, schema_path: str) -> "SchemaValidator":
+        with open(schema_path, "r") as schema_file:
+            return cls(json.load(schema_file))
+
+    @timed("SchemaValidator.feature_errors")
+    def feature_errors(self, feature: dict) -> list:
+        """Returns every ValidationError of a single feature."""
+        if self._feature_validator is None:
+            return []
+        if self._feature_check is not None and self._feature_check(feature):
+            return []
+        return list(self._feature_validator.iter_errors(feature))
+
+    def iter_feature_errors(self, features):
+        """Yields (index, errors) for each feature that has errors."""
+        for index, feature in enumerate(features):
+            errors = self.feature_errors(feature)
+            if errors:
+                yield index, errors
+
+    def iter_errors(self, instance: dict):
+        """Yields every ValidationError, with paths relative to the collection."""
+        yield from self._envelope_validator.iter_errors(instance)
+        if self._feature_validator is None or not isinstance(instance, dict):
+            return
+        features = instance.get("features")
+        if not isinstance(features, list):
+            return
+        for index, errors in self.iter_feature_errors(features):
+            for error in errors:
+                error.path.extendleft([index, "features"])
+                yield error
+
+    def iter_stream_errors(self, features, members: dict):
+        """
+        Yields every ValidationError of a collection read as a stream: the
+        errors of each feature as it comes, then those of the envelope, built
+        from ``members`` once ``features`` is exhausted (as ``iter_features``
+        fills it). Schemas that cannot be split need the whole collection,
+        which is then assembled in memory.
+        """
+        if self._feature_validator is None:
+            features = list(features)
+            yield from self._validator.iter_errors({**members, "features": features})
+            return
+        count = 0
+
+        def counted():
+            nonlocal count
+            for feature in features:
+                count += 1
+                yield feature
+
+        for index, errors in self.iter_feature_errors(counted()):
+            for error in errors:
+                error.path.extendleft([index, "features"])
+                yield error
+        # The envelope schema has no "items": placeholders keep minItems and
+        # the like working at a pointer per feature.
+        envelope = {**members, "features": [None] * count}
+        yield from self._envelope_validator.iter_errors(envelope)
+
+    def is_valid(self, instance: dict) -> bool:
+        return next(self.iter_errors(instance), None) is None
+
+
+_validators = {}
+
+
+def get_validator(schema_path: str = SCHEMA_PATH) -> SchemaValidator:
+    """Returns the compiled validator for a schema file, cached by path and mtime."""
+    path = os.path.abspath(schema_path)
+    key = (path, os.stat(path).st_mtime_ns)
+    validator = _validators.get(key)
+    if validator is None:
+        # Drop validators compiled from an older version of the same file.
+        for stale in [cached for cached in _validators if cached[0] == path]:
+            del _validators[stale]
+        validator = _validators[key] = SchemaValidator.from_file(path)
+    return validator
+
+
+_LIMITS = {"west": 180, "east": 180, "south": 90, "north": 90}
+
+
+def _issue(check: str, path: str, message: str) -> dict:
+    return {"check": check, "path": path, "message": message}
+
+
+def _geometry_errors(geometry, path: str) -> list:
+    if geometry is None:
+        return []
+    if not isinstance(geometry, dict):
+        return [_issue("geojson", path, "geometry is not an object")]
+    if geometry.get("type") == "GeometryCollection":
+        members = geometry.get("geometries")
+        if not isinstance(members, list):
+            return [_issue("geojson", path, "geometries is not an array")]
+        return [
+            issue
+            for i, member in enumerate(members)
+            for issue in _geometry_errors(member, f"{path}.geometries[{i}]")
+        ]
+    try:
+        errors = geojson.GeoJSON.to_instance(geometry, strict=True).errors()
+    except (AttributeError, TypeError, ValueError) as e:
+        return [_issue("geojson", path, str(e))]
+    if isinstance(errors, list):
+        errors = "; ".join(str(error) for error in errors if error)
+    return [_issue("geojson", path, errors)] if errors else []
+
+
+def geojson_errors(feature, path: str = "$") -> list:
+    """The problems the geojson package finds with a Feature and its geometry."""
+    if not isinstance(feature, dict) or feature.get("type") != "Feature":
+        return [_issue("geojson", path, "not a GeoJSON Feature")]
+    return _geometry_errors(feature.get("geometry"), f"{path}.geometry")
+
+
+def sheet_errors(feature, path: str = "$") -> list:
+    """
+    Problems with the sheet a Feature describes: bounds that are not numbers or
+    out of range, and a south edge north of the north edge. The schema lets
+    bounds be left out or null, so those are not problems.
+    """
+    properties = feature.get("properties") if isinstance(feature, dict) else None
+    if not isinstance(properties, dict):
+        return [_issue("sheet", f"{path}.properties", "properties is not an object")]
+    issues = []
+    for name in BOUNDS:
+        value = properties.get(name)
+        if value is None:
+            continue
+        if not isinstance(value, (int, float)) or isinstance(value, bool):
+            message = f"{name} {value!r} is not a number"
+            issues.append(_issue("sheet", f"{path}.properties.{name}", message))
+        elif not math.isfinite(value) or abs(value) > _LIMITS[name]:
+            message = f"{name} {value!r} is outside -{_LIMITS[name]}..{_LIMITS[name]}"
+            issues.append(_issue("sheet", f"{path}.properties.{name}", message))
+    south, north = properties.get("south"), properties.get("north")
+    if not issues and south is not None and north is not None and south > north:
+        message = f"south {south!r} is north of north {north!r}"
+        issues.append(_issue("sheet", f"{path}.properties", message))
+    return issues
+
+
+class FileReport(NamedTuple):
+    """The outcome of validating one file."""
+
+    file: str
+    features: int
+    errors: list  # {"check", "path", "message"} dicts
+    seconds: float
+
+    @property
+    def valid(self) -> bool:
+        return not self.errors
+
+    def to_dict(self) -> dict:
+        return {
+            "file": self.file,
+            "valid": self.valid,
+            "features": self.features,
+            "seconds": round(self.seconds, 6),
+            "errors": self.errors,
+        }
+
+
+def validate_file(path, schema_path: str = SCHEMA_PATH) -> FileReport:
+    """
+    Streams a file through the GeoJSON, JSON Schema and sheet checks and
+    reports every error with its JSON path. ``schema_path=None`` skips the
+    schema. Errors reading the file are reported, not raised.
+    """
+    start = time.perf_counter()
+    errors, count = [], 0
+
+    def checked(features):
+        nonlocal count
+        for index, feature in enumerate(features):
+            count += 1
+            errors.extend(geojson_errors(feature, f"$.features[{index}]"))
+            errors.extend(sheet_errors(feature, f"$.features[{index}]"))
+            yield feature
+
+    try:
+        validator = get_validator(schema_path) if schema_path else None
+        with open(path, "r") as file:
+            members = {}
+            features = checked(iter_features(file, members=members))
+            if validator is None:
+                for _ in features:
+                    pass
+            else:
+                for error in validator.iter_stream_errors(features, members):
+                    errors.append(_issue("schema", error.json_path, error.message))
+            if members.get("type") != "FeatureCollection":
+                message = "not a GeoJSON FeatureCollection"
+                errors.append(_issue("geojson", "$.type", message))
+    except (OSError, ValueError) as e:
+        errors.append(_issue("json", "$", f"{type(e).__name__}: {e}"))
+    return FileReport(str(path), count, errors, time.perf_counter() - start)
+
+
+def find_files(paths, pattern: str = "*.geojson") -> list[Path]:
+    """
+    Expands directories (every file matching ``pattern`` below them) and glob
+    patterns into a sorted list of files without duplicates.
+    """
+    files = set()
+    for path in paths:
+        path = str(path)
+        if os.path.isdir(path):
+            files.update(p for p in Path(path).rglob(pattern) if p.is_file())
+        elif glob.has_magic(path):
+            files.update(Path(p) for p in glob.glob(path, recursive=True))
+        else:
+            files.add(Path(path))
+    return sorted(files)
+
+
+def validate_files(files, *, schema_path: str = SCHEMA_PATH, jobs: int = 1):
+    """
+    Validates many files, spread over ``jobs`` processes (all cores when 0).
+    Every worker compiles the schema once. Yields a FileReport per file, in
+    the order of ``files``.
+    """
+    files = list(files)
+    jobs = jobs or os.cpu_count()
+    check = functools.partial(validate_file, schema_path=schema_path)
+    if jobs == 1 or len(files) < 2:
+        yield from (check(path) for path in files)
+        return
+    workers = min(jobs, len(files))
+    # Hand out a few small batches per worker: fewer round trips for many
+    # small files, and still some balancing when sizes differ.
+    chunksize = max(1, len(files) // (workers * 4))
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        initializer=get_validator if schema_path else None,
+        initargs=(schema_path,) if schema_path else (),
+    ) as pool:
+        yield from pool.map(check, files, chunksize=chunksize)
@@ -0,0 +1,187 @@
+"""
+Streaming GeoJSON output.
+
+Features are serialized one at a time straight to a file handle. Coordinates
+are rounded and polygon rings wound in RFC 7946 order (exterior rings
+counterclockwise, holes clockwise) while each geometry is copied for output,
+instead of dumping a whole collection and re-parsing it with geojson_rewind.
+"""
+
+import json
+
+import numpy as np
+from geojson_rewind.rewind import rewindRings
+
+from openindexmaps_py.timings import timed
+
+
+class OutputFeature(dict):
+    """
+    A feature dict that is already in output form: coordinates rounded and
+    rings wound. It is written as is, whatever the ``precision``.
+    """
+
+
+def round_floats(values: np.ndarray, precision: int = 6) -> np.ndarray:
+    """
+    Rounds a float array exactly as ``round(value, precision)`` rounds each value.
+
+    NumPy's scale-and-round can differ from ``round`` when the scaled value is
+    within rounding error of a tie; those few values are redone with ``round``.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    scale = 10.0**precision
+    scaled = values * scale
+    rounded = np.rint(scaled) / scale
+    with np.errstate(invalid="ignore"):
+        distance = np.abs(scaled - np.floor(scaled) - 0.5)
+        doubtful = (distance <= np.abs(scaled) * 1e-15 + 1e-9) | (
+            np.abs(scaled) >= 2.0**52
+        )
+    doubtful &= np.isfinite(values)
+    for index in zip(*np.nonzero(doubtful)):
+        rounded[index] = round(float(values[index]), precision)
+    rounded[~np.isfinite(values)] = values[~np.isfinite(values)]
+    return rounded
+
+
+def _round_coordinates(coordinates, precision):
+    if isinstance(coordinates, (list, tuple)):
+        return [_round_coordinates(value, precision) for value in coordinates]
+    if isinstance(coordinates, float) and precision is not None:
+        return round(coordinates, precision)
+    return coordinates
+
+
+def output_geometry(geometry: dict, precision: int = 6) -> dict:
+    """Returns a copy of a geometry with rounded, RFC 7946-wound coordinates."""
+    if not geometry:
+        return geometry
+    geometry_type = geometry.get("type")
+    output = dict(geometry)
+    if geometry_type == "GeometryCollection":
+        output["geometries"] = [
+            output_geometry(member, precision) for member in geometry["geometries"]
+        ]
+        return output
+    coordinates = _round_coordinates(geometry.get("coordinates"), precision)
+    if geometry_type == "Polygon":
+        coordinates = rewindRings(coordinates, True)
+    elif geometry_type == "MultiPolygon":
+        coordinates = [rewindRings(polygon, True) for polygon in coordinates]
+    output["coordinates"] = coordinates
+    return output
+
+
+def output_feature(feature, precision: int = 6) -> dict:
+    """Returns the plain dict written for a feature."""
+    if isinstance(feature, OutputFeature):
+        return feature
+    mapping = getattr(feature, "__geo_interface__", feature)
+    output = dict(mapping)
+    output["geometry"] = output_geometry(mapping.get("geometry"), precision)
+    return output
+
+
+@timed("writer.feature_json")
+def feature_json(
+    feature, *, indent: int = None, precision: int = 6, ensure_ascii: bool = True
+) -> str:
+    """Serializes a single feature."""
+    return json.dumps(
+        output_feature(feature, precision),
+        indent=indent,
+        ensure_ascii=ensure_ascii,
+        allow_nan=False,
+    )
+
+
+class _Layout:
+    """The text around and between the features of a written collection."""
+
+    def __init__(self, indent, ensure_ascii: bool, members: dict = None):
+        collection = {"type": "FeatureCollection", **(members or {})}
+        head = json.dumps(collection, indent=indent, ensure_ascii=ensure_ascii)
+        head = head[:-1].rstrip("\n")
+        if indent is None:
+            head += ", "
+            self.separator, self.item_prefix = ", ", ""
+            self.tail = self.empty_tail = "]}"
+        else:
+            pad = " " * indent if isinstance(indent, int) else indent
+            head += ",\n" + pad
+            self.separator, self.item_prefix = ",", "\n" + pad * 2
+            self.tail, self.empty_tail = "\n" + pad + "]\n}", "]\n}"
+        self.head = head + '"features": ['
+
+
+def write_features(
+    fp,
+    features,
+    *,
+    indent: int = None,
+    precision: int = 6,
+    ensure_ascii: bool = True,
+    continued: bool = False,
+) -> int:
+    """
+    Writes the features of a collection without the text around them, as
+    ``write_feature_collection`` lays them out. Joined with
+    ``feature_separator(indent)``, such runs make up one collection's
+    ``features``; ``continued`` writes the separator before the first feature
+    of a run that follows others. Returns the number of features written.
+    """
+    layout = _Layout(indent, ensure_ascii)
+    count = 0
+    for feature in features:
+        text = feature_json(
+            feature, indent=indent, precision=precision, ensure_ascii=ensure_ascii
+        )
+        if indent is not None:
+            text = text.replace("\n", layout.item_prefix)
+        separator = layout.separator if count or continued else ""
+        fp.write(separator + layout.item_prefix + text)
+        count += 1
+    return count
+
+
+def feature_separator(indent: int = None) -> str:
+    """The text between two features written by ``write_features``."""
+    return _Layout(indent, True).separator
+
+
+def write_collection_head(
+    fp, *, indent: int = None, ensure_ascii: bool = True, members: dict = None
+):
+    """Writes the start of a collection, up to its first feature."""
+    fp.write(_Layout(indent, ensure_ascii, members).head)
+
+
+def write_collection_tail(fp, count: int, *, indent: int = None):
+    """Writes the end of a collection of ``count`` features."""
+    layout = _Layout(indent, True)
+    fp.write(layout.tail if count else layout.empty_tail)
+
+
+def write_feature_collection(
+    fp,
+    features,
+    *,
+    indent: int = None,
+    precision: int = 6,
+    ensure_ascii: bool = True,
+    members: dict = None,
+) -> int:
+    """
+    Writes a FeatureCollection to an open text file, one feature at a time.
+
+    The output is the same as ``json.dumps`` of the whole collection with the
+    same ``indent``. ``members`` are extra top-level members written before
+    ``features``. Returns the number of features written.
+    """
+    write_collection_head(fp, indent=indent, ensure_ascii=ensure_ascii, members=members)
+    count = write_features(
+        fp, features, indent=indent, precision=precision, ensure_ascii=ensure_ascii
+    )
+    write_collection_tail(fp, count, indent=indent)
+    return count
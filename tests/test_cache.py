@@ -0,0 +1,145 @@
+import io
+import json
+import os
+import shutil
+
+import pytest
+from openindexmaps_py import cache as oimcache
+from openindexmaps_py.cache import IndexCache, default_cache_dir
+from openindexmaps_py.columnar import ColumnarOpenIndexMap, SheetColumns, read_columns
+from openindexmaps_py.oimpy import OpenIndexMap
+
+FIXTURE = "tests/fixture/f0303_OIM.geojson"
+
+
+@pytest.fixture
+def source(tmp_path):
+    path = tmp_path / "source.geojson"
+    shutil.copy(FIXTURE, path)
+    return path
+
+
+@pytest.fixture
+def index_cache(tmp_path):
+    return IndexCache(tmp_path / "cache", max_bytes=10 * 1024 * 1024)
+
+
+def test_save_and_load_round_trip(tmp_path):
+    columns = read_columns("tests/fixture/MillionthMap.geojson")
+    columns.save(tmp_path / "columns.npz")
+    loaded = SheetColumns.load(tmp_path / "columns.npz")
+    assert len(loaded) == len(columns)
+    assert loaded.rows() == columns.rows()
+    assert (loaded.bounds() == columns.bounds()).all()
+    # The loaded store can still grow.
+    loaded.append({"label": "new", "west": 1.5})
+    assert loaded.row(-1) == {"label": "new", "west": 1.5}
+    assert loaded.rows(0, len(columns)) == columns.rows()
+
+
+def test_sources_round_trip(tmp_path):
+    columns = read_columns("tests/fixture/f0168.geojson", sources=True)
+    assert columns.sources.members["name"] == "f0002-ND"
+    columns.save(tmp_path / "columns.npz")
+    loaded = SheetColumns.load(tmp_path / "columns.npz")
+    with open("tests/fixture/f0168.geojson") as file:
+        features = json.load(file)["features"]
+    assert list(loaded.source_features([3, 0])) == [features[3], features[0]]
+    assert loaded.sources.members == columns.sources.members
+    assert read_columns(FIXTURE).sources is None
+
+
+def test_take():
+    columns = read_columns(FIXTURE)
+    taken = columns.take([5, 0, 5])
+    assert taken.rows() == [columns.row(5), columns.row(0), columns.row(5)]
+    assert len(columns.take([])) == 0
+
+
+def test_encoded_bounds():
+    columns = SheetColumns.from_properties(
+        [{"west": 1.0}, {"west": 1}, {"west": "1"}, {}, {"west": 1.0}, {"west": None}]
+    )
+    assert columns.column("west") == [1.0, 1, "1", None, 1.0, None]
+    values, codes = columns.encoded("west")
+    assert codes[0] == codes[4] and codes[3] == -1
+    assert len(values) == 4
+
+
+def test_cache_hit_skips_parsing(source, index_cache, monkeypatch):
+    expected = str(OpenIndexMap.from_file(source))
+    first = OpenIndexMap.from_file(source, cache=index_cache)
+    assert isinstance(first, ColumnarOpenIndexMap)
+    assert len(index_cache.entries()) == 1
+
+    def fail(file_path):
+        raise AssertionError("parsed again")
+
+    monkeypatch.setattr(oimcache, "read_columns", fail)
+    second = OpenIndexMap.from_file(source, cache=index_cache)
+    assert str(first) == str(second) == expected
+
+
+def test_changed_file_is_parsed_again(source, index_cache):
+    index_cache.columns(source)
+    with open(source, "a") as file:
+        file.write("\n")
+    assert len(index_cache.columns(source)) == 91
+    assert len(index_cache.entries()) == 2
+
+
+def test_content_hash_in_key(source, tmp_path):
+    plain = IndexCache(tmp_path / "cache")
+    hashing = IndexCache(tmp_path / "cache", hash_content=True)
+    keys = plain.key(source), hashing.key(source)
+    # An edit that keeps the size and modification time.
+    status = os.stat(source)
+    source.write_text(source.read_text().replace("35-3", "35-4"))
+    os.utime(source, ns=(status.st_atime_ns, status.st_mtime_ns))
+    assert plain.key(source) == keys[0]
+    assert hashing.key(source) != keys[1]
+
+
+def test_least_recently_used_entries_are_evicted(source, tmp_path):
+    unbounded = IndexCache(tmp_path / "cache", max_bytes=10**9)
+    unbounded.columns(source)
+    entry_size = unbounded.size()
+    bounded = IndexCache(tmp_path / "cache", max_bytes=2 * entry_size)
+    others = []
+    for i in range(2):
+        other = tmp_path / f"other{i}.geojson"
+        shutil.copy(FIXTURE, other)
+        others.append(other)
+    bounded.columns(others[0])
+    entries = {entry.stem: entry for entry in bounded.entries()}
+    os.utime(entries[bounded.key(source)], ns=(10**9, 10**9))
+    os.utime(entries[bounded.key(others[0])], ns=(2 * 10**9, 2 * 10**9))
+    bounded.load(bounded.key(source))  # the oldest entry is used again
+    bounded.columns(others[1])
+    assert bounded.size() <= 2 * entry_size
+    keys = {entry.stem for entry in bounded.entries()}
+    assert keys == {bounded.key(source), bounded.key(others[1])}
+    assert bounded.clear() == 2
+
+
+def test_unreadable_entry_is_discarded(source, index_cache):
+    index_cache.columns(source)
+    (entry,) = index_cache.entries()
+    entry.write_bytes(b"not an npz file")
+    assert index_cache.load(index_cache.key(source)) is None
+    assert not entry.exists()
+
+
+def test_default_cache_dir(monkeypatch, tmp_path):
+    monkeypatch.setenv("OIMPY_CACHE_DIR", str(tmp_path))
+    assert default_cache_dir() == tmp_path
+    assert IndexCache().directory == tmp_path
+
+
+def test_from_file_cache_true(source, monkeypatch, tmp_path):
+    monkeypatch.setenv("OIMPY_CACHE_DIR", str(tmp_path / "default"))
+    oim = ColumnarOpenIndexMap.from_file(source, cache=True)
+    output = io.StringIO()
+    oim.write(output)
+    assert output.getvalue() == str(OpenIndexMap.from_file(source))
+    assert len(list((tmp_path / "default").iterdir())) == 1
@@ -0,0 +1,107 @@
+import json
+import geojson
+from openindexmaps_py.columnar import ColumnarOpenIndexMap, SheetColumns
+from openindexmaps_py.oimpy import MapSheet, OpenIndexMap, Sheet
+from openindexmaps_py.testfeatures import SimpleTestMapSheets
+from openindexmaps_py.writer import output_feature
+
+
+def sample_properties():
+    return [
+        SimpleTestMapSheets.sheet,
+        SimpleTestMapSheets.inset_map_sheet,
+        SimpleTestMapSheets.two_inset_map_sheet,
+        {"label": "1", "west": 1, "east": 2.5, "south": None, "available": True},
+    ]
+
+
+def test_columns_round_trip():
+    columns = SheetColumns.from_properties(sample_properties())
+    assert len(columns) == 4
+    for i, properties in enumerate(sample_properties()):
+        row = columns.row(i)
+        assert row == properties
+        assert list(row) == list(properties)
+        assert [type(v) for v in row.values()] == [type(v) for v in properties.values()]
+
+
+def test_columns_grow_and_bounds():
+    columns = SheetColumns(capacity=1)
+    for properties in sample_properties():
+        columns.append(properties)
+    bounds = columns.bounds()
+    assert bounds.shape == (4, 4)
+    assert bounds[0].tolist() == [-87.95, 42.97511111111111, -87.85, 43.07511111111111]
+    assert columns.column("label") == ["14924", "998", "997", "1"]
+
+
+def test_mutable_values_are_copied():
+    columns = SheetColumns.from_properties(sample_properties())
+    columns.row(1)["inset"].clear()
+    assert len(columns.row(1)["inset"]) == 1
+
+
+def test_columnar_features_behave_like_sheets(tmp_path):
+    path = tmp_path / "oim.geojson"
+    oim = OpenIndexMap([Sheet(properties) for properties in sample_properties()[:3]])
+    path.write_text(str(oim))
+
+    columnar = ColumnarOpenIndexMap.from_file(str(path))
+    assert len(columnar.features) == 3
+    assert all(isinstance(sheet, Sheet) for sheet in columnar.features)
+    assert columnar["type"] != "Feature"
+    assert columnar.features[-1].label == "997"
+    assert json.loads(geojson.dumps(columnar)) == json.loads(geojson.dumps(oim))
+
+    columnar.add_sheet(Sheet(SimpleTestMapSheets.antimeridian_sheet))
+    assert len(columnar.__geo_interface__["features"]) == 4
+    assert columnar.to_openindexmap().features[3].label == "999"
+
+
+def test_columnar_compute_bbox():
+    columnar = ColumnarOpenIndexMap([Sheet(p) for p in sample_properties()[:3]])
+    expected = OpenIndexMap([Sheet(p) for p in sample_properties()[:3]]).compute_bbox()
+    assert columnar.compute_bbox() == expected
+    columnar.add_sheet(Sheet(SimpleTestMapSheets.antimeridian_sheet))
+    assert columnar.compute_bbox() == [-180.0, -5.0, 180.0, 43.07511111111111]
+
+
+def test_columns_rows_match_row():
+    columns = SheetColumns.from_properties(sample_properties())
+    assert columns.rows() == [columns.row(i) for i in range(4)]
+    assert columns.rows(1, 3) == [columns.row(1), columns.row(2)]
+    columns.rows()[1]["inset"].clear()
+    assert len(columns.row(1)["inset"]) == 1
+
+
+def test_columnar_write_matches_sheets():
+    properties = sample_properties()[:3] + [
+        SimpleTestMapSheets.antimeridian_sheet,
+        {"label": "cw", "west": 2.5, "east": 1.25, "south": 1.0, "north": 2.0},
+        {"label": "line", "west": 1.0, "east": 1.0000001, "south": 1.0, "north": 2.0},
+        {"label": "far", "west": 170.0, "east": 190.0, "south": 1.0, "north": 2.0},
+        {"label": "type", "type": "x", "west": 1.0, "east": 2.0, "south": 1.0},
+        {"label": "tie", "west": 0.0000005, "east": 1.0000015, "south": 0.5},
+    ]
+    sheets = [Sheet(p) for p in properties]
+    columnar = ColumnarOpenIndexMap(sheets)
+    assert str(columnar) == str(OpenIndexMap(sheets))
+    assert str(columnar) == str(ColumnarOpenIndexMap(sheets, sheet_class=MapSheet))
+
+
+def test_taken_columns_share_value_tables():
+    columns = SheetColumns.from_properties([{"label": "a"}, {"label": "b"}])
+    taken = columns.take([1])
+    taken.append({"label": "c"})
+    columns.append({"label": "d"})
+    assert taken.column("label") == ["b", "c"]
+    assert columns.column("label") == ["a", "b", "d"]
+
+
+def test_keys_and_geometries():
+    oim = ColumnarOpenIndexMap.from_file("tests/fixture/f0303_OIM.geojson")
+    assert oim.columns.keys() == list(
+        dict.fromkeys(key for sheet in oim.features for key in sheet.properties)
+    )
+    expected = [output_feature(sheet)["geometry"] for sheet in oim.features]
+    assert [json.dumps(g) for g in oim.geometries()] == list(map(json.dumps, expected))
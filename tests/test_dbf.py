@@ -0,0 +1,128 @@
+import contextlib
+import io
+import struct
+
+import pytest
+from openindexmaps_py.dbf import DbfReader
+from openindexmaps_py.geodex import GeodexGeoJSON, GeodexTable, convert_geodex
+
+FIXTURE = "tests/fixture/f0168"
+
+
+def write_dbf(path, fields, records, *, deleted=(), encoding="latin-1"):
+    """
+    Writes a dBASE III table. ``fields`` are (name, type, length, decimals);
+    values are written as given, right-aligned for N and F fields.
+    """
+    record_length = 1 + sum(length for _, _, length, _ in fields)
+    header_length = 32 + 32 * len(fields) + 1
+    header = struct.pack(
+        "<B3BIHH20x", 3, 124, 1, 1, len(records), header_length, record_length
+    )
+    for name, kind, length, decimals in fields:
+        header += struct.pack(
+            "<11sc4xBB14x", name.encode("ascii"), kind.encode("ascii"), length, decimals
+        )
+    body = b""
+    for row, values in enumerate(records):
+        body += b"*" if row in deleted else b" "
+        for (_, kind, length, _), value in zip(fields, values):
+            text = "" if value is None else str(value)
+            text = text.rjust(length) if kind in "NF" else text.ljust(length)
+            body += text.encode(encoding)[:length].ljust(length)
+    path.write_bytes(header + b"\r" + body + b"\x1a")
+    return path
+
+
+FIELDS = [
+    ("RECORD", "C", 12, 0),
+    ("SCALE", "N", 9, 0),
+    ("X1", "N", 19, 11),
+    ("Y1", "F", 12, 5),
+    ("HOLD", "L", 1, 0),
+]
+
+
+def test_decodes_field_types(tmp_path):
+    path = write_dbf(
+        tmp_path / "types.dbf",
+        FIELDS,
+        [
+            ["45-3", 100000, "17.33333", "48.0", "T"],
+            ["Kärnten", None, "*******", "", "?"],
+            ["deleted", 1, "1.0", "1.0", "F"],
+            ["", "15", "-0.5", "2e1", "n"],
+        ],
+        deleted={2},
+    )
+    with DbfReader(path) as reader:
+        assert len(reader) == 4
+        assert [field.name for field in reader.fields] == [f[0] for f in FIELDS]
+        records = list(reader.iter_records())
+    assert records == [
+        {"RECORD": "45-3", "SCALE": 100000, "X1": 17.33333, "Y1": 48.0, "HOLD": True},
+        {"RECORD": "Kärnten", "SCALE": None, "X1": None, "Y1": None, "HOLD": None},
+        {"RECORD": None, "SCALE": 15, "X1": -0.5, "Y1": 20.0, "HOLD": False},
+    ]
+    assert type(records[0]["SCALE"]) is int
+
+
+def test_decimals_in_integer_field(tmp_path):
+    fields = [("SCALE", "N", 9, 0)]
+    path = write_dbf(tmp_path / "scale.dbf", fields, [[100000], ["1.5"]])
+    with DbfReader(path) as reader:
+        assert next(reader.iter_columns()) == {"SCALE": [100000.0, 1.5]}
+
+
+def test_encoding_from_cpg(tmp_path):
+    fields = [("LOCATION", "C", 20, 0)]
+    path = write_dbf(tmp_path / "utf8.dbf", fields, [["Kärnten"]], encoding="utf-8")
+    with DbfReader(path) as reader:
+        assert next(reader.iter_records())["LOCATION"] == "KÃ¤rnten"
+    (tmp_path / "utf8.cpg").write_text("UTF-8")
+    with DbfReader(path) as reader:
+        assert next(reader.iter_records())["LOCATION"] == "Kärnten"
+
+
+def test_batches(tmp_path):
+    fields = [("RECORD", "N", 6, 0)]
+    path = write_dbf(
+        tmp_path / "batches.dbf",
+        fields,
+        [[row] for row in range(25)],
+        deleted={3, 10},
+    )
+    with DbfReader(path) as reader:
+        batches = list(reader.iter_columns(batch_size=10))
+        records = list(reader.iter_records(["RECORD"], batch_size=7))
+    assert [len(batch["RECORD"]) for batch in batches] == [9, 9, 5]
+    expected = [row for row in range(25) if row not in (3, 10)]
+    assert sum((batch["RECORD"] for batch in batches), []) == expected
+    assert [record["RECORD"] for record in records] == expected
+
+
+def test_not_a_dbf(tmp_path):
+    (tmp_path / "empty.dbf").write_bytes(b"")
+    with pytest.raises(ValueError):
+        DbfReader(tmp_path / "empty.dbf")
+
+
+def test_from_dbf_matches_geojson_export():
+    with contextlib.redirect_stdout(io.StringIO()):
+        from_dbf = GeodexGeoJSON.from_dbf(f"{FIXTURE}.dbf", batch_size=100)
+        from_geojson = GeodexGeoJSON.from_geojson_file(f"{FIXTURE}.geojson")
+        expected = str(from_geojson.to_openindexmap(VALIDATE=False))
+        assert str(from_dbf.to_openindexmap(VALIDATE=False)) == expected
+
+    table = GeodexTable.from_dbf(f"{FIXTURE}.dbf", batch_size=100)
+    assert len(table) == len(from_dbf.features)
+    written = io.StringIO()
+    table.to_openindexmap(VALIDATE=False).write(written)
+    assert written.getvalue() == expected
+
+
+def test_convert_geodex_reads_dbf():
+    from_dbf, from_geojson = io.StringIO(), io.StringIO()
+    assert convert_geodex(f"{FIXTURE}.dbf", from_dbf) == 757
+    convert_geodex(f"{FIXTURE}.geojson", from_geojson)
+    assert from_dbf.getvalue() == from_geojson.getvalue()
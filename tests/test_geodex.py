@@ -0,0 +1,298 @@
+import contextlib
+import io
+import json
+from pathlib import Path
+
+import pytest
+from openindexmaps_py.geodex import GeodexGeoJSON, GeodexSheet, GeodexTable
+from openindexmaps_py.geodex import SkippedRecord, convert_geodex, round_column
+from openindexmaps_py.geodex import convert_geodex_files, find_geodex_files
+from openindexmaps_py.geodex import geodex_sheets, map_sheets
+from openindexmaps_py.geodex import normalize_bounds, normalized_features
+from openindexmaps_py.geodex import OUT_OF_RANGE, SHIFTED, UNKNOWN_MERIDIAN
+from openindexmaps_py.geodex import SWAPPED_LATITUDES, SWAPPED_LONGITUDES
+from openindexmaps_py.testfeatures import SimpleGeodexTestSheets
+
+
+def per_record(features, FLIP=False):
+    with contextlib.redirect_stdout(io.StringIO()):
+        geodex = GeodexGeoJSON([GeodexSheet(feature, FLIP) for feature in features])
+        return geodex.to_openindexmap(VALIDATE=False)
+
+
+def record(**properties):
+    base = {
+        "RECORD": "45-3",
+        "LOCATION": "Komarno",
+        "DATE": 1987,
+        "SCALE": 100000,
+        "PRODUCTION": 31,
+        "PROJECT": 161,
+        "PRIME_MER": 131,
+        "HOLD": 1,
+        "YEAR1": 1987,
+        "YEAR1_TYPE": 98,
+        "EDITION_NO": 1,
+        "ISO_TYPE": 5,
+        "ISO_VAL": 10,
+        "X1": 17.33333,
+        "X2": 18.0,
+        "Y1": 48.0,
+        "Y2": 47.66667,
+    }
+    base.update(properties)
+    return {"type": "Feature", "properties": base, "geometry": None}
+
+
+EDGE_RECORDS = [
+    record(),
+    record(X1=None),
+    record(X1=17, X2=18, Y1=48, Y2=47),
+    record(X1=0.0000005, X2=1.0000005, Y1=2.6750005, Y2=-0.1234565),
+    record(PRODUCTION=31.0, PROJECT=12345, PRIME_MER="131", HOLD=0),
+    record(YEAR2=1990, YEAR2_TYPE=114, YEAR3=1991, YEAR3_TYPE=121, YEAR4_TYPE=0),
+    record(YEAR1_TYPE=None, YEAR2=None, YEAR2_TYPE=103, DATE=None),
+    record(ISO_TYPE=2, ISO_VAL=None),
+    record(ISO_TYPE=1.0, ISO_VAL=0),
+    record(ISO_TYPE=7, EDITION_NO=0),
+    record(SCALE=None, EDITION_NO=None, CATLOC="646-b", PUBLISHER="USGS"),
+    record(X1=179.0, X2=-179.0),
+]
+
+
+@pytest.mark.parametrize(
+    "path, FLIP",
+    [
+        ("tests/fixture/f0303_geodex.geojson", False),
+        ("tests/fixture/f0140_geodex.geojson", False),
+        ("tests/fixture/f0140_geodex.geojson", True),
+    ],
+)
+def test_batch_matches_per_record_on_exports(path, FLIP):
+    with contextlib.redirect_stdout(io.StringIO()):
+        expected = GeodexGeoJSON.from_geojson_file(path, FLIP=FLIP)
+        expected = expected.to_openindexmap(VALIDATE=False)
+    table = GeodexTable.from_geojson_file(path, FLIP=FLIP)
+    assert str(table.to_openindexmap(VALIDATE=False)) == str(expected)
+
+
+@pytest.mark.parametrize("FLIP", [False, True])
+def test_batch_matches_per_record_on_edge_cases(FLIP):
+    table = GeodexTable.from_features(EDGE_RECORDS, FLIP=FLIP)
+    expected = per_record(EDGE_RECORDS, FLIP)
+    assert table.sheet_properties() == [s["properties"] for s in expected.features]
+    assert str(table.to_openindexmap(VALIDATE=False)) == str(expected)
+    assert table.skipped_records() == [1]
+
+
+def test_batch_scale_must_be_an_int():
+    with pytest.raises(AssertionError):
+        GeodexTable.from_features([record(SCALE=2.5)]).sheet_properties()
+
+
+def test_empty_table():
+    table = GeodexTable.from_features([])
+    assert len(table) == 0
+    assert len(table.to_openindexmap(VALIDATE=False).features) == 0
+
+
+def test_round_column_matches_round():
+    values = [None, 3, True, 2.675, 0.0000005, -1.2345675, 1e20, float("inf")]
+    expected = [None if v is None else round(v, 6) for v in values]
+    assert round_column(values) == expected
+    assert [type(v) for v in round_column(values)] == [type(v) for v in expected]
+    with pytest.raises(TypeError):
+        round_column(["1.5"])
+
+
+def write_records(path, features):
+    path.write_text(json.dumps({"type": "FeatureCollection", "features": features}))
+    return path
+
+
+def test_pipeline_matches_per_record(tmp_path):
+    path = write_records(tmp_path / "geodex.geojson", EDGE_RECORDS)
+    skipped, output = [], io.StringIO()
+    written = convert_geodex(path, output, on_skip=skipped.append)
+    assert written == len(EDGE_RECORDS) - 1
+    assert output.getvalue() == str(per_record(EDGE_RECORDS))
+    assert skipped == [SkippedRecord(1, "45-3", "missing coordinates")]
+
+
+def test_pipeline_reports_invalid_and_broken_records(tmp_path):
+    path = write_records(
+        tmp_path / "geodex.geojson",
+        [record(), record(SCALE=2.5, RECORD="bad-scale"), record(RECORD=None)],
+    )
+    schema = json.loads(open("schemas/1.0.0.schema.json").read())
+    items = schema["properties"]["features"]["items"]
+    items["properties"]["properties"]["required"] = ["label"]
+    schema_path = tmp_path / "schema.json"
+    schema_path.write_text(json.dumps(schema))
+
+    skipped, output = [], io.StringIO()
+    written = convert_geodex(
+        path,
+        output,
+        VALIDATE=True,
+        schema_path=str(schema_path),
+        on_skip=skipped.append,
+    )
+    assert written == 1
+    assert [(s.index, s.record) for s in skipped] == [(1, "bad-scale"), (2, None)]
+    assert "label" in skipped[1].reason
+    assert len(json.loads(output.getvalue())["features"]) == 1
+
+
+def test_pipeline_stages_are_lazy():
+    features = iter(enumerate([record(), record(), record()]))
+    sheets = map_sheets(geodex_sheets(features))
+    next(sheets)
+    assert len(list(features)) == 2
+
+
+def test_convert_geodex_files(tmp_path):
+    source_dir = tmp_path / "geodex"
+    source_dir.mkdir()
+    for name in ("f0001_geodex", "f0002_geodex", "f0003"):
+        write_records(source_dir / f"{name}.geojson", EDGE_RECORDS)
+    (source_dir / "broken.geojson").write_text("{")
+    files = find_geodex_files(source_dir, str(source_dir / "f000*.geojson"))
+    assert [f.name for f in files] == [
+        "broken.geojson",
+        "f0001_geodex.geojson",
+        "f0002_geodex.geojson",
+        "f0003.geojson",
+    ]
+
+    results = list(
+        convert_geodex_files(files, tmp_path / "oim", flip=["f0002*"], jobs=2)
+    )
+    assert [Path(r.output).name for r in results] == [
+        "broken_OIM.geojson",
+        "f0001_OIM.geojson",
+        "f0002_OIM.geojson",
+        "f0003_OIM.geojson",
+    ]
+    assert results[0].error.startswith("ValueError")
+    assert sorted(path.name for path in (tmp_path / "oim").iterdir()) == [
+        "f0001_OIM.geojson",
+        "f0002_OIM.geojson",
+        "f0003_OIM.geojson",
+    ]
+    assert [(r.records, r.written, len(r.skipped)) for r in results[1:]] == [
+        (12, 11, 1)
+    ] * 3
+    assert Path(results[1].output).read_text() == str(per_record(EDGE_RECORDS))
+    assert Path(results[2].output).read_text() == str(per_record(EDGE_RECORDS, True))
+
+
+def test_find_geodex_files_skips_outputs(tmp_path):
+    write_records(tmp_path / "f0001_geodex.geojson", EDGE_RECORDS)
+    write_records(tmp_path / "f0003.geojson", [])
+    (tmp_path / "f0002.dbf").write_text("")
+    (tmp_path / "notes").write_text("")
+    oim = Path("tests/fixture/f0140_OIM.geojson").read_text()
+    for name in ("f0001_OIM.geojson", "f0140-f030-merge.geojson", "output.geojson"):
+        (tmp_path / name).write_text(oim)
+    expected = ["f0001_geodex.geojson", "f0002.dbf"]
+    assert [f.name for f in find_geodex_files(tmp_path)] == expected
+    assert [f.name for f in find_geodex_files(str(tmp_path / "f*"))] == expected
+
+
+def test_convert_geodex_files_rejects_colliding_outputs(tmp_path):
+    sources = ["tests/fixture/f0168.geojson", "tests/fixture/f0168.dbf"]
+    with pytest.raises(ValueError, match="f0168_OIM.geojson"):
+        convert_geodex_files(sources, tmp_path / "oim")
+    assert not (tmp_path / "oim").exists()
+
+
+def test_normalize_bounds():
+    nonstandard = SimpleGeodexTestSheets.nonstandard_gdx_sheet
+    rows = [
+        # x1, x2, y1, y2, PRIME_MER
+        (
+            nonstandard["x1"],
+            nonstandard["x2"],
+            nonstandard["y1"],
+            nonstandard["y2"],
+            131,
+        ),
+        (25.55, 25.45, 44.95, 44.85, 131),  # east given first
+        (178, -178, 5.0, -5.0, 131),  # crosses the antimeridian
+        (2.0, 3.0, 49.0, 48.0, 142),  # Paris
+        (-170.0, -169.0, 1.0, 0.0, 135),  # Ferro, wraps past -180
+        (10.0, 20.0, 1.0, 0.0, 999),  # Cordoba: no offset known
+        (200.0, 10.0, 95.0, 0.0, None),
+        (None, 1.0, 1.0, 0.0, 131),
+    ]
+    bounds = normalize_bounds(*zip(*rows))
+    assert bounds.north.tolist()[:7] == [44.95, 44.95, 5.0, 49.0, 1.0, 1.0, 90.0]
+    assert bounds.south.tolist()[:7] == [44.85, 44.85, -5.0, 48.0, 0.0, 0.0, 0.0]
+    assert bounds.west.tolist()[:7] == [
+        25.45,
+        25.45,
+        178.0,
+        4.337229,
+        172.333333,
+        10.0,
+        180.0,
+    ]
+    assert bounds.east.tolist()[:7] == [
+        25.55,
+        25.55,
+        -178.0,
+        5.337229,
+        173.333333,
+        20.0,
+        10.0,
+    ]
+    assert bounds.flags.tolist() == [
+        SWAPPED_LATITUDES,
+        SWAPPED_LONGITUDES,
+        0,
+        SHIFTED,
+        SHIFTED,
+        UNKNOWN_MERIDIAN,
+        OUT_OF_RANGE,
+        0,
+    ]
+    assert bounds.west[7] != bounds.west[7]  # NaN
+
+    unclamped = normalize_bounds(*zip(*rows), clamp=False)
+    assert (unclamped.north[6], unclamped.west[6]) == (95.0, 200.0)
+
+
+def test_normalized_features_in_pipeline(tmp_path):
+    features = [
+        record(RECORD=str(n), X1=18.0, X2=17.33333, Y1=47.66667, Y2=48.0)
+        for n in range(5)
+    ]
+    features.append(record(RECORD="Paris", PRIME_MER=142, X1=None))
+    normalized = list(normalized_features(enumerate(features), batch_size=2))
+    assert [index for index, _ in normalized] == list(range(6))
+    properties = normalized[0][1]["properties"]
+    assert (properties["X1"], properties["X2"]) == (17.33333, 18.0)
+    assert (properties["Y1"], properties["Y2"]) == (48.0, 47.66667)
+    assert normalized[5][1]["properties"]["X2"] == 18.0
+
+    source = write_records(tmp_path / "swapped.geojson", features)
+    output = io.StringIO()
+    assert convert_geodex(source, output, NORMALIZE=True) == 5
+    sheet = json.loads(output.getvalue())["features"][0]["properties"]
+    assert (sheet["west"], sheet["south"], sheet["east"], sheet["north"]) == (
+        17.33333,
+        47.66667,
+        18.0,
+        48.0,
+    )
+
+
+def test_table_normalize():
+    table = GeodexTable.from_features(
+        [record(), record(PRIME_MER=132, X1=0.0, X2=1.0), record(Y1=None)]
+    )
+    flags = table.normalize()
+    assert flags.tolist() == [0, SHIFTED, 0]
+    assert table.columns["X1"][:2] == [17.33333, -3.687375]
+    assert table.columns["Y1"][2] is None
@@ -0,0 +1,83 @@
+import random
+
+import pytest
+from openindexmaps_py.columnar import ColumnarOpenIndexMap
+from openindexmaps_py.indexes import HashIndex, SortedIndex, natural_key
+from openindexmaps_py.oimpy import OpenIndexMap, Sheet
+
+
+def sheet(label, **properties):
+    return Sheet(
+        {"label": label, "west": 0, "south": 0, "east": 1, "north": 1, **properties}
+    )
+
+
+def shuffled_labels():
+    labels = [f"46-{i}" for i in range(1, 21)] + ["47-1", "A12", "a2", "B"]
+    random.Random(3).shuffle(labels)
+    return labels
+
+
+def test_natural_key_orders_numbers_by_value():
+    labels = ["46-10", "46-2", "46-1", "46-1a", "46"]
+    assert sorted(labels, key=natural_key) == ["46", "46-1", "46-1a", "46-2", "46-10"]
+
+
+def test_hash_index():
+    index = HashIndex(["a", 1, None, "1", "a"])
+    assert index.lookup("a") == [0, 4]
+    assert index.lookup(1) == [1, 3]
+    assert index.lookup(None) == []
+    index.add(5, "a")
+    assert index.lookup("a") == [0, 4, 5]
+
+
+def test_sorted_index_range_and_prefix():
+    labels = shuffled_labels()
+    index = SortedIndex(labels)
+    in_range = [labels[row] for row in index.range("46-1", "46-20")]
+    assert in_range == [f"46-{i}" for i in range(1, 21)]
+    assert [labels[row] for row in index.range("46-18")] == [
+        "46-18",
+        "46-19",
+        "46-20",
+        "47-1",
+        "a2",
+        "A12",
+        "B",
+    ]
+    prefixed = [labels[row] for row in index.prefix("46-1")]
+    assert prefixed == ["46-1"] + [f"46-{i}" for i in range(10, 20)]
+    assert index.prefix("Z") == []
+
+
+@pytest.mark.parametrize("oim_class", [OpenIndexMap, ColumnarOpenIndexMap])
+def test_openindexmap_find(oim_class):
+    labels = shuffled_labels()
+    oim = oim_class([sheet(label, recId=str(i % 3)) for i, label in enumerate(labels)])
+    assert [s["properties"]["label"] for s in oim.find("label", "46-7")] == ["46-7"]
+    assert len(oim.find("recId", "0")) == 8
+    assert oim.find_rows("label", "46-7") == [labels.index("46-7")]
+    assert oim.find("sheetId", "x") == []
+    found = oim.find_range("label", "46-9", "46-11")
+    assert [s["properties"]["label"] for s in found] == ["46-9", "46-10", "46-11"]
+    found = oim.find_prefix("label", "46-2")
+    assert [s["properties"]["label"] for s in found] == ["46-2", "46-20"]
+
+
+@pytest.mark.parametrize("oim_class", [OpenIndexMap, ColumnarOpenIndexMap])
+def test_indexes_follow_add_sheet(oim_class):
+    oim = oim_class([sheet("46-1"), sheet("46-3")])
+    assert len(oim.find_range("label", "46-1", "46-3")) == 2
+    assert oim.find("label", "46-2") == []
+    oim.add_sheet(sheet("46-2"))
+    assert [s["properties"]["label"] for s in oim.find("label", "46-2")] == ["46-2"]
+    found = oim.find_range("label", "46-1", "46-3")
+    assert [s["properties"]["label"] for s in found] == ["46-1", "46-2", "46-3"]
+
+
+def test_indexes_rebuilt_after_features_change():
+    oim = OpenIndexMap([sheet("46-1")])
+    assert len(oim.find("label", "46-1")) == 1
+    oim.features.append(sheet("46-1"))
+    assert len(oim.find("label", "46-1")) == 2
@@ -0,0 +1,134 @@
+import json
+
+import pytest
+from openindexmaps_py import mapping
+from openindexmaps_py.mapping import pack_sheets
+from openindexmaps_py.oimpy import OpenIndexMap
+
+FIXTURE = "tests/fixture/233bA62500a.geojson"
+
+
+def unpack(packed):
+    """Decodes the geometries the way the page does."""
+    cursor = [0, 0]
+
+    def positions(flat, closed=False):
+        points = []
+        for dx, dy in zip(flat[::2], flat[1::2]):
+            cursor[0] += dx
+            cursor[1] += dy
+            points.append([cursor[0] / packed["scale"], cursor[1] / packed["scale"]])
+        return points + points[:1] if closed else points
+
+    def geometry(packed_geometry):
+        if packed_geometry is None:
+            return None
+        code, coordinates = packed_geometry
+        geometry_type = mapping._GEOMETRY_TYPES[code]
+        if geometry_type == "GeometryCollection":
+            return {
+                "type": geometry_type,
+                "geometries": list(geometry(g) for g in coordinates),
+            }
+        if geometry_type == "Point":
+            coordinates = positions(coordinates)[0]
+        elif geometry_type in ("MultiPoint", "LineString"):
+            coordinates = positions(coordinates)
+        elif geometry_type == "MultiLineString":
+            coordinates = [positions(line) for line in coordinates]
+        elif geometry_type == "Polygon":
+            coordinates = [positions(ring, True) for ring in coordinates]
+        else:
+            coordinates = [
+                [positions(ring, True) for ring in polygon] for polygon in coordinates
+            ]
+        return {"type": geometry_type, "coordinates": coordinates}
+
+    return [geometry(g) for g in packed["geometries"]]
+
+
+def test_pack_sheets():
+    with open(FIXTURE) as file:
+        data = json.load(file)
+    packed = pack_sheets(json.dumps(data))
+    features = data["features"]
+    assert packed["properties"]["label"] == [f["properties"]["label"] for f in features]
+    assert packed["properties"]["datePub"] == [
+        f["properties"]["datePub"] for f in features
+    ]
+    assert packed["classes"] == "".join(
+        "1" if f["properties"]["available"] else "0" for f in features
+    )
+    assert unpack(packed) == [f["geometry"] for f in features]
+    # The cursor runs on from the last corner of one sheet to the next sheet.
+    first, second = packed["geometries"][:2]
+    assert first[1][0][0][:2] == [-8500000, 2250000]
+    assert second[1][0][0][:2] == [-50000, -50000]
+    assert packed["bounds"] == [[19.5, -85.0], [23.5, -74.0]]
+    # Sheets rebuild their rectangles from the bounds, as Polygons.
+    sheets = pack_sheets(OpenIndexMap.from_file(FIXTURE))
+    assert sheets["properties"] == packed["properties"]
+    assert sheets["classes"] == packed["classes"]
+    assert sheets["bounds"] == packed["bounds"]
+    assert {code for code, _ in sheets["geometries"]} == {4}
+
+
+def test_pack_sheets_quantizes_other_geometries():
+    triangle = [[0.123456, 0.0], [1.0, 0.0], [0.5, 1.0]]
+    features = [
+        {"properties": {"label": "a", "available": "yes"}, "geometry": None},
+        {
+            "properties": None,
+            "geometry": {"type": "LineString", "coordinates": triangle},
+        },
+        {
+            "properties": {"datePub": "1900"},
+            "geometry": {
+                "type": "GeometryCollection",
+                "geometries": [
+                    {"type": "Point", "coordinates": [2.0, 3.0]},
+                    {"type": "Polygon", "coordinates": [triangle + triangle[:1]]},
+                ],
+            },
+        },
+    ]
+    packed = pack_sheets({"type": "FeatureCollection", "features": features}, 3)
+    assert packed["properties"] == {
+        "label": ["a", None, None],
+        "datePub": [None, None, "1900"],
+    }
+    assert packed["classes"] == "100"
+    rounded = [[0.123, 0.0], [1.0, 0.0], [0.5, 1.0]]
+    assert unpack(packed) == [
+        None,
+        {"type": "LineString", "coordinates": rounded},
+        {
+            "type": "GeometryCollection",
+            "geometries": [
+                {"type": "Point", "coordinates": [2.0, 3.0]},
+                {"type": "Polygon", "coordinates": [rounded + rounded[:1]]},
+            ],
+        },
+    ]
+    assert packed["bounds"] == [[0.0, 0.123], [3.0, 2.0]]
+    assert pack_sheets({"features": []})["bounds"] is None
+
+
+@pytest.mark.parametrize("path", [FIXTURE, "tests/fixture/f0140_OIM.geojson"])
+def test_compact_map_is_smaller(path):
+    with open(path) as file:
+        data = file.read()
+    mapping.create_map(data)
+    with open(mapping.OUTPUT_PATH) as file:
+        full = file.read()
+    mapping.create_map(data, compact=True)
+    with open(mapping.OUTPUT_PATH) as file:
+        compact = file.read()
+    assert len(compact) * 3 < len(full)
+    sheet = json.loads(data)["features"][0]["properties"]
+    assert json.dumps(sheet["label"]) in compact
+    # Properties the map does not use are left out.
+    assert (
+        json.dumps(sheet["scale"]) in full and json.dumps(sheet["scale"]) not in compact
+    )
+    assert "L.geoJson" in compact and "fitBounds" in compact
@@ -0,0 +1,62 @@
+import io
+import json
+
+import pytest
+from openindexmaps_py.merge import merge_files, source_note
+
+
+def write_collection(path, labels, **members):
+    features = [
+        {
+            "type": "Feature",
+            "properties": {
+                "label": label,
+                "west": 0,
+                "south": 0,
+                "east": 1,
+                "north": 1,
+            },
+            "geometry": None,
+        }
+        for label in labels
+    ]
+    path.write_text(
+        json.dumps({"type": "FeatureCollection", **members, "features": features})
+    )
+    return str(path)
+
+
+@pytest.fixture
+def sources(tmp_path):
+    return [
+        write_collection(tmp_path / "a.geojson", ["a1", "a2"], name="a"),
+        write_collection(tmp_path / "empty.geojson", []),
+        write_collection(tmp_path / "b.geojson", [f"b{i}" for i in range(50)]),
+        write_collection(tmp_path / "c.geojson", ["c1"]),
+    ]
+
+
+@pytest.mark.parametrize("jobs", [1, 2])
+@pytest.mark.parametrize("indent", [None, 4])
+def test_merge_files(sources, jobs, indent):
+    output = io.StringIO()
+    assert merge_files(output, sources, jobs=jobs, indent=indent) == 53
+    merged = json.loads(output.getvalue())
+    labels = [feature["properties"]["label"] for feature in merged["features"]]
+    assert labels == ["a1", "a2"] + [f"b{i}" for i in range(50)] + ["c1"]
+    notes = [feature["properties"]["note"] for feature in merged["features"]]
+    assert notes[0] == source_note(sources[0])
+    assert notes[-1] == source_note(sources[3])
+
+    expected = json.dumps(merged, indent=indent)
+    assert output.getvalue() == expected
+
+
+@pytest.mark.parametrize("jobs", [1, 2])
+def test_merge_empty_inputs(sources, jobs):
+    output = io.StringIO()
+    assert merge_files(output, [sources[1], sources[1]], jobs=jobs) == 0
+    assert json.loads(output.getvalue()) == {
+        "type": "FeatureCollection",
+        "features": [],
+    }
@@ -1,6 +1,9 @@
 # test_oimpycli.py
 
 import json
+import os
+import subprocess
+import sys
 import pytest
 from click.testing import CliRunner
 from openindexmaps_py.oimpycli import cli
@@ -68,6 +71,119 @@ def test_query_command(sample_oim_file):
     assert '"name": "Test Sheet"' in result.output
 
 
+def test_query_keeps_top_level_members():
+    result = CliRunner().invoke(
+        cli, ["query", "tests/fixture/f0168.geojson", "-w", "RECORD=U-17"]
+    )
+    assert result.exit_code == 0, result.output
+    output = json.loads(result.stdout)
+    assert output["name"] == "f0002-ND"
+    assert output["crs"]["properties"]["name"] == "urn:ogc:def:crs:EPSG::3857"
+    assert [f["properties"]["RECORD"] for f in output["features"]] == ["U-17"]
+
+
+def test_query_stdin_with_schema(sample_oim_file, sample_schema_file):
+    with open(sample_oim_file) as file:
+        result = CliRunner().invoke(
+            cli, ["query", "-", "-s", sample_schema_file], input=file.read()
+        )
+    assert result.exit_code == 2
+    assert "standard input cannot be validated" in result.output
+
+
+def test_query_predicates_limit_and_fields():
+    runner = CliRunner()
+    result = runner.invoke(
+        cli,
+        [
+            "query",
+            "tests/fixture/f0303_OIM.geojson",
+            "-w",
+            "datePub>=1950",
+            "-w",
+            "label<44",
+            "--bbox",
+            "16",
+            "48",
+            "18",
+            "49",
+            "--fields",
+            "label,datePub",
+            "--limit",
+            "2",
+        ],
+    )
+    assert result.exit_code == 0, result.output
+    assert "Query: datePub>=1950 AND label<44" in result.output
+    output = json.loads(result.output[result.output.index("{") :])
+    assert [feature["properties"] for feature in output["features"]] == [
+        {"label": "34-4", "datePub": "1991"},
+        {"label": "35-3", "datePub": "1987"},
+    ]
+
+    result = runner.invoke(cli, ["query", "tests/fixture/f0303_OIM.geojson", "-w", "x"])
+    assert result.exit_code != 0
+    assert "Cannot parse 'x'" in result.output
+
+
+def test_query_cache(tmp_path, monkeypatch):
+    monkeypatch.setenv("OIMPY_CACHE_DIR", str(tmp_path))
+    arguments = ["query", "tests/fixture/f0303_OIM.geojson", "-w", "label>=40"]
+    arguments += ["--fields", "label,west", "-n", "3"]
+    expected = json.loads(CliRunner().invoke(cli, arguments).stdout)
+    for _ in range(2):  # parse and store, then load
+        result = CliRunner().invoke(cli, arguments + ["--cache"])
+        assert result.exit_code == 0, result.output
+        assert json.loads(result.stdout) == expected
+    assert len(list(tmp_path.glob("*.npz"))) == 1
+
+
+def test_query_cache_keeps_source_features(tmp_path, monkeypatch):
+    monkeypatch.setenv("OIMPY_CACHE_DIR", str(tmp_path / "cache"))
+    source = tmp_path / "points.geojson"
+    crs = {"type": "name", "properties": {"name": "urn:ogc:def:crs:EPSG::3857"}}
+    point = {"type": "Point", "coordinates": [5, 5]}
+    features = [
+        {"type": "Feature", "id": 1, "properties": {"label": "a"}, "geometry": point},
+        {"type": "Feature", "properties": None, "geometry": None},
+    ]
+    source.write_text(
+        json.dumps({"type": "FeatureCollection", "crs": crs, "features": features})
+    )
+    for extra in ([], ["--point", "5", "5"], ["-w", "label=a"]):
+        arguments = ["query", str(source), *extra]
+        expected = json.loads(CliRunner().invoke(cli, arguments).stdout)
+        for _ in range(2):  # parse and store, then load
+            result = CliRunner().invoke(cli, arguments + ["--cache"])
+            assert result.exit_code == 0, result.output
+            assert json.loads(result.stdout) == expected
+        assert expected["crs"] == crs
+        assert expected["features"][0]["geometry"] == point
+
+
+def test_query_point_writes_to_file(tmp_path):
+    output = tmp_path / "result.geojson"
+    result = CliRunner().invoke(
+        cli,
+        [
+            "query",
+            "tests/fixture/f0303_OIM.geojson",
+            "--point",
+            "17.5",
+            "48.5",
+            "-f",
+            str(output),
+            "--quiet",
+        ],
+    )
+    assert result.exit_code == 0, result.output
+    labels = [
+        feature["properties"]["label"]
+        for feature in json.loads(output.read_text())["features"]
+    ]
+    assert labels == ["35-3"]
+
+
 def test_query_with_schema(sample_oim_file, sample_schema_file):
     runner = CliRunner()
     result = runner.invoke(cli, ["query", sample_oim_file, "-s", sample_schema_file])
@@ -138,3 +254,223 @@ def test_merge_command(sample_oim_file, tmp_path):
     assert '"label": "46-2"' in result.output
     assert '"label": "46-3"' in result.output
     assert '"note": "From source file' in result.output
+
+
+def test_cli_import_defers_heavy_modules():
+    code = (
+        "import sys, openindexmaps_py.oimpycli, openindexmaps_py.oimpy as oimpy;"
+        "print(sorted(m for m in ('folium', 'requests', 'shapely', 'jsonschema',"
+        " 'antimeridian', 'yaml') if m in sys.modules), oimpy.config._data)"
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", code], capture_output=True, text=True, check=True
+    )
+    assert result.stdout.strip() == "[] None"
+
+
+def test_convert_geodex_command(tmp_path):
+    runner = CliRunner()
+    output_dir = tmp_path / "oim"
+    result = runner.invoke(
+        cli,
+        [
+            "convert-geodex",
+            "tests/fixture/f0303_geodex.geojson",
+            "tests/fixture/f0140_geodex.geojson",
+            "-o",
+            str(output_dir),
+            "--jobs",
+            "2",
+            "--flip",
+            "f0140*",
+        ],
+    )
+    assert result.exit_code == 0, result.output
+    assert "2 files, 363 records: 363 written, 0 skipped, 0 failed" in result.output
+    oim = json.loads((output_dir / "f0303_OIM.geojson").read_text())
+    assert len(oim["features"]) == 91
+    oim = json.loads((output_dir / "f0140_OIM.geojson").read_text())
+    assert oim["features"][0]["properties"]["label"] == "41071.A5"
+
+
+def test_convert_geodex_command_outside_the_repository(tmp_path, monkeypatch):
+    source = os.path.abspath("tests/fixture/f0303_geodex.geojson")
+    monkeypatch.chdir(tmp_path)
+    result = CliRunner().invoke(cli, ["convert-geodex", source])
+    assert result.exit_code == 0, result.output
+    assert "1 files, 91 records: 91 written" in result.output
+
+    # A second run over the directory leaves the OpenIndexMap it wrote alone.
+    result = CliRunner().invoke(cli, ["convert-geodex", "."])
+    assert result.exit_code == 1
+    assert "No Geodex files found." in result.output
+
+    result = CliRunner().invoke(cli, ["convert-geodex", source, "--validate"])
+    assert result.exit_code == 2
+    assert "Invalid value for '--schema'" in result.output
+
+
+def test_convert_geodex_command_without_files(tmp_path):
+    result = CliRunner().invoke(cli, ["convert-geodex", str(tmp_path)])
+    assert result.exit_code == 1
+    assert "No Geodex files found." in result.output
+
+
+def test_convert_geodex_command_timings(tmp_path):
+    result = CliRunner().invoke(
+        cli,
+        [
+            "convert-geodex",
+            "tests/fixture/f0303_geodex.geojson",
+            "-o",
+            str(tmp_path),
+            "--timings",
+        ],
+    )
+    assert result.exit_code == 0, result.output
+    lines = result.output.splitlines()
+    assert lines[2].split() == [
+        "stage",
+        "calls",
+        "records",
+        "seconds",
+        "records/s",
+        "share",
+    ]
+    assert lines[3].split()[:3] == ["iter_features", "91", "91"]
+    assert any(line.split()[:2] == ["MapSheet.__init__", "91"] for line in lines)
+
+
+def test_validate_command(tmp_path):
+    report = tmp_path / "report.json"
+    with open("tests/fixture/f0303_OIM.geojson") as file:
+        collection = json.load(file)
+    collection["features"][1]["properties"]["south"] = 95
+    bad = tmp_path / "f0303_bad.geojson"
+    bad.write_text(json.dumps(collection))
+    arguments = ["validate", "tests/fixture/f0303_OIM.geojson", "tests/fixture"]
+    result = CliRunner().invoke(
+        cli,
+        arguments
+        + [str(bad), "--pattern", "f0303_*.geojson", "-j", "2", "-o", str(report)],
+    )
+    assert result.exit_code == 1, result.output
+    assert "4 files, 274 features: 1 invalid" in result.output
+    content = json.loads(report.read_text())
+    assert [entry["valid"] for entry in content["files"]] == [False, True, True, True]
+    (error,) = content["files"][0]["errors"]
+    assert error["path"] == "$.features[1].properties.south"
+
+    result = CliRunner().invoke(
+        cli, ["validate", "tests/fixture/f0303_OIM.geojson", "--format", "ndjson"]
+    )
+    assert result.exit_code == 0
+    (line,) = result.stdout.splitlines()
+    assert json.loads(line)["features"] == 91
+
+
+def test_validate_command_outside_the_repository(tmp_path, monkeypatch):
+    oim = os.path.abspath("tests/fixture/f0303_OIM.geojson")
+    monkeypatch.chdir(tmp_path)
+    result = CliRunner().invoke(cli, ["validate", oim, "--no-schema"])
+    assert result.exit_code == 0, result.output
+    assert '"schema": null' in result.stdout
+
+    result = CliRunner().invoke(cli, ["validate", oim])
+    assert result.exit_code == 2
+    assert "Invalid value for '--schema'" in result.output
+
+
+def test_tiles_command(tmp_path):
+    output = tmp_path / "f0303.mbtiles"
+    arguments = ["tiles", "tests/fixture/f0303_OIM.geojson", "-o", str(output)]
+    result = CliRunner().invoke(
+        cli, arguments + ["--max-zoom", "5", "--fields", "label,datePub"]
+    )
+    assert result.exit_code == 0, result.output
+    assert "z5: " in result.output and "of 91 sheets written" in result.output
+    assert output.exists()
+
+    result = CliRunner().invoke(cli, arguments + ["--min-zoom", "6", "--max-zoom", "5"])
+    assert result.exit_code == 2
+
+
+def test_map_command_compact(sample_oim_file):
+    runner = CliRunner()
+    result = runner.invoke(cli, ["map", sample_oim_file, "--compact"])
+    assert result.exit_code == 0
+    assert "Map created" in result.output
+    with open("html/index.html") as file:
+        page = file.read()
+    assert '"46-2"' in page and "Test Sheet" not in page
+
+
+def test_global_profile_and_timings(tmp_path):
+    import pstats
+
+    report_path, profile_path = tmp_path / "timings.json", tmp_path / "query.prof"
+    result = CliRunner().invoke(
+        cli,
+        [
+            "--timings-json",
+            str(report_path),
+            "--trace-memory",
+            "--profile",
+            str(profile_path),
+            "query",
+            "tests/fixture/f0303_OIM.geojson",
+            "-f",
+            str(tmp_path / "out.geojson"),
+            "--quiet",
+        ],
+    )
+    assert result.exit_code == 0, result.output
+    lines = result.stderr.splitlines()
+    assert lines[0].split() == ["phase", "seconds", "share"]
+    assert [line.split()[0] for line in lines[1:8]] == [
+        "parse",
+        "sheet",
+        "validation",
+        "serialization",
+        "output",
+        "other",
+        "total",
+    ]
+    assert lines[-1].startswith("tracemalloc peak")
+
+    report = json.loads(report_path.read_text())
+    assert report["command"] == "query"
+    stages = {stage["name"]: stage for stage in report["stages"]}
+    assert stages["iter_features"]["records"] == 91
+    assert stages["writer.feature_json"]["calls"] == 91
+    assert sum(report["phases"].values()) == pytest.approx(report["seconds"])
+    assert report["tracemalloc_peak"] > 0
+    stats = pstats.Stats(str(profile_path))
+    assert any(name == "query" for _, _, name in stats.stats)
+
+
+def test_global_timings_convert_geodex(tmp_path):
+    report_path = tmp_path / "timings.json"
+    result = CliRunner().invoke(
+        cli,
+        [
+            "--timings-json",
+            str(report_path),
+            "convert-geodex",
+            "tests/fixture/f0303_geodex.geojson",
+            "-o",
+            str(tmp_path),
+            "--timings",
+        ],
+    )
+    assert result.exit_code == 0, result.output
+    assert any(
+        line.split()[:2] == ["MapSheet.__init__", "91"]
+        for line in result.stdout.splitlines()
+    )
+    assert "tracemalloc peak" not in result.stderr
+    report = json.loads(report_path.read_text())
+    stages = {stage["name"]: stage for stage in report["stages"]}
+    assert stages["MapSheet.__init__"]["calls"] == 91
+    assert report["phases"]["sheets"] > 0
+    assert report["tracemalloc_peak"] is None
@@ -1,9 +1,20 @@
+import antimeridian
 import geojson
+import pytest
+from shapely.geometry import shape
 import logging
+import warnings
 from pathlib import Path
+from openindexmaps_py.testfeatures import SimpleTestMapSheets
 from openindexmaps_py.oimpy import (
+    CompactMapSheet,
+    CompactSheet,
+    LazyConfig,
+    MapSheet,
     OpenIndexMap,
     Sheet,
+    SHEET_ATTRIBUTES,
+    MAPSHEET_ATTRIBUTES,
 )  # Adjust the import based on your package structure
 
 # Configure logging for tests
@@ -11,6 +22,21 @@ logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 
+def test_config_keeps_the_application_log_level():
+    package_logger = logging.getLogger("openindexmaps_py")
+    level = package_logger.level
+    try:
+        package_logger.setLevel(logging.ERROR)
+        assert LazyConfig()["logging-level"] == "WARNING"
+        assert package_logger.level == logging.ERROR
+
+        package_logger.setLevel(logging.NOTSET)
+        LazyConfig()["fix-antimeridian"]
+        assert package_logger.level == logging.WARNING
+    finally:
+        package_logger.setLevel(level)
+
+
 def test_default_oim():
     # return {"type": "FeatureCollection", "features": []}
     defaultoim = OpenIndexMap()
@@ -57,6 +83,122 @@ def test_openindexmap_validation():
         ), "The OpenIndexMap is not valid."
 
 
+def test_compact_sheet_attribute_api():
+    sheetdict = SimpleTestMapSheets.sheet
+    sheet = Sheet(sheetdict, sheetId="A1")
+    compact = CompactSheet(sheetdict, sheetId="A1")
+    for name in SHEET_ATTRIBUTES:
+        assert getattr(compact, name) == getattr(sheet, name), name
+    assert compact.__geo_interface__ == sheet.__geo_interface__
+    assert "label" not in compact, "Values should only be stored in properties"
+
+    compact.label = "renamed"
+    assert compact["properties"]["label"] == "renamed"
+
+    map_sheet = MapSheet(sheetdict)
+    compact_map_sheet = CompactMapSheet(sheetdict)
+    for name in MAPSHEET_ATTRIBUTES:
+        assert getattr(compact_map_sheet, name) == getattr(map_sheet, name), name
+
+
+def test_from_file_sheet_class(tmp_path):
+    path = tmp_path / "oim.geojson"
+    path.write_text(str(OpenIndexMap([Sheet(SimpleTestMapSheets.sheet)])))
+    oim = OpenIndexMap.from_file(str(path), sheet_class=CompactSheet)
+    assert isinstance(oim.features[0], CompactSheet)
+    assert oim.features[0].west == -87.95
+
+
+def test_compute_bbox_matches_geometry():
+    sheets = [
+        Sheet(SimpleTestMapSheets.sheet),
+        Sheet(SimpleTestMapSheets.inset_map_sheet),
+    ]
+    oim = OpenIndexMap(sheets)
+    expected = [float("inf"), float("inf"), float("-inf"), float("-inf")]
+    for feature in oim.__geo_interface__["features"]:
+        minx, miny, maxx, maxy = shape(feature["geometry"]).bounds
+        expected = [
+            min(expected[0], minx),
+            min(expected[1], miny),
+            max(expected[2], maxx),
+            max(expected[3], maxy),
+        ]
+    # antimeridian.fix_geojson rounds coordinates to 6 decimals
+    assert oim.compute_bbox() == pytest.approx(expected, abs=1e-6)
+
+    oim.add_sheet(Sheet(SimpleTestMapSheets.antimeridian_sheet))
+    assert oim.compute_bbox() == [-180.0, -5.0, 180.0, 43.07511111111111]
+
+
+@pytest.mark.parametrize(
+    "west, east, expected",
+    [(185, 190, [-175, -170]), (-190, -185, [170, 175]), (360, 365, [0, 5])],
+)
+def test_compute_bbox_normalizes_longitudes(west, east, expected):
+    sheet = Sheet({"west": west, "east": east, "south": 0, "north": 1})
+    minx, _, maxx, _ = shape(sheet["geometry"]).bounds
+    assert [minx, maxx] == expected
+    oim = OpenIndexMap([sheet])
+    assert oim.compute_bbox() == [expected[0], 0, expected[1], 1]
+    oim.add_sheet(Sheet(SimpleTestMapSheets.sheet))
+    assert oim.compute_bbox()[0] == min(expected[0], -87.95)
+
+
+def test_compute_bbox_is_maintained_by_add_sheet():
+    oim = OpenIndexMap([Sheet(SimpleTestMapSheets.sheet)])
+    assert oim.compute_bbox() == [-87.95, 42.97511111111111, -87.85, 43.07511111111111]
+
+    oim.add_sheet(Sheet(SimpleTestMapSheets.inset_map_sheet))
+    assert oim._bbox[1] == 2, "add_sheet should extend the cached bbox"
+    assert oim.compute_bbox() == [-88, 42, -87, 43.07511111111111]
+
+    oim.features[0]["properties"]["north"] = 50.0
+    oim.invalidate_bbox()
+    assert oim.compute_bbox()[3] == 50.0
+    assert "_bbox" not in oim, "The cache should not become a GeoJSON member"
+
+
+@pytest.mark.parametrize(
+    "sheetdict",
+    [
+        SimpleTestMapSheets.sheet,
+        SimpleTestMapSheets.inset_map_sheet,
+        SimpleTestMapSheets.nonstandard_gdx_sheet,
+        {"west": -179.5, "east": 179.5, "south": -1, "north": 1},
+        {"west": 170, "east": -170, "south": 1, "north": -1},
+    ],
+)
+def test_antimeridian_fast_path_matches_fixer(sheetdict):
+    west, south = sheetdict["west"], sheetdict["south"]
+    east, north = sheetdict["east"], sheetdict["north"]
+    ring = [(west, south), (east, south), (east, north), (west, north), (west, south)]
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        expected = shape(antimeridian.fix_geojson(geojson.Polygon([ring])))
+    geometry = shape(Sheet(sheetdict)["geometry"])
+    assert geometry.geom_type == expected.geom_type
+    assert geometry.normalize().equals_exact(expected.normalize(), 1e-6)
+    if geometry.geom_type == "Polygon":
+        assert geometry.exterior.is_ccw
+
+
+def test_degenerate_sheet_skips_fixer():
+    sheet = Sheet({"label": "46-2"})
+    assert sheet["geometry"]["coordinates"][0][0] == [0.0, 0.0]
+
+
+def test_antimeridian_sheets():
+    oim = OpenIndexMap(
+        [
+            Sheet(SimpleTestMapSheets.sheet),
+            Sheet(SimpleTestMapSheets.antimeridian_sheet),
+            Sheet(SimpleTestMapSheets.nonstandard_gdx_sheet),
+        ]
+    )
+    assert [sheet.label for sheet in oim.antimeridian_sheets()] == ["999"]
+
+
 if __name__ == "__main__":
     import pytest
 
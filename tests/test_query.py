@@ -0,0 +1,189 @@
+import pytest
+from openindexmaps_py.columnar import SheetColumns, read_columns
+from openindexmaps_py.query import (
+    Predicate,
+    bbox_predicate,
+    compare,
+    feature_bounds,
+    parse_predicate,
+    point_predicate,
+    query_features,
+    query_rows,
+)
+from openindexmaps_py.streaming import iter_features
+
+
+def sheet(label, datePub=None, bounds=(0, 0, 1, 1), **properties):
+    west, south, east, north = bounds
+    properties.update(label=label, west=west, south=south, east=east, north=north)
+    if datePub is not None:
+        properties["datePub"] = datePub
+    return {"type": "Feature", "properties": properties, "geometry": None}
+
+
+@pytest.mark.parametrize(
+    "expression, expected",
+    [
+        ("label=46-2", ("label", "=", "46-2")),
+        ("datePub>=1950", ("datePub", ">=", "1950")),
+        (" scale <= 1:24000 ", ("scale", "<=", "1:24000")),
+        ("note!=a=b", ("note", "!=", "a=b")),
+        ("title=", ("title", "=", "")),
+    ],
+)
+def test_parse_predicate(expression, expected):
+    predicate = parse_predicate(expression)
+    assert (predicate.key, predicate.op, predicate.value) == expected
+
+
+@pytest.mark.parametrize("expression", ["label", "=46-2", ">=1950"])
+def test_parse_predicate_errors(expression):
+    with pytest.raises(ValueError):
+        parse_predicate(expression)
+
+
+@pytest.mark.parametrize(
+    "value, bound, expected",
+    [
+        (1987, "1950", 1),
+        ("1987", "1950", 1),
+        ("1950-06-01", "1950", 0),
+        ("1950-06-01", "1950-07", -1),
+        ("1949-12-31", "1950", -1),
+        (1950, "1950-03", 0),
+        ("46-10", "46-2", 1),
+        (24000, "100000", -1),
+        (2.5, "2.50", 0),
+    ],
+)
+def test_compare(value, bound, expected):
+    assert compare(value, bound) == expected
+
+
+def test_predicates():
+    feature = sheet("46-2", "1987-05", scale=24000)
+    assert Predicate("label", "=", "46-2")(feature)
+    assert Predicate("scale", "=", "24000")(feature)
+    assert Predicate("title", "=", "")(feature)
+    assert Predicate("title", "!=", "x")(feature)
+    assert Predicate("datePub", ">=", "1950")(feature)
+    assert Predicate("datePub", "<=", "1987")(feature)
+    assert not Predicate("datePub", "<", "1987")(feature)
+    assert Predicate("scale", ">", "10000")(feature)
+    assert not Predicate("title", ">=", "")(feature)
+
+
+def test_bbox_and_point():
+    sheets = [
+        sheet("a", bounds=(10, 40, 11, 41)),
+        sheet("crossing", bounds=(179, -1, -179, 1)),
+        sheet("north first", bounds=(20, 41, 21, 40)),
+    ]
+    match = lambda predicate: [s["properties"]["label"] for s in sheets if predicate(s)]
+    assert match(bbox_predicate(11, 41, 12, 42)) == ["a"]
+    assert match(bbox_predicate(170, -5, 179.5, 5)) == ["crossing"]
+    assert match(bbox_predicate(-180, 0, -179.5, 0)) == ["crossing"]
+    assert match(bbox_predicate(175, -5, -175, 5)) == ["crossing"]
+    assert match(bbox_predicate(0, 0, 100, 10)) == []
+    assert match(point_predicate(20.5, 40.5)) == ["north first"]
+    assert match(point_predicate(-179.5, 0.5)) == ["crossing"]
+
+
+def test_feature_bounds_from_geometry():
+    feature = {
+        "type": "Feature",
+        "properties": {"label": "x"},
+        "geometry": {
+            "type": "Polygon",
+            "coordinates": [[[1, 2], [3, 2], [3, 5], [1, 5], [1, 2]]],
+        },
+    }
+    assert feature_bounds(feature) == (1, 2, 3, 5)
+    assert feature_bounds({"properties": {}, "geometry": None}) is None
+
+
+def test_query_features_is_lazy_and_projects():
+    read = []
+
+    def features():
+        for i in range(1000):
+            read.append(i)
+            yield sheet(f"46-{i}", str(1900 + i % 100), extra=i)
+
+    matches = query_features(
+        features(),
+        [parse_predicate("datePub>=1990"), parse_predicate("label!=46-91")],
+        limit=3,
+        fields=["label", "datePub"],
+    )
+    assert read == []
+    assert [match["properties"] for match in matches] == [
+        {"label": "46-90", "datePub": "1990"},
+        {"label": "46-92", "datePub": "1992"},
+        {"label": "46-93", "datePub": "1993"},
+    ]
+    assert len(read) == 94
+
+
+@pytest.mark.parametrize(
+    "fixture", ["tests/fixture/f0303_OIM.geojson", "tests/fixture/MillionthMap.geojson"]
+)
+@pytest.mark.parametrize(
+    "predicates",
+    [
+        [],
+        [parse_predicate("label<44"), parse_predicate("datePub>=1950")],
+        [parse_predicate("label=SB 24"), parse_predicate("missing!=x")],
+        [parse_predicate("west>=-40"), parse_predicate("west=-36")],
+        [parse_predicate("missing>1")],
+        [bbox_predicate(100, 20, -110, 40)],
+        [bbox_predicate(16, 48, 18, 49), parse_predicate("available=True")],
+        [point_predicate(-40, -6)],
+    ],
+)
+def test_query_rows_matches_query_features(fixture, predicates):
+    with open(fixture) as file:
+        features = list(iter_features(file))
+    expected = [
+        i
+        for i, feature in enumerate(features)
+        if all(predicate(feature) for predicate in predicates)
+    ]
+    columns = read_columns(fixture)
+    assert query_rows(columns, predicates).tolist() == expected
+    assert query_rows(columns, predicates, limit=2).tolist() == expected[:2]
+
+
+def test_query_rows_calls_plain_predicates():
+    columns = SheetColumns.from_properties([{"label": "a"}, {"label": "b"}])
+    rows = query_rows(columns, [lambda feature: feature["properties"]["label"] > "a"])
+    assert rows.tolist() == [1]
+
+
+def test_query_rows_across_the_antimeridian():
+    features = [
+        sheet("crossing", bounds=(170, 0, -170, 1)),
+        sheet("east", bounds=(175, 0, 179, 1)),
+        sheet("west", bounds=(-179, 0, -175, 1)),
+        sheet("text", bounds=("170", 0, "-170", 1)),
+        sheet("far", bounds=(0, 0, 1, 1)),
+    ]
+    columns = SheetColumns.from_properties(f["properties"] for f in features)
+    for predicate in [
+        bbox_predicate(-178, 0, -177, 1),
+        bbox_predicate(179, 0.5, -179, 0.5),
+        point_predicate(180, 0),
+        bbox_predicate(-10, -10, 10, 10),
+    ]:
+        expected = [i for i, feature in enumerate(features) if predicate(feature)]
+        assert query_rows(columns, [predicate]).tolist() == expected
+
+
+def test_fields_of_sheet_objects():
+    from openindexmaps_py.oimpy import Sheet
+
+    sheet_object = Sheet({"label": "1", "west": 0, "south": 0, "east": 1, "north": 1})
+    (projected,) = query_features([sheet_object], fields=["label"])
+    assert set(projected) == {"type", "geometry", "properties"}
+    assert projected["type"] == "Feature"
+    assert projected["properties"] == {"label": "1"}
@@ -0,0 +1,194 @@
+import asyncio
+import gzip
+import json
+import os
+import shutil
+import threading
+import time
+import urllib.request
+
+import pytest
+from openindexmaps_py.server import SheetService
+
+F0303 = "tests/fixture/f0303_OIM.geojson"
+MILLIONTH = "tests/fixture/MillionthMap.geojson"
+
+
+@pytest.fixture(scope="module")
+def service():
+    return SheetService([F0303, MILLIONTH], reload_interval=0)
+
+
+def get(service, target, **headers):
+    headers = {name.replace("_", "-").lower(): value for name, value in headers.items()}
+    status, response_headers, body = service.respond("GET", target, headers)
+    if response_headers.get("Content-Encoding") == "gzip":
+        body = gzip.decompress(body)
+    return status, response_headers, json.loads(body) if body else None
+
+
+def labels(collection):
+    return [feature["properties"]["label"] for feature in collection["features"]]
+
+
+def test_index(service):
+    status, headers, body = get(service, "/")
+    assert status == 200 and headers["Content-Type"] == "application/json"
+    assert [(m["name"], m["sheets"]) for m in body["maps"]] == [
+        ("f0303_OIM", 91),
+        ("MillionthMap", 208),
+    ]
+    assert body["sheets"] == 299
+
+
+def test_sheet_queries(service):
+    status, headers, body = get(service, "/sheets?point=17.5,48.5")
+    assert status == 200 and headers["Content-Type"] == "application/geo+json"
+    assert body["type"] == "FeatureCollection" and labels(body) == ["35-3"]
+
+    _, _, body = get(service, "/sheets?bbox=16,48,18,49&map=f0303_OIM&limit=3")
+    assert len(body["features"]) == 3
+
+    _, _, body = get(service, "/sheets?label=SB%2024&fields=label,datePub")
+    assert [feature["properties"] for feature in body["features"]] == [
+        {"label": "SB 24", "datePub": "1936"},
+        {"label": "SB 24", "datePub": "1952"},
+    ]
+    assert body["features"][0]["type"] == "Feature"
+
+    _, _, body = get(service, "/sheets?label=SB%2024&date=1950/")
+    assert [f["properties"]["datePub"] for f in body["features"]] == ["1952"]
+    _, _, body = get(service, "/sheets?date=1936&map=MillionthMap")
+    dates = {f["properties"]["datePub"] for f in body["features"]}
+    assert dates == {"1936"}
+
+
+@pytest.mark.parametrize(
+    "target, status",
+    [
+        ("/sheets?bbox=1,2", 400),
+        ("/sheets?point=a,b", 400),
+        ("/sheets?map=nope", 400),
+        ("/sheets?limit=-1", 400),
+        ("/sheets?label=a&label=b", 400),
+        ("/nothing", 404),
+    ],
+)
+def test_bad_requests(service, target, status):
+    assert get(service, target)[0] == status
+    assert service.respond("POST", "/sheets", {})[0] == 405
+
+
+def test_etags_and_gzip(service):
+    target = "/sheets?bbox=-180,-90,180,90"
+    _, plain_headers, plain = get(service, target)
+    status, headers, compressed = get(service, target, accept_encoding="gzip, br")
+    assert headers["Content-Encoding"] == "gzip" and compressed == plain
+    assert headers["ETag"] != plain_headers["ETag"]
+    status, _, body = get(service, target, if_none_match=plain_headers["ETag"])
+    assert status == 304 and body is None
+    # Small bodies are not compressed, and keep their identity tag.
+    _, plain_headers, _ = get(service, "/sheets?limit=0")
+    _, headers, _ = get(service, "/sheets?limit=0", accept_encoding="gzip")
+    assert "Content-Encoding" not in headers
+    assert headers["ETag"] == plain_headers["ETag"]
+    status, headers, body = get(
+        service,
+        "/sheets?limit=0",
+        accept_encoding="gzip",
+        if_none_match=plain_headers["ETag"],
+    )
+    assert status == 304 and body is None
+    assert headers["ETag"] == plain_headers["ETag"]
+
+
+def test_changed_files_are_reloaded(tmp_path):
+    path = tmp_path / "sheets.geojson"
+    shutil.copy(F0303, path)
+    service = SheetService([path], reload_interval=0)
+    _, before, body = get(service, "/sheets?label=35-3")
+    assert len(body["features"]) == 1
+
+    collection = json.loads(path.read_text())
+    collection["features"] = collection["features"][:10]
+    path.write_text(json.dumps(collection))
+    status = os.stat(path)
+    os.utime(path, ns=(status.st_atime_ns, status.st_mtime_ns + 10**9))
+    assert asyncio.run(service.reload_changed()) == ["sheets"]
+    assert asyncio.run(service.reload_changed()) == []
+    _, after, body = get(service, "/sheets?label=35-3")
+    assert body["features"] == [] and after["ETag"] != before["ETag"]
+    assert get(service, "/")[2]["sheets"] == 10
+
+
+def test_http_round_trip(service):
+    async def main():
+        server = await service.start("127.0.0.1", 0)
+        host, port = server.sockets[0].getsockname()[:2]
+
+        def fetch():
+            request = urllib.request.Request(
+                f"http://{host}:{port}/sheets?point=17.5,48.5",
+                headers={"Accept-Encoding": "gzip"},
+            )
+            with urllib.request.urlopen(request) as response:
+                return response.headers, response.read()
+
+        headers, body = await asyncio.get_running_loop().run_in_executor(None, fetch)
+
+        reader, writer = await asyncio.open_connection(host, port)
+        writer.write(b"HEAD / HTTP/1.1\r\nHost: x\r\n\r\nGET / HTTP/1.0\r\n\r\n")
+        await writer.drain()
+        raw = await reader.read()
+        writer.close()
+        server.close()
+        await server.wait_closed()
+        return headers, body, raw
+
+    headers, body, raw = asyncio.run(main())
+    assert headers["ETag"]
+    assert labels(json.loads(body)) == ["35-3"]
+    head, second = raw.split(b"\r\n\r\n", 1)
+    assert b"Connection: keep-alive" in head
+    assert second.startswith(b"HTTP/1.1 200 OK") and second.endswith(b'"sheets": 299}')
+
+
+def test_slow_query_does_not_block_other_connections():
+    service = SheetService([F0303], reload_interval=0)
+    sheets_body = service._sheets_body
+    started, release = threading.Event(), threading.Event()
+
+    def slow_sheets_body(parsed):
+        started.set()
+        release.wait(5)
+        return sheets_body(parsed)
+
+    service._sheets_body = slow_sheets_body
+
+    async def main():
+        server = await service.start("127.0.0.1", 0)
+        host, port = server.sockets[0].getsockname()[:2]
+
+        async def request(target):
+            reader, writer = await asyncio.open_connection(host, port)
+            writer.write(f"GET {target} HTTP/1.0\r\n\r\n".encode("latin-1"))
+            await writer.drain()
+            raw = await reader.read()
+            writer.close()
+            return raw
+
+        start = time.perf_counter()
+        slow = asyncio.create_task(request("/sheets?label=35-3"))
+        await asyncio.get_running_loop().run_in_executor(None, started.wait, 5)
+        # Answered while the query is still running in the executor.
+        index = await request("/")
+        assert not release.is_set() and time.perf_counter() - start < 2
+        release.set()
+        sheets = await slow
+        server.close()
+        await server.wait_closed()
+        return index, sheets
+
+    index, sheets = asyncio.run(main())
+    assert index.startswith(b"HTTP/1.1 200 OK") and index.endswith(b'"sheets": 91}')
+    assert b'"label": "35-3"' in sheets
@@ -0,0 +1,91 @@
+import numpy as np
+from openindexmaps_py.columnar import ColumnarOpenIndexMap
+from openindexmaps_py.oimpy import OpenIndexMap, Sheet
+from openindexmaps_py.spatial import SheetIndex
+from openindexmaps_py.testfeatures import SimpleTestMapSheets
+
+
+def grid_bounds():
+    bounds = [(x, y, x + 1.0, y + 1.0) for x in range(-10, 10) for y in range(-5, 5)]
+    bounds.append((175.0, -5.0, -175.0, 5.0))  # crosses the antimeridian
+    bounds.append((np.nan, np.nan, np.nan, np.nan))
+    return np.array(bounds)
+
+
+def brute_force(bounds, west, south, east, north):
+    return [
+        row
+        for row, (w, s, e, n) in enumerate(bounds)
+        if w <= east and e >= west and s <= north and n >= south
+    ]
+
+
+def test_query_bbox_matches_linear_scan():
+    bounds = grid_bounds()
+    index = SheetIndex(bounds)
+    for box in [(-2.5, -2.5, 0.5, 0.5), (0, 0, 0, 0), (-100, -100, 100, 100)]:
+        assert index.query_bbox(*box).tolist() == brute_force(bounds[:-2], *box)
+
+
+def test_antimeridian_sheet_and_query():
+    index = SheetIndex(grid_bounds())
+    crossing = len(grid_bounds()) - 2
+    assert index.query_point(179.5, 0).tolist() == [crossing]
+    assert index.query_point(-179.5, 0).tolist() == [crossing]
+    assert index.query_point(0.5, 0.5).tolist() == [105]
+    assert index.query_point(170, 0).tolist() == []
+    # a query box that itself crosses the antimeridian
+    assert index.query_bbox(179, -1, -179, 1).tolist() == [crossing]
+    assert index.query_bbox(179, -1, -100, 1).tolist() == [crossing]
+
+
+def test_nearest():
+    index = SheetIndex(grid_bounds())
+    assert index.nearest(0.5, 0.5).tolist() == [105]
+    assert index.nearest(-178.0, 0.0).tolist() == [len(grid_bounds()) - 2]
+    nearest = index.nearest(20.0, 0.5, count=3).tolist()
+    assert nearest[0] == 195 and len(nearest) == 3
+
+
+def brute_force_nearest(bounds, lon, lat, count):
+    distances = {}
+    for row, (w, s, e, n) in enumerate(bounds):
+        if np.isnan(w):
+            continue
+        halves = [(w, e)]
+        if abs(e - w) > 180:  # split at the antimeridian
+            halves = [(max(w, e), 180.0), (-180.0, min(w, e))]
+        distances[row] = min(
+            np.hypot(max(west - lon, 0, lon - east), max(s - lat, 0, lat - n))
+            for west, east in halves
+        )
+    return sorted(distances, key=lambda row: (distances[row], row))[:count]
+
+
+def test_nearest_matches_brute_force():
+    bounds = np.concatenate(
+        [
+            grid_bounds(),
+            [(170.0, 20.0, -170.0, 30.0), (-179.0, -30.0, 179.0, -20.0)],
+        ]
+    )
+    index = SheetIndex(bounds)
+    points = [(0.5, 0.5), (179.9, 0.0), (-179.9, 25.0), (178.0, -25.0), (90.0, 80.0)]
+    for lon, lat in points:
+        for count in (1, 2, 5, 40, len(bounds)):
+            expected = brute_force_nearest(bounds, lon, lat, count)
+            assert index.nearest(lon, lat, count).tolist() == expected, (lon, lat)
+
+
+def test_openindexmap_queries_follow_add_sheet():
+    oim = OpenIndexMap([Sheet(SimpleTestMapSheets.sheet)])
+    assert [s.label for s in oim.sheets_at(-87.9, 43.0)] == ["14924"]
+    assert oim.sheets_at(179.0, 0.0) == []
+
+    oim.add_sheet(Sheet(SimpleTestMapSheets.antimeridian_sheet))
+    assert [s.label for s in oim.sheets_at(179.0, 0.0)] == ["999"]
+    assert [s.label for s in oim.query_bbox(-180, -90, 180, 90)] == ["14924", "999"]
+    assert [s.label for s in oim.nearest_sheets(-88.5, 43.0)] == ["14924"]
+
+    columnar = ColumnarOpenIndexMap.from_openindexmap(oim)
+    assert [s.label for s in columnar.sheets_at(-179.0, 0.0)] == ["999"]
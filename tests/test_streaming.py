@@ -0,0 +1,81 @@
+import io
+import json
+import pytest
+from openindexmaps_py.oimpy import MapSheet, OpenIndexMap, Sheet
+from openindexmaps_py.streaming import iter_features, read_ahead
+
+
+def feature_collection(count):
+    return {
+        "type": "FeatureCollection",
+        "features": [
+            {
+                "type": "Feature",
+                "properties": {
+                    "label": f"{i}",
+                    "title": "Tîrgu Mureș",
+                    "west": -1.5e-7,
+                    "east": 1.0,
+                    "south": 0.0,
+                    "north": 1.0,
+                },
+                "geometry": None,
+            }
+            for i in range(count)
+        ],
+    }
+
+
+@pytest.mark.parametrize("chunk_size", [1, 7, 4096])
+@pytest.mark.parametrize("indent", [None, 4])
+def test_iter_features_matches_json_load(chunk_size, indent):
+    data = {"bbox": [0, 0, 1, 1], **feature_collection(25), "name": {"a": [1, 2]}}
+    text = json.dumps(data, indent=indent, ensure_ascii=False)
+    members = {}
+    features = list(
+        iter_features(io.StringIO(text), chunk_size=chunk_size, members=members)
+    )
+    assert features == data["features"]
+    assert members == {key: data[key] for key in ("bbox", "type", "name")}
+
+
+def test_iter_features_empty_and_missing():
+    assert (
+        list(
+            iter_features(io.StringIO('{"type": "FeatureCollection", "features": []}'))
+        )
+        == []
+    )
+    assert list(iter_features(io.StringIO('{"type": "FeatureCollection"}'))) == []
+    assert list(iter_features(io.StringIO("{}"))) == []
+
+
+def test_read_ahead_reads_the_members_before_the_features():
+    data = {"name": "f0168", **feature_collection(2), "bbox": [0, 0, 1, 1]}
+    members = {}
+    features = read_ahead(iter_features(io.StringIO(json.dumps(data)), members=members))
+    assert members == {"name": "f0168", "type": "FeatureCollection"}
+    assert list(features) == data["features"]
+    assert members["bbox"] == [0, 0, 1, 1]
+    assert list(read_ahead(iter_features(io.StringIO("{}")))) == []
+
+
+def test_iter_features_truncated():
+    text = json.dumps(feature_collection(3))[:-20]
+    with pytest.raises(ValueError):
+        list(iter_features(io.StringIO(text), chunk_size=8))
+
+
+def test_iter_sheets(tmp_path):
+    path = tmp_path / "oim.geojson"
+    path.write_text(json.dumps(feature_collection(5)))
+
+    sheets = OpenIndexMap.iter_sheets(str(path), sheet_class=MapSheet)
+    first = next(sheets)
+    assert isinstance(first, MapSheet)
+    assert first.title == "Tîrgu Mureș"
+    assert [sheet.label for sheet in sheets] == ["1", "2", "3", "4"]
+
+    oim = OpenIndexMap.from_file(str(path))
+    assert isinstance(oim.features[0], Sheet)
+    assert len(oim.features) == 5
@@ -0,0 +1,308 @@
+import gzip
+import json
+import sqlite3
+
+import geojson
+import mapbox_vector_tile
+import pytest
+from openindexmaps_py import mapping
+from openindexmaps_py.columnar import ColumnarOpenIndexMap
+from openindexmaps_py.oimpy import BOUNDS, OpenIndexMap, Sheet
+from openindexmaps_py.tiles import (
+    EXTENT,
+    _column_bands,
+    mercator,
+    tile_bounds,
+    tile_source,
+    write_tiles,
+    zoom_tiles,
+)
+
+FIXTURE = "tests/fixture/f0303_OIM.geojson"
+
+
+@pytest.fixture(scope="module")
+def oim():
+    return ColumnarOpenIndexMap.from_file(FIXTURE)
+
+
+def decode_tile(data):
+    """
+    Decodes a tile (gzipped or not) with mapbox-vector-tile into {layer name:
+    {"extent", "features"}}, each geometry a list of rings in tile units.
+    """
+    if data[:2] == b"\x1f\x8b":
+        data = gzip.decompress(data)
+    layers = mapbox_vector_tile.decode(data, default_options={"y_coord_down": True})
+    decoded = {}
+    for name, layer in layers.items():
+        features = []
+        for feature in layer["features"]:
+            geometry = feature["geometry"]
+            polygons = geometry["coordinates"]
+            if geometry["type"] == "Polygon":
+                polygons = [polygons]
+            rings = [
+                [tuple(point) for point in ring] for rings in polygons for ring in rings
+            ]
+            features.append(
+                {
+                    "id": feature["id"],
+                    "type": geometry["type"],
+                    "properties": feature["properties"],
+                    "geometry": rings,
+                }
+            )
+        decoded[name] = {"extent": layer["extent"], "features": features}
+    return decoded
+
+
+def features_by_tile(tiles):
+    return {(x, y): decode_tile(data)["sheets"]["features"] for x, y, data in tiles}
+
+
+def global_ring(ring, zoom, x, y):
+    """Projects a ring the way the tiles snap it, in the units of tile x, y."""
+    scale = (EXTENT << zoom) / 16
+    xs, ys = mercator([point[0] for point in ring], [point[1] for point in ring])
+    return [
+        (round(px * scale) * 16 - x * EXTENT, round(py * scale) * 16 - y * EXTENT)
+        for px, py in zip(xs.tolist(), ys.tolist())
+    ]
+
+
+def signed_area(ring):
+    return sum(x0 * y1 - x1 * y0 for (x0, y0), (x1, y1) in zip(ring, ring[1:]))
+
+
+def test_mercator_and_tile_bounds():
+    west, south, east, north = tile_bounds(1, 1, 0)
+    assert (west, east) == (0.0, 180.0)
+    assert south == pytest.approx(0.0, abs=1e-9)
+    assert north == pytest.approx(85.0511287798066)
+    x, y = mercator([west, east], [north, south])
+    assert x.tolist() == [0.5, 1.0]
+    assert y.tolist() == pytest.approx([0.0, 0.5])
+
+
+def test_sheets_in_tiles(oim):
+    zoom = 8
+    tiles = features_by_tile(zoom_tiles(tile_source(oim), zoom))
+    for row, sheet in enumerate(oim.features):
+        west, south, east, north = (sheet.properties[key] for key in BOUNDS)
+        # The tile under the middle of the sheet holds all of it (or its part).
+        cx, cy = mercator((west + east) / 2, (south + north) / 2)
+        x, y = int(cx * (1 << zoom)), int(cy * (1 << zoom))
+        (feature,) = [f for f in tiles[(x, y)] if f["id"] == row]
+        assert feature["type"] == "Polygon"
+        assert feature["properties"]["label"] == sheet.properties["label"]
+        assert feature["properties"]["datePub"] == sheet.properties["datePub"]
+        (ring,) = feature["geometry"]
+        expected = global_ring(
+            [(west, north), (east, north), (east, south), (west, south), (west, north)],
+            zoom,
+            x,
+            y,
+        )
+        clipped = [
+            (min(max(px, -64), EXTENT + 64), min(max(py, -64), EXTENT + 64))
+            for px, py in expected
+        ]
+        assert ring == clipped
+        assert signed_area(ring) > 0  # clockwise exterior
+
+
+def test_every_sheet_is_in_its_tiles(oim):
+    for zoom in (6, 10):
+        tiles = features_by_tile(zoom_tiles(tile_source(oim), zoom))
+        ids = {feature["id"] for features in tiles.values() for feature in features}
+        assert ids == set(range(len(oim.columns)))
+        for (x, y), features in tiles.items():
+            west, south, east, north = tile_bounds(zoom, x, y)
+            margin = (east - west) * 64 / EXTENT
+            for feature in features:
+                sheet = oim.features[feature["id"]].properties
+                assert sheet["west"] < east + margin and sheet["east"] > west - margin
+
+
+def test_small_sheets_are_left_out_at_low_zooms(oim):
+    source = tile_source(oim)
+    (tile,) = zoom_tiles(source, 0)
+    features = decode_tile(tile[2])["sheets"]["features"]
+    # At zoom 0 a sheet of 2/3 by 1/3 degree is about half a pixel.
+    assert 0 < len(features) < len(oim.columns)
+    for feature in features:
+        (ring,) = feature["geometry"]
+        assert all(x % 16 == 0 and y % 16 == 0 for x, y in ring)
+
+
+def test_fields_and_values():
+    oim = OpenIndexMap(
+        [
+            Sheet(properties)
+            for properties in [
+                {"label": "a", "west": 0, "east": 1, "south": 0, "north": 1},
+                {
+                    "label": "b",
+                    "west": 1.5,
+                    "east": 2,
+                    "south": 0,
+                    "north": 1,
+                    "available": False,
+                    "count": -3,
+                    "location": ["Milwaukee"],
+                    "note": None,
+                },
+            ]
+        ]
+    )
+    tiles = zoom_tiles(tile_source(oim), 5)
+    found = {
+        feature["id"]: feature["properties"]
+        for features in features_by_tile(tiles).values()
+        for feature in features
+    }
+    assert found[0] == {"label": "a", "west": 0, "east": 1, "south": 0, "north": 1}
+    assert found[1] == {
+        "label": "b",
+        "west": 1.5,
+        "east": 2,
+        "south": 0,
+        "north": 1,
+        "available": False,
+        "count": -3,
+        "location": '["Milwaukee"]',
+    }
+    tiles = zoom_tiles(tile_source(oim, fields=["label"]), 5)
+    for features in features_by_tile(tiles).values():
+        assert all(set(feature["properties"]) == {"label"} for feature in features)
+
+
+def test_other_geometries():
+    triangle = [[10.0, 10.0], [12.0, 10.0], [11.0, 12.0], [10.0, 10.0]]
+    square = [[0.0, 0.0], [40.0, 0.0], [40.0, 40.0], [0.0, 40.0], [0.0, 0.0]]
+    hole = [[10.0, 10.0], [10.0, 20.0], [20.0, 20.0], [20.0, 10.0], [10.0, 10.0]]
+    oim = OpenIndexMap(
+        [
+            geojson.Feature(
+                properties={"label": "triangle"},
+                geometry={"type": "Polygon", "coordinates": [triangle]},
+            ),
+            geojson.Feature(
+                properties={"label": "holed"},
+                geometry={"type": "Polygon", "coordinates": [square, hole]},
+            ),
+            geojson.Feature(
+                properties={"label": "split"},
+                geometry={
+                    "type": "MultiPolygon",
+                    "coordinates": [
+                        [[[170, 0], [180, 0], [180, 5], [170, 5], [170, 0]]],
+                        [[[-180, 0], [-170, 0], [-170, 5], [-180, 5], [-180, 0]]],
+                    ],
+                },
+            ),
+        ]
+    )
+    source = tile_source(oim)
+    assert len(source.shapes) == 2 and len(source.boxes) == 2
+    tiles = features_by_tile(zoom_tiles(source, 0))
+    (features,) = tiles.values()
+    by_label = {feature["properties"]["label"]: feature for feature in features}
+    (ring,) = by_label["triangle"]["geometry"]
+    assert len(ring) == 4 and signed_area(ring) > 0
+    outer, inner = by_label["holed"]["geometry"]
+    assert signed_area(outer) > 0 > signed_area(inner)
+    east, west = by_label["split"]["geometry"]
+    assert east[0][0] > 3800 and west[0][0] == 0
+    # The parts are drawn from one cursor: both stay inside the tile.
+    assert all(-64 <= x <= EXTENT + 64 for x, _ in east + west)
+
+    banded = [
+        tile for x in range(16) for tile in zoom_tiles(source, 4, columns=(x, x + 1))
+    ]
+    assert banded == zoom_tiles(source, 4)
+
+
+def test_write_directory_and_mbtiles(oim, tmp_path):
+    counts = write_tiles(oim, tmp_path / "tiles", minzoom=2, maxzoom=6)
+    assert list(counts) == [2, 3, 4, 5, 6]
+    files = sorted((tmp_path / "tiles").glob("*/*/*.pbf"))
+    assert len(files) == sum(counts.values())
+    metadata = json.loads((tmp_path / "tiles" / "metadata.json").read_text())
+    assert metadata["tiles"] == ["{z}/{x}/{y}.pbf"]
+    assert (metadata["minzoom"], metadata["maxzoom"]) == (2, 6)
+    assert metadata["bounds"] == oim.compute_bbox()
+    layer = metadata["vector_layers"][0]
+    assert layer["id"] == "sheets" and layer["fields"]["label"] == "String"
+    assert layer["fields"]["west"] == "Number"
+
+    path = tmp_path / "index.mbtiles"
+    assert write_tiles(oim, path, minzoom=2, maxzoom=6, jobs=2) == counts
+    with sqlite3.connect(path) as connection:
+        rows = connection.execute(
+            "SELECT zoom_level, tile_column, tile_row, tile_data FROM tiles"
+        ).fetchall()
+        names = dict(connection.execute("SELECT name, value FROM metadata"))
+    assert len(rows) == len(files)
+    assert names["format"] == "pbf" and names["maxzoom"] == "6"
+    assert json.loads(names["json"])["vector_layers"][0]["id"] == "sheets"
+    for zoom, x, tms_row, data in rows:
+        y = (1 << zoom) - 1 - tms_row
+        expected = (tmp_path / "tiles" / str(zoom) / str(x) / f"{y}.pbf").read_bytes()
+        assert gzip.decompress(data) == expected
+        assert decode_tile(data) == decode_tile(expected)
+
+
+def test_write_tiles_rejects_zooms(oim, tmp_path):
+    with pytest.raises(ValueError):
+        write_tiles(oim, tmp_path / "tiles", minzoom=5, maxzoom=4)
+
+
+def test_parallel_zoom_levels_match(oim, tmp_path):
+    write_tiles(oim, tmp_path / "one", minzoom=0, maxzoom=7)
+    write_tiles(oim, tmp_path / "many", minzoom=0, maxzoom=7, jobs=0)
+    one = {
+        p.relative_to(tmp_path / "one"): p.read_bytes()
+        for p in (tmp_path / "one").rglob("*.pbf")
+    }
+    many = {
+        p.relative_to(tmp_path / "many"): p.read_bytes()
+        for p in (tmp_path / "many").rglob("*.pbf")
+    }
+    assert one == many
+
+
+@pytest.mark.parametrize("zoom", [0, 5, 9])
+def test_column_bands_match_zoom_level(oim, zoom):
+    source = tile_source(oim)
+    bands = _column_bands(source, zoom, pieces=50)
+    assert bands[0][0] == 0 and bands[-1][1] == 1 << zoom
+    assert all(stop == first for (_, stop), (first, _) in zip(bands, bands[1:]))
+    if zoom == 9:
+        assert len(bands) > 1
+    banded = [
+        tile for columns in bands for tile in zoom_tiles(source, zoom, columns=columns)
+    ]
+    assert banded == zoom_tiles(source, zoom)
+
+
+def test_create_map_from_tiles(oim, tmp_path):
+    directory = tmp_path / "tiles"
+    write_tiles(oim, directory, minzoom=0, maxzoom=4)
+    mapping.create_map(tiles=str(directory))
+    with open(mapping.OUTPUT_PATH) as file:
+        page = file.read()
+    assert "L.vectorGrid.protobuf" in page
+    assert f"{directory.name}/{{z}}/{{x}}/{{y}}.pbf" in page
+    assert '"maxNativeZoom": 4' in page
+    # The sheets come from the tiles, not from inlined GeoJSON.
+    assert oim.features[0].properties["title"] not in page
+
+    mapping.create_map(
+        tiles="http://localhost:8000/{z}/{x}/{y}.pbf", bounds=[0, 40, 10, 50]
+    )
+    with open(mapping.OUTPUT_PATH) as file:
+        page = file.read()
+    assert "http://localhost:8000/{z}/{x}/{y}.pbf" in page
+    assert "[[40, 0], [50, 10]]" in page
@@ -0,0 +1,132 @@
+import contextlib
+import io
+import json
+
+from openindexmaps_py import timings
+from openindexmaps_py.geodex import GeodexGeoJSON, convert_geodex
+from openindexmaps_py.timings import Timings, stage, timed, timed_iter
+
+
+@timed("double")
+def double(value):
+    return 2 * value
+
+
+def test_nothing_recorded_when_inactive():
+    assert timings.current() is None
+    assert double(2) == 4
+    with stage("block") as block:
+        block.records = 10
+    assert list(timed_iter("items", range(3))) == [0, 1, 2]
+    with Timings() as collector:
+        pass
+    assert collector.stages == []
+
+
+def test_stages():
+    with Timings() as collector:
+        assert timings.current() is collector
+        for value in range(3):
+            double(value)
+        with stage("block") as block:
+            block.records = 10
+        assert list(timed_iter("items", "abcd")) == list("abcd")
+    assert timings.current() is None
+
+    stages = {entry.name: entry for entry in collector.stages}
+    assert [name for name in stages] == ["double", "block", "items"]
+    assert (stages["double"].calls, stages["double"].records) == (3, 3)
+    assert (stages["block"].calls, stages["block"].records) == (1, 10)
+    assert (stages["items"].calls, stages["items"].records) == (4, 4)
+    assert all(entry.seconds <= collector.seconds for entry in collector.stages)
+
+
+def test_timed_counts_records_and_exceptions():
+    @timed("fails", records=lambda items: len(items))
+    def fails(items):
+        raise ValueError
+
+    with Timings() as collector:
+        with contextlib.suppress(ValueError):
+            fails([1, 2, 3])
+    assert collector.stages[0][:3] == ("fails", 1, 3)
+
+
+def test_merge_and_report():
+    first, second = Timings(), Timings()
+    first.add("load", 0.5, records=100)
+    second.add("load", 0.5, records=100)
+    second.add("write", 0.25)
+    first.merge(second)
+    report = json.loads(json.dumps(first.report()))
+    assert report["stages"] == [
+        {
+            "name": "load",
+            "calls": 2,
+            "records": 200,
+            "seconds": 1.0,
+            "records_per_second": 200.0,
+        },
+        {
+            "name": "write",
+            "calls": 1,
+            "records": 1,
+            "seconds": 0.25,
+            "records_per_second": 4.0,
+        },
+    ]
+    assert first.format().splitlines()[1].split()[:4] == ["load", "2", "200", "1.000"]
+
+
+def test_geodex_stages():
+    with Timings() as collector, contextlib.redirect_stdout(io.StringIO()):
+        geodex = GeodexGeoJSON.from_geojson_file("tests/fixture/f0303_geodex.geojson")
+        geodex.to_openindexmap()
+    stages = {entry.name: entry for entry in collector.stages}
+    assert stages["geojson.load"].records == 91
+    for name in (
+        "GeodexSheet.__init__",
+        "GeodexSheet.get_dates",
+        "GeodexSheet.get_iso",
+        "MapSheet.__init__",
+        "Sheet._warn_if_invalid",
+    ):
+        assert stages[name].calls == 91, name
+    assert stages["OpenIndexMap.is_valid"][1:3] == (1, 91)
+
+    with Timings() as collector:
+        convert_geodex("tests/fixture/f0303_geodex.geojson", io.StringIO())
+    stages = {entry.name: entry for entry in collector.stages}
+    assert stages["iter_features"].records == 91
+    assert stages["writer.feature_json"].calls == 91
+
+
+def test_self_seconds_and_phases(monkeypatch):
+    clock = iter(range(100))
+    monkeypatch.setattr(timings.time, "perf_counter", lambda: float(next(clock)))
+    with Timings() as collector:  # starts at 0
+        with stage("output"):  # 1
+            for item in timed_iter("iter_features", ["a"]):  # 2-3, 4-5
+                with stage("writer.feature_json"):  # 6-7
+                    pass
+        # output ends at 8
+        with stage("unlisted"):  # 9-10
+            pass
+    # ends at 11
+    stages = {entry.name: entry for entry in collector.stages}
+    assert stages["output"].seconds == 7.0
+    assert stages["output"].self_seconds == 7.0 - 2.0 - 1.0
+    assert stages["iter_features"].self_seconds == 2.0
+    assert collector.phases() == {
+        "parse": 2.0,
+        "sheets": 0.0,
+        "validation": 0.0,
+        "serialization": 1.0,
+        "output": 4.0,
+        "other": 4.0,
+    }
+    assert collector.report()["phases"] == collector.phases()
+
+    merged = Timings()
+    merged.merge(collector, seconds=False)
+    assert merged.stages == collector.stages and merged.seconds == 0.0
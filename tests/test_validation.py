@@ -0,0 +1,190 @@
+import copy
+import json
+import os
+import pytest
+from jsonschema import Draft7Validator
+from openindexmaps_py import validation
+from openindexmaps_py.oimpy import SCHEMA_PATH
+from openindexmaps_py.validation import (
+    SchemaValidator,
+    compile_schema,
+    find_files,
+    geojson_errors,
+    get_validator,
+    sheet_errors,
+    validate_file,
+    validate_files,
+)
+
+
+def load_json(filename):
+    with open(filename, "r") as file:
+        return json.load(file)
+
+
+def broken_features():
+    feature = load_json("tests/fixture/MillionthMap.geojson")["features"][0]
+    variants = []
+    for change in (
+        lambda f: f["properties"].update(label=5),
+        lambda f: f["properties"].update(west="far"),
+        lambda f: f["properties"].update(tooLongName=1),
+        lambda f: f["properties"].update(badNAME=1),
+        lambda f: f.update(type="Sheet"),
+        lambda f: f["geometry"].update(type="Circle"),
+        lambda f: f["geometry"].update(
+            coordinates=[f["geometry"]["coordinates"][0][:3]]
+        ),
+        lambda f: f["geometry"].update(coordinates=[[[True, 1]] * 4]),
+    ):
+        variant = copy.deepcopy(feature)
+        change(variant)
+        variants.append(variant)
+    return feature, variants
+
+
+def test_compiled_predicate_agrees_with_jsonschema():
+    items_schema = load_json(SCHEMA_PATH)["properties"]["features"]["items"]
+    check = compile_schema(items_schema)
+    reference = Draft7Validator(items_schema)
+    assert check is not None
+
+    feature, variants = broken_features()
+    assert check(feature) and reference.is_valid(feature)
+    for variant in variants:
+        assert check(variant) == reference.is_valid(variant) == False
+
+
+def test_unsupported_keywords_fall_back():
+    assert compile_schema({"$ref": "#/definitions/x"}) is None
+    assert compile_schema({"items": [{"type": "string"}]}) is None
+    assert compile_schema({"enum": [True]})(1) is False
+
+
+def test_all_errors_are_reported_per_feature():
+    collection = load_json("tests/fixture/MillionthMap.geojson")
+    collection["features"][1]["properties"].update(label=5, west="far")
+    collection["features"][3]["type"] = "Sheet"
+
+    validator = SchemaValidator(load_json(SCHEMA_PATH))
+    errors = list(validator.iter_errors(collection))
+    paths = sorted(error.json_path for error in errors)
+    assert paths == [
+        "$.features[1].properties.label",
+        "$.features[1].properties.west",
+        "$.features[3].type",
+    ]
+    assert not validator.is_valid(collection)
+    assert not Draft7Validator(load_json(SCHEMA_PATH)).is_valid(collection)
+
+    features = collection.pop("features")
+    streamed = list(validator.iter_stream_errors(iter(features), collection))
+    assert sorted(error.json_path for error in streamed) == paths
+    streamed = validator.iter_stream_errors(iter(features), {"type": "Sheets"})
+    assert [error.json_path for error in streamed] == paths + ["$.type"]
+
+
+def test_get_validator_caches_by_mtime(tmp_path):
+    schema_path = tmp_path / "schema.json"
+    schema_path.write_text(json.dumps({"type": "object", "required": ["type"]}))
+    first = get_validator(str(schema_path))
+    assert get_validator(str(schema_path)) is first
+    assert not first.is_valid({})
+
+    schema_path.write_text(json.dumps({"type": "object"}))
+    stat = os.stat(schema_path)
+    os.utime(schema_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    second = get_validator(str(schema_path))
+    assert second is not first
+    assert second.is_valid({})
+    assert (
+        len([key for key in validation._validators if key[0] == str(schema_path)]) == 1
+    )
+
+
+def test_invalid_schema_is_rejected():
+    with pytest.raises(Exception):
+        SchemaValidator({"type": 5})
+
+
+def test_geojson_and_sheet_errors():
+    feature, _ = broken_features()
+    assert geojson_errors(feature) == sheet_errors(feature) == []
+    feature["geometry"]["coordinates"][0].pop()
+    feature["properties"].update(west="far", south=95, east=None)
+    del feature["properties"]["north"]
+    assert [error["path"] for error in geojson_errors(feature)] == ["$.geometry"]
+    assert [error["message"] for error in sheet_errors(feature)] == [
+        "west 'far' is not a number",
+        "south 95 is outside -90..90",
+    ]
+    feature["geometry"] = {"type": "Circle"}
+    feature["properties"] = {"west": 0, "south": 2, "east": 1, "north": 1}
+    assert len(geojson_errors(feature)) == 1
+    assert [error["path"] for error in sheet_errors(feature)] == ["$.properties"]
+    assert [error["check"] for error in geojson_errors([])] == ["geojson"]
+
+
+def test_null_bounds_are_valid(tmp_path):
+    feature, _ = broken_features()
+    feature["properties"].update(west=None, south=None)
+    del feature["properties"]["east"], feature["properties"]["north"]
+    assert get_validator(SCHEMA_PATH).is_valid(
+        {"type": "FeatureCollection", "features": [feature]}
+    )
+    assert sheet_errors(feature) == []
+    report = validate_file(write_collection(tmp_path / "a.geojson", [feature]))
+    assert report.valid, report.errors
+
+
+def write_collection(path, features, **members):
+    path.write_text(
+        json.dumps({"type": "FeatureCollection", **members, "features": features})
+    )
+    return path
+
+
+def test_validate_file_reports_every_error(tmp_path):
+    collection = load_json("tests/fixture/MillionthMap.geojson")
+    features = collection["features"]
+    features[1]["properties"].update(label=5, west="far")
+    features[3]["geometry"]["coordinates"] = [[[0, 0], [1, 1]]]
+    report = validate_file(write_collection(tmp_path / "a.geojson", features))
+    assert report.features == len(features) and not report.valid
+    assert sorted((e["check"], e["path"]) for e in report.errors) == [
+        ("geojson", "$.features[3].geometry"),
+        ("schema", "$.features[1].properties.label"),
+        ("schema", "$.features[1].properties.west"),
+        ("schema", "$.features[3].geometry"),
+        ("sheet", "$.features[1].properties.west"),
+    ]
+    no_schema = validate_file(tmp_path / "a.geojson", schema_path=None)
+    assert {e["check"] for e in no_schema.errors} == {"geojson", "sheet"}
+
+    (tmp_path / "broken.geojson").write_text('{"type": "FeatureCollection", "feat')
+    (broken,) = validate_file(tmp_path / "broken.geojson").errors
+    assert broken["check"] == "json"
+
+
+def test_validate_files_in_parallel(tmp_path):
+    (tmp_path / "nested").mkdir()
+    good = load_json("tests/fixture/f0303_OIM.geojson")["features"]
+    paths = [
+        write_collection(tmp_path / "good.geojson", good),
+        write_collection(tmp_path / "nested" / "bad.geojson", [{"type": "Sheet"}]),
+        write_collection(tmp_path / "empty.geojson", [], type="Collection"),
+    ]
+    (tmp_path / "notes.txt").write_text("not checked")
+    files = find_files([tmp_path])
+    assert files == sorted(paths)
+    sequential = [report.to_dict() for report in validate_files(files)]
+    parallel = [report.to_dict() for report in validate_files(files, jobs=2)]
+    for report in sequential + parallel:
+        report.pop("seconds")
+    assert parallel == sequential
+    assert [report["valid"] for report in sequential] == [False, True, False]
+    assert [(e["check"], e["path"]) for e in sequential[0]["errors"]] == [
+        ("schema", "$.type"),
+        ("geojson", "$.type"),
+    ]
+    assert sequential[1]["features"] == 91
@@ -0,0 +1,68 @@
+import io
+import json
+import geojson
+import pytest
+from geojson_rewind import rewind
+from openindexmaps_py.oimpy import OpenIndexMap, Sheet
+from openindexmaps_py.testfeatures import SimpleTestMapSheets
+from openindexmaps_py.writer import output_geometry, write_feature_collection
+
+
+def sample_oim():
+    return OpenIndexMap(
+        [
+            Sheet(SimpleTestMapSheets.sheet),
+            Sheet(SimpleTestMapSheets.antimeridian_sheet),
+            Sheet({"label": "Tîrgu Mureș", **SimpleTestMapSheets.inset_map_sheet}),
+        ]
+    )
+
+
+@pytest.mark.parametrize("indent", [None, 0, 2, 4])
+def test_write_matches_dumps_then_rewind(indent):
+    oim = sample_oim()
+    expected = json.dumps(json.loads(rewind(geojson.dumps(oim))), indent=indent)
+    output = io.StringIO()
+    assert oim.write(output, indent=indent) == 3
+    assert output.getvalue() == expected
+
+
+def test_str_matches_previous_output():
+    oim = sample_oim()
+    assert str(oim) == rewind(geojson.dumps(oim))
+    sheet = oim.features[0]
+    assert str(sheet) == rewind(geojson.dumps(sheet, indent=4))
+
+
+def test_empty_collection():
+    output = io.StringIO()
+    OpenIndexMap().write(output, indent=2)
+    assert json.loads(output.getvalue()) == {
+        "type": "FeatureCollection",
+        "features": [],
+    }
+
+
+def test_rings_are_rewound_and_rounded():
+    clockwise = {
+        "type": "Polygon",
+        "coordinates": [
+            [[0, 0], [0, 1.123456789], [1, 1], [1, 0], [0, 0]],
+            [[0.2, 0.2], [0.8, 0.2], [0.8, 0.8], [0.2, 0.2]],
+        ],
+    }
+    geometry = output_geometry(clockwise, precision=3)
+    assert geometry["coordinates"][0] == [[0, 0], [1, 0], [1, 1], [0, 1.123], [0, 0]]
+    assert geometry["coordinates"][1][1] == [0.8, 0.8]
+    assert clockwise["coordinates"][0][1] == [0, 1.123456789], "input is not modified"
+
+
+def test_members_and_plain_features():
+    features = [{"type": "Feature", "properties": {"a": 1}, "geometry": None}]
+    output = io.StringIO()
+    write_feature_collection(output, iter(features), members={"name": "x"})
+    assert json.loads(output.getvalue()) == {
+        "type": "FeatureCollection",
+        "name": "x",
+        "features": features,
+    }